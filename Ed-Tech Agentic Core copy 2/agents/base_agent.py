@@ -1,14 +1,59 @@
 from abc import ABC, abstractmethod
+from typing import Optional, Tuple
+from core.config import AGENT_TOKEN_BUDGETS, DEFAULT_AGENT_TOKEN_BUDGET, AGENT_BUDGET_POLICY, MODEL_CONTEXT_TOKENS
+from core.tokens import calibrator, estimate_tokens, estimate_prompt_tokens, trim_to_tokens
+from core.logger import logger
 
 class BaseAgent(ABC):
     def __init__(self, name: str, model: str):
         self.name = name
         self.model = model
+        self.token_budget = AGENT_TOKEN_BUDGETS.get(name, DEFAULT_AGENT_TOKEN_BUDGET)
+        self.budget_policy = AGENT_BUDGET_POLICY
 
     @abstractmethod
     def get_system_prompt(self) -> str:
         pass
-    
+
     def format_user_prompt(self, **kwargs) -> str:
         """Override this to format the specific user input for the agent."""
         pass
+
+    # --- Prompt budget ---
+
+    def predict_tokens(self, system_prompt: str, user_content: str, cache_content: Optional[str] = None) -> int:
+        """Calibrated estimate of the input tokens this call will be billed for."""
+        return calibrator.predict(self.model, estimate_prompt_tokens(system_prompt, user_content, cache_content))
+
+    def tokens_available(self, system_prompt: str, cache_content: Optional[str] = None) -> int:
+        """Calibrated tokens left for the user prompt under this agent's budget (for sizing batches)."""
+        fixed = self.predict_tokens(system_prompt, "", cache_content)
+        return max(0, self.token_budget - fixed)
+
+    def fit_prompt(self, system_prompt: str, user_content: str, cache_content: Optional[str] = None) -> Tuple[str, int]:
+        """
+        Checks the call against this agent's budget before it is sent. Over budget
+        it logs a warning, and with the "trim" policy (or past the model's context
+        window) cuts the middle of user_content to fit.
+        Returns (user_content, raw_estimate); the raw estimate is what calibration learns from.
+        """
+        raw = estimate_prompt_tokens(system_prompt, user_content, cache_content)
+        ratio = calibrator.ratio(self.model)
+        predicted = int(round(raw * ratio))
+        if predicted <= self.token_budget:
+            return user_content, raw
+
+        limit = self.token_budget if self.budget_policy == "trim" else MODEL_CONTEXT_TOKENS
+        logger.warning(f"{self.name} prompt ~{predicted} tokens exceeds budget {self.token_budget}", extra={"props": {
+            "event": "prompt_over_budget", "agent": self.name, "model": self.model,
+            "predicted_input_tokens": predicted, "token_budget": self.token_budget,
+            "trimmed": predicted > limit,
+        }})
+        if predicted <= limit:
+            return user_content, raw
+
+        # Convert the calibrated overshoot back to raw estimator units for the user text
+        user_raw = estimate_tokens(user_content)
+        keep = max(0, user_raw - int((predicted - limit) / ratio) - 32)  # room for the omission marker
+        trimmed = trim_to_tokens(user_content, keep)
+        return trimmed, estimate_prompt_tokens(system_prompt, trimmed, cache_content)
@@ -1,14 +1,34 @@
 from .base_agent import BaseAgent
-import os
-
-PROMPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompts")
+from .prompt_registry import PromptRegistry
+
+# Placeholders each agent fills in, per template. Checked when the registry loads.
+PROMPT_FIELDS = {
+    "creator_preread_user.md": ("topic", "subtopics", "prerequisites"),
+    "creator_assignment_user.md": ("topic", "subtopics", "question_type", "difficulty", "count"),
+    "creator_lecture_user.md": ("topic", "subtopics", "prerequisites"),
+    "auditor_user.md": ("mode", "target_audience", "draft", "transcript"),
+    "pedagogue_user.md": ("mode", "target_audience", "draft"),
+    "editor_user.md": ("draft", "audit_feedback", "pedagogue_feedback"),
+    "editor_instruction.md": ("draft", "instruction"),
+    "sanitizer_user.md": ("mode", "text"),
+    "checker_assignment_user.md": ("question_data",),
+    "assignment_fix_user.md": ("question_json", "issues", "feedback"),
+    "creator_preread_system.md": (),
+    "creator_assignment_system.md": (),
+    "creator_lecture_system.md": (),
+    "auditor_system.md": (),
+    "pedagogue_system.md": (),
+    "editor_system.md": (),
+    "sanitizer_system.md": (),
+    "checker_assignment_system.md": (),
+}
+
+# Loaded and validated once per process; raises PromptError if a template is missing or broken
+prompts = PromptRegistry(fields=PROMPT_FIELDS)
 
 def read_prompt(filename):
-    try:
-        with open(os.path.join(PROMPTS_DIR, filename), "r", encoding="utf-8") as f:
-            return f.read()
-    except FileNotFoundError:
-        return f"Error: Prompt file {filename} not found."
+    """Raw template text (cached). Raises PromptError if the file doesn't exist."""
+    return prompts.text(filename)
 
 # --- 1. The Creator ---
 class CreatorAgent(BaseAgent):
@@ -17,34 +37,26 @@ class CreatorAgent(BaseAgent):
 
     def get_system_prompt(self, mode: str = "Lecture Notes") -> str:
         if mode == "Pre-read Notes":
-            return read_prompt("creator_preread_system.md")
+            return prompts.text("creator_preread_system.md")
         elif mode == "Assignment":
-            return read_prompt("creator_assignment_system.md")
+            return prompts.text("creator_assignment_system.md")
         else: # Default or "Lecture Notes"
-            return read_prompt("creator_lecture_system.md")
+            return prompts.text("creator_lecture_system.md")
 
     def format_user_prompt(self, topic: str, subtopics: str, mode: str = "Lecture Notes", **kwargs) -> str:
         if mode == "Pre-read Notes":
-            template = read_prompt("creator_preread_user.md")
-            prerequisites = kwargs.get("prerequisites", "None")
-            return template.replace("{topic}", topic)\
-                           .replace("{subtopics}", subtopics)\
-                           .replace("{prerequisites}", prerequisites)
+            return prompts.render("creator_preread_user.md", topic=topic, subtopics=subtopics,
+                                  prerequisites=kwargs.get("prerequisites", "None"))
         
         elif mode == "Assignment":
-            template = read_prompt("creator_assignment_user.md")
-            return template.replace("{topic}", topic)\
-                           .replace("{subtopics}", subtopics)\
-                           .replace("{question_type}", kwargs.get("question_type", "MCSC"))\
-                           .replace("{difficulty}", kwargs.get("difficulty", "Medium"))\
-                           .replace("{count}", str(kwargs.get("count", 5)))
+            return prompts.render("creator_assignment_user.md", topic=topic, subtopics=subtopics,
+                                  question_type=kwargs.get("question_type", "MCSC"),
+                                  difficulty=kwargs.get("difficulty", "Medium"),
+                                  count=kwargs.get("count", 5))
             
         else: # Lecture Notes
-            template = read_prompt("creator_lecture_user.md")
-            prerequisites = kwargs.get("prerequisites", "None")
-            return template.replace("{topic}", topic)\
-                           .replace("{subtopics}", subtopics)\
-                           .replace("{prerequisites}", prerequisites)
+            return prompts.render("creator_lecture_user.md", topic=topic, subtopics=subtopics,
+                                  prerequisites=kwargs.get("prerequisites", "None"))
 
     def format_preread_prompt(self, topic: str, subtopics: str) -> str:
         # DEPRECATED: Use format_user_prompt with mode="Pre-read Notes"
@@ -57,11 +69,12 @@ class AuditorAgent(BaseAgent):
         super().__init__("Auditor", model)
 
     def get_system_prompt(self) -> str:
-        return read_prompt("auditor_system.md")
+        return prompts.text("auditor_system.md")
 
-    def format_user_prompt(self, draft: str, transcript: str) -> str:
-        template = read_prompt("auditor_user.md")
-        return template.replace("{draft}", draft).replace("{transcript}", transcript)
+    def format_user_prompt(self, draft: str, transcript: str, mode: str = "Lecture Notes",
+                           target_audience: str = "General Student") -> str:
+        return prompts.render("auditor_user.md", draft=draft, transcript=transcript,
+                              mode=mode, target_audience=target_audience)
 
 
 # --- 3. The Pedagogue (Flow/Difficulty) ---
@@ -70,13 +83,12 @@ class PedagogueAgent(BaseAgent):
         super().__init__("Pedagogue", model)
 
     def get_system_prompt(self) -> str:
-        return read_prompt("pedagogue_system.md")
+        return prompts.text("pedagogue_system.md")
 
-    def format_user_prompt(self, draft: str, target_audience: str = "General Student") -> str:
-        template = read_prompt("pedagogue_user.md")
+    def format_user_prompt(self, draft: str, target_audience: str = "General Student", mode: str = "Lecture Notes") -> str:
         # Inject audience at the top or bottom
         audience_instruction = f"\n\nIMPORTANT: Assess this content specifically for a '{target_audience}' audience."
-        return template.replace("{draft}", draft) + audience_instruction
+        return prompts.render("pedagogue_user.md", draft=draft, mode=mode, target_audience=target_audience) + audience_instruction
 
 
 # --- 4. The Editor (Diff-Based) ---
@@ -85,17 +97,14 @@ class EditorAgent(BaseAgent):
         super().__init__("Editor", model)
 
     def get_system_prompt(self) -> str:
-        return read_prompt("editor_system.md")
+        return prompts.text("editor_system.md")
 
     def format_user_prompt(self, draft: str, audit_feedback: str, pedagogue_feedback: str) -> str:
-        template = read_prompt("editor_user.md")
-        return template.replace("{draft}", draft)\
-                       .replace("{audit_feedback}", audit_feedback)\
-                       .replace("{pedagogue_feedback}", pedagogue_feedback)
+        return prompts.render("editor_user.md", draft=draft, audit_feedback=audit_feedback,
+                              pedagogue_feedback=pedagogue_feedback)
 
     def format_instruction_prompt(self, draft: str, instruction: str) -> str:
-        template = read_prompt("editor_instruction.md")
-        return template.replace("{draft}", draft).replace("{instruction}", instruction)
+        return prompts.render("editor_instruction.md", draft=draft, instruction=instruction)
 
 
 # --- 5. The Sanitizer ---
@@ -104,11 +113,10 @@ class SanitizerAgent(BaseAgent):
         super().__init__("Sanitizer", model)
 
     def get_system_prompt(self) -> str:
-        return read_prompt("sanitizer_system.md")
+        return prompts.text("sanitizer_system.md")
 
-    def format_user_prompt(self, text: str) -> str:
-        template = read_prompt("sanitizer_user.md")
-        return template.replace("{text}", text)
+    def format_user_prompt(self, text: str, mode: str = "Lecture Notes") -> str:
+        return prompts.render("sanitizer_user.md", text=text, mode=mode)
 
 
 # --- 6. The Checker (Assignment Validation) ---
@@ -117,9 +125,12 @@ class CheckerAgent(BaseAgent):
         super().__init__("Checker", model)
 
     def get_system_prompt(self) -> str:
-        return read_prompt("checker_assignment_system.md")
+        return prompts.text("checker_assignment_system.md")
 
     def format_user_prompt(self, question_data: str) -> str:
-        template = read_prompt("checker_assignment_user.md")
-        return template.replace("{question_data}", question_data)
+        return prompts.render("checker_assignment_user.md", question_data=question_data)
+
+    def format_fix_prompt(self, question_json: str, issues, feedback: str) -> str:
+        """Prompt asking the Creator to rewrite a question the Checker failed."""
+        return prompts.render("assignment_fix_user.md", question_json=question_json, issues=issues, feedback=feedback)
 
@@ -0,0 +1,143 @@
+import os
+import re
+import time
+import threading
+from typing import Dict, Iterable, Optional
+from core.config import PROMPT_HOT_RELOAD, PROMPT_RELOAD_CHECK_S
+from core.logger import logger
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompts")
+
+# {lowercase_name}; JSON examples ('{ "type": ...}') and headings like '{Topic}' are not placeholders
+_PLACEHOLDER_RE = re.compile(r"\{([a-z_][a-z0-9_]*)\}")
+
+class PromptError(ValueError):
+    """A prompt file is missing, or its placeholders don't match what the agent supplies."""
+
+class PromptTemplate:
+    """
+    A prompt file compiled into literal segments and placeholder names, so
+    rendering is one join instead of a str.replace pass per field over the draft.
+    """
+    __slots__ = ("name", "path", "mtime", "text", "literals", "fields")
+
+    def __init__(self, name: str, path: str, text: str, mtime: float, fields: Iterable[str] = ()):
+        self.name = name
+        self.path = path
+        self.text = text
+        self.mtime = mtime
+        fields = set(fields)
+        parts = _PLACEHOLDER_RE.split(text)
+        # parts alternates literal, name, literal, ...; undeclared names stay literal text
+        self.literals = [parts[0]]
+        self.fields = []
+        for i in range(1, len(parts), 2):
+            name_, literal = parts[i], parts[i + 1]
+            if name_ in fields:
+                self.fields.append(name_)
+                self.literals.append(literal)
+            else:
+                self.literals[-1] += "{" + name_ + "}" + literal
+
+        missing = fields - set(self.fields)
+        if missing:
+            raise PromptError(f"Prompt {name} has no placeholder for: {', '.join(sorted(missing))}")
+        unknown = sorted(set(parts[1::2]) - fields)
+        if unknown and fields:
+            logger.warning(f"Prompt {name}: undeclared placeholders left as literal text: {unknown}")
+
+    def render(self, **values) -> str:
+        if not self.fields:
+            return self.text
+        try:
+            pieces = [self.literals[0]]
+            for field, literal in zip(self.fields, self.literals[1:]):
+                pieces.append(str(values[field]))
+                pieces.append(literal)
+        except KeyError as e:
+            raise PromptError(f"Prompt {self.name} needs a value for {e.args[0]}") from None
+        return "".join(pieces)
+
+class PromptRegistry:
+    """
+    Loads and compiles every template in prompts/ once. With hot_reload, a
+    template whose file mtime changed is recompiled on next use (stat at most
+    once per check_interval), so prompt edits show up without a restart.
+    `fields` maps filename -> placeholders the caller supplies; those files
+    must exist and contain exactly those placeholders, checked at load time.
+    """
+    def __init__(self, directory: str = PROMPTS_DIR, fields: Optional[Dict[str, Iterable[str]]] = None,
+                 hot_reload: bool = PROMPT_HOT_RELOAD, check_interval: float = PROMPT_RELOAD_CHECK_S):
+        self.directory = directory
+        self.fields = {name: tuple(f) for name, f in (fields or {}).items()}
+        self.hot_reload = hot_reload
+        self.check_interval = check_interval
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {"loads": 0, "reloads": 0, "renders": 0}
+        self.load_all()
+
+    def _compile(self, name: str) -> PromptTemplate:
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            mtime = os.path.getmtime(path)
+        except FileNotFoundError:
+            raise PromptError(f"Prompt file {name} not found in {self.directory}") from None
+        self.stats["loads"] += 1
+        return PromptTemplate(name, path, text, mtime, self.fields.get(name, ()))
+
+    def load_all(self):
+        """Compiles every .md file plus every declared template; raises PromptError on the first problem."""
+        names = set(self.fields)
+        if os.path.isdir(self.directory):
+            names.update(f for f in os.listdir(self.directory) if f.endswith(".md"))
+        templates = {name: self._compile(name) for name in sorted(names)}
+        with self._lock:
+            self._templates = templates
+            self._checked = dict.fromkeys(templates, time.monotonic())
+
+    def _maybe_reload(self, name: str, template: PromptTemplate) -> PromptTemplate:
+        now = time.monotonic()
+        if now - self._checked.get(name, 0.0) < self.check_interval:
+            return template
+        self._checked[name] = now
+        try:
+            mtime = os.path.getmtime(template.path)
+        except FileNotFoundError:
+            return template  # Keep serving the last good version
+        if mtime == template.mtime:
+            return template
+        try:
+            fresh = self._compile(name)
+        except PromptError as e:
+            logger.error(f"Prompt reload failed, keeping previous version: {e}")
+            template.mtime = mtime  # Don't retry until the file changes again
+            return template
+        with self._lock:
+            self._templates[name] = fresh
+        self.stats["reloads"] += 1
+        logger.info(f"Reloaded prompt {name}")
+        return fresh
+
+    def get(self, name: str) -> PromptTemplate:
+        template = self._templates.get(name)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None:
+                    template = self._templates[name] = self._compile(name)
+                    self._checked[name] = time.monotonic()
+            return template
+        if self.hot_reload:
+            template = self._maybe_reload(name, template)
+        return template
+
+    def text(self, name: str) -> str:
+        return self.get(name).text
+
+    def render(self, name: str, **values) -> str:
+        self.stats["renders"] += 1
+        return self.get(name).render(**values)
@@ -1,9 +1,9 @@
 import streamlit as st
 import os
 from core.state_manager import StateManager
-from core.config import PAGE_TITLE, PAGE_ICON, LAYOUT
+from core.config import PAGE_TITLE, PAGE_ICON, LAYOUT, METRICS_ENABLED
 from core.logger import logger
-from ui.layout import render_sidebar, load_css
+from ui.layout import render_sidebar, load_css, cached_namespace_stats
 from ui.components import render_header
 from ui.views import render_dashboard, render_editor, render_settings
 
@@ -16,24 +16,25 @@ StateManager.initialize_state()
 # Load Global CSS (Glassmorphism, Resets)
 load_css()
 
+# --- METRICS ENDPOINT ---
+# Started once per server process (reruns are no-ops); scraped at /metrics
+if METRICS_ENABLED:
+    from core.metrics import start_http_server
+    start_http_server()
+
 # --- RAG INITIALIZATION ---
+# core.rag defers chromadb / torch imports, so importing it here is cheap.
+# The engine itself is loaded on a background thread right away; the UI
+# reads its readiness via rag.get_status() instead of blocking on a spinner.
 try:
-    from core.rag import RAGManager
-    
-    @st.cache_resource
-    def get_rag_manager():
-        logger.info("Initializing cached RAGManager")
-        return RAGManager()
+    from core import rag
 
-    # Initialize only if enabled to avoid reloading heavy models unnecessarily
-    if st.session_state.get("rag_enabled", False):
-        if "rag_manager" not in st.session_state or st.session_state.rag_manager is None:
-            with st.spinner("Initializing Knowledge Base Engine..."):
-                st.session_state.rag_manager = get_rag_manager()
-except ImportError:
-    st.session_state.rag_manager = None
+    rag.start_warmup()
+    st.session_state.rag_status = rag.get_status()
+    st.session_state.rag_manager = rag.get_rag_manager() # None until warm-up completes
 except Exception as e:
     logger.error(f"RAG Init Error: {e}")
+    st.session_state.rag_status = "error"
     st.session_state.rag_manager = None
 
 # --- SIDEBAR (NAVIGATION) ---
@@ -42,6 +43,7 @@ rag_enabled = render_sidebar()
 st.session_state.rag_enabled = rag_enabled
 
 # --- FILE INGESTION (Linear Process) ---
+# Uploads stay queued until the background warm-up has finished.
 if "uploaded_files" in st.session_state and st.session_state.rag_manager:
     for uploaded_file in st.session_state["uploaded_files"]:
         # Save temp to ingest
@@ -51,10 +53,12 @@ if "uploaded_files" in st.session_state and st.session_state.rag_manager:
             f.write(uploaded_file.getbuffer())
         
         # Ingest
-        st.session_state.rag_manager.ingest_document(temp_path, uploaded_file.name)
-        st.toast(f"Ingested {uploaded_file.name} into Knowledge Base")
+        namespace = st.session_state.get("rag_namespace", "")
+        st.session_state.rag_manager.ingest_document(temp_path, uploaded_file.name, namespace=namespace)
+        st.toast(f"Ingested {uploaded_file.name} into Knowledge Base ({namespace or 'global'})")
     
     del st.session_state["uploaded_files"] # Clear queue
+    cached_namespace_stats.clear()  # New chunks show up in the sidebar counts
 
 # --- MAIN LAYOUT ---
 # Header is global
@@ -1,6 +1,4 @@
-from playwright.sync_api import sync_playwright
 import time
-import pandas as pd
 import re
 
 # Global list to keep browser open if needed
@@ -19,6 +17,10 @@ def publish_quiz_loop(email, password, quiz_df, status_callback=None):
     log("🚀 Initializing Browser...", 0.0)
 
     try:
+        # Imported on use: Playwright (and pandas) are only needed when actually publishing
+        from playwright.sync_api import sync_playwright
+        import pandas as pd
+
         # Start Playwright manually to allow detaching/keeping open
         p = sync_playwright().start()
         browser = p.chromium.launch(headless=False)
@@ -0,0 +1,96 @@
+import sys
+import os
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+# End-to-end run_loop benchmark against the offline mock backend (core.mock_llm).
+# Every run goes through the real SDK, instructor, retries, streaming, editing and
+# the save node; only the network is replaced. Runs execute in a temp directory
+# so storage/, logs/ and the catalog of this checkout are never touched.
+MODES = {
+    "Lecture Notes": {},
+    "Assignment": {"assignment_config": {"mcsc": 5, "mcmc": 3, "subjective": 2}},
+}
+CONCURRENCY = [1, 10, 50]
+AGENTS = ("creator", "auditor", "pedagogue", "editor", "sanitizer", "checker")
+
+def make_config(model):
+    from core.models import OrchestratorConfig, AgentConfig
+    return OrchestratorConfig(**{name: AgentConfig(model=model) for name in AGENTS}, max_iterations=3)
+
+async def one_run(config, http_client, mode, index):
+    from core.orchestrator import Orchestrator
+    orch = Orchestrator(config, api_key="mock", http_client=http_client, headless=True)
+    t = time.perf_counter()
+    ok = False
+    async for event in orch.run_loop(f"Bench Topic {index}", "Basics, Applications", mode=mode, **MODES[mode]):
+        if event.get("type") == "FINAL_RESULT" and "cost" in event:
+            ok = bool(event["content"]) and event["content"] != "[]"
+    return time.perf_counter() - t, ok
+
+async def run_batch(config, mock_config, mode, concurrency):
+    from core.mock_llm import mock_http_client
+    # One shared HTTP client per batch, as a long-lived worker process would have
+    http_client = mock_http_client(mock_config)
+    t = time.perf_counter()
+    results = await asyncio.gather(*(one_run(config, http_client, mode, i) for i in range(concurrency)))
+    wall = time.perf_counter() - t
+    await http_client.aclose()
+    return wall, results, http_client._transport.stats
+
+def report(mode, concurrency, wall, results, stats):
+    durations = sorted(d for d, _ in results)
+    failed = sum(1 for _, ok in results if not ok)
+    p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+    calls = (stats["requests"] - stats["rate_limited"]) / len(results)
+    print(f"{mode:<14} x{concurrency:<3} wall {wall:>7.2f} s  run p50 {statistics.median(durations):>6.2f} s"
+          f"  p95 {p95:>6.2f} s  {calls:>5.1f} calls/run  {len(results) / wall:>6.2f} runs/s"
+          f"  429s {stats['rate_limited']:<4}" + (f"  FAILED {failed}" if failed else ""))
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark on the mock LLM backend")
+    parser.add_argument("--mode", choices=list(MODES), action="append", help="Mode(s) to run (default: all)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=CONCURRENCY)
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Extra uniform latency, seconds")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered 429")
+    parser.add_argument("--stream-delay", type=float, default=0.005, help="Seconds between streamed chunks")
+    parser.add_argument("--rpm", type=int, default=100_000,
+                        help="Client-side limiter RPM for the run (production default is 50)")
+    parser.add_argument("--model", default="claude-3-haiku-20240307")
+    parser.add_argument("--verbose", action="store_true", help="Keep pipeline logging on the console")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        from core.mock_llm import MockLLMConfig
+        from core.rate_limiter import limiter
+        from core.tracing import tracer
+        if not args.verbose:
+            logging.getLogger("EdTechCore").setLevel(logging.ERROR)
+            tracer.print_summary = False  # One tree per run would drown the table
+        limiter.rpm = args.rpm
+
+        mock_config = MockLLMConfig(latency_s=args.latency, latency_jitter_s=args.jitter,
+                                    rate_limit_rate=args.rate_limit_rate, stream_chunk_delay_s=args.stream_delay)
+        config = make_config(args.model)
+        print(f"End-to-end benchmark (mock latency {args.latency}+{args.jitter}s, 429 rate {args.rate_limit_rate}, "
+              f"limiter rpm {args.rpm})")
+        print("-" * 120)
+        for mode in args.mode or list(MODES):
+            for concurrency in args.concurrency:
+                wall, results, stats = asyncio.run(run_batch(config, mock_config, mode, concurrency))
+                report(mode, concurrency, wall, results, stats)
+        from core.tokens import calibrator
+        calibrator.save()  # Now, inside tmp, rather than at exit into the checkout
+        os.chdir(REPO_DIR)
+
+if __name__ == "__main__":
+    main()
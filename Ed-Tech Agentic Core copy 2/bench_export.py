@@ -0,0 +1,74 @@
+import sys
+import os
+import time
+import tempfile
+import tracemalloc
+
+sys.path.append(os.getcwd())
+
+from core import assignment_exporter
+from core.assignment_exporter import TEMPLATE_COLUMNS
+from core.models import MCSCQuestion, MCMCQuestion, SubjectiveQuestion
+
+N_QUESTIONS = 10_000
+
+def make_questions(n):
+    """Typed questions with realistic field sizes, cycling through the three types."""
+    body = "Consider the following scenario in detail. " * 8
+    questions = []
+    for i in range(n):
+        if i % 3 == 0:
+            questions.append(MCSCQuestion(question_text=f"Q{i}: {body}", options=[f"Option {k} for {i}" for k in range(4)],
+                                          correct_option_index=1 + i % 4, explanation=body, difficulty="Easy"))
+        elif i % 3 == 1:
+            questions.append(MCMCQuestion(question_text=f"Q{i}: {body}", options=[f"Option {k} for {i}" for k in range(4)],
+                                          correct_option_indices=[1, 3], explanation=body, difficulty="Medium"))
+        else:
+            questions.append(SubjectiveQuestion(question_text=f"Q{i}: {body}", model_answer=body,
+                                                explanation=body, difficulty="Hard"))
+    return questions
+
+def legacy_dataframe_csv(questions, path):
+    """The previous path: row dicts -> DataFrame -> backfill/reorder columns -> to_csv."""
+    import pandas as pd
+    rows = [dict(zip(TEMPLATE_COLUMNS, r)) for r in assignment_exporter.iter_rows(questions)]
+    df = pd.DataFrame(rows)
+    for c in TEMPLATE_COLUMNS:
+        if c not in df.columns:
+            df[c] = ""
+    df = df[TEMPLATE_COLUMNS]
+    df.to_csv(path, index=False)
+
+def legacy_dataframe_xlsx(questions, path):
+    import pandas as pd
+    rows = [dict(zip(TEMPLATE_COLUMNS, r)) for r in assignment_exporter.iter_rows(questions)]
+    pd.DataFrame(rows)[TEMPLATE_COLUMNS].to_excel(path, index=False)
+
+def measure(label, func, *args):
+    tracemalloc.start()
+    t = time.perf_counter()
+    try:
+        func(*args)
+    except ImportError as e:
+        tracemalloc.stop()
+        print(f"{label:<28} skipped ({e})")
+        return
+    elapsed = (time.perf_counter() - t) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = os.path.getsize(args[-1]) if os.path.exists(args[-1]) else 0
+    print(f"{label:<28} {elapsed:>9.1f} ms  peak {peak / 1e6:>7.1f} MB  file {size / 1e6:>6.1f} MB")
+
+def main():
+    questions = make_questions(N_QUESTIONS)
+    print(f"Assignment export benchmark ({N_QUESTIONS:,} questions)")
+    print("-" * 72)
+    with tempfile.TemporaryDirectory() as tmp:
+        measure("pandas csv (previous)", legacy_dataframe_csv, questions, os.path.join(tmp, "legacy.csv"))
+        measure("streaming csv", assignment_exporter.write_csv, questions, os.path.join(tmp, "quiz.csv"))
+        measure("pandas xlsx (previous)", legacy_dataframe_xlsx, questions, os.path.join(tmp, "legacy.xlsx"))
+        measure("streaming xlsx", assignment_exporter.write_xlsx, questions, os.path.join(tmp, "quiz.xlsx"))
+        measure("streaming parquet", assignment_exporter.write_parquet, questions, os.path.join(tmp, "quiz.parquet"))
+
+if __name__ == "__main__":
+    main()
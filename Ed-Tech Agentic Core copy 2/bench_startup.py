@@ -0,0 +1,116 @@
+import sys
+import os
+import argparse
+import subprocess
+import statistics
+
+sys.path.append(os.getcwd())
+
+# Each module is imported in a fresh interpreter so we measure COLD import time.
+TARGETS = [
+    "core.rag",               # What app.py pays on every process start
+    "chromadb",               # Deferred until warm-up thread
+    "sentence_transformers",  # Deferred until warm-up thread (pulls torch)
+    "pypdf",                  # Deferred until a PDF is ingested
+]
+
+# Import-time budget for the two entry paths, measured with -X importtime.
+# app.py's own module imports (it can't be imported outside `streamlit run`),
+# and the headless path used by scripts/workers.
+ENTRY_POINTS = {
+    "app.py": "ui.layout, ui.components, ui.views",
+    "headless": "core.orchestrator",
+}
+BUDGET_MS = {"app.py": 1500, "headless": 1400}
+# Must not be imported until first use by either entry path
+DEFERRED = ["pandas", "playwright", "instructor", "openpyxl", "pyarrow", "chromadb",
+            "sentence_transformers", "torch", "pypdf"]
+# Additionally deferred on one entry path only (the UI needs streamlit, scripts/workers must not pay for it)
+DEFERRED_BY_ENTRY = {"headless": ["streamlit"]}
+
+RUNS = 3
+
+def cold_import_ms(module):
+    """Returns wall time (ms) to import `module` in a fresh interpreter, or None if unavailable."""
+    code = (
+        "import time; t=time.perf_counter(); "
+        f"import {module}; "
+        "print((time.perf_counter()-t)*1000)"
+    )
+    res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.getcwd())
+    if res.returncode != 0:
+        return None
+    return float(res.stdout.strip().splitlines()[-1])
+
+def importtime_profile(modules):
+    """
+    Imports `modules` under -X importtime in a fresh interpreter.
+    Returns ({module: cumulative_us}, total_ms) or (None, error) if the import failed.
+    """
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modules}"],
+                         capture_output=True, text=True, cwd=os.getcwd())
+    if res.returncode != 0:
+        return None, res.stderr.strip().splitlines()[-1] if res.stderr.strip() else "import failed"
+    cumulative = {}
+    total_us = 0
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        if not cum.strip().isdigit():
+            continue  # header row
+        if not name.startswith("  "):
+            total_us += int(cum)  # top-level entries; nested ones are already included
+        cumulative[name.strip()] = int(cum)
+    return cumulative, total_us / 1000
+
+def check_entry_points():
+    """Prints the import budget report; returns a list of violations."""
+    violations = []
+    print(f"\nImport-time budget (-X importtime, {RUNS} runs each, median)")
+    print("-" * 50)
+    for label, modules in ENTRY_POINTS.items():
+        totals = []
+        profile = None
+        for _ in range(RUNS):
+            profile, total = importtime_profile(modules)
+            if profile is None:
+                break
+            totals.append(total)
+        if profile is None:
+            violations.append(f"{label}: {total}")
+            print(f"{label:<25} FAILED ({total})")
+            continue
+        median = statistics.median(totals)
+        print(f"{label:<25} {median:>10.1f} ms  (budget {BUDGET_MS[label]} ms)")
+        if median > BUDGET_MS[label]:
+            violations.append(f"{label}: {median:.0f} ms > {BUDGET_MS[label]} ms")
+        heaviest = sorted(((us, name) for name, us in profile.items() if "." not in name), reverse=True)[:5]
+        print("  heaviest: " + ", ".join(f"{name} {us / 1000:.0f} ms" for us, name in heaviest))
+        eager = [m for m in DEFERRED + DEFERRED_BY_ENTRY.get(label, []) if m in profile]
+        if eager:
+            violations.append(f"{label}: imports {', '.join(eager)} at startup")
+    return violations
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import and startup import-budget benchmark.")
+    parser.add_argument("--check", action="store_true", help="Exit non-zero if a budget is exceeded or a deferred module is imported eagerly")
+    args = parser.parse_args()
+
+    print(f"Cold import benchmark ({RUNS} runs each, median)")
+    print("-" * 50)
+    for module in TARGETS:
+        samples = [cold_import_ms(module) for _ in range(RUNS)]
+        if any(s is None for s in samples):
+            print(f"{module:<25} not installed")
+            continue
+        print(f"{module:<25} {statistics.median(samples):>10.1f} ms")
+
+    violations = check_entry_points()
+    if violations:
+        print("\nBudget violations:\n  " + "\n  ".join(violations))
+        if args.check:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import threading
+from core.catalog import Catalog
+
+OBJECTS_DIR = "storage/objects"
+REFS_DIR = "storage/refs"
+
+class ArtifactStore:
+    """
+    Content-addressed store for generated outputs.
+      - storage/objects/{sha[:2]}/{sha[2:]}: zlib-compressed content, written once per unique content
+      - storage/refs/{topic_sanitized}.jsonl: append-only named refs (kind, mode, iteration -> digest, path)
+    Files saved with write_file are kept once, as the readable file the ref points at;
+    saving content that already exists costs a hash, a hard link and a ref, not a write.
+    """
+
+    _lock = threading.Lock()
+    stats = {"puts": 0, "dedup_hits": 0, "bytes_written": 0}
+
+    @staticmethod
+    def _safe_topic(topic):
+        safe_topic = "".join([c if c.isalnum() else "_" for c in (topic or "")]).strip().lower()[:50]
+        return safe_topic or "untitled"
+
+    @staticmethod
+    def _object_path(digest):
+        return os.path.join(OBJECTS_DIR, digest[:2], digest[2:])
+
+    @staticmethod
+    def _refs_path(topic):
+        return os.path.join(REFS_DIR, f"{ArtifactStore._safe_topic(topic)}.jsonl")
+
+    @staticmethod
+    def digest(content):
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        return hashlib.sha256(data).hexdigest()
+
+    # ==========================
+    # Objects
+    # ==========================
+
+    @staticmethod
+    def put(content):
+        """Stores content (str or bytes) and returns its sha256 digest. Existing objects are not rewritten."""
+        data = content.encode("utf-8") if isinstance(content, str) else (content or b"")
+        digest = hashlib.sha256(data).hexdigest()
+        path = ArtifactStore._object_path(digest)
+
+        with ArtifactStore._lock:
+            ArtifactStore.stats["puts"] += 1
+            if os.path.exists(path):
+                ArtifactStore.stats["dedup_hits"] += 1
+                return digest
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            payload = zlib.compress(data, 6)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            ArtifactStore.stats["bytes_written"] += len(payload)
+        return digest
+
+    @staticmethod
+    def get(digest, as_text=True):
+        """Returns the content for digest, or None if the object is missing."""
+        try:
+            with open(ArtifactStore._object_path(digest), "rb") as f:
+                data = zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+        return data.decode("utf-8") if as_text else data
+
+    @staticmethod
+    def object_size(digest):
+        try:
+            return os.path.getsize(ArtifactStore._object_path(digest))
+        except FileNotFoundError:
+            return 0
+
+    # ==========================
+    # Refs
+    # ==========================
+
+    @staticmethod
+    def list_refs(topic, kind=None):
+        """Returns refs for a topic (oldest first), optionally filtered by kind."""
+        refs = []
+        try:
+            with open(ArtifactStore._refs_path(topic), "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        refs.append(json.loads(line))
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            print(f"Error reading refs for {topic}: {e}")
+        return [r for r in refs if kind is None or r.get("kind") == kind]
+
+    @staticmethod
+    def add_ref(topic, kind, digest, mode="", iteration=None, path=None, size=0):
+        ref = {
+            "name": f"{kind}/v{iteration}" if iteration is not None else kind,
+            "kind": kind,
+            "mode": mode,
+            "iteration": iteration,
+            "digest": digest,
+            "path": path,
+            "size": size,
+            "created": int(time.time())
+        }
+        os.makedirs(REFS_DIR, exist_ok=True)
+        with ArtifactStore._lock:
+            with open(ArtifactStore._refs_path(topic), "a", encoding="utf-8") as f:
+                f.write(json.dumps(ref) + "\n")
+        return ref
+
+    @staticmethod
+    def _read_ref(ref):
+        """Content of a ref: its readable file when present and unchanged, else the stored object."""
+        path = ref.get("path")
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            if hashlib.sha256(data).hexdigest() == ref["digest"]:
+                return data.decode("utf-8")
+        return ArtifactStore.get(ref["digest"])
+
+    @staticmethod
+    def resolve(topic, name):
+        """Returns the content the newest ref called `name` points at, or None."""
+        for ref in reversed(ArtifactStore.list_refs(topic)):
+            if ref["name"] == name:
+                return ArtifactStore._read_ref(ref)
+        return None
+
+    # ==========================
+    # Files
+    # ==========================
+
+    @staticmethod
+    def _file_matches(path, digest):
+        """True when the file at path exists and still hashes to digest (it may have been edited since)."""
+        try:
+            with open(path, "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest() == digest
+        except OSError:
+            return False
+
+    @staticmethod
+    def write_file(path, content, topic="", kind="file", mode="", iteration=None, model="", cost=0.0):
+        """
+        Saves content as a readable file at path, records a ref for it and returns path.
+        If an unchanged file with the same content was already written for this topic
+        and kind, path is hard-linked to it instead of writing the bytes again (falling
+        back to a plain write where links aren't supported).
+        """
+        data = content.encode("utf-8") if isinstance(content, str) else (content or b"")
+        digest = hashlib.sha256(data).hexdigest()
+        existing = None
+        for ref in reversed(ArtifactStore.list_refs(topic, kind)):
+            if ref["digest"] == digest and ref.get("path") and ArtifactStore._file_matches(ref["path"], digest):
+                existing = ref["path"]
+                break
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Both branches replace path rather than writing into it, so a file linked to another ref is never edited
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        linked = False
+        if existing:
+            if os.path.exists(path) and os.path.samefile(existing, path):
+                linked = True
+            else:
+                try:
+                    os.link(existing, tmp)
+                    os.replace(tmp, path)
+                    linked = True
+                except OSError:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+        if not linked:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+        with ArtifactStore._lock:
+            ArtifactStore.stats["puts"] += 1
+            if linked:
+                ArtifactStore.stats["dedup_hits"] += 1
+            else:
+                ArtifactStore.stats["bytes_written"] += len(data)
+        ArtifactStore.add_ref(topic, kind, digest, mode=mode, iteration=iteration, path=path, size=len(data))
+        Catalog.record(path, topic=topic, mode=mode, kind=kind, model=model, cost=cost, size=len(data), digest=digest)
+        return path
+
+    @staticmethod
+    def usage():
+        """Returns {'objects': count, 'bytes': compressed size on disk}."""
+        count = size = 0
+        for dirpath, _, files in os.walk(OBJECTS_DIR):
+            for f in files:
+                count += 1
+                size += os.path.getsize(os.path.join(dirpath, f))
+        return {"objects": count, "bytes": size}
@@ -0,0 +1,164 @@
+"""
+Canonical export of assignment questions to the Assess bulk-upload template.
+
+    rows = iter_rows(questions)                  # typed models or dicts, one row at a time
+    write_csv(questions, "quiz.csv")             # csv module, no DataFrame
+    write_xlsx(questions, "quiz.xlsx")           # openpyxl write-only mode
+    write_parquet(questions, "quiz.parquet")     # needs pyarrow (optional)
+
+Rows are produced lazily and written as they are produced, so memory stays
+proportional to one row (plus the writer's own buffering), not the batch.
+
+    python bench_export.py                       # 10k-question benchmark vs the pandas path
+"""
+import io
+import csv
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+from core.utils import clean_meta_commentary
+
+# Column order of the Assess upload template ("temp - template.csv")
+TEMPLATE_COLUMNS = [
+    "questionType", "contentType", "contentBody", "intAnswer", "prepTime(in_seconds)",
+    "floatAnswer.max", "floatAnswer.min", "fitbAnswer", "mcscAnswer", "subjectiveAnswer",
+    "option.1", "option.2", "option.3", "option.4", "mcmcAnswer", "tagRelationships",
+    "difficultyLevel", "answerExplanation",
+]
+# Review-only columns shown in the editor table; never uploaded
+REVIEW_COLUMNS = ["_validation_warning"]
+MAX_OPTIONS = 4
+PARQUET_BATCH_ROWS = 2048
+
+def _as_dict(question) -> Dict[str, Any]:
+    if hasattr(question, "model_dump"):
+        return question.model_dump()
+    return question if isinstance(question, dict) else {}
+
+def question_to_row(question, clean: bool = False, extra_columns: Sequence[str] = ()) -> List[str]:
+    """
+    Maps one question (MCSCQuestion / MCMCQuestion / SubjectiveQuestion or the
+    equivalent dict) to a template row, as a list of strings in column order.
+    clean=True strips LLM meta-commentary from the text fields.
+    """
+    q = _as_dict(question)
+    q_type = str(q.get("type") or "mcsc").lower().strip()
+    text = q.get("question_text") or q.get("question") or q.get("content") or ""
+    explanation = q.get("explanation") or ""
+    if clean:
+        text = clean_meta_commentary(text)
+        explanation = clean_meta_commentary(explanation)
+
+    mcsc = mcmc = subjective = ""
+    options = ["", "", "", ""]
+    if q_type in ("mcsc", "mcmc"):
+        for i, opt in enumerate((q.get("options") or [])[:MAX_OPTIONS]):
+            options[i] = str(opt)
+        if q_type == "mcsc":
+            mcsc = str(q.get("correct_option_index", ""))
+        else:
+            indices = q.get("correct_option_indices", [])
+            mcmc = ", ".join(map(str, indices)) if isinstance(indices, list) else str(indices)
+    elif q_type == "subjective":
+        # The solution goes in both columns; Assess shows answerExplanation to graders
+        subjective = q.get("model_answer") or q.get("answer") or q.get("correct_answer") or explanation
+        explanation = subjective
+
+    row = [
+        q_type, "markdown", text, "", "", "", "", "", mcsc, subjective,
+        *options, mcmc, "", str(q.get("difficulty") or "Medium"), explanation,
+    ]
+    for col in extra_columns:
+        value = q.get(col, "")
+        row.append("" if value is None else str(value))
+    return row
+
+def iter_rows(questions: Iterable, clean: bool = False, extra_columns: Sequence[str] = ()) -> Iterator[List[str]]:
+    for question in questions:
+        yield question_to_row(question, clean=clean, extra_columns=extra_columns)
+
+def write_csv_stream(questions: Iterable, stream, clean: bool = False) -> int:
+    """Writes header + rows to an open text stream. Returns the number of questions."""
+    writer = csv.writer(stream, lineterminator="\n")
+    writer.writerow(TEMPLATE_COLUMNS)
+    count = 0
+    for row in iter_rows(questions, clean=clean):
+        writer.writerow(row)
+        count += 1
+    return count
+
+def to_csv_text(questions: Iterable, clean: bool = False) -> str:
+    """CSV as a string, for callers that save through ArtifactStore."""
+    buffer = io.StringIO()
+    write_csv_stream(questions, buffer, clean=clean)
+    return buffer.getvalue()
+
+def write_csv(questions: Iterable, path: str, clean: bool = False) -> int:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        return write_csv_stream(questions, f, clean=clean)
+
+def write_xlsx_rows(rows: Iterable[Sequence], path: str, columns: Sequence[str], sheet: str = "Sheet1") -> int:
+    """Streams arbitrary rows to an .xlsx file with openpyxl's write-only workbook."""
+    from openpyxl import Workbook  # Heavy import, only needed for Excel exports
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet)
+    ws.append(list(columns))
+    count = 0
+    for row in rows:
+        ws.append(list(row))
+        count += 1
+    wb.save(path)
+    return count
+
+def write_xlsx(questions: Iterable, path: str, clean: bool = False) -> int:
+    return write_xlsx_rows(iter_rows(questions, clean=clean), path, TEMPLATE_COLUMNS)
+
+def write_parquet(questions: Iterable, path: str, clean: bool = False, batch_rows: int = PARQUET_BATCH_ROWS) -> int:
+    """Writes all-string columns in row groups of batch_rows. Raises ImportError without pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow); use CSV or XLSX instead.") from e
+
+    schema = pa.schema([(col, pa.string()) for col in TEMPLATE_COLUMNS])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in iter_rows(questions, clean=clean):
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                writer.write_table(pa.Table.from_pylist([dict(zip(TEMPLATE_COLUMNS, r)) for r in batch], schema=schema))
+                count += len(batch)
+                batch = []
+        if batch or not count:
+            writer.write_table(pa.Table.from_pylist([dict(zip(TEMPLATE_COLUMNS, r)) for r in batch], schema=schema))
+            count += len(batch)
+    return count
+
+def to_columns(questions: Iterable, extra_columns: Sequence[str] = ()) -> Dict[str, List[str]]:
+    """
+    Column-oriented {name: values} in template order (plus extra_columns), for
+    building a DataFrame in one step without backfilling or reordering.
+    """
+    columns = list(TEMPLATE_COLUMNS) + list(extra_columns)
+    data = {col: [] for col in columns}
+    appenders = [data[col].append for col in columns]
+    for row in iter_rows(questions, extra_columns=extra_columns):
+        for append, value in zip(appenders, row):
+            append(value)
+    return data
+
+def to_dataframe(questions: Iterable, extra_columns: Sequence[str] = ()):
+    """String-typed DataFrame for the editor table, indexed from 1."""
+    import pandas as pd
+    data = to_columns(questions, extra_columns=extra_columns)
+    count = len(data[TEMPLATE_COLUMNS[0]])
+    return pd.DataFrame(data, index=pd.RangeIndex(1, count + 1), dtype=str)
+
+def export(questions: Iterable, path: str, clean: bool = False) -> int:
+    """Picks the writer from the file extension (.csv, .xlsx, .parquet)."""
+    lowered = path.lower()
+    if lowered.endswith(".xlsx"):
+        return write_xlsx(questions, path, clean=clean)
+    if lowered.endswith(".parquet"):
+        return write_parquet(questions, path, clean=clean)
+    return write_csv(questions, path, clean=clean)
@@ -0,0 +1,335 @@
+"""
+Headless batch runner: generates a whole curriculum from a manifest.
+
+    python -m core.batch semester.csv --concurrency 8 --budget 3500
+    python -m core.batch semester.yaml --dry-run
+
+A manifest is a CSV with a header row, or a YAML list (optionally
+{"defaults": {...}, "topics": [...]}), with one entry per run:
+
+    topic, subtopics, mode, audience, assignment_config, transcript, namespace
+
+Only topic is required. assignment_config is a JSON object in CSV cells
+(e.g. {"mcsc": 5, "subjective": 2}); transcript is a text file path relative
+to the manifest; namespace pulls knowledge base context like the UI's RAG toggle.
+
+Runs share one HTTP connection pool and the process-wide rate limiter, write
+their artifacts through the normal save node, and start no new runs once the
+global spend cap is reached (runs in flight finish and save, so the cap can be
+exceeded by at most one run per concurrent slot). A JSON summary report is
+written at the end.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import uuid
+import asyncio
+import argparse
+from typing import Dict, List, Optional
+from core.config import (DEFAULT_MODEL, CONTEXT_TOKEN_BUDGET, BATCH_CONCURRENCY, BATCH_REPORT_DIR,
+                         BATCH_FAST_MODEL)
+from core.cascade import default_policies
+from core.context_packer import pack_context
+from core.logger import logger, set_log_context
+from core.models import OrchestratorConfig, AgentConfig
+from core.orchestrator import Orchestrator
+from core.utils import split_subtopics
+
+MODES = ("Lecture Notes", "Pre-read Notes", "Assignment")
+DEFAULT_AUDIENCE = "General Student"
+
+class ManifestError(ValueError):
+    """A manifest row is missing a topic or has an invalid field."""
+
+# ==========================
+# Manifest
+# ==========================
+
+def _normalize(entry: dict, where: str, base_dir: str) -> dict:
+    entry = {str(k).strip().lower(): v for k, v in entry.items() if k is not None}
+    topic = str(entry.get("topic") or "").strip()
+    if not topic:
+        raise ManifestError(f"{where}: topic is required")
+
+    mode = str(entry.get("mode") or "Lecture Notes").strip()
+    if mode not in MODES:
+        raise ManifestError(f"{where}: unknown mode {mode!r} (expected one of {', '.join(MODES)})")
+
+    assignment_config = entry.get("assignment_config") or {}
+    if isinstance(assignment_config, str):
+        try:
+            assignment_config = json.loads(assignment_config)
+        except ValueError:
+            raise ManifestError(f"{where}: assignment_config is not valid JSON: {assignment_config!r}") from None
+    if not isinstance(assignment_config, dict):
+        raise ManifestError(f"{where}: assignment_config must be an object")
+
+    transcript = str(entry.get("transcript") or "").strip() or None
+    if transcript and not os.path.isabs(transcript):
+        transcript = os.path.join(base_dir, transcript)
+
+    return {
+        "topic": topic,
+        "subtopics": str(entry.get("subtopics") or "").strip(),
+        "mode": mode,
+        "audience": str(entry.get("audience") or entry.get("target_audience") or DEFAULT_AUDIENCE).strip(),
+        "assignment_config": assignment_config,
+        "transcript": transcript,
+        "namespace": str(entry.get("namespace") or "").strip() or None,
+    }
+
+def load_manifest(path: str) -> List[dict]:
+    """Reads and validates a CSV or YAML manifest. Raises ManifestError on the first bad entry."""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    if path.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAML manifests need PyYAML (pip install pyyaml); CSV works without it") from None
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or []
+        defaults = {}
+        if isinstance(data, dict):
+            defaults = data.get("defaults") or {}
+            data = data.get("topics") or []
+        if not isinstance(data, list):
+            raise ManifestError(f"{path}: expected a list of topics")
+        return [_normalize({**defaults, **(item if isinstance(item, dict) else {"topic": item})},
+                           f"{path} entry {i}", base_dir) for i, item in enumerate(data, 1)]
+
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        # Row numbers count the header as line 1, as a spreadsheet shows them
+        return [_normalize(row, f"{path} line {i}", base_dir)
+                for i, row in enumerate(csv.DictReader(f), 2) if any((v or "").strip() for v in row.values())]
+
+# ==========================
+# Runner
+# ==========================
+
+class SpendCap:
+    """Running total of spend (INR, the unit orchestrator costs are priced in) across all runs in the batch."""
+    def __init__(self, limit: Optional[float] = None):
+        self.limit = limit
+        self.spent = 0.0
+
+    def add(self, amount: float):
+        self.spent += amount
+
+    @property
+    def reached(self) -> bool:
+        return self.limit is not None and self.spent >= self.limit
+
+def default_config(model: str = DEFAULT_MODEL, fast_model: str = BATCH_FAST_MODEL, max_iterations: int = 3,
+                   cascade: bool = True):
+    """
+    Same split as the UI: the main model drafts and reviews, the fast model sanitizes and checks.
+    With cascade, the Auditor also starts on the fast model, and the Auditor, Sanitizer and Checker
+    escalate to the main model per core.cascade.default_policies.
+    """
+    cascade = cascade and fast_model != model
+    policies = default_policies(model) if cascade else {}
+    return OrchestratorConfig(
+        creator=AgentConfig(model=model),
+        auditor=AgentConfig(model=fast_model if cascade else model, cascade=policies.get("auditor")),
+        pedagogue=AgentConfig(model=model), editor=AgentConfig(model=model),
+        sanitizer=AgentConfig(model=fast_model, cascade=policies.get("sanitizer")),
+        checker=AgentConfig(model=fast_model, cascade=policies.get("checker")),
+        max_iterations=max_iterations, human_in_the_loop=False,
+    )
+
+class BatchRunner:
+    def __init__(self, config: OrchestratorConfig, concurrency: int = BATCH_CONCURRENCY, budget: Optional[float] = None,
+                 api_key: Optional[str] = None, http_client=None, context_budget: int = CONTEXT_TOKEN_BUDGET,
+                 progress=None):
+        """
+        http_client: shared by every run; defaults to one SDK client (one connection pool) for the batch.
+        progress: optional callable(result_dict) invoked as each run finishes.
+        """
+        self.config = config
+        self.concurrency = max(1, concurrency)
+        self.spend = SpendCap(budget)
+        self.api_key = api_key
+        self.http_client = http_client
+        self.context_budget = context_budget
+        self.progress = progress
+        self.batch_id = uuid.uuid4().hex[:8]
+
+    def _context(self, job: dict) -> Optional[str]:
+        """Transcript + knowledge base context, packed the same way the UI does it."""
+        transcript = None
+        if job["transcript"]:
+            with open(job["transcript"], "r", encoding="utf-8") as f:
+                transcript = f.read()
+        context_map = {}
+        if job["namespace"]:
+            from core import rag
+            manager = rag.get_rag_manager(wait=True)
+            if manager is None:
+                raise RuntimeError(f"Knowledge base unavailable: {rag.get_error()}")
+            subtopics = split_subtopics(job["subtopics"])
+            if subtopics:
+                context_map = manager.retrieve_context_batch(subtopics, topic=job["topic"], namespace=job["namespace"])
+            else:
+                context_map = {job["topic"]: manager.retrieve_context(job["topic"], namespace=job["namespace"])}
+        if not transcript and not context_map:
+            return None
+        packed, _ = pack_context(transcript, context_map, subtopics=split_subtopics(job["subtopics"]),
+                                 topic=job["topic"], budget_tokens=self.context_budget)
+        return packed
+
+    async def run_job(self, job: dict, index: int = 0) -> dict:
+        """
+        Runs one manifest job to completion and returns its result row. Once the
+        spend cap is reached no new job starts; runs already in flight finish and save.
+        """
+        result = {"index": index, "topic": job["topic"], "mode": job["mode"], "status": "skipped",
+                  "cost": 0.0, "duration_s": 0.0, "path": "", "error": ""}
+        if self.spend.reached:
+            result["error"] = f"Spend cap ₹{self.spend.limit:.2f} reached before start"
+            return result
+
+        set_log_context(batch_id=self.batch_id)
+        start = time.time()
+        orch = None
+        counted = 0.0
+        events = None
+        try:
+            orch = Orchestrator(self.config, api_key=self.api_key, http_client=self.http_client, headless=True)
+            context = await asyncio.to_thread(self._context, job)
+            events = orch.run_loop(job["topic"], job["subtopics"] or job["topic"], context, mode=job["mode"],
+                                   target_audience=job["audience"], assignment_config=job["assignment_config"])
+            result["status"] = "failed"
+            async for event in events:
+                cost = orch.state["costs"]
+                self.spend.add(cost - counted)
+                counted = cost
+                if event.get("status") == "Error" or event.get("model") == "Error":
+                    result["error"] = str(event.get("content") or event.get("status"))[:300]
+                if event.get("type") == "FINAL_RESULT" and "path" in event:
+                    result["path"] = event["path"]
+                    result["status"] = "done" if event.get("path") else "failed"
+        except Exception as e:
+            logger.error(f"Batch run failed for {job['topic']}: {e}")
+            result["status"] = "failed"
+            result["error"] = str(e)[:300]
+        finally:
+            if events is not None:
+                await events.aclose()
+            if orch is not None:
+                self.spend.add(orch.state["costs"] - counted)
+                result["cost"] = round(orch.state["costs"], 6)
+            result["duration_s"] = round(time.time() - start, 2)
+        return result
+
+    async def _run_one(self, index: int, job: dict, semaphore: asyncio.Semaphore) -> dict:
+        async with semaphore:
+            result = await self.run_job(job, index)
+        return self._finish(result)
+
+    def _finish(self, result: dict) -> dict:
+        if self.progress:
+            self.progress(result)
+        return result
+
+    async def run(self, jobs: List[dict]) -> Dict:
+        """Runs every job (at most `concurrency` at once) and returns the summary report."""
+        owns_client = self.http_client is None
+        if owns_client:
+            import anthropic
+            self.http_client = anthropic.DefaultAsyncHttpxClient()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.time()
+        try:
+            results = await asyncio.gather(*(self._run_one(i, job, semaphore) for i, job in enumerate(jobs, 1)))
+        finally:
+            if owns_client:
+                await self.http_client.aclose()
+                self.http_client = None
+        counts = {}
+        for r in results:
+            counts[r["status"]] = counts.get(r["status"], 0) + 1
+        return {
+            "batch_id": self.batch_id,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(start)),
+            "wall_s": round(time.time() - start, 2),
+            "concurrency": self.concurrency,
+            "budget": self.spend.limit,
+            "total_cost": round(self.spend.spent, 6),
+            "counts": counts,
+            "config": self.config.model_dump(),
+            "jobs": results,
+        }
+
+# ==========================
+# CLI
+# ==========================
+
+def write_report(report: Dict, path: Optional[str] = None) -> str:
+    path = path or os.path.join(BATCH_REPORT_DIR, f"batch_{time.strftime('%Y%m%d_%H%M%S')}_{report['batch_id']}.json")
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+def format_report(report: Dict) -> str:
+    lines = [f"{'#':>4}  {'status':<8} {'mode':<15} {'cost':>8} {'time':>7}  topic / output"]
+    for r in report["jobs"]:
+        detail = r["path"] or r["error"]
+        lines.append(f"{r['index']:>4}  {r['status']:<8} {r['mode']:<15} {r['cost']:>8.4f} {r['duration_s']:>6.1f}s  "
+                     f"{r['topic']}" + (f"  -> {detail}" if detail else ""))
+    counts = ", ".join(f"{n} {status}" for status, n in sorted(report["counts"].items()))
+    budget = f" of ₹{report['budget']:.2f} cap" if report["budget"] is not None else ""
+    lines.append(f"Batch {report['batch_id']}: {counts}; ₹{report['total_cost']:.4f}{budget}; {report['wall_s']:.1f}s wall")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate every topic in a manifest without the UI")
+    parser.add_argument("manifest", help="CSV or YAML manifest")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Runs in flight at once")
+    parser.add_argument("--budget", type=float, help="Global spend cap in INR (as priced by core.cost_ledger); no new runs start once reached (runs in flight finish)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Creator/Auditor/Pedagogue/Editor model")
+    parser.add_argument("--fast-model", default=BATCH_FAST_MODEL, help="Sanitizer/Checker model (and the cascaded Auditor's first try)")
+    parser.add_argument("--max-iterations", type=int, default=3)
+    parser.add_argument("--no-cascade", action="store_true",
+                        help="Pin every agent to one model instead of escalating from the fast model")
+    parser.add_argument("--rpm", type=int, help="Override the shared rate limiter's requests per minute")
+    parser.add_argument("--report", help="Report path (default: storage/batch_reports/batch_<time>.json)")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port while the batch runs")
+    parser.add_argument("--dry-run", action="store_true", help="Validate the manifest and print the plan")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = load_manifest(args.manifest)
+    except (ManifestError, ImportError, OSError) as e:
+        print(f"Manifest error: {e}")
+        return 2
+    if args.dry_run:
+        for i, job in enumerate(jobs, 1):
+            extra = f" {job['assignment_config']}" if job["mode"] == "Assignment" else ""
+            print(f"{i:>4}  {job['mode']:<15} {job['topic']} [{job['audience']}]{extra}")
+        print(f"{len(jobs)} runs, concurrency {args.concurrency}")
+        return 0
+
+    if args.rpm:
+        from core.rate_limiter import limiter
+        limiter.rpm = args.rpm
+    if args.metrics_port:
+        from core.metrics import start_http_server
+        start_http_server(args.metrics_port)
+    config = default_config(args.model, args.fast_model, args.max_iterations, cascade=not args.no_cascade)
+
+    def progress(result):
+        print(f"[{result['index']}/{len(jobs)}] {result['status']:<8} {result['topic']} (₹{result['cost']:.4f})", flush=True)
+
+    runner = BatchRunner(config, concurrency=args.concurrency, budget=args.budget, progress=progress)
+    report = asyncio.run(runner.run(jobs))
+    path = write_report(report, args.report)
+    print(format_report(report))
+    print(f"Report: {path}")
+    return 0 if report["counts"].get("done", 0) == len(jobs) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Budget-aware model cascades.
+
+A cascaded agent runs on its configured (cheap) model first and is retried on
+the policy's stronger models only when a check on the output fails:
+
+    outcome = await run_cascade("Checker", "claude-haiku-4-5-20251001", policy, attempt, check)
+
+Every cascaded call is counted in core.metrics and logged as a 'cascade'
+event with the cost, latency and verdict of each step (see core.log_analytics),
+so escalation rates can be weighed against the spend and time they cost and
+how often escalating changed the answer.
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from core.config import (CASCADE_ESCALATION_MODEL, CASCADE_MIN_CONFIDENCE, CASCADE_BORDERLINE_MARGIN,
+                         CASCADE_MIN_LENGTH_RATIO)
+from core.cost_ledger import rates_for
+from core.logger import logger
+from core.models import CascadePolicy
+from core.tracing import tracer
+from core import metrics
+
+class CascadeOutcome(NamedTuple):
+    result: Any
+    cost: float        # every attempt, escalations included
+    models: List[str]  # models tried, in order; the last one produced result
+    reasons: List[str] # why each escalation happened
+
+async def run_cascade(agent: str, model: str, policy: Optional[CascadePolicy],
+                      attempt: Callable[[str], Awaitable[Tuple[Any, float]]],
+                      check: Callable[[Any], Optional[str]],
+                      verdict: Optional[Callable[[Any], Any]] = None) -> CascadeOutcome:
+    """
+    attempt(model) -> (result, cost) makes the call; check(result) returns an
+    escalation reason or None to accept. The last model's result is returned
+    whether or not it passes. verdict(result), if given, is logged per step.
+    Without a policy this is a single attempt on model.
+    """
+    if policy is None:
+        result, cost = await attempt(model)
+        return CascadeOutcome(result, cost, [model], [])
+
+    ladder = [model] + [m for m in policy.escalate_to if m != model]
+    steps, reasons = [], []
+    total = 0.0
+    with tracer.span("cascade", agent=agent) as span:
+        for i, current in enumerate(ladder):
+            start = time.perf_counter()
+            result, cost = await attempt(current)
+            total += cost or 0.0
+            steps.append({"model": current, "cost": round(cost or 0.0, 6),
+                          "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+                          "verdict": verdict(result) if verdict else None})
+            reason = check(result) if i < len(ladder) - 1 else None
+            if reason is None:
+                break
+            reasons.append(reason)
+            metrics.cascade_escalations.inc(agent=agent, reason=reason)
+        models = [s["model"] for s in steps]
+        span.set(models=",".join(models), escalated=len(models) > 1, reasons=",".join(reasons), cost=round(total, 6))
+
+    metrics.cascade_calls.inc(agent=agent, outcome="escalated" if reasons else "accepted")
+    logger.info("Cascade", extra={"props": {
+        "event": "cascade",
+        "agent": agent,
+        "models": models,
+        "escalated": bool(reasons),
+        "reasons": reasons,
+        "steps": steps,
+        "cost": round(total, 6),
+    }})
+    return CascadeOutcome(result, total, models, reasons)
+
+# --- Checks ---
+
+def check_structured(resp, policy: CascadePolicy) -> Optional[str]:
+    """Missing/invalid structured output, or a reported confidence below the policy's floor."""
+    if resp is None:
+        return "invalid" if policy.on_invalid else None
+    confidence = getattr(resp, "confidence", None)
+    if policy.min_confidence is not None and confidence is not None and confidence < policy.min_confidence:
+        return "low_confidence"
+    return None
+
+def check_score(resp, threshold: int, policy: CascadePolicy) -> Optional[str]:
+    """Structured check plus a quality_score close enough to threshold to flip the stop decision."""
+    reason = check_structured(resp, policy)
+    if reason or resp is None:
+        return reason
+    if policy.borderline_margin is not None and abs(resp.quality_score - threshold) <= policy.borderline_margin:
+        return "borderline"
+    return None
+
+def check_text(text: Optional[str], source: str, policy: CascadePolicy,
+               min_ratio: float = CASCADE_MIN_LENGTH_RATIO) -> Optional[str]:
+    """Empty output, or much shorter than the text it was meant to clean (truncated or refused)."""
+    if not policy.on_invalid:
+        return None
+    if not text or not text.strip():
+        return "invalid"
+    if source and len(text) < min_ratio * len(source):
+        return "truncated"
+    return None
+
+# --- Default policies ---
+
+def default_policies(escalate_to: str = CASCADE_ESCALATION_MODEL) -> Dict[str, CascadePolicy]:
+    """Checker and Sanitizer escalate on failed validation (and low Checker confidence); the Auditor only on borderline scores."""
+    return {
+        "checker": CascadePolicy(escalate_to=[escalate_to], min_confidence=CASCADE_MIN_CONFIDENCE),
+        "sanitizer": CascadePolicy(escalate_to=[escalate_to]),
+        "auditor": CascadePolicy(escalate_to=[escalate_to], on_invalid=False,
+                                 borderline_margin=CASCADE_BORDERLINE_MARGIN),
+    }
+
+def is_stronger(model: str, than: str) -> bool:
+    """Priced above than per output token (core.cost_ledger rates), the cascade's proxy for capability."""
+    return rates_for(model)["output"] > rates_for(than)["output"]
+
+def ladder_policies(start_models: Dict[str, str], escalate_to: str) -> Dict[str, CascadePolicy]:
+    """default_policies(escalate_to) for the agents in start_models whose start model it is stronger than."""
+    return {agent: policy for agent, policy in default_policies(escalate_to).items()
+            if agent in start_models and is_stronger(escalate_to, start_models[agent])}
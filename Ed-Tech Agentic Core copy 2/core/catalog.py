@@ -0,0 +1,189 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from contextlib import closing
+
+CATALOG_DB = "storage/catalog.db"
+# Scanned once to backfill a new catalog with artifacts saved before it existed
+BACKFILL_ROOTS = ("storage", "generated_content", "outputs")
+BACKFILL_EXTENSIONS = (".md", ".csv", ".json", ".xlsx")
+HIDDEN_KINDS = ("metadata",)  # Tracked for session listing, not shown as projects
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    topic TEXT NOT NULL DEFAULT '',
+    mode TEXT NOT NULL DEFAULT '',
+    kind TEXT NOT NULL DEFAULT '',
+    model TEXT NOT NULL DEFAULT '',
+    cost REAL NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0,
+    digest TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_created ON artifacts(created DESC);
+CREATE INDEX IF NOT EXISTS idx_artifacts_topic ON artifacts(topic, created DESC);
+CREATE INDEX IF NOT EXISTS idx_artifacts_kind ON artifacts(kind, topic);
+"""
+
+class Catalog:
+    """
+    SQLite index of every saved artifact (path, topic, mode, kind, model, cost, size, timestamps).
+    Rows are written when the artifact is saved, so dashboard counts and
+    "recent" lists are index lookups instead of directory scans.
+    """
+
+    _lock = threading.Lock()
+    _initialized = set()  # db paths whose schema (and backfill) is done in this process
+
+    @staticmethod
+    def _connect():
+        db_path = CATALOG_DB
+        new_db = not os.path.exists(db_path)
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+
+        key = os.path.abspath(db_path)
+        if key not in Catalog._initialized:
+            with Catalog._lock:
+                if key not in Catalog._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(_SCHEMA)
+                    if new_db:
+                        Catalog._backfill(conn)
+                    Catalog._initialized.add(key)
+        return conn
+
+    @staticmethod
+    def _backfill(conn):
+        """Records artifacts already on disk. Runs only when the catalog file is first created."""
+        rows = []
+        for root in BACKFILL_ROOTS:
+            if not os.path.isdir(root):
+                continue
+            for dirpath, dirnames, files in os.walk(root):
+                # Internal stores are not user-facing artifacts
+                dirnames[:] = [d for d in dirnames if d not in ("versions", "sessions", "objects", "refs", "chroma_db")]
+                for f in files:
+                    if not f.endswith(BACKFILL_EXTENSIONS):
+                        continue
+                    path = os.path.join(dirpath, f)
+                    stats = os.stat(path)
+                    topic, mode, kind = Catalog._infer(root, dirpath, f)
+                    rows.append((path, f, topic, mode, kind, stats.st_size, stats.st_mtime, stats.st_mtime))
+        conn.executemany(
+            "INSERT OR IGNORE INTO artifacts (path, name, topic, mode, kind, size, created, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        conn.commit()
+
+    @staticmethod
+    def _infer(root, dirpath, filename):
+        """Best-effort (topic, mode, kind) for a pre-catalog file from its location and name."""
+        mode = "Assignment" if "Assignment" in filename or filename.endswith((".csv", ".xlsx")) else "Lecture Notes"
+        if root == "generated_content":
+            if filename == "metadata.json":
+                return os.path.basename(dirpath), "", "metadata"
+            kind = "draft" if filename.startswith("notes_draft_") else "quiz" if filename.startswith("quiz_") else ""
+            return os.path.basename(dirpath), mode, kind
+        if dirpath == "storage":
+            # '{Topic}_{epoch}.md' / '{Topic}_Assignment_{epoch}.csv' from the orchestrator
+            stem = re.sub(r"(_Assignment)?_\d+$", "", os.path.splitext(filename)[0])
+            kind = "assignment_csv" if filename.endswith(".csv") else "notes" if filename.endswith(".md") else ""
+            return stem.replace("_", " "), mode, kind
+        return "", mode, ""
+
+    @staticmethod
+    def record(path, topic="", mode="", kind="", model="", cost=0.0, size=0, digest=None):
+        """
+        Adds (or refreshes) the row for an artifact saved at path. Saving the
+        same path again (deduplicated content) adds its cost to the row and
+        keeps the earlier mode/model when the new save has none.
+        """
+        now = time.time()
+        try:
+            with closing(Catalog._connect()) as conn:
+                conn.execute(
+                    "INSERT INTO artifacts (path, name, topic, mode, kind, model, cost, size, digest, created, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(path) DO UPDATE SET topic=excluded.topic, mode=COALESCE(NULLIF(excluded.mode, ''), mode), "
+                    "kind=excluded.kind, model=COALESCE(NULLIF(excluded.model, ''), model), cost=cost + excluded.cost, "
+                    "size=excluded.size, digest=excluded.digest, updated=excluded.updated",
+                    (path, os.path.basename(path), topic or "", mode or "", kind or "", model or "",
+                     float(cost or 0.0), int(size or 0), digest, now, now)
+                )
+                conn.commit()
+        except Exception as e:
+            print(f"Error recording artifact {path}: {e}")
+
+    @staticmethod
+    def _visible_filter(topic=None):
+        clauses = [f"kind NOT IN ({', '.join('?' * len(HIDDEN_KINDS))})"]
+        params = list(HIDDEN_KINDS)
+        if topic is not None:
+            clauses.append("topic = ?")
+            params.append(topic)
+        return " WHERE " + " AND ".join(clauses), params
+
+    @staticmethod
+    def count(topic=None):
+        try:
+            with closing(Catalog._connect()) as conn:
+                query, params = Catalog._visible_filter(topic)
+                return conn.execute(f"SELECT COUNT(*) FROM artifacts{query}", params).fetchone()[0]
+        except Exception as e:
+            print(f"Error counting artifacts: {e}")
+            return 0
+
+    @staticmethod
+    def recent(limit=5, topic=None):
+        """Newest artifacts first, in the same shape as utils.load_recent_files plus catalog fields."""
+        query, params = Catalog._visible_filter(topic)
+        try:
+            with closing(Catalog._connect()) as conn:
+                rows = conn.execute(f"SELECT * FROM artifacts{query} ORDER BY created DESC LIMIT ?", params + [limit]).fetchall()
+        except Exception as e:
+            print(f"Error listing artifacts: {e}")
+            return []
+
+        results = []
+        for row in rows:
+            item = dict(row)
+            item["ctime"] = item["created"]
+            item["mtime"] = item["updated"]
+            item["timestamp"] = time.strftime("%Y-%m-%d %H:%M", time.localtime(item["created"]))
+            results.append(item)
+        return results
+
+    @staticmethod
+    def topics(kinds=None):
+        """Distinct topics (sorted), optionally restricted to artifact kinds."""
+        query = "SELECT DISTINCT topic FROM artifacts WHERE topic != ''"
+        params = list(kinds or [])
+        if params:
+            query += f" AND kind IN ({', '.join('?' * len(params))})"
+        query += " ORDER BY topic"
+        try:
+            with closing(Catalog._connect()) as conn:
+                return [r[0] for r in conn.execute(query, params).fetchall()]
+        except Exception as e:
+            print(f"Error listing topics: {e}")
+            return []
+
+    @staticmethod
+    def totals():
+        """{'artifacts': n, 'cost': sum, 'bytes': sum} across the catalog."""
+        try:
+            with closing(Catalog._connect()) as conn:
+                query, params = Catalog._visible_filter()
+                row = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(cost), 0), COALESCE(SUM(size), 0) FROM artifacts{query}", params).fetchone()
+                return {"artifacts": row[0], "cost": row[1], "bytes": row[2]}
+        except Exception as e:
+            print(f"Error reading catalog totals: {e}")
+            return {"artifacts": 0, "cost": 0.0, "bytes": 0}
@@ -30,7 +30,8 @@ class AssignmentChecker:
             response_model=CheckerResult,
             system_prompt=self.agent.get_system_prompt(),
             user_content=self.agent.format_user_prompt(q_str),
-            model=self.agent.model
+            model=self.agent.model,
+            agent=self.agent
         )
         return resp, cost
 
@@ -1,26 +1,57 @@
 import os
+import time
 import anthropic
 from dotenv import load_dotenv
 from typing import Optional, Tuple
 from core.utils import retry_with_backoff
 from core.logger import logger
+from core.tokens import calibrator, estimate_prompt_tokens
+from core.tracing import tracer, current_span
+from core.rate_limiter import limiter
+from core import metrics
+from core.cost_ledger import ledger, calculate_cost
 
 load_dotenv()
 
+def prompt_tokens(usage) -> int:
+    """All input tokens of a call, including prompt-cache writes and reads (input_tokens excludes them)."""
+    return (usage.input_tokens or 0) + (getattr(usage, "cache_creation_input_tokens", 0) or 0) \
+        + (getattr(usage, "cache_read_input_tokens", 0) or 0)
+
+def usage_attributes(usage) -> dict:
+    """Span attributes for a call's usage, including prompt-cache hits."""
+    return {
+        "input_tokens": usage.input_tokens or 0,
+        "output_tokens": usage.output_tokens or 0,
+        "cache_read_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+        "cache_write_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+    }
+
+def budget_prompt(agent, system_prompt, user_content, cache_content=None):
+    """Returns (user_content, raw_estimate), applying agent's token budget when an agent is given."""
+    if agent is not None:
+        return agent.fit_prompt(system_prompt, user_content, cache_content)
+    return user_content, estimate_prompt_tokens(system_prompt, user_content, cache_content)
+
 class AnthropicClient:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, http_client=None):
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
         if not self.api_key:
             # Logger warning instead of crashing immediately? Or keep crash?
             # Keeping exception as this is critical config.
             raise ValueError("ANTHROPIC_API_KEY not found in environment or passed as argument.")
-        self.client = anthropic.AsyncAnthropic(api_key=self.api_key)
+        self.client = anthropic.AsyncAnthropic(api_key=self.api_key, http_client=http_client)
 
     @retry_with_backoff(exceptions=(anthropic.APIConnectionError, anthropic.RateLimitError, anthropic.APIError))
-    async def _make_api_call(self, model, max_tokens, temperature, system_prompt, messages, extra_headers) -> Tuple[str, int, int]:
+    async def _make_api_call(self, model, max_tokens, temperature, system_prompt, messages, extra_headers,
+                             tokens=0) -> Tuple[str, object]:
         """
         Internal method to make the actual API call with retries.
+        Every attempt takes a slot (and `tokens` of TPM quota) from the shared rate limiter.
         """
+        wait_start = time.perf_counter()
+        await limiter.acquire(tokens)
+        current_span().set(queue_wait_ms=round((time.perf_counter() - wait_start) * 1000, 1))
         response = await self.client.messages.create(
             model=model,
             max_tokens=max_tokens,
@@ -29,10 +60,7 @@ class AnthropicClient:
             messages=messages,
             extra_headers=extra_headers
         )
-        content = response.content[0].text
-        input_tokens = response.usage.input_tokens
-        output_tokens = response.usage.output_tokens
-        return content, input_tokens, output_tokens
+        return response.content[0].text, response.usage
 
     async def generate_response(
         self,
@@ -41,12 +69,15 @@ class AnthropicClient:
         model: str = "claude-3-5-sonnet-20240620",
         max_tokens: int = 4096,
         temperature: float = 0.7,
-        cache_content: Optional[str] = None
+        cache_content: Optional[str] = None,
+        agent=None
     ) -> Tuple[Optional[str], int, int]:
         """
         Generates a response from Claude, handling prompt caching if 'cache_content' is provided.
+        With `agent`, the prompt is checked (and possibly trimmed) against that agent's token budget.
         Returns: (content, input_tokens, output_tokens)
         """
+        user_content, estimate = budget_prompt(agent, system_prompt, user_content, cache_content)
         
         # Construct messages
         messages = []
@@ -74,19 +105,28 @@ class AnthropicClient:
 
         extra_headers = {"anthropic-beta": "prompt-caching-2024-07-31"} if cache_content else None
 
-        try:
-            return await self._make_api_call(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                system_prompt=system_prompt,
-                messages=messages,
-                extra_headers=extra_headers
-            )
+        with tracer.span("llm.response", kind="client", model=model) as span:
+            start = time.perf_counter()
+            try:
+                content, usage = await self._make_api_call(
+                    model=model,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    system_prompt=system_prompt,
+                    messages=messages,
+                    extra_headers=extra_headers,
+                    tokens=calibrator.predict(model, estimate)
+                )
+                span.set(**usage_attributes(usage))
+                self._log_call("response", model, start, usage.input_tokens, usage.output_tokens,
+                               estimate=estimate, prompt_tokens=prompt_tokens(usage), usage=usage, agent=agent)
+                return content, usage.input_tokens, usage.output_tokens
 
-        except Exception as e:
-            logger.error(f"Error calling Anthropic API after retries: {e}")
-            return None, 0, 0
+            except Exception as e:
+                span.fail(e)
+                self._log_call("response", model, start, 0, 0, estimate=estimate, error=e, agent=agent)
+                logger.error(f"Error calling Anthropic API after retries: {e}")
+                return None, 0, 0
 
     async def generate_stream(
         self,
@@ -94,56 +134,71 @@ class AnthropicClient:
         user_content: str,
         model: str = "claude-3-5-sonnet-20240620",
         max_tokens: int = 4096,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        agent=None
     ):
         """
         Yields chunks of text from Claude.
         """
-        try:
-            async with self.client.messages.stream(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                system=system_prompt,
-                messages=[{"role": "user", "content": user_content}] # Caching not prioritized for stream yet or use same logic
-            ) as stream:
-                async for text in stream.text_stream:
-                    yield text
-        except Exception as e:
-             logger.error(f"Streaming failed: {e}")
-             yield ""
+        user_content, estimate = budget_prompt(agent, system_prompt, user_content)
+        with tracer.span("llm.stream", kind="client", model=model) as span:
+            wait_start = time.perf_counter()
+            await limiter.acquire(calibrator.predict(model, estimate))
+            span.set(queue_wait_ms=round((time.perf_counter() - wait_start) * 1000, 1))
+            start = time.perf_counter()
+            first_chunk = True
+            try:
+                async with self.client.messages.stream(
+                    model=model,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    system=system_prompt,
+                    messages=[{"role": "user", "content": user_content}] # Caching not prioritized for stream yet or use same logic
+                ) as stream:
+                    async for text in stream.text_stream:
+                        if first_chunk:
+                            span.set(ttft_ms=round((time.perf_counter() - start) * 1000, 1))
+                            first_chunk = False
+                        yield text
+                    usage = (await stream.get_final_message()).usage
+                span.set(**usage_attributes(usage))
+                self._log_call("stream", model, start, usage.input_tokens, usage.output_tokens,
+                               estimate=estimate, prompt_tokens=prompt_tokens(usage), usage=usage, agent=agent)
+            except Exception as e:
+                 span.fail(e)
+                 self._log_call("stream", model, start, 0, 0, estimate=estimate, error=e, agent=agent)
+                 logger.error(f"Streaming failed: {e}")
+                 yield ""
+
+    def _log_call(self, kind, model, start, input_tokens, output_tokens, estimate=0, prompt_tokens=0, error=None,
+                  usage=None, agent=None):
+        """
+        One structured 'llm_call' record per API call (see core.log_analytics), also counted in
+        core.metrics and appended to the cost ledger, which prices it. Returns the call's cost.
+        """
+        latency = time.perf_counter() - start
+        predicted = calibrator.predict(model, estimate)  # before observe(), so it's a true prediction
+        calibrator.observe(model, estimate, prompt_tokens)
+        cost = ledger.record_usage(kind, model, usage, ok=error is None, agent=getattr(agent, "name", None))
+        current_span().set(cost=cost, predicted_input_tokens=predicted)
+        metrics.record_api_call(kind, model, latency, input_tokens, output_tokens, cost, error is None, usage)
+        logger.info("LLM call", extra={"props": {
+            "event": "llm_call",
+            "call": kind,
+            "model": model,
+            "latency_ms": round(latency * 1000, 1),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "predicted_input_tokens": predicted,
+            "prompt_tokens": prompt_tokens,
+            "cost": cost,
+            "ok": error is None,
+        }})
+        return cost
 
     def calculate_cost(self, input_tokens: int, output_tokens: int, model: str) -> float:
         """
-        Calculates cost based on model pricing (approximate).
-        Prices per 1M tokens in INR (₹).
+        Calculates cost based on model pricing (approximate), in INR (₹).
+        Pricing lives in core.config.MODEL_PRICING_INR; see core.cost_ledger.
         """
-        # Pricing table (INR Rates)
-        pricing = {
-            # New Models
-            "claude-sonnet-4-5-20250929": {"input": 300.0, "output": 1500.0},
-            "claude-haiku-4-5-20251001": {"input": 100.0, "output": 500.0},
-            "claude-opus-4-5-20251101": {"input": 500.0, "output": 2500.0},
-            
-            # Legacy/Fallback
-            "claude-3-haiku-20240307": {"input": 25.0, "output": 125.0},
-            
-            # Generics (Fallbacks)
-            "sonnet": {"input": 300.0, "output": 1500.0},
-            "haiku": {"input": 25.0, "output": 125.0},
-            "opus": {"input": 500.0, "output": 2500.0},
-        }
-        
-        # Simple lookup
-        rates = None
-        if model in pricing:
-            rates = pricing[model]
-        else:
-            # Fuzzy match
-            if "opus" in model: rates = pricing["opus"]
-            elif "sonnet" in model: rates = pricing["sonnet"] 
-            elif "haiku" in model: rates = pricing["haiku"]
-            else: rates = pricing["sonnet"] # Default
-        
-        cost = (input_tokens / 1_000_000 * rates["input"]) + (output_tokens / 1_000_000 * rates["output"])
-        return round(cost, 6)
+        return calculate_cost(input_tokens, output_tokens, model)
@@ -18,10 +18,118 @@ ALLOWED_MODELS = [
     "claude-3-haiku-20240307"
 ]
 
+# --- PRICING ---
+# INR per 1M tokens. Unlisted models fall back to the family rate matched by name (sonnet if none match).
+MODEL_PRICING_INR = {
+    "claude-sonnet-4-5-20250929": {"input": 300.0, "output": 1500.0},
+    "claude-haiku-4-5-20251001": {"input": 100.0, "output": 500.0},
+    "claude-opus-4-5-20251101": {"input": 500.0, "output": 2500.0},
+    "claude-3-haiku-20240307": {"input": 25.0, "output": 125.0},
+    "sonnet": {"input": 300.0, "output": 1500.0},
+    "haiku": {"input": 25.0, "output": 125.0},
+    "opus": {"input": 500.0, "output": 2500.0},
+}
+CACHE_WRITE_PRICE_FACTOR = 1.25  # Prompt-cache writes, relative to the input rate
+CACHE_READ_PRICE_FACTOR = 0.1    # Prompt-cache reads, relative to the input rate
+
+# --- COST LEDGER ---
+COST_LEDGER_DB = "storage/costs.db"  # One append-only row per API call (run, session, agent, model, tokens, cost)
+
+# --- MODEL CASCADE ---
+# Cascaded agents start on their configured (cheap) model and retry on a stronger one only when a check fails
+CASCADE_ESCALATION_MODEL = "claude-sonnet-4-5-20250929"
+CASCADE_MIN_CONFIDENCE = 70     # Checker: escalate verdicts reported below this confidence (0-100)
+CASCADE_BORDERLINE_MARGIN = 3   # Auditor: escalate when quality_score is within this of the mode's stop threshold
+CASCADE_MIN_LENGTH_RATIO = 0.6  # Sanitizer: escalate when the cleaned text is shorter than this fraction of the draft
+
 # --- RETRY LOGIC ---
 MAX_RETRIES = 3
 INITIAL_BACKOFF = 1  # seconds
 BACKOFF_FACTOR = 2
 
+# --- RAG RERANKING ---
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_CANDIDATES = 20  # Candidate pool fetched from Chroma before reranking
+RERANK_BUDGET_MS = 250  # Per-query budget; over budget -> keep distance order
+RERANK_BATCH_SIZE = 16
+# Load the cross-encoder (torch) during RAG warm-up. Off by default: the UI loads it in the background
+# when the Rerank toggle is switched on, so sessions that never rerank never pay for it.
+RERANK_PRELOAD = os.getenv("RERANK_PRELOAD", "0") == "1"
+
+# --- CONTEXT PACKING ---
+# Token budget for transcript + knowledge base context sent as cache_content
+CONTEXT_TOKEN_BUDGET = 60000
+
+# --- PROMPT BUDGETS ---
+# Max estimated input tokens (system + user + cached context) per call, by agent name
+AGENT_TOKEN_BUDGETS = {
+    "Creator": 120000,
+    "Auditor": 120000,
+    "Pedagogue": 120000,
+    "Editor": 100000,
+    "Sanitizer": 60000,
+    "Checker": 16000,
+}
+DEFAULT_AGENT_TOKEN_BUDGET = 100000
+# "warn" logs over-budget prompts; "trim" also cuts the middle of the user prompt to fit.
+# Prompts over MODEL_CONTEXT_TOKENS are always trimmed (the API would reject them).
+AGENT_BUDGET_POLICY = os.getenv("AGENT_BUDGET_POLICY", "warn")
+MODEL_CONTEXT_TOKENS = 200000
+TOKEN_CALIBRATION_PATH = "storage/token_calibration.json"  # Learned estimate/actual ratios per model
+
+# --- SESSION PERSISTENCE ---
+STATE_SAVE_DEBOUNCE_S = 0.5  # Session saves within this window are coalesced into one write
+# Backend: "file" (single host), "sqlite" (WAL, shared volume) or "redis" (replicas behind a load balancer)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "file")
+SESSION_TTL_S = int(os.getenv("SESSION_TTL_S", 7 * 24 * 3600))  # Idle sessions older than this are expired
+SESSION_CLEANUP_INTERVAL_S = 3600  # Minimum gap between opportunistic cleanups per process
+SESSION_DIR = "storage/sessions"
+SESSION_DB = "storage/sessions.db"
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+
+# --- BATCH ---
+BATCH_CONCURRENCY = 4                         # Runs in flight at once for python -m core.batch
+BATCH_FAST_MODEL = "claude-3-haiku-20240307"  # Sanitizer/Checker model, as in the UI defaults
+BATCH_REPORT_DIR = "storage/batch_reports"
+
+# --- JOB QUEUE ---
+JOB_QUEUE_DB = "storage/jobs.db"
+JOB_MAX_ATTEMPTS = 3
+JOB_VISIBILITY_TIMEOUT_S = 600   # A job whose worker stops heartbeating is claimable again after this
+JOB_RETRY_BACKOFF_S = 30         # First retry delay; doubles per attempt
+WORKER_SLOTS = 4                 # Concurrent runs per worker process
+WORKER_POLL_S = 1.0              # Idle workers check the queue this often
+WORKER_STALE_S = 30              # Workers silent this long no longer count toward the quota split
+API_RPM = int(os.getenv("API_RPM", 50))        # Account-wide quota shared by all workers
+API_TPM = int(os.getenv("API_TPM", 40000))
+
+# --- LOGGING ---
+LOG_DIR = "logs"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Roll logs/app.jsonl at this size, and at every day change
+LOG_BACKUP_COUNT = 30            # Rolled files kept
+LOG_COMPRESS = True              # gzip rolled files
+LOG_DEBUG_SAMPLE_RATE = 0.1      # Fraction of DEBUG records kept per call site
+
+# --- TRACING ---
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1") == "1"
+TRACE_DIR = os.path.join(LOG_DIR, "traces")            # traces_{date}.jsonl, one file per day
+TRACE_FORMAT = os.getenv("TRACE_FORMAT", "jsonl")     # "jsonl" (one span per line) or "otlp" (OTLP/JSON, one trace per line)
+TRACE_PRINT_SUMMARY = os.getenv("TRACE_PRINT_SUMMARY", "1") == "1"  # Flame-style tree on stdout when a run ends
+
+# --- METRICS ---
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # Local only; put a proxy in front to expose it
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))     # GET /metrics in Prometheus text format
+METRICS_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)  # Seconds, per API call
+METRICS_RUN_BUCKETS = (10, 30, 60, 120, 180, 240, 300, 600)          # Seconds, per orchestrator run
+METRICS_WAIT_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60)                 # Seconds, per rate-limiter wait
+
+# --- PROMPTS ---
+# Re-read a prompt file when its mtime changes (checked at most once per interval). Off by default;
+# set PROMPT_HOT_RELOAD=1 while editing prompts/ in development.
+PROMPT_HOT_RELOAD = os.getenv("PROMPT_HOT_RELOAD", "0") == "1"
+PROMPT_RELOAD_CHECK_S = 1.0
+
 # --- PATHS ---
 # (Can be expanded if needed)
@@ -0,0 +1,149 @@
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from core.tokens import estimate_tokens
+from core.config import CONTEXT_TOKEN_BUDGET
+from core.logger import logger
+
+KB_HEADER = "[KNOWLEDGE BASE CONTEXT]:"
+GAP_MARKER = "[...]"
+MAX_SEGMENT_CHARS = 2000  # Long paragraphs are split so one block can't eat the budget
+
+_STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "is", "are", "was", "with",
+    "as", "by", "at", "it", "this", "that", "be", "from", "vs", "we", "you", "so", "if",
+}
+
+def _terms(text: str) -> List[str]:
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+def _segment_transcript(transcript: str) -> List[str]:
+    """Splits on blank lines, then hard-wraps paragraphs longer than MAX_SEGMENT_CHARS."""
+    segments = []
+    for para in re.split(r"\n\s*\n", transcript):
+        para = para.strip()
+        while len(para) > MAX_SEGMENT_CHARS:
+            cut = para.rfind(" ", 0, MAX_SEGMENT_CHARS)
+            cut = cut if cut > 0 else MAX_SEGMENT_CHARS
+            segments.append(para[:cut].strip())
+            para = para[cut:].strip()
+        if para:
+            segments.append(para)
+    return segments
+
+def _split_rag_chunks(context: str) -> List[str]:
+    return [c.strip() for c in re.split(r"(?=\[Source: )", context) if c.strip()]
+
+def _score(segment: str, query_terms: Counter) -> float:
+    """Length-normalized term overlap with the topic/subtopic vocabulary."""
+    if not query_terms:
+        return 0.0
+    terms = _terms(segment)
+    if not terms:
+        return 0.0
+    seg_counts = Counter(terms)
+    hits = sum(min(seg_counts[t], 3) * w for t, w in query_terms.items() if t in seg_counts)
+    return hits / (len(terms) ** 0.5)
+
+def pack_context(transcript: Optional[str], rag_map: Optional[Dict[str, str]] = None,
+                 subtopics: Optional[List[str]] = None, topic: str = "",
+                 budget_tokens: int = CONTEXT_TOKEN_BUDGET) -> Tuple[str, Dict]:
+    """
+    Fits transcript + RAG context into budget_tokens.
+
+    Segments (transcript paragraphs and RAG chunks) are ranked by relevance to
+    the topic/subtopics and greedily selected until the budget is full. The
+    selected segments are emitted in their ORIGINAL order, so the same inputs
+    always produce the same text and the prompt-cache prefix stays stable.
+    The transcript is only segmented when trimming is needed; when everything
+    fits it is passed through as-is. Separators, gap markers and the KB and
+    subtopic headers are counted against the budget along with the segments.
+
+    Returns: (packed_text, stats)
+    """
+    transcript = transcript or ""
+    rag_map = {k: v for k, v in (rag_map or {}).items() if v}
+
+    # (group, original_position, text) -> groups keep transcript and KB apart in output
+    kb_segments = []
+    for sub_idx, (subtopic, context) in enumerate(rag_map.items()):
+        for chunk_idx, chunk in enumerate(_split_rag_chunks(context)):
+            kb_segments.append((f"kb:{sub_idx}:{subtopic}", chunk_idx, chunk))
+    kb_costs = [estimate_tokens(s[2]) for s in kb_segments]
+
+    # Text the rebuild adds around segments: a separator per segment, a gap marker before a
+    # transcript segment that follows a dropped one, the KB header, and one header per subtopic
+    sep_cost = estimate_tokens("\n\n")
+    gap_cost = estimate_tokens(GAP_MARKER) + sep_cost
+    kb_header_cost = estimate_tokens(f"{KB_HEADER}\n")
+    group_costs = {group: estimate_tokens(f"### Subtopic: {group.split(':', 2)[2]}\n") for group, _, _ in kb_segments}
+    kb_overhead = kb_header_cost + sum(group_costs.values()) if group_costs else 0
+
+    def full_cost(segment_costs):
+        return sum(segment_costs) + sep_cost * len(segment_costs) + kb_overhead
+
+    whole = transcript.strip()
+    whole_cost = estimate_tokens(whole) if whole else 0
+    if full_cost(([whole_cost] if whole else []) + kb_costs) <= budget_tokens:
+        transcript_segments = [whole] if whole else []
+        transcript_costs = [whole_cost] if whole else []
+    else:
+        transcript_segments = _segment_transcript(transcript)
+        transcript_costs = [estimate_tokens(s) for s in transcript_segments]
+    segments = [("transcript", i, s) for i, s in enumerate(transcript_segments)] + kb_segments
+    costs = transcript_costs + kb_costs
+    total_tokens = full_cost(costs)
+    stats = {
+        "segments": len(segments),
+        "kept": len(segments),
+        "input_tokens": total_tokens,
+        "packed_tokens": total_tokens,
+        "budget_tokens": budget_tokens,
+    }
+
+    if total_tokens <= budget_tokens:
+        selected = set(range(len(segments)))
+    else:
+        query_terms = Counter(_terms(" ".join([topic] + list(subtopics or []))))
+        scores = [_score(s[2], query_terms) for s in segments]
+        # Highest score first; ties broken by original index so ranking is deterministic
+        ranking = sorted(range(len(segments)), key=lambda i: (-scores[i], i))
+        selected, used, open_groups = set(), 0, set()
+        for i in ranking:
+            group = segments[i][0]
+            extra = sep_cost
+            if group == "transcript":
+                extra += gap_cost  # Room for a gap marker in front of it
+            else:
+                extra += (0 if open_groups else kb_header_cost) + (0 if group in open_groups else group_costs[group])
+            if used + costs[i] + extra <= budget_tokens:
+                selected.add(i)
+                used += costs[i] + extra
+                if group != "transcript":
+                    open_groups.add(group)
+        stats["kept"] = len(selected)
+        stats["packed_tokens"] = used
+        logger.info("Context packed to budget", extra={"props": stats})
+
+    # Rebuild in original order, marking gaps where segments were dropped
+    transcript_parts, kb_sections = [], {}
+    prev_kept = {}
+    for i, (group, pos, text) in enumerate(segments):
+        if i not in selected:
+            prev_kept[group] = False
+            continue
+        target = transcript_parts if group == "transcript" else kb_sections.setdefault(group, [])
+        if prev_kept.get(group) is False and group == "transcript":
+            target.append(GAP_MARKER)
+        target.append(text)
+        prev_kept[group] = True
+
+    packed = "\n\n".join(transcript_parts)
+    if kb_sections:
+        rendered = []
+        for group, chunks in kb_sections.items():
+            subtopic = group.split(":", 2)[2]
+            rendered.append(f"### Subtopic: {subtopic}\n" + "\n\n".join(chunks))
+        packed += f"\n\n{KB_HEADER}\n" + "\n\n".join(rendered)
+
+    return packed.strip(), stats
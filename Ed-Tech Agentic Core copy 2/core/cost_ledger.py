@@ -0,0 +1,215 @@
+import os
+import time
+import atexit
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from typing import Dict, List, Optional
+from core.config import COST_LEDGER_DB, MODEL_PRICING_INR, CACHE_WRITE_PRICE_FACTOR, CACHE_READ_PRICE_FACTOR
+from core.logger import logger, get_log_context
+
+GROUP_COLUMNS = ("run_id", "session_id", "agent", "model", "call")
+MAX_TRACKED_RUNS = 256  # In-process run totals kept for run_total()
+READ_WAIT_S = 0.25      # Longest a query waits for this process's buffered rows before reading what is on disk
+
+def rates_for(model: str) -> Dict[str, float]:
+    """INR per 1M input/output tokens for a model id (family fallback by name)."""
+    if model in MODEL_PRICING_INR:
+        return MODEL_PRICING_INR[model]
+    for family in ("opus", "sonnet", "haiku"):
+        if family in (model or ""):
+            return MODEL_PRICING_INR[family]
+    return MODEL_PRICING_INR["sonnet"]
+
+def calculate_cost(input_tokens: int, output_tokens: int, model: str,
+                   cache_read_tokens: int = 0, cache_write_tokens: int = 0) -> float:
+    """
+    INR cost of one call. input_tokens excludes prompt-cache tokens (as in the
+    API's usage block); cache writes and reads are priced off the input rate.
+    """
+    rates = rates_for(model)
+    cost = ((input_tokens or 0) + (cache_write_tokens or 0) * CACHE_WRITE_PRICE_FACTOR
+            + (cache_read_tokens or 0) * CACHE_READ_PRICE_FACTOR) / 1_000_000 * rates["input"] \
+        + (output_tokens or 0) / 1_000_000 * rates["output"]
+    return round(cost, 6)
+
+def usage_cost(usage, model: str) -> float:
+    """calculate_cost() for an API usage object."""
+    return calculate_cost(usage.input_tokens or 0, usage.output_tokens or 0, model,
+                          getattr(usage, "cache_read_input_tokens", 0) or 0,
+                          getattr(usage, "cache_creation_input_tokens", 0) or 0)
+
+
+class CostLedger:
+    """
+    Append-only record of every API call's spend in one WAL-mode SQLite file.
+
+    Both clients write one row per call; run, session and agent are taken from
+    the logging context (core.logger.set_log_context) unless passed in. The
+    orchestrator's per-run total, the sidebar ticker and spend caps all read
+    from here, so each call is priced and counted exactly once. Per-run totals
+    are also kept in memory so the run loop never waits on a query.
+
+    record() is called from the event loop, so rows are buffered and inserted
+    in batches by a background writer thread; queries wait up to `wait`
+    seconds for the buffer to drain (a slow disk makes them slightly stale,
+    never slow), and flush() is registered at exit.
+    """
+    def __init__(self, db_path: str = COST_LEDGER_DB):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._initialized = set()  # absolute db paths whose schema is done (the default path is cwd-relative)
+        self._run_totals = OrderedDict()  # run_id -> cost recorded by this process
+        self._pending = []  # rows not yet handed to the writer
+        self._writing = False
+        self._cond = threading.Condition()
+        self._writer = None
+        atexit.register(self.flush)
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        key = os.path.abspath(self.db_path)
+        if key not in self._initialized:
+            with self._lock:
+                if key not in self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS calls ("
+                        "id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, "
+                        "run_id TEXT NOT NULL DEFAULT '', session_id TEXT NOT NULL DEFAULT '', "
+                        "agent TEXT NOT NULL DEFAULT '', call TEXT NOT NULL DEFAULT '', model TEXT NOT NULL, "
+                        "input_tokens INTEGER NOT NULL DEFAULT 0, output_tokens INTEGER NOT NULL DEFAULT 0, "
+                        "cache_read_tokens INTEGER NOT NULL DEFAULT 0, cache_write_tokens INTEGER NOT NULL DEFAULT 0, "
+                        "cost REAL NOT NULL DEFAULT 0, ok INTEGER NOT NULL DEFAULT 1)"
+                    )
+                    # Covering indexes: per-run / per-session totals never touch the table rows
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_run ON calls(run_id, cost)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_session ON calls(session_id, ts, cost)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_calls_ts ON calls(ts)")
+                    self._initialized.add(key)
+        return conn
+
+    def record(self, call: str, model: str, input_tokens: int = 0, output_tokens: int = 0,
+               cache_read_tokens: int = 0, cache_write_tokens: int = 0, cost: Optional[float] = None,
+               ok: bool = True, agent: Optional[str] = None, run_id: Optional[str] = None,
+               session_id: Optional[str] = None) -> float:
+        """Appends one call and returns its cost (priced here when cost is None)."""
+        if cost is None:
+            cost = calculate_cost(input_tokens, output_tokens, model, cache_read_tokens, cache_write_tokens)
+        context = get_log_context()
+        run_id = run_id or context.get("run_id") or ""
+        session_id = session_id or context.get("session_id") or ""
+        agent = agent or context.get("agent") or ""
+
+        if run_id:
+            with self._lock:
+                self._run_totals[run_id] = self._run_totals.pop(run_id, 0.0) + cost
+                while len(self._run_totals) > MAX_TRACKED_RUNS:
+                    self._run_totals.popitem(last=False)
+        row = (time.time(), run_id, session_id, agent, call, model, int(input_tokens or 0),
+               int(output_tokens or 0), int(cache_read_tokens or 0), int(cache_write_tokens or 0),
+               float(cost), 1 if ok else 0)
+        with self._cond:
+            self._pending.append(row)
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="cost-ledger-writer", daemon=True)
+                self._writer.start()
+            self._cond.notify_all()
+        return cost
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                rows, self._pending = self._pending, []
+                self._writing = True
+            try:
+                with closing(self._connect()) as conn:
+                    conn.executemany(
+                        "INSERT INTO calls (ts, run_id, session_id, agent, call, model, input_tokens, output_tokens, "
+                        "cache_read_tokens, cache_write_tokens, cost, ok) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    conn.commit()
+            except Exception as e:
+                logger.error(f"Error recording {len(rows)} cost row(s) to {self.db_path}: {e}")
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Blocks until buffered rows are written; False if the writer is still busy after timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def record_usage(self, call: str, model: str, usage, ok: bool = True, agent: Optional[str] = None) -> float:
+        """record() from an API usage object (None for a failed call)."""
+        if usage is None:
+            return self.record(call, model, cost=0.0, ok=ok, agent=agent)
+        return self.record(call, model, usage.input_tokens or 0, usage.output_tokens or 0,
+                           getattr(usage, "cache_read_input_tokens", 0) or 0,
+                           getattr(usage, "cache_creation_input_tokens", 0) or 0,
+                           cost=usage_cost(usage, model), ok=ok, agent=agent)
+
+    def run_total(self, run_id: Optional[str]) -> float:
+        """Spend of a run recorded by this process (in memory; falls back to the database without waiting)."""
+        if not run_id:
+            return 0.0
+        with self._lock:
+            if run_id in self._run_totals:
+                return self._run_totals[run_id]
+        return self.total(run_id=run_id, wait=0)  # Nothing of this run is buffered here
+
+    @staticmethod
+    def _where(run_id=None, session_id=None, agent=None, since=None):
+        clauses, params = [], []
+        for column, value in (("run_id", run_id), ("session_id", session_id), ("agent", agent)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def total(self, run_id: Optional[str] = None, session_id: Optional[str] = None,
+              agent: Optional[str] = None, since: Optional[float] = None, wait: float = READ_WAIT_S) -> float:
+        """Summed cost of the matching calls."""
+        where, params = self._where(run_id, session_id, agent, since)
+        if wait:
+            self.flush(wait)
+        try:
+            with closing(self._connect()) as conn:
+                return round(conn.execute(f"SELECT COALESCE(SUM(cost), 0) FROM calls{where}", params).fetchone()[0], 6)
+        except Exception as e:
+            logger.error(f"Error reading cost ledger: {e}")
+            return 0.0
+
+    def breakdown(self, by: str = "agent", run_id: Optional[str] = None, session_id: Optional[str] = None,
+                  since: Optional[float] = None, wait: float = READ_WAIT_S) -> List[Dict]:
+        """Calls, tokens and cost grouped by one of GROUP_COLUMNS, most expensive first."""
+        if by not in GROUP_COLUMNS:
+            raise ValueError(f"Cannot group costs by {by!r}; expected one of {GROUP_COLUMNS}")
+        where, params = self._where(run_id, session_id, None, since)
+        if wait:
+            self.flush(wait)
+        try:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    f"SELECT {by} AS key, COUNT(*) AS calls, SUM(1 - ok) AS errors, "
+                    "SUM(input_tokens) AS input_tokens, SUM(output_tokens) AS output_tokens, "
+                    "SUM(cache_read_tokens) AS cache_read_tokens, SUM(cache_write_tokens) AS cache_write_tokens, "
+                    f"ROUND(SUM(cost), 6) AS cost FROM calls{where} GROUP BY {by} ORDER BY cost DESC", params
+                ).fetchall()
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error reading cost ledger: {e}")
+            return []
+
+
+ledger = CostLedger()
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Dict, List, Optional
+from core.config import JOB_QUEUE_DB, JOB_MAX_ATTEMPTS, JOB_VISIBILITY_TIMEOUT_S, JOB_RETRY_BACKOFF_S
+
+# queued -> running -> done
+#                   -> queued again (failed attempt, retried after backoff, or lease expired)
+#                   -> failed (attempts exhausted) | cancelled
+STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+class JobQueue:
+    """
+    Durable local job queue in one WAL-mode SQLite file, shared by the worker
+    processes and readable by the dashboard.
+
+    A worker claims a job with a lease (visibility timeout) and heartbeats to
+    extend it; if the worker dies, the lease lapses and the job is claimable
+    again. Failed attempts are retried with exponential backoff up to
+    max_attempts. Workers also register here, which is how they learn how
+    many peers share the API quota.
+    """
+    def __init__(self, db_path: str = JOB_QUEUE_DB):
+        self.db_path = db_path
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)  # Explicit transactions
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS jobs ("
+                        "id TEXT PRIMARY KEY, batch_id TEXT, payload TEXT NOT NULL, status TEXT NOT NULL, "
+                        "priority INTEGER NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, "
+                        "max_attempts INTEGER NOT NULL, available_at REAL NOT NULL, lease_expires REAL, "
+                        "worker_id TEXT, result TEXT, error TEXT, cost REAL NOT NULL DEFAULT 0, "
+                        "created REAL NOT NULL, updated REAL NOT NULL)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, available_at, priority)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs(batch_id)")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS workers ("
+                        "worker_id TEXT PRIMARY KEY, pid INTEGER, started REAL, last_seen REAL, "
+                        "running INTEGER DEFAULT 0, processed INTEGER DEFAULT 0)"
+                    )
+                    self._initialized = True
+        return conn
+
+    @staticmethod
+    def _row(row) -> Dict:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    # --- Producer side ---
+
+    def enqueue(self, payload: Dict, batch_id: Optional[str] = None, priority: int = 0,
+                max_attempts: int = JOB_MAX_ATTEMPTS) -> str:
+        return self.enqueue_many([payload], batch_id, priority, max_attempts)[0]
+
+    def enqueue_many(self, payloads: List[Dict], batch_id: Optional[str] = None, priority: int = 0,
+                     max_attempts: int = JOB_MAX_ATTEMPTS) -> List[str]:
+        now = time.time()
+        ids = [uuid.uuid4().hex for _ in payloads]
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO jobs (id, batch_id, payload, status, priority, max_attempts, available_at, created, updated) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+                [(job_id, batch_id, json.dumps(p), priority, max_attempts, now, now, now) for job_id, p in zip(ids, payloads)]
+            )
+            conn.execute("COMMIT")
+        return ids
+
+    def cancel(self, batch_id: Optional[str] = None, job_id: Optional[str] = None) -> int:
+        """Cancels queued jobs (running ones finish their current attempt)."""
+        where, args = ("id = ?", (job_id,)) if job_id else ("batch_id = ?", (batch_id,))
+        with closing(self._connect()) as conn:
+            cur = conn.execute(f"UPDATE jobs SET status='cancelled', updated=? WHERE status='queued' AND {where}",
+                               (time.time(),) + args)
+            return cur.rowcount
+
+    # --- Worker side ---
+
+    def claim(self, worker_id: str, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT_S) -> Optional[Dict]:
+        """
+        Atomically takes the next available job: queued and due, or running with
+        a lapsed lease (its worker died). Returns None when nothing is claimable.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Lapsed leases whose attempts are used up fail here rather than run again
+                conn.execute(
+                    "UPDATE jobs SET status='failed', error=COALESCE(error, 'Lease expired'), worker_id=NULL, updated=? "
+                    "WHERE status='running' AND lease_expires < ? AND attempts >= max_attempts", (now, now))
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE (status='queued' AND available_at <= ?) "
+                    "OR (status='running' AND lease_expires < ?) "
+                    "ORDER BY priority DESC, available_at, created LIMIT 1", (now, now)).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status='running', attempts=attempts+1, worker_id=?, lease_expires=?, updated=? "
+                    "WHERE id=?", (worker_id, now + visibility_timeout, now, row["id"]))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        job = self._row(row)
+        job.update(status="running", attempts=job["attempts"] + 1, worker_id=worker_id)
+        return job
+
+    def heartbeat(self, job_id: str, worker_id: str, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT_S) -> bool:
+        """Extends the lease. False means the job is no longer ours (lease lapsed and was re-claimed)."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cur = conn.execute("UPDATE jobs SET lease_expires=?, updated=? WHERE id=? AND worker_id=? AND status='running'",
+                               (now + visibility_timeout, now, job_id, worker_id))
+            return cur.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Dict, cost: float = 0.0) -> bool:
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status='done', result=?, error=NULL, cost=cost+?, lease_expires=NULL, updated=? "
+                "WHERE id=? AND worker_id=? AND status='running'",
+                (json.dumps(result), cost, time.time(), job_id, worker_id))
+            return cur.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, cost: float = 0.0, result: Optional[Dict] = None,
+             backoff: float = JOB_RETRY_BACKOFF_S, retry: bool = True) -> Optional[str]:
+        """Records a failed attempt; requeues with exponential backoff while attempts remain. Returns the new status."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id=? AND worker_id=? AND status='running'",
+                                   (job_id, worker_id)).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                status = "queued" if retry and row["attempts"] < row["max_attempts"] else "failed"
+                delay = backoff * (2 ** (row["attempts"] - 1))
+                conn.execute(
+                    "UPDATE jobs SET status=?, error=?, result=?, cost=cost+?, available_at=?, lease_expires=NULL, "
+                    "worker_id=CASE WHEN ?='queued' THEN NULL ELSE worker_id END, updated=? WHERE id=?",
+                    (status, error[:1000], json.dumps(result) if result else None, cost, now + delay, status, now, job_id))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return status
+
+    # --- Worker registry ---
+
+    def register_worker(self, worker_id: str, running: int = 0, processed: int = 0):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO workers (worker_id, pid, started, last_seen, running, processed) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(worker_id) DO UPDATE SET last_seen=excluded.last_seen, running=excluded.running, "
+                "processed=excluded.processed", (worker_id, os.getpid(), now, now, running, processed))
+
+    def unregister_worker(self, worker_id: str):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM workers WHERE worker_id=?", (worker_id,))
+
+    def live_workers(self, stale_after: float) -> List[Dict]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT * FROM workers WHERE last_seen >= ? ORDER BY started",
+                                (time.time() - stale_after,)).fetchall()
+        return [dict(r) for r in rows]
+
+    # --- Status API (dashboard) ---
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def list_jobs(self, status: Optional[str] = None, batch_id: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        clauses, args = [], []
+        if status:
+            clauses.append("status = ?")
+            args.append(status)
+        if batch_id:
+            clauses.append("batch_id = ?")
+            args.append(batch_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT * FROM jobs {where} ORDER BY created LIMIT ?", args + [limit]).fetchall()
+        return [self._row(r) for r in rows]
+
+    def summary(self, batch_id: Optional[str] = None) -> Dict:
+        """Job counts by status plus total cost, for one batch or the whole queue."""
+        where, args = ("WHERE batch_id = ?", (batch_id,)) if batch_id else ("", ())
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT status, COUNT(*) AS n, SUM(cost) AS cost FROM jobs {where} GROUP BY status",
+                                args).fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        total_cost = 0.0
+        for r in rows:
+            counts[r["status"]] = r["n"]
+            total_cost += r["cost"] or 0.0
+        return {"counts": counts, "total": sum(counts.values()), "cost": round(total_cost, 6)}
+
+    def batches(self, limit: int = 20) -> List[Dict]:
+        """Most recent batches with per-status counts."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT batch_id, MIN(created) AS created, COUNT(*) AS total, SUM(cost) AS cost, "
+                "SUM(status='done') AS done, SUM(status='failed') AS failed, "
+                "SUM(status IN ('queued', 'running')) AS pending "
+                "FROM jobs GROUP BY batch_id ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(r) for r in rows]
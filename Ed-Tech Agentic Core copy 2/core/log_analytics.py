@@ -0,0 +1,323 @@
+"""
+Streaming analytics over the JSONL logs written by core.logger.
+
+    python -m core.log_analytics                      # logs/*.jsonl and rolled .jsonl.gz files
+    python -m core.log_analytics logs/app_2026-01-20.jsonl --since 2026-01-20 --json
+
+Reads one line at a time (gzip transparently) and keeps only fixed-size
+aggregates, so memory stays flat no matter how many files are scanned.
+"""
+import os
+import re
+import glob
+import gzip
+import json
+import math
+import argparse
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from core.config import LOG_DIR
+
+# Cheap substring checks before json.loads; most lines are neither
+_INTERESTING = ('"event"', "Retry ", "Rate limit hit")
+_RETRY_RE = re.compile(r"^Retry (\d+)/\d+ for (\S+) due to")
+_RATE_LIMIT_RE = re.compile(r"Waiting ([\d.]+)s")
+
+class LatencyHistogram:
+    """
+    Log-bucketed histogram (~2.5% relative error) for streaming percentiles.
+    Memory is bounded by the value range, not the sample count.
+    """
+    GROWTH = 1.05
+
+    def __init__(self):
+        self.buckets = defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        value = max(float(value), 0.0)
+        self.buckets[int(math.log(value + 1, self.GROWTH))] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                # Midpoint of the bucket, mapped back from log space
+                low, high = self.GROWTH ** bucket - 1, self.GROWTH ** (bucket + 1) - 1
+                return min((low + high) / 2, self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+class GroupStats:
+    __slots__ = ("calls", "errors", "input_tokens", "output_tokens", "cost", "latency",
+                 "predicted_tokens", "predicted_actual", "predicted_abs_error")
+
+    def __init__(self):
+        self.calls = self.errors = self.input_tokens = self.output_tokens = 0
+        # Calls that carry both a prediction and the billed prompt size (see agents.base_agent)
+        self.predicted_tokens = self.predicted_actual = self.predicted_abs_error = 0
+        self.cost = 0.0
+        self.latency = LatencyHistogram()
+
+    def add(self, rec: dict):
+        self.calls += 1
+        if rec.get("ok") is False:
+            self.errors += 1
+        self.input_tokens += int(rec.get("input_tokens") or 0)
+        self.output_tokens += int(rec.get("output_tokens") or 0)
+        self.cost += float(rec.get("cost") or 0.0)
+        if rec.get("latency_ms") is not None:
+            self.latency.add(rec["latency_ms"])
+        predicted, actual = rec.get("predicted_input_tokens"), rec.get("prompt_tokens")
+        if predicted and actual:
+            self.predicted_tokens += int(predicted)
+            self.predicted_actual += int(actual)
+            self.predicted_abs_error += abs(int(predicted) - int(actual))
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "p50_ms": round(self.latency.percentile(50), 1),
+            "p95_ms": round(self.latency.percentile(95), 1),
+            "mean_ms": round(self.latency.mean, 1),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost": round(self.cost, 4),
+            "prediction_error_pct": round(100 * self.predicted_abs_error / self.predicted_actual, 1)
+                                    if self.predicted_actual else None,
+        }
+
+class CascadeStats:
+    """
+    One cascaded agent (see core.cascade): how often it escalated and why, what
+    the first (cheap) step and the escalation steps cost, and how often
+    escalating changed the verdict. The savings estimate prices every call as
+    if it had gone straight to the escalation model at its observed mean cost.
+    """
+    __slots__ = ("calls", "escalated", "reasons", "first_cost", "first_ms", "escalation_cost", "escalation_ms",
+                 "compared", "verdict_changed")
+
+    def __init__(self):
+        self.calls = self.escalated = self.compared = self.verdict_changed = 0
+        self.reasons = defaultdict(int)
+        self.first_cost = self.first_ms = self.escalation_cost = self.escalation_ms = 0.0
+
+    def add(self, rec: dict):
+        steps = rec.get("steps") or []
+        if not steps:
+            return
+        self.calls += 1
+        self.first_cost += float(steps[0].get("cost") or 0.0)
+        self.first_ms += float(steps[0].get("latency_ms") or 0.0)
+        if len(steps) > 1:
+            self.escalated += 1
+            for reason in rec.get("reasons") or []:
+                self.reasons[reason] += 1
+            self.escalation_cost += sum(float(step.get("cost") or 0.0) for step in steps[1:])
+            self.escalation_ms += sum(float(step.get("latency_ms") or 0.0) for step in steps[1:])
+            first, last = steps[0].get("verdict"), steps[-1].get("verdict")
+            if first is not None and last is not None:
+                self.compared += 1
+                self.verdict_changed += first != last
+
+    def to_dict(self):
+        d = {
+            "calls": self.calls,
+            "escalated": self.escalated,
+            "rate": round(self.escalated / self.calls, 3) if self.calls else 0.0,
+            "reasons": dict(sorted(self.reasons.items(), key=lambda kv: -kv[1])),
+            "first_cost": round(self.first_cost, 4),
+            "escalation_cost": round(self.escalation_cost, 4),
+            "first_mean_ms": round(self.first_ms / self.calls, 1) if self.calls else 0.0,
+            "escalation_mean_ms": round(self.escalation_ms / self.escalated, 1) if self.escalated else None,
+            "verdict_changed_pct": round(100 * self.verdict_changed / self.compared, 1) if self.compared else None,
+            "est_saved_cost": None,
+            "est_saved_s": None,
+        }
+        if self.escalated:
+            d["est_saved_cost"] = round(self.calls * self.escalation_cost / self.escalated
+                                        - self.first_cost - self.escalation_cost, 4)
+            d["est_saved_s"] = round((self.calls * self.escalation_ms / self.escalated
+                                      - self.first_ms - self.escalation_ms) / 1000, 1)
+        return d
+
+class LogAnalyzer:
+    """Aggregates llm_call, retry, rate_limit_wait, cascade and run_complete events."""
+    DIMENSIONS = ("agent", "model", "topic")
+    TOP_RUNS = 10
+
+    def __init__(self, since: Optional[str] = None, until: Optional[str] = None):
+        self.since = since
+        self.until = until
+        self.lines = 0
+        self.parsed = 0
+        self.bad_lines = 0
+        self.groups = {dim: defaultdict(GroupStats) for dim in self.DIMENSIONS}
+        self.overall = GroupStats()
+        self.retries = defaultdict(int)         # func -> count
+        self.rate_limit_waits = 0
+        self.rate_limit_wait_s = 0.0
+        self.cascades = defaultdict(CascadeStats)  # agent -> escalation stats
+        self.run_cost = LatencyHistogram()       # reused as a cost distribution
+        self.runs = 0
+        self.top_runs: List[dict] = []           # most expensive, capped at TOP_RUNS
+
+    def _in_window(self, rec):
+        ts = rec.get("timestamp", "")
+        if self.since and ts < self.since:
+            return False
+        if self.until and ts >= self.until:
+            return False
+        return True
+
+    def feed_line(self, line: str):
+        self.lines += 1
+        if not any(marker in line for marker in _INTERESTING):
+            return
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            self.bad_lines += 1
+            return
+        if not self._in_window(rec):
+            return
+        self.parsed += 1
+        self.feed(rec)
+
+    def feed(self, rec: dict):
+        event = rec.get("event")
+        message = rec.get("message", "")
+
+        if event == "llm_call":
+            self.overall.add(rec)
+            for dim in self.DIMENSIONS:
+                self.groups[dim][rec.get(dim) or "-"].add(rec)
+        elif event == "retry" or (event is None and message.startswith("Retry ")):
+            match = _RETRY_RE.match(message)
+            func = rec.get("func") or (match.group(2) if match else "?")
+            self.retries[func] += 1
+        elif event == "rate_limit_wait" or (event is None and "Rate limit hit" in message):
+            wait = rec.get("wait_s")
+            if wait is None:
+                match = _RATE_LIMIT_RE.search(message)
+                wait = float(match.group(1)) if match else 0.0
+            self.rate_limit_waits += 1
+            self.rate_limit_wait_s += float(wait)
+        elif event == "cascade":
+            self.cascades[rec.get("agent") or "-"].add(rec)
+        elif event == "run_complete":
+            cost = float(rec.get("cost") or 0.0)
+            self.runs += 1
+            self.run_cost.add(cost * 1000)  # milli-units keep small costs in distinct buckets
+            self.top_runs.append({k: rec.get(k) for k in ("run_id", "topic", "mode", "cost", "duration_s", "timestamp")})
+            if len(self.top_runs) > self.TOP_RUNS * 2:
+                self._trim_runs()
+
+    def _trim_runs(self):
+        self.top_runs.sort(key=lambda r: r.get("cost") or 0.0, reverse=True)
+        del self.top_runs[self.TOP_RUNS:]
+
+    def feed_file(self, path: str):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                self.feed_line(line)
+
+    def report(self) -> Dict:
+        self._trim_runs()
+        return {
+            "lines": self.lines,
+            "events": self.parsed,
+            "bad_lines": self.bad_lines,
+            "calls": self.overall.to_dict(),
+            "by": {
+                dim: {key: stats.to_dict() for key, stats in sorted(groups.items(), key=lambda kv: -kv[1].cost)}
+                for dim, groups in self.groups.items()
+            },
+            "retries": dict(sorted(self.retries.items(), key=lambda kv: -kv[1])),
+            "rate_limit": {"waits": self.rate_limit_waits, "total_wait_s": round(self.rate_limit_wait_s, 2)},
+            "cascade": {agent: stats.to_dict() for agent, stats in sorted(self.cascades.items())},
+            "runs": {
+                "count": self.runs,
+                "p50_cost": round(self.run_cost.percentile(50) / 1000, 4),
+                "p95_cost": round(self.run_cost.percentile(95) / 1000, 4),
+                "mean_cost": round(self.run_cost.mean / 1000, 4),
+                "top": self.top_runs,
+            },
+        }
+
+def default_paths(log_dir: str = LOG_DIR) -> List[str]:
+    paths = glob.glob(os.path.join(log_dir, "*.jsonl")) + glob.glob(os.path.join(log_dir, "*.jsonl.gz"))
+    return sorted(paths, key=os.path.getmtime)
+
+def analyze(paths: Iterable[str], since: Optional[str] = None, until: Optional[str] = None) -> Dict:
+    analyzer = LogAnalyzer(since=since, until=until)
+    for path in paths:
+        analyzer.feed_file(path)
+    return analyzer.report()
+
+def format_report(report: Dict) -> str:
+    lines = [f"Scanned {report['lines']:,} lines ({report['events']:,} events, {report['bad_lines']} unparsable)"]
+    c = report["calls"]
+    lines.append(f"LLM calls: {c['calls']} ({c['errors']} failed) · p50 {c['p50_ms']:.0f} ms · "
+                 f"p95 {c['p95_ms']:.0f} ms · cost ₹{c['cost']:.4f}")
+    if c.get("prediction_error_pct") is not None:
+        lines.append(f"Prompt-size prediction error: {c['prediction_error_pct']:.1f}% (mean absolute, token-weighted)")
+    for dim, groups in report["by"].items():
+        if not groups:
+            continue
+        lines.append(f"\nBy {dim}:")
+        lines.append(f"  {'':<36} {'calls':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'in tok':>9} {'out tok':>9} {'cost':>9}")
+        for key, s in groups.items():
+            lines.append(f"  {str(key)[:36]:<36} {s['calls']:>6} {s['errors']:>4} {s['p50_ms']:>8.0f} {s['p95_ms']:>8.0f} "
+                         f"{s['input_tokens']:>9,} {s['output_tokens']:>9,} {s['cost']:>9.4f}")
+    lines.append(f"\nRetries: {sum(report['retries'].values())} "
+                 + (", ".join(f"{k}={v}" for k, v in report["retries"].items()) if report["retries"] else ""))
+    rl = report["rate_limit"]
+    lines.append(f"Rate-limit waits: {rl['waits']} ({rl['total_wait_s']:.1f}s total)")
+    if report.get("cascade"):
+        lines.append("\nModel cascade:")
+        for agent, cs in report["cascade"].items():
+            reasons = ", ".join(f"{k}={v}" for k, v in cs["reasons"].items())
+            line = (f"  {agent:<12} {cs['escalated']}/{cs['calls']} escalated ({cs['rate']:.0%})"
+                    + (f" [{reasons}]" if reasons else "")
+                    + f" · first step ₹{cs['first_cost']:.4f}, {cs['first_mean_ms']:.0f} ms avg"
+                    + f" · escalations ₹{cs['escalation_cost']:.4f}")
+            if cs["verdict_changed_pct"] is not None:
+                line += f" · verdict changed {cs['verdict_changed_pct']:.1f}%"
+            if cs["est_saved_cost"] is not None:
+                line += f" · est. saved ₹{cs['est_saved_cost']:.4f}, {cs['est_saved_s']:.1f}s"
+            lines.append(line)
+    runs = report["runs"]
+    lines.append(f"Runs: {runs['count']} · cost p50 ₹{runs['p50_cost']:.4f} · p95 ₹{runs['p95_cost']:.4f} · mean ₹{runs['mean_cost']:.4f}")
+    for r in runs["top"]:
+        lines.append(f"  {r.get('timestamp', '')}  {r.get('run_id') or '-':<8}  ₹{(r.get('cost') or 0):.4f}  "
+                     f"{r.get('duration_s') or 0:>6}s  {r.get('mode') or ''}: {r.get('topic') or ''}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latency, retry and cost breakdowns from JSONL logs.")
+    parser.add_argument("paths", nargs="*", help=f"Log files (default: {LOG_DIR}/*.jsonl[.gz])")
+    parser.add_argument("--since", help="Only records with timestamp >= this (e.g. 2026-01-01)")
+    parser.add_argument("--until", help="Only records with timestamp < this")
+    parser.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+    args = parser.parse_args(argv)
+
+    report = analyze(args.paths or default_paths(), since=args.since, until=args.until)
+    print(json.dumps(report, indent=2, ensure_ascii=False) if args.json else format_report(report))
+
+if __name__ == "__main__":
+    main()
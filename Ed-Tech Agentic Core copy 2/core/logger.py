@@ -1,8 +1,29 @@
 import logging
+import logging.handlers
 import sys
 import os
+import re
 import json
 import time
+import gzip
+import queue
+import atexit
+import shutil
+import threading
+import contextvars
+from core.config import (
+    LOG_DIR, LOG_LEVEL, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_COMPRESS, LOG_DEBUG_SAMPLE_RATE
+)
+
+# Fields merged into every record's props (run_id, topic, agent, ...). Tasks inherit a copy.
+_log_context = contextvars.ContextVar("log_context", default={})
+
+def set_log_context(**fields):
+    """Adds fields to the structured context of the current task/thread."""
+    _log_context.set({**_log_context.get(), **fields})
+
+def get_log_context():
+    return dict(_log_context.get())
 
 class JSONFormatter(logging.Formatter):
     """
@@ -17,50 +38,189 @@ class JSONFormatter(logging.Formatter):
             "module": record.module,
             "line": record.lineno
         }
-        
-        # Add exception info if present
+
+        # Add exception info if present (pre-rendered to exc_text when queued)
         if record.exc_info:
             log_obj["exception"] = self.formatException(record.exc_info)
-            
+        elif record.exc_text:
+            log_obj["exception"] = record.exc_text
+
         # Merge extra attributes if passed in extra={}
         if hasattr(record, "props"):
             log_obj.update(record.props)
 
-        return json.dumps(log_obj)
+        return json.dumps(log_obj, default=str)
+
+class DebugSampler(logging.Filter):
+    """
+    Keeps 1 in N DEBUG records per call site (N = 1 / rate); other levels pass.
+    Runs on the caller's thread, so dropped records are never queued.
+    """
+    def __init__(self, rate=LOG_DEBUG_SAMPLE_RATE):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counts = {}
+        self.dropped = 0
+
+    def filter(self, record):
+        if record.levelno != logging.DEBUG:
+            return True
+        if not self.every:
+            self.dropped += 1
+            return False
+        key = (record.pathname, record.lineno)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % self.every == 0:
+            return True
+        self.dropped += 1
+        return False
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread. Only message interpolation and
+    traceback rendering happen on the caller; JSON encoding and I/O don't.
+    """
+    def prepare(self, record):
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        # Copy so other handlers on this logger see the original record
+        record = logging.makeLogRecord(record.__dict__)
+        context = _log_context.get()
+        if context:
+            record.props = {**context, **getattr(record, "props", {})}
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
 
-def setup_logger(name="EdTechCore", level=logging.INFO):
+class RotatingJSONLHandler(logging.handlers.BaseRotatingHandler):
     """
-    Sets up a configured logger with console output and daily file rotation.
+    Writes to {directory}/{prefix}.jsonl and rolls it to {prefix}_{date}.{n}.jsonl
+    when the day changes or the file reaches max_bytes. Rolled files are
+    optionally gzipped; only the newest backup_count are kept.
     """
+    def __init__(self, directory=LOG_DIR, prefix="app", max_bytes=LOG_MAX_BYTES,
+                 backup_count=LOG_BACKUP_COUNT, compress=LOG_COMPRESS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        path = os.path.join(directory, f"{prefix}.jsonl")
+        self._day = time.strftime("%Y-%m-%d", time.localtime(os.path.getmtime(path))) if os.path.exists(path) else self._today()
+        super().__init__(path, "a", encoding="utf-8", delay=True)
+
+    @staticmethod
+    def _today():
+        return time.strftime("%Y-%m-%d")
+
+    def shouldRollover(self, record):
+        if not os.path.exists(self.baseFilename):
+            self._day = self._today()
+            return False
+        if self._today() != self._day:
+            return True
+        if self.max_bytes > 0:
+            size = self.stream.tell() if self.stream else os.path.getsize(self.baseFilename)
+            return size >= self.max_bytes
+        return False
+
+    def _rolled_name(self):
+        n = 0
+        while True:
+            name = os.path.join(self.directory, f"{self.prefix}_{self._day}.{n}.jsonl")
+            if not os.path.exists(name) and not os.path.exists(name + ".gz"):
+                return name
+            n += 1
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            rolled = self._rolled_name()
+            os.replace(self.baseFilename, rolled)
+            if self.compress:
+                with open(rolled, "rb") as src, gzip.open(rolled + ".gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(rolled)
+            self._prune()
+        self._day = self._today()
+
+    def rolled_files(self):
+        """Rolled log files, oldest first."""
+        pattern = re.compile(rf"^{re.escape(self.prefix)}_\d{{4}}-\d{{2}}-\d{{2}}(\.\d+)?\.jsonl(\.gz)?$")
+        files = [os.path.join(self.directory, f) for f in os.listdir(self.directory) if pattern.match(f)]
+        return sorted(files, key=os.path.getmtime)
+
+    def _prune(self):
+        if self.backup_count <= 0:
+            return
+        files = self.rolled_files()
+        for path in files[:max(0, len(files) - self.backup_count)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+_listener = None
+_listener_lock = threading.Lock()
+
+def setup_logger(name="EdTechCore", level=LOG_LEVEL):
+    """
+    Sets up a configured logger. Records go through a queue to a background
+    listener that writes console output and the rotating JSONL file, so
+    logging never blocks the caller (e.g. the orchestrator's event loop).
+    """
+    global _listener
     logger = logging.getLogger(name)
-    
+
     # Avoid adding duplicate handlers if already configured
     if logger.handlers:
         return logger
-        
+
     logger.setLevel(level)
-    
+
     # Formatter
     formatter = JSONFormatter(datefmt='%Y-%m-%dT%H:%M:%SZ')
-    
+
     # Console Handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
+    handlers = [console_handler]
+
     # File Handler
     try:
-        os.makedirs("logs", exist_ok=True)
-        # Simple file handler (log rotation could be added here)
-        log_file = f"logs/app_{time.strftime('%Y-%m-%d')}.jsonl"
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler = RotatingJSONLHandler()
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
     except Exception as e:
         print(f"Failed to setup file logger: {e}")
-        
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSampler())
+    logger.addHandler(queue_handler)
+
+    with _listener_lock:
+        listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)  # drains the queue on shutdown
+        _listener = listener
+
     return logger
 
+def flush_logs():
+    """Blocks until every queued record has been written (tests, CLI exits)."""
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener.start()
+
 # Singleton instance
 logger = setup_logger()
 # Usage: logger.info("Event", extra={"props": {"user_id": 123, "cost": 0.05}})
@@ -0,0 +1,340 @@
+"""
+In-process metrics registry with a Prometheus text endpoint.
+
+The clients, RateLimiter and Orchestrator update the module-level metrics
+below; `start_http_server()` serves them at http://127.0.0.1:9108/metrics
+(METRICS_HOST/METRICS_PORT) and the Settings page renders `summary()`.
+Metrics are per process: each Streamlit server, batch run or worker process
+has its own registry.
+
+    scrape_configs:
+      - job_name: edtech
+        static_configs: [{targets: ["localhost:9108"]}]
+"""
+import os
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from core.config import (METRICS_HOST, METRICS_PORT, METRICS_LATENCY_BUCKETS, METRICS_RUN_BUCKETS,
+                         METRICS_WAIT_BUCKETS, JOB_QUEUE_DB)
+from core.logger import logger
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _num(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[n] for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + self._samples()
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Sum over every label set matching the given labels (all of them when none are given)."""
+        unknown = set(labels) - set(self.labelnames)
+        if unknown:
+            raise ValueError(f"{self.name} has no labels {tuple(unknown)}")
+        wanted = [(self.labelnames.index(n), v) for n, v in labels.items()]
+        with self._lock:
+            return sum(v for k, v in self._values.items() if all(k[i] == want for i, want in wanted))
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items(), key=lambda kv: tuple(map(str, kv[0])))
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+class Gauge(Counter):
+    """A Counter that can go down, or be computed at scrape time with set_function()."""
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function = None
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Unlabelled gauge whose value is read from function() at each scrape."""
+        self._function = function
+
+    def value(self, **labels) -> float:
+        if self._function is not None:
+            try:
+                return self._function()
+            except Exception:
+                return 0
+        return super().value(**labels)
+
+    def _samples(self):
+        if self._function is not None:
+            return [f"{self.name} {_num(self.value())}"]
+        return super()._samples()
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=METRICS_LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}  # labels -> [bucket counts..., sum]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-1] += value
+
+    def _merged(self, labels: Dict) -> List[float]:
+        with self._lock:
+            if labels:
+                series = [list(self._series.get(self._key(labels), []))]
+            else:
+                series = [list(s) for s in self._series.values()]
+        merged = [0] * len(self.buckets) + [0.0]
+        for s in series:
+            for i, v in enumerate(s):
+                merged[i] += v
+        return merged
+
+    def count(self, **labels) -> int:
+        return int(sum(self._merged(labels)[:-1]))
+
+    def sum(self, **labels) -> float:
+        return self._merged(labels)[-1]
+
+    def quantile(self, q: float, **labels) -> float:
+        """Estimated q-quantile, interpolating inside buckets like PromQL's histogram_quantile()."""
+        counts = self._merged(labels)[:-1]
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank, seen, lower = q * total, 0, 0.0
+        for bound, n in zip(self.buckets, counts):
+            if n and seen + n >= rank:
+                if bound == math.inf:
+                    return lower  # Beyond the last finite bucket
+                return lower + (bound - lower) * (rank - seen) / n
+            seen += n
+            lower = bound if bound != math.inf else lower
+        return lower
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._series.items(), key=lambda kv: tuple(map(str, kv[0])))
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = 'le="{}"'.format("+Inf" if bound == math.inf else _num(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(round(series[-1], 6))}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, help, labelnames=(), **kwargs):
+        with self._lock:
+            if name not in self._metrics:  # Re-imports (Streamlit reruns) get the existing metric
+                self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self._register(Gauge, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=METRICS_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+registry = Registry()
+
+# --- API calls (core.client, core.structured_client) ---
+api_calls = registry.counter("edtech_api_calls_total", "Anthropic API calls", ("model", "call", "status"))
+api_latency = registry.histogram("edtech_api_call_duration_seconds", "API call latency", ("model", "call"))
+api_tokens = registry.counter("edtech_api_tokens_total", "Tokens billed, by kind (input, output, cache_read, cache_write)",
+                              ("model", "kind"))
+api_cost = registry.counter("edtech_api_cost_inr_total", "Estimated API spend in INR", ("model",))
+retries = registry.counter("edtech_retries_total", "Failed attempts retried by retry_with_backoff", ("func",))
+
+# --- Rate limiter (core.rate_limiter) ---
+limiter_waits = registry.histogram("edtech_rate_limit_wait_seconds", "Time requests spent waiting for the rate limiter",
+                                   buckets=METRICS_WAIT_BUCKETS)
+limiter_waiting = registry.gauge("edtech_rate_limit_waiting", "Requests currently waiting for the rate limiter")
+limiter_rpm = registry.gauge("edtech_rate_limit_rpm", "Requests per minute this process may send")
+
+# --- Runs (core.orchestrator) ---
+active_runs = registry.gauge("edtech_active_runs", "Orchestrator runs in progress")
+runs = registry.counter("edtech_runs_total", "Finished orchestrator runs", ("mode", "status"))
+run_duration = registry.histogram("edtech_run_duration_seconds", "Orchestrator run wall time", ("mode",),
+                                  buckets=METRICS_RUN_BUCKETS)
+# --- Model cascades (core.cascade) ---
+cascade_calls = registry.counter("edtech_cascade_calls_total", "Cascaded agent calls, by whether they escalated",
+                                 ("agent", "outcome"))
+cascade_escalations = registry.counter("edtech_cascade_escalations_total", "Escalations to a stronger model, by reason",
+                                       ("agent", "reason"))
+job_queue_depth = registry.gauge("edtech_job_queue_depth", "Queued and running jobs in the batch job queue")
+active_runs.set(0)
+limiter_waiting.set(0)
+
+def _job_queue_depth() -> int:
+    if not os.path.exists(JOB_QUEUE_DB):
+        return 0
+    from core.job_queue import JobQueue
+    counts = JobQueue().summary()["counts"]
+    return counts["queued"] + counts["running"]
+
+job_queue_depth.set_function(_job_queue_depth)
+
+def record_api_call(call: str, model: str, latency_s: float, input_tokens: int, output_tokens: int, cost: float,
+                    ok: bool, usage=None):
+    """One finished API call; usage (if given) adds prompt-cache token counts."""
+    api_calls.inc(model=model, call=call, status="ok" if ok else "error")
+    api_latency.observe(latency_s, model=model, call=call)
+    api_tokens.inc(input_tokens, model=model, kind="input")
+    api_tokens.inc(output_tokens, model=model, kind="output")
+    if usage is not None:
+        api_tokens.inc(getattr(usage, "cache_read_input_tokens", 0) or 0, model=model, kind="cache_read")
+        api_tokens.inc(getattr(usage, "cache_creation_input_tokens", 0) or 0, model=model, kind="cache_write")
+    api_cost.inc(cost, model=model)
+
+def escalation_rates() -> Dict[str, Dict]:
+    """{agent: {"calls", "escalated", "rate"}} for every cascaded agent seen by this process."""
+    with cascade_calls._lock:
+        agents = sorted({agent for agent, _ in cascade_calls._values})
+    rates = {}
+    for agent in agents:
+        calls = int(cascade_calls.value(agent=agent))
+        escalated = int(cascade_calls.value(agent=agent, outcome="escalated"))
+        rates[agent] = {"calls": calls, "escalated": escalated, "rate": escalated / calls if calls else 0.0}
+    return rates
+
+def summary() -> Dict:
+    """The same numbers as /metrics, flattened for the Settings panel."""
+    return {
+        "api_calls": int(api_calls.value()),
+        "api_errors": int(api_calls.value(status="error")),
+        "latency_p50_s": api_latency.quantile(0.5),
+        "latency_p95_s": api_latency.quantile(0.95),
+        "input_tokens": int(api_tokens.value(kind="input")),
+        "output_tokens": int(api_tokens.value(kind="output")),
+        "cache_read_tokens": int(api_tokens.value(kind="cache_read")),
+        "cost_inr": round(api_cost.value(), 4),
+        "retries": int(retries.value()),
+        "limiter_waits": limiter_waits.count(),
+        "limiter_wait_s": round(limiter_waits.sum(), 2),
+        "limiter_waiting": int(limiter_waiting.value()),
+        "active_runs": int(active_runs.value()),
+        "runs": int(runs.value()),
+        "job_queue_depth": int(job_queue_depth.value()),
+        "cascade_calls": int(cascade_calls.value()),
+        "cascade_escalated": int(cascade_calls.value(outcome="escalated")),
+    }
+
+# ==========================
+# HTTP endpoint
+# ==========================
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood stderr
+
+_server = None
+_server_lock = threading.Lock()
+_failed_binds = set()  # (host, port) already tried and taken; not retried in this process
+
+def start_http_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """
+    Serves /metrics on a daemon thread. Idempotent within a process (Streamlit
+    reruns app.py on every interaction); returns None if the port is taken,
+    logging that once rather than on every rerun.
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        if (host, port) in _failed_binds:
+            return None
+        try:
+            server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError as e:
+            _failed_binds.add((host, port))
+            logger.error(f"Metrics endpoint not started on {host}:{port}: {e}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info(f"Metrics endpoint at http://{host}:{server.server_address[1]}/metrics")
+        _server = server
+        return server
+
+def endpoint_url() -> Optional[str]:
+    if _server is None:
+        return None
+    host, port = _server.server_address[:2]
+    return f"http://{host}:{port}/metrics"
@@ -0,0 +1,249 @@
+"""
+Offline stand-in for the Anthropic Messages API, for tests and benchmarks.
+
+    from core.mock_llm import MockLLMConfig, mock_http_client
+    orch = Orchestrator(config, api_key="mock", http_client=mock_http_client(MockLLMConfig(latency_s=0.3)))
+
+MockAnthropicTransport plugs into httpx underneath the real anthropic SDK (and instructor),
+so retries, SSE parsing and tool-use validation run exactly as in production.
+Structured calls get schema-valid tool_use input for the requested model
+(AuditResult, EditorResponse, MCSCBatch, ...); plain and streamed calls get a
+markdown draft. Latency, token counts, 429s and stream pacing are configurable,
+and every outcome is deterministic for a given seed and call order.
+"""
+import re
+import json
+import random
+import asyncio
+import threading
+import itertools
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+class MockLLMConfig:
+    def __init__(self, latency_s: float = 0.0, latency_jitter_s: float = 0.0, rate_limit_rate: float = 0.0,
+                 retry_after_s: float = 0.01, stream_chunk_chars: int = 64, stream_chunk_delay_s: float = 0.0,
+                 draft_sections: int = 6, input_tokens: Optional[int] = None, output_tokens: Optional[int] = None,
+                 quality_score: int = 85, engagement_score: int = 70, checker_status: str = "PASS",
+                 checker_confidence: int = 90, responses: Optional[Dict[str, Any]] = None, seed: int = 0):
+        """
+        latency_s (+ uniform jitter) is slept before every response. rate_limit_rate is
+        the fraction of requests answered with 429 + retry-after-ms. input_tokens /
+        output_tokens fix the reported usage (default: ~4 chars per token of the
+        request / response). responses maps a tool name (e.g. "AuditResult") to a
+        dict, or to a callable(request_body) -> dict, overriding the built-in fakes.
+        """
+        self.latency_s = latency_s
+        self.latency_jitter_s = latency_jitter_s
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_s = retry_after_s
+        self.stream_chunk_chars = stream_chunk_chars
+        self.stream_chunk_delay_s = stream_chunk_delay_s
+        self.draft_sections = draft_sections
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.quality_score = quality_score
+        self.engagement_score = engagement_score
+        self.checker_status = checker_status
+        self.checker_confidence = checker_confidence
+        self.responses = responses or {}
+        self.seed = seed
+
+# ==========================
+# Fake payloads
+# ==========================
+
+_COUNT_RE = re.compile(r"Number of Questions:\s*(\d+)")
+_PARA_RE = re.compile(r"\[mock-para-(\d+)\]")
+
+def _request_text(body: dict) -> str:
+    parts = [body.get("system") if isinstance(body.get("system"), str) else json.dumps(body.get("system") or "")]
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get("text", "") for block in content or [] if isinstance(block, dict))
+    return "\n".join(p for p in parts if p)
+
+def fake_draft(sections: int, seed: int = 0) -> str:
+    """Markdown draft; every paragraph carries a [mock-para-N] tag the fake Editor can target."""
+    lines = ["# Mock Lecture Notes", ""]
+    for i in range(1, sections + 1):
+        lines += [f"## {i}. Section {i}", "",
+                  f"[mock-para-{i}] Concept {i} builds on the previous section (variant {seed}). " * 3, "",
+                  "```python", f"def example_{i}(x):", f"    return x * {i}", "```", ""]
+    return "\n".join(lines)
+
+def _mcsc(i):
+    return {"question_text": f"Mock MCSC question {i}?", "options": [f"Option {k} of {i}" for k in range(1, 5)],
+            "correct_option_index": 1 + i % 4, "explanation": f"Explanation {i}.", "difficulty": "Medium", "type": "mcsc"}
+
+def _mcmc(i):
+    return {"question_text": f"Mock MCMC question {i}?", "options": [f"Choice {k} of {i}" for k in range(1, 5)],
+            "correct_option_indices": [1, 3], "explanation": f"Explanation {i}.", "difficulty": "Medium", "type": "mcmc"}
+
+def _subjective(i):
+    return {"question_text": f"Explain concept {i}.", "model_answer": f"Model answer {i}.",
+            "explanation": f"Grading notes {i}.", "difficulty": "Hard", "type": "subjective"}
+
+def _question_count(text, default=5):
+    match = _COUNT_RE.search(text)
+    return int(match.group(1)) if match else default
+
+def _editor(text, cfg):
+    match = _PARA_RE.search(text)
+    if not match:
+        return {"replacements": [], "summary_of_changes": "No changes."}
+    tag = match.group(0)
+    return {"replacements": [{"target_text": tag, "replacement_text": f"[mock-para-{match.group(1)}-revised]",
+                              "reason": "Clarify wording."}],
+            "summary_of_changes": "Revised one paragraph."}
+
+BUILTIN_TOOLS: Dict[str, Callable[[str, MockLLMConfig], dict]] = {
+    "AuditResult": lambda text, cfg: {
+        "critiques": [{"section": "Section 1", "issue": "Imprecise definition.", "severity": "Minor",
+                       "suggestion": "Tighten the definition.", "quote": None}],
+        "summary": "Mostly accurate.", "quality_score": cfg.quality_score},
+    "PedagogueAnalysis": lambda text, cfg: {
+        "points": [{"section": "Section 1", "feedback_type": "Engagement", "observation": "Dense opening.",
+                    "suggestion": "Open with an example."}],
+        "overall_assessment": "Reasonable flow.", "engagement_score": cfg.engagement_score},
+    "EditorResponse": _editor,
+    "CheckerResponse": lambda text, cfg: {"status": cfg.checker_status, "issues": [], "corrected_answer_index": None,
+                                          "feedback": "Looks correct.", "confidence": cfg.checker_confidence},
+    "MCSCBatch": lambda text, cfg: {"questions": [_mcsc(i) for i in range(_question_count(text))]},
+    "MCMCBatch": lambda text, cfg: {"questions": [_mcmc(i) for i in range(_question_count(text))]},
+    "SubjectiveBatch": lambda text, cfg: {"questions": [_subjective(i) for i in range(_question_count(text))]},
+    "MCSCQuestion": lambda text, cfg: _mcsc(0),
+    "MCMCQuestion": lambda text, cfg: _mcmc(0),
+    "SubjectiveQuestion": lambda text, cfg: _subjective(0),
+}
+
+def fake_from_schema(schema: dict, defs: Optional[dict] = None, name: str = "value") -> Any:
+    """Minimal valid instance of a JSON schema (for tools without a built-in fake)."""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return fake_from_schema(defs[schema["$ref"].split("/")[-1]], defs, name)
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "default" in schema:
+        return schema["default"]
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return fake_from_schema(options[0], defs, name)
+    kind = schema.get("type", "object")
+    if kind == "object":
+        return {k: fake_from_schema(v, defs, k) for k, v in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [fake_from_schema(schema.get("items", {}), defs, name) for _ in range(schema.get("minItems", 1))]
+    if kind == "integer":
+        return int(schema.get("minimum", 1))
+    if kind == "number":
+        return float(schema.get("minimum", 1.0))
+    if kind == "boolean":
+        return True
+    return f"mock {name}"
+
+# ==========================
+# Transport
+# ==========================
+
+class MockAnthropicTransport(httpx.AsyncBaseTransport):
+    """httpx transport answering POST /v1/messages like the Anthropic API."""
+
+    def __init__(self, config: Optional[MockLLMConfig] = None):
+        self.config = config or MockLLMConfig()
+        self._rng = random.Random(self.config.seed)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats = Counter()
+
+    def _roll(self):
+        with self._lock:
+            return self._rng.random(), self._rng.random()
+
+    def _usage(self, request_text, output_text):
+        cfg = self.config
+        return {
+            "input_tokens": cfg.input_tokens if cfg.input_tokens is not None else max(1, len(request_text) // 4),
+            "output_tokens": cfg.output_tokens if cfg.output_tokens is not None else max(1, len(output_text) // 4),
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(await request.aread() or b"{}")
+        limited, jitter = self._roll()
+        self.stats["requests"] += 1
+
+        if limited < self.config.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            return httpx.Response(429, headers={"retry-after-ms": str(int(self.config.retry_after_s * 1000)),
+                                                "x-should-retry": "true"},
+                                  json={"type": "error", "error": {"type": "rate_limit_error", "message": "Mock rate limit"}})
+
+        delay = self.config.latency_s + jitter * self.config.latency_jitter_s
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        text = _request_text(body)
+        message_id = f"msg_mock_{next(self._ids)}"
+        tools = body.get("tools") or []
+        if tools:
+            tool = tools[0]
+            name = tool.get("name", "tool")
+            override = self.config.responses.get(name)
+            if callable(override):
+                payload = override(body)
+            elif override is not None:
+                payload = override
+            elif name in BUILTIN_TOOLS:
+                payload = BUILTIN_TOOLS[name](text, self.config)
+            else:
+                payload = fake_from_schema(tool.get("input_schema", {}))
+            self.stats[f"tool:{name}"] += 1
+            content = [{"type": "tool_use", "id": f"toolu_{message_id}", "name": name, "input": payload}]
+            output_text, stop_reason = json.dumps(payload), "tool_use"
+        else:
+            output_text = fake_draft(self.config.draft_sections, self.stats["requests"])
+            content = [{"type": "text", "text": output_text}]
+            stop_reason = "end_turn"
+
+        message = {"id": message_id, "type": "message", "role": "assistant", "model": body.get("model", "mock"),
+                   "content": content, "stop_reason": stop_reason, "stop_sequence": None,
+                   "usage": self._usage(text, output_text)}
+        if body.get("stream"):
+            self.stats["streams"] += 1
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=self._sse(message, output_text))
+        return httpx.Response(200, json=message)
+
+    async def _sse(self, message, output_text):
+        def event(kind, data):
+            return f"event: {kind}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+        usage = message["usage"]
+        start = dict(message, content=[], stop_reason=None, usage=dict(usage, output_tokens=1))
+        yield event("message_start", {"type": "message_start", "message": start})
+        yield event("content_block_start", {"type": "content_block_start", "index": 0,
+                                            "content_block": {"type": "text", "text": ""}})
+        step = max(1, self.config.stream_chunk_chars)
+        for i in range(0, len(output_text), step):
+            if self.config.stream_chunk_delay_s > 0:
+                await asyncio.sleep(self.config.stream_chunk_delay_s)
+            yield event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                "delta": {"type": "text_delta", "text": output_text[i:i + step]}})
+        yield event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        yield event("message_delta", {"type": "message_delta",
+                                      "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                      "usage": {"output_tokens": usage["output_tokens"]}})
+        yield event("message_stop", {"type": "message_stop"})
+
+def mock_http_client(config: Optional[MockLLMConfig] = None) -> httpx.AsyncClient:
+    """An httpx client for anthropic.AsyncAnthropic(http_client=...) that never touches the network."""
+    return httpx.AsyncClient(transport=MockAnthropicTransport(config), base_url="https://mock.anthropic.invalid")
@@ -3,10 +3,17 @@ from typing import List, Literal, Optional, Union
 
 # --- Configuration Models ---
 
+class CascadePolicy(BaseModel):
+    escalate_to: List[str] = Field(..., description="Stronger models to retry on, in order, when a check fails.")
+    on_invalid: bool = Field(True, description="Escalate when the output is missing or fails validation.")
+    min_confidence: Optional[int] = Field(None, description="Escalate when the reported confidence (0-100) is below this.")
+    borderline_margin: Optional[int] = Field(None, description="Escalate when quality_score is within this many points of the stop threshold.")
+
 class AgentConfig(BaseModel):
     model: str = Field(..., description="The model ID to use for this agent.")
     temperature: float = Field(0.7, description="Temperature for generation.")
     max_tokens: int = Field(8192, description="Max tokens for generation.")
+    cascade: Optional[CascadePolicy] = Field(None, description="Start on `model` and escalate per this policy.")
 
 class OrchestratorConfig(BaseModel):
     creator: AgentConfig
@@ -96,6 +103,7 @@ class CheckerResponse(BaseModel):
     issues: List[str] = Field(..., description="List of specific issues found.")
     corrected_answer_index: Optional[Union[int, List[int]]] = Field(None, description="Suggested corrected index/indices if wrong.")
     feedback: str = Field(..., description="Brief feedback on quality.")
+    confidence: Optional[int] = Field(None, ge=0, le=100, description="Confidence in this verdict, 0-100.")
 
 # --- Assignment Models (UPDATED) ---
 
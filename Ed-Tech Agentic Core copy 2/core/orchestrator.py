@@ -2,13 +2,18 @@ import json
 import asyncio
 import time
 import os
+import uuid
 from typing import Optional, Dict, Any, List
 
-from core.logger import logger
+from core.logger import logger, set_log_context
+from core.tracing import tracer
+from core import metrics
+from core.cost_ledger import ledger
+from core.cascade import run_cascade, check_structured, check_score, check_text
 from core.config import DEFAULT_MODEL
 from core.client import AnthropicClient
 from core.structured_client import StructuredClient
-from core.utils import save_markdown_file, save_metadata, get_timestamp_filename, save_excel, clean_meta_commentary
+from core.utils import save_markdown_file, save_metadata, get_timestamp_filename, save_excel
 from agents.definitions import (
     CreatorAgent, AuditorAgent, PedagogueAgent, SanitizerAgent, EditorAgent, CheckerAgent
 )
@@ -18,6 +23,8 @@ from core.models import (
     MCSCQuestion, MCMCQuestion, SubjectiveQuestion
 )
 from core.version_manager import VersionManager
+from core.artifact_store import ArtifactStore
+from core import assignment_exporter
 import re
 import difflib
 
@@ -28,10 +35,12 @@ def clean_json_string(text):
     return text.strip()
 
 
-from core.state_manager import StateManager
-
 class Orchestrator:
-    def __init__(self, config: "OrchestratorConfig", api_key=None): # Type hint quoted for forward ref or import
+    def __init__(self, config: "OrchestratorConfig", api_key=None, http_client=None, headless=False): # Type hint quoted for forward ref or import
+        """
+        http_client: optional httpx.AsyncClient for the Anthropic SDK (e.g. core.mock_llm for offline runs).
+        headless: run without a Streamlit session (no checkpoints to st.session_state, no stop button).
+        """
         # If config is not passed (legacy support), create a default one
         if not hasattr(config, "creator"):
             from core.models import OrchestratorConfig, AgentConfig
@@ -51,8 +60,9 @@ class Orchestrator:
         self.config = config
         logger.info(f"Initializing Orchestrator with config: {config.model_dump_json(indent=2)}")
         
-        self.client = AnthropicClient(api_key) 
-        self.structured_client = StructuredClient(api_key) 
+        self.headless = headless
+        self.client = AnthropicClient(api_key, http_client=http_client)
+        self.structured_client = StructuredClient(api_key, http_client=http_client)
         
         # Initialize agents with specific models from config
         self.creator = CreatorAgent(model=config.creator.model)
@@ -67,7 +77,8 @@ class Orchestrator:
         self.state = {
             "draft": "",
             "iteration": 0,
-            "costs": 0.0,
+            "run_id": None,
+            "costs": 0.0,  # This run's spend, read back from the cost ledger
             "used_models": set(),
             "audit_result": None,
             "pedagogue_result": None,
@@ -180,9 +191,32 @@ class Orchestrator:
                 event[k] = v
         return event
 
-    def _update_costs(self, cost, model):
-        self.state["costs"] += cost
+    def _update_costs(self, model):
+        """Refreshes the run's spend from the cost ledger (the clients record every call). Returns the increase."""
+        previous = self.state["costs"]
+        self.state["costs"] = ledger.run_total(self.state["run_id"])
         self.state["used_models"].add(model)
+        return self.state["costs"] - previous
+
+    async def _cascade(self, agent, agent_config, attempt, check, verdict=None):
+        """Runs attempt on the agent's model, escalating per agent_config.cascade (see core.cascade)."""
+        policy = agent_config.cascade if agent_config else None
+        outcome = await run_cascade(agent.name, agent.model, policy, attempt,
+                                    (lambda result: check(result, policy)) if policy else None, verdict)
+        self.state["used_models"].update(outcome.models)
+        return outcome
+
+    # StateManager pulls streamlit, so it is only imported by UI runs (never headless)
+    def _checkpoint(self):
+        from core.state_manager import StateManager
+        StateManager.save_checkpoint(self.state["draft"], self.state["iteration"])
+
+    def _stop_requested(self):
+        from core.state_manager import StateManager
+        return StateManager.get_session_val("stop_signal")
+
+    def _models_used(self):
+        return ", ".join(sorted(self.state.get("used_models", set())))
 
     async def run_loop(self, topic: str, subtopics: str, transcript: str = None, mode: str = "Lecture Notes", target_audience: str = "General Student", **kwargs):
         """
@@ -193,100 +227,139 @@ class Orchestrator:
         self.state["iteration"] = 0
         self.state["costs"] = 0.0
         self.state["used_models"] = set()
+        run_id = uuid.uuid4().hex[:8]
+        self.state["run_id"] = run_id
         
         assignment_config = kwargs.get("assignment_config", {})
         self.state["assignment_config"] = assignment_config
         self.state["mode"] = mode # Added mode to state for _should_stop_early
+        self.state["target_audience"] = target_audience
         
         max_iterations = self.config.max_iterations
+        set_log_context(run_id=run_id, topic=topic, mode=mode, agent="Orchestrator")
         
-        # --- Timeout Wrapper ---
-        start_time = time.time()
-        TIMEOUT_SECONDS = 300
+        with tracer.span("run", kind="run", run_id=run_id, topic=topic, mode=mode) as run_span:
+            set_log_context(trace_id=run_span.trace_id)
+            # --- Timeout Wrapper ---
+            start_time = time.time()
+            TIMEOUT_SECONDS = 300
+            status = "done"
+            metrics.active_runs.inc()
         
-        try:
-             # Set a global timeout check
+            try:
+                 # Set a global timeout check
             
-            # --- Node 1: Creator ---
-            async for event in self._node_creator(topic, subtopics, transcript, mode, **kwargs):
-                if time.time() - start_time > TIMEOUT_SECONDS: raise asyncio.TimeoutError()
-                yield event
+                # --- Node 1: Creator ---
+                with tracer.span("node.creator", kind="node", model=self.creator.model):
+                    async for event in self._node_creator(topic, subtopics, transcript, mode, **kwargs):
+                        if time.time() - start_time > TIMEOUT_SECONDS: raise asyncio.TimeoutError()
+                        yield event
                 
-            if not self.state["draft"]:
-                return # Critical failure
+                if not self.state["draft"]:
+                    status = "failed"
+                    return # Critical failure
 
-            # CHECKPOINT 1: After Draft
-            StateManager.save_checkpoint(self.state["draft"], 0)
+                # CHECKPOINT 1: After Draft
+                if not self.headless:
+                    self._checkpoint()
 
-            if mode == "Assignment":
-                    # Shortcut for Assignment mode - just sanitization implicitly or direct save
-                    yield self.yield_event("Orchestrator", "System", "Validating Assignment...")
-                    # Assignment logic remains simple for now, can be structured later
-            else:
-                # --- Loop: Critique & Refine ---
-                while self.state["iteration"] < max_iterations:
-                    if time.time() - start_time > TIMEOUT_SECONDS: raise asyncio.TimeoutError()
+                if mode == "Assignment":
+                        # Shortcut for Assignment mode - just sanitization implicitly or direct save
+                        yield self.yield_event("Orchestrator", "System", "Validating Assignment...")
+                        # Assignment logic remains simple for now, can be structured later
+                else:
+                    # --- Loop: Critique & Refine ---
+                    while self.state["iteration"] < max_iterations:
+                        if time.time() - start_time > TIMEOUT_SECONDS: raise asyncio.TimeoutError()
                     
-                    self.state["iteration"] += 1
+                        self.state["iteration"] += 1
                     
-                    # OPTIMIZATION: Pedagogue only runs on first iteration to establish tone/difficulty
-                    run_pedagogue = (self.state["iteration"] == 1)
+                        # OPTIMIZATION: Pedagogue only runs on first iteration to establish tone/difficulty
+                        run_pedagogue = (self.state["iteration"] == 1)
                     
-                    yield self.yield_event("Orchestrator", "System", f"Iteration {self.state['iteration']}: Critiquing...")
+                        yield self.yield_event("Orchestrator", "System", f"Iteration {self.state['iteration']}: Critiquing...")
                     
-                    # Check for stop signal
-                    if StateManager.get_session_val("stop_signal"):
-                        yield self.yield_event("Orchestrator", "System", "Generation stopped by user.")
-                        break
-
-                    # --- Node 2: Parallel Critique (Auditor & Pedagogue) ---
-                    # Detailed status moved inside the node
-                    async for event in self._node_critique_parallel(transcript, target_audience, run_pedagogue):
-                        if time.time() - start_time > TIMEOUT_SECONDS: raise asyncio.TimeoutError()
-                        yield event
+                        # Check for stop signal
+                        if not self.headless and self._stop_requested():
+                            yield self.yield_event("Orchestrator", "System", "Generation stopped by user.")
+                            break
+
+                        # --- Node 2: Parallel Critique (Auditor & Pedagogue) ---
+                        # Detailed status moved inside the node
+                        with tracer.span("node.critique", kind="node", iteration=self.state["iteration"]):
+                            async for event in self._node_critique_parallel(transcript, target_audience, run_pedagogue):
+                                if time.time() - start_time > TIMEOUT_SECONDS: raise asyncio.TimeoutError()
+                                yield event
                     
-                    # --- Node 3: Decision Gate ---
-                    if self._should_stop_early():
-                        yield self.yield_event("Orchestrator", "System", "Critique Clean. Breaking loop.")
-                        break
+                        # --- Node 3: Decision Gate ---
+                        if self._should_stop_early():
+                            yield self.yield_event("Orchestrator", "System", "Critique Clean. Breaking loop.")
+                            break
                     
-                    if self.state["iteration"] == max_iterations:
-                        yield self.yield_event("Orchestrator", "System", "Max iterations reached. Skipping final edit.")
-                        break
+                        if self.state["iteration"] == max_iterations:
+                            yield self.yield_event("Orchestrator", "System", "Max iterations reached. Skipping final edit.")
+                            break
 
-                    # --- Node 4: Editor ---
-                    # Status yielded inside _node_editor for granularity
-                    async for event in self._node_editor():
-                        if time.time() - start_time > TIMEOUT_SECONDS: raise asyncio.TimeoutError()
-                        yield event
+                        # --- Node 4: Editor ---
+                        # Status yielded inside _node_editor for granularity
+                        with tracer.span("node.editor", kind="node", iteration=self.state["iteration"]):
+                            async for event in self._node_editor():
+                                if time.time() - start_time > TIMEOUT_SECONDS: raise asyncio.TimeoutError()
+                                yield event
 
-                    # CHECKPOINT 2: After Refinement
-                    StateManager.save_checkpoint(self.state["draft"], self.state["iteration"])
+                        # CHECKPOINT 2: After Refinement
+                        if not self.headless:
+                            self._checkpoint()
 
-                # --- Node 5: Sanitizer ---
-                async for event in self._node_sanitizer(mode):
-                    if time.time() - start_time > TIMEOUT_SECONDS: raise asyncio.TimeoutError()
-                    yield event
+                    # --- Node 5: Sanitizer ---
+                    with tracer.span("node.sanitizer", kind="node"):
+                        async for event in self._node_sanitizer(mode):
+                            if time.time() - start_time > TIMEOUT_SECONDS: raise asyncio.TimeoutError()
+                            yield event
 
-            # --- Node 6: Save & Return ---
-            async for event in self._node_save_and_finalize(topic, mode):
-                yield event
-                    
-        except asyncio.TimeoutError:
-            logger.error("Orchestrator Loop Timed Out")
-            yield self.yield_event("Orchestrator", "Error", "Process timed out. Saving current progress...")
-            # Emergency Save
-            async for event in self._node_save_and_finalize(topic, mode):
-                 yield event
-        except Exception as e:
-            logger.error(f"Orchestrator Loop Error: {e}", exc_info=True)
-            yield self.yield_event("Orchestrator", "Error", f"Process Failed: {str(e)}")
+                # --- Node 6: Save & Return ---
+                with tracer.span("node.save", kind="node"):
+                    async for event in self._node_save_and_finalize(topic, mode):
+                        yield event
+
+            except asyncio.TimeoutError:
+                status = "timeout"
+                logger.error("Orchestrator Loop Timed Out")
+                run_span.set(timed_out=True)
+                yield self.yield_event("Orchestrator", "Error", "Process timed out. Saving current progress...")
+                # Emergency Save
+                with tracer.span("node.save", kind="node", emergency=True):
+                    async for event in self._node_save_and_finalize(topic, mode):
+                         yield event
+            except GeneratorExit:
+                status = "cancelled"  # Consumer stopped iterating early
+                raise
+            except Exception as e:
+                status = "error"
+                run_span.fail(e)
+                logger.error(f"Orchestrator Loop Error: {e}", exc_info=True)
+                yield self.yield_event("Orchestrator", "Error", f"Process Failed: {str(e)}")
+            finally:
+                set_log_context(agent="Orchestrator")
+                run_span.set(cost=round(self.state["costs"], 6), iterations=self.state["iteration"],
+                             models=self._models_used())
+                logger.info("Run complete", extra={"props": {
+                    "event": "run_complete",
+                    "cost": round(self.state["costs"], 6),
+                    "duration_s": round(time.time() - start_time, 2),
+                    "iterations": self.state["iteration"],
+                    "models": self._models_used(),
+                }})
+                metrics.active_runs.dec()
+                metrics.runs.inc(mode=mode, status=status)
+                metrics.run_duration.observe(time.time() - start_time, mode=mode)
 
     # ==========================
     # Node Implementations
     # ==========================
 
     async def _node_creator(self, topic, subtopics, transcript, mode, **kwargs):
+        set_log_context(agent="Creator")
         try:
             # Create a concise subtopic summary (first 3 words of first 2 subtopics)
             sub_preview = ", ".join([s.strip()[:20] for s in subtopics.split(",")[:2]]) if subtopics else topic
@@ -316,6 +389,7 @@ Ensure 4 options per question."""
                         system_prompt=self.creator.get_system_prompt(mode="Assignment"),
                         user_content=self.creator.format_user_prompt(topic, subtopics, mode="Assignment", question_type="Multiple Choice Single Correct", difficulty="Medium", count=n_mcsc),
                         model=self.creator.model,
+                        agent=self.creator,
                         cache_content=transcript
                      )
                      if resp and resp.questions:
@@ -337,6 +411,7 @@ Ensure 4 options per question."""
                         system_prompt=self.creator.get_system_prompt(mode="Assignment"),
                         user_content=self.creator.format_user_prompt(topic, subtopics, mode="Assignment", question_type="Multiple Choice Multiple Correct", difficulty="Medium", count=n_mcmc),
                         model=self.creator.model,
+                        agent=self.creator,
                         cache_content=transcript
                      )
                      if resp and resp.questions:
@@ -357,6 +432,7 @@ Subtopics: {subtopics}"""
                         system_prompt=self.creator.get_system_prompt(mode="Assignment"),
                         user_content=self.creator.format_user_prompt(topic, subtopics, mode="Assignment", question_type="Subjective/Descriptive", difficulty="Medium", count=n_subj),
                         model=self.creator.model,
+                        agent=self.creator,
                         cache_content=transcript
                      )
                      if resp and resp.questions:
@@ -382,7 +458,8 @@ Subtopics: {subtopics}"""
                  # Deduplicate before saving (Optional)
                  total_generated = len(all_questions)
                  if assignment_config.get("enable_dedup", False):
-                     all_questions = self._deduplicate_batch(all_questions)
+                     with tracer.span("dedup", questions=len(all_questions)):
+                         all_questions = self._deduplicate_batch(all_questions)
                      removed_count = total_generated - len(all_questions)
                      if removed_count > 0:
                          yield self.yield_event("Orchestrator", "System", 
@@ -393,14 +470,15 @@ Subtopics: {subtopics}"""
 
                  draft = json.dumps(all_questions, indent=2)
                  
-                 self._update_costs(total_cost, self.creator.model)
+                 self._update_costs(self.creator.model)
                  self.state["draft"] = draft
                  yield self.yield_event("Creator", self.creator.model, f"Batch Generated ({len(all_questions)} items)", content=draft, cost=total_cost)
                  
                  # --- Verification Step ---
                  yield self.yield_event("Orchestrator", "System", "Starting Verification Loop...")
-                 async for event in self._node_assignment_review(all_questions):
-                     yield event
+                 with tracer.span("node.checker", kind="node", questions=len(all_questions)):
+                     async for event in self._node_assignment_review(all_questions):
+                         yield event
                  return
             
             elif mode == "Pre-read Notes":
@@ -412,7 +490,8 @@ Subtopics: {subtopics}"""
                 async for chunk in self.client.generate_stream(
                     system_prompt=self.creator.get_system_prompt(mode="Pre-read Notes"),
                     user_content=creator_prompt,
-                    model=self.creator.model
+                    model=self.creator.model,
+                    agent=self.creator
                 ):
                     draft += chunk
                     yield {"type": "stream", "content": chunk, "agent": "Creator"}
@@ -428,7 +507,8 @@ Subtopics: {subtopics}"""
                 async for chunk in self.client.generate_stream(
                     system_prompt=self.creator.get_system_prompt(mode="Lecture Notes"),
                     user_content=creator_prompt,
-                    model=self.creator.model
+                    model=self.creator.model,
+                    agent=self.creator
                 ):
                     draft += chunk
                     yield {"type": "stream", "content": chunk, "agent": "Creator"}
@@ -442,8 +522,7 @@ Subtopics: {subtopics}"""
                 yield {"type": "error", "message": "Failed to generate draft."}
                 return
     
-            cost = self.client.calculate_cost(in_tok, out_tok, self.creator.model)
-            self._update_costs(cost, self.creator.model)
+            cost = self._update_costs(self.creator.model)
             
             self.state["draft"] = draft
             yield self.yield_event("Creator", self.creator.model, "Draft Generated", content=draft, tokens=(in_tok, out_tok), cost=cost)
@@ -480,7 +559,7 @@ Subtopics: {subtopics}"""
             audit_res = {"data": None, "cost": 0.0}
             
         self.state["audit_result"] = audit_res["data"]
-        self._update_costs(audit_res["cost"], self.auditor.model)
+        self._update_costs(audit_res.get("model", self.auditor.model))
         
         # 2. Handle Pedagogue Result
         pedagogue_res = None
@@ -491,7 +570,7 @@ Subtopics: {subtopics}"""
                  pedagogue_res = {"data": None, "cost": 0.0}
 
             self.state["pedagogue_result"] = pedagogue_res["data"]
-            self._update_costs(pedagogue_res["cost"], self.pedagogue.model)
+            self._update_costs(self.pedagogue.model)
         
         # Serialize for UI
         audit_json = audit_res["data"].model_dump() if audit_res["data"] else {}
@@ -499,7 +578,7 @@ Subtopics: {subtopics}"""
         if self.state["pedagogue_result"]:
              pedagogue_json = self.state["pedagogue_result"].model_dump()
 
-        yield self.yield_event("Auditor", self.auditor.model, f"Quality Score: {audit_json.get('quality_score', 'N/A')}", 
+        yield self.yield_event("Auditor", audit_res.get("model", self.auditor.model), f"Quality Score: {audit_json.get('quality_score', 'N/A')}", 
                               content=json.dumps(audit_json, indent=2), cost=audit_res["cost"])
         
         if run_pedagogue and pedagogue_json:
@@ -544,6 +623,7 @@ Subtopics: {subtopics}"""
         return "\n".join(feedback_parts)
 
     async def _node_editor(self):
+        set_log_context(agent="Editor")
         try:
             # OPTIMIZATION: Prune Feedback to save tokens and prevent context pollution
             audit_data = self.state["audit_result"]
@@ -583,10 +663,11 @@ Subtopics: {subtopics}"""
                 response_model=EditorResponse,
                 system_prompt=self.editor.get_system_prompt(),
                 user_content=editor_prompt,
-                model=self.editor.model
+                model=self.editor.model,
+                agent=self.editor
             )
             
-            self._update_costs(cost, self.editor.model)
+            self._update_costs(self.editor.model)
             
             if not resp:
                 # GRACEFUL DEGRADATION: If structured editor fails, keep previous draft
@@ -601,7 +682,9 @@ Subtopics: {subtopics}"""
                 yield self.yield_event("Editor", self.editor.model, "No changes needed.")
                 return
 
-            new_draft, applied_count = self._apply_robust_edits(self.state["draft"], replacements)
+            with tracer.span("edits.apply", replacements=len(replacements)) as span:
+                new_draft, applied_count = self._apply_robust_edits(self.state["draft"], replacements)
+                span.set(applied=applied_count)
             
             # Determine success based on applied edits
             if applied_count == 0 and replacements:
@@ -619,32 +702,33 @@ Subtopics: {subtopics}"""
             yield self.yield_event("Editor", self.editor.model, status="Error", content=f"Editor logic failed: {str(e)}. Keeping draft.")
 
     async def _node_sanitizer(self, mode):
+        set_log_context(agent="Sanitizer")
         # Format prompt with mode
-        sanitizer_prompt = self.sanitizer.format_user_prompt(self.state["draft"])
-        # Inject mode into prompt string if needed, or update format_user_prompt to take mode
-        # The prompt template has {mode}, so we need to pass it.
-        # But BaseAgent.format_user_prompt signatures vary. 
-        # Let's fix this by updating Sanitizer prompt injection here manually or verify SanitizerAgent supports it.
-        # Checking SanitizerAgent: format_user_prompt(text). It does NOT take mode.
-        # I need to update SanitizerAgent in definitions.py or hack it here. 
-        # The prompt template I created DOES have {mode}.
-        
-        template = self.sanitizer.format_user_prompt(self.state["draft"])
-        sanitizer_prompt = template.replace("{mode}", mode) # Manual injection since definitions.py wasn't updated for Sanitizer mode arg yet
+        sanitizer_prompt = self.sanitizer.format_user_prompt(self.state["draft"], mode=mode)
+
+        async def attempt(model):
+            before = ledger.run_total(self.state["run_id"])
+            response = await self.client.generate_response(
+                system_prompt=self.sanitizer.get_system_prompt(),
+                user_content=sanitizer_prompt,
+                model=model,
+                agent=self.sanitizer
+            )
+            return response, ledger.run_total(self.state["run_id"]) - before
+
+        outcome = await self._cascade(self.sanitizer, self.config.sanitizer, attempt,
+                                      lambda response, policy: check_text(response[0], self.state["draft"], policy))
+        final_content, in_tok, out_tok = outcome.result
+        model = outcome.models[-1]
+        if outcome.reasons:
+            yield self.yield_event("Sanitizer", model, f"Escalated to {model} ({', '.join(outcome.reasons)})")
 
-        final_content, in_tok, out_tok = await self.client.generate_response(
-            system_prompt=self.sanitizer.get_system_prompt(),
-            user_content=sanitizer_prompt,
-            model=self.sanitizer.model
-        )
-        
         if final_content:
-            cost = self.client.calculate_cost(in_tok, out_tok, self.sanitizer.model)
-            self._update_costs(cost, self.sanitizer.model)
+            cost = self._update_costs(model)
             self.state["draft"] = final_content
-            yield self.yield_event("Sanitizer", self.sanitizer.model, "Polish Complete", content=final_content, tokens=(in_tok, out_tok), cost=cost)
+            yield self.yield_event("Sanitizer", model, "Polish Complete", content=final_content, tokens=(in_tok, out_tok), cost=cost)
         else:
-            yield self.yield_event("Sanitizer", self.sanitizer.model, status="Error", content="Sanitizer failed.")
+            yield self.yield_event("Sanitizer", model, status="Error", content="Sanitizer failed.")
 
     async def _node_save_and_finalize(self, topic, mode):
         """
@@ -658,100 +742,30 @@ Subtopics: {subtopics}"""
         if mode == "Assignment":
             # --- CSV Export Logic ---
             try:
-                import pandas as pd
                 questions = json.loads(content)
-                rows = []
-                
-                for q in questions:
-                    # Sanitization Phase: Clean meta-commentary
-                    q["explanation"] = clean_meta_commentary(q.get("explanation", ""))
-                    q["question_text"] = clean_meta_commentary(q.get("question_text", ""))
-
-                    row = {
-                        "questionType": q.get("type", "mcsc"),
-                        "contentType": "markdown",
-                        "contentBody": q.get("question_text", ""),
-                        "intAnswer": "",
-                        "prepTime(in_seconds)": "",
-                        "floatAnswer.max": "",
-                        "floatAnswer.min": "",
-                        "fitbAnswer": "",
-                        "mcscAnswer": "",
-                        "subjectiveAnswer": "",
-                        "option.1": "",
-                        "option.2": "",
-                        "option.3": "",
-                        "option.4": "",
-                        "mcmcAnswer": "",
-                        "tagRelationships": "",
-                        "difficultyLevel": q.get("difficulty", "Medium"),
-                        "answerExplanation": q.get("explanation", "")
-                    }
-                    
-                    q_type = q.get("type")
-                    
-                    if q_type == "mcsc":
-                        opts = q.get("options", [])
-                        for i, opt in enumerate(opts):
-                            if i < 4:
-                                row[f"option.{i+1}"] = opt
-                        row["mcscAnswer"] = q.get("correct_option_index", "")
-                        
-                    elif q_type == "mcmc":
-                        opts = q.get("options", [])
-                        for i, opt in enumerate(opts):
-                            if i < 4:
-                                row[f"option.{i+1}"] = opt
-                        indices = q.get("correct_option_indices", [])
-                        if isinstance(indices, list):
-                            row["mcmcAnswer"] = ", ".join(map(str, indices))
-                        else:
-                            row["mcmcAnswer"] = str(indices)
-                            
-                    elif q_type == "subjective":
-                        row["subjectiveAnswer"] = q.get("model_answer", "")
-                        
-                    rows.append(row)
-                    
-                df = pd.DataFrame(rows)
-                
-                # Reorder columns to match template exactly
-                cols = ["questionType", "contentType", "contentBody", "intAnswer", "prepTime(in_seconds)", 
-                        "floatAnswer.max", "floatAnswer.min", "fitbAnswer", "mcscAnswer", "subjectiveAnswer", 
-                        "option.1", "option.2", "option.3", "option.4", "mcmcAnswer", "tagRelationships", 
-                        "difficultyLevel", "answerExplanation"]
-                
-                # Ensure all cols exist
-                for c in cols:
-                    if c not in df.columns:
-                        df[c] = ""
-                        
-                df = df[cols]
+                csv_text = assignment_exporter.to_csv_text(questions, clean=True)
                 
                 filename = f"{topic.replace(' ', '_')}_Assignment_{int(time.time())}.csv"
-                filepath = os.path.join("storage", filename)
-                os.makedirs("storage", exist_ok=True)
-                df.to_csv(filepath, index=False)
+                filepath = ArtifactStore.write_file(os.path.join("storage", filename), csv_text,
+                                                    topic=topic, kind="assignment_csv", mode=mode,
+                                                    model=self._models_used(), cost=self.state["costs"])
                 
             except Exception as e:
                 logger.error(f"Failed to export CSV: {e}")
                 # Fallback to json dump
                 filename = f"{topic.replace(' ', '_')}_{int(time.time())}.json"
-                filepath = os.path.join("storage", filename)
-                os.makedirs("storage", exist_ok=True)
-                with open(filepath, "w", encoding="utf-8") as f:
-                    f.write(content)
+                filepath = ArtifactStore.write_file(os.path.join("storage", filename), content,
+                                                    topic=topic, kind="assignment_json", mode=mode,
+                                                    model=self._models_used(), cost=self.state["costs"])
         else:
             # 1. Clean up excessive newlines
             content = re.sub(r'\n{3,}', '\n\n', content)
             
             # 2. Local File Save
             filename = f"{topic.replace(' ', '_')}_{int(time.time())}.md"
-            filepath = os.path.join("storage", filename)
-            os.makedirs("storage", exist_ok=True)
-            
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(content)
+            filepath = ArtifactStore.write_file(os.path.join("storage", filename), content,
+                                                topic=topic, kind="notes", mode=mode,
+                                                model=self._models_used(), cost=self.state["costs"])
             
         # 3. Version Control Checkpoint
         VersionManager.save_version(topic, content, mode, summary="Finalized Generation")
@@ -767,6 +781,15 @@ Subtopics: {subtopics}"""
             "path": filepath
         }
 
+    def _quality_threshold(self, mode=None):
+        """Mode-specific quality_score at or above which the critique loop may stop."""
+        thresholds = {
+            "Pre-read Notes": 85,  # Lower bar, introductory content
+            "Lecture Notes": 90,   # Higher bar, comprehensive content
+            "Assignment": 95       # Highest bar, must be precise
+        }
+        return thresholds.get(mode or self.state.get("mode", "Lecture Notes"), 90)
+
     def _should_stop_early(self):
         """Enhanced stopping logic with mode-specific thresholds"""
         if not self.state["audit_result"]:
@@ -789,15 +812,8 @@ Subtopics: {subtopics}"""
         if len(critical_issues) > 0:
             return False
         
-        # Mode-specific quality thresholds
-        thresholds = {
-            "Pre-read Notes": 85,  # Lower bar, introductory content
-            "Lecture Notes": 90,   # Higher bar, comprehensive content
-            "Assignment": 95       # Highest bar, must be precise
-        }
-        
-        threshold = thresholds.get(mode, 90)
-        
+        threshold = self._quality_threshold(mode)
+
         # Stop if quality exceeds threshold and no major issues
         major_issues = [c for c in audit.critiques if c.severity == "Major"]
         if audit.quality_score >= threshold and len(major_issues) <= 1:
@@ -806,6 +822,7 @@ Subtopics: {subtopics}"""
         return False
 
     async def _run_audit_structured(self, draft, transcript, cache_context=None):
+        set_log_context(agent="Auditor")
         prompt_draft = draft
         prompt_transcript = transcript or "No transcript provided."
         
@@ -821,18 +838,29 @@ Subtopics: {subtopics}"""
              # Legacy/Fallback behavior just for transcript
              pass_cache = transcript
 
-        prompt = self.auditor.format_user_prompt(prompt_draft, prompt_transcript)
+        prompt = self.auditor.format_user_prompt(prompt_draft, prompt_transcript, mode=self.state.get("mode", "Lecture Notes"),
+                                                 target_audience=self.state.get("target_audience", "General Student"))
         
-        resp, in_tok, out_tok, cost = await self.structured_client.generate_structured(
-            response_model=AuditResult,
-            system_prompt=self.auditor.get_system_prompt(),
-            user_content=prompt,
-            model=self.auditor.model,
-            cache_content=pass_cache
-        )
-        return {"data": resp, "cost": cost}
+        async def attempt(model):
+            resp, _, _, cost = await self.structured_client.generate_structured(
+                response_model=AuditResult,
+                system_prompt=self.auditor.get_system_prompt(),
+                user_content=prompt,
+                model=model,
+                agent=self.auditor,
+                cache_content=pass_cache
+            )
+            return resp, cost
+
+        # Escalate when the score is close enough to the stop threshold to flip the loop's decision
+        threshold = self._quality_threshold()
+        outcome = await self._cascade(self.auditor, self.config.auditor, attempt,
+                                      lambda resp, policy: check_score(resp, threshold, policy),
+                                      verdict=lambda resp: resp.quality_score if resp else None)
+        return {"data": outcome.result, "cost": outcome.cost, "model": outcome.models[-1]}
 
     async def _run_pedagogue_structured(self, draft, target_audience, cache_context=None):
+        set_log_context(agent="Pedagogue")
         prompt_draft = draft
         pass_cache = None
         
@@ -840,13 +868,14 @@ Subtopics: {subtopics}"""
              prompt_draft = "(Refer to <current_draft> block in cached context)"
              pass_cache = cache_context
 
-        prompt = self.pedagogue.format_user_prompt(prompt_draft, target_audience)
+        prompt = self.pedagogue.format_user_prompt(prompt_draft, target_audience, mode=self.state.get("mode", "Lecture Notes"))
         
         resp, in_tok, out_tok, cost = await self.structured_client.generate_structured(
             response_model=PedagogueAnalysis,
             system_prompt=self.pedagogue.get_system_prompt(),
             user_content=prompt,
             model=self.pedagogue.model,
+            agent=self.pedagogue,
             cache_content=pass_cache
         )
         return {"data": resp, "cost": cost}
@@ -856,13 +885,15 @@ Subtopics: {subtopics}"""
         Single-shot refinement based on user instruction.
         Returns: (new_draft, cost)
         """
+        set_log_context(agent="Editor")
         prompt = self.editor.format_instruction_prompt(current_draft, instruction)
         
         resp, in_tok, out_tok, cost = await self.structured_client.generate_structured(
             response_model=EditorResponse,
             system_prompt=self.editor.get_system_prompt(),
             user_content=prompt,
-            model=self.editor.model
+            model=self.editor.model,
+            agent=self.editor
         )
         
         if not resp:
@@ -877,6 +908,7 @@ Subtopics: {subtopics}"""
         Iterates through questions, runs Checker, and applies fixes/regenerations.
         Refactored to Separate Persona (Checker vs Creator) and Strict Validation.
         """
+        set_log_context(agent="Checker")
         validated_questions = []
         failed_questions = [] # NEW: Track failures separately
         total_checks = len(questions)
@@ -923,13 +955,23 @@ Subtopics: {subtopics}"""
                  resp: CheckerResponse = None
                  cost = 0.0
                  try:
-                    resp, _, _, cost = await self.structured_client.generate_structured(
-                        response_model=CheckerResponse,
-                        system_prompt=self.checker.get_system_prompt(),
-                        user_content=prompt,
-                        model=self.checker.model
-                    )
-                    self._update_costs(cost, self.checker.model)
+                    async def attempt(model):
+                        resp, _, _, cost = await self.structured_client.generate_structured(
+                            response_model=CheckerResponse,
+                            system_prompt=self.checker.get_system_prompt(),
+                            user_content=prompt,
+                            model=model,
+                            agent=self.checker
+                        )
+                        return resp, cost
+
+                    outcome = await self._cascade(self.checker, self.config.checker, attempt, check_structured,
+                                                  verdict=lambda resp: resp.status if resp else None)
+                    resp, cost = outcome.result, outcome.cost
+                    self._update_costs(outcome.models[-1])
+                    if outcome.reasons:
+                        yield self.yield_event("Checker", outcome.models[-1],
+                                               f"Escalated to {outcome.models[-1]} ({', '.join(outcome.reasons)})")
                  except Exception as e:
                     logger.error(f"Checker validation failed: {e}")
                     validated_questions.append(q) 
@@ -961,18 +1003,7 @@ Subtopics: {subtopics}"""
                  
                  # --- 4. Fix Loop (Silent Fixer Pattern) ---
                  
-                 fix_prompt = f"""
-TARGET: Rewrite the following question to fix the issues listed below.
-Original Question: {q_json}
-Issues: {resp.issues}
-Feedback: {resp.feedback}
-
-REQUIREMENTS:
-1. Output ONLY the raw JSON object. 
-2. The 'explanation' field must contain ONLY the educational explanation for the student.
-3. Do NOT include any sentences like "I have corrected the option" or "Let me adjust this".
-4. Ensure 'correct_option_index' matches the text exactly.
-"""
+                 fix_prompt = self.checker.format_fix_prompt(q_json, resp.issues, resp.feedback)
 
                  yield self.yield_event("Editor", self.creator.model, f"Attempting fix for Q{i+1}...")
                  
@@ -988,9 +1019,10 @@ REQUIREMENTS:
                             # CRITICAL: Use Creator System Prompt
                             system_prompt=self.creator.get_system_prompt(mode="Assignment"), 
                             user_content=fix_prompt,
-                            model=self.creator.model 
+                            model=self.creator.model, 
+                            agent=self.creator
                          )
-                         self._update_costs(fix_cost, self.creator.model)
+                         self._update_costs(self.creator.model)
                          
                          if fixed_q:
                              # 4.1 Sanity Check the Fix
@@ -1,15 +1,37 @@
 import os
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils import embedding_functions
-from sentence_transformers import SentenceTransformer
-import pypdf
-from typing import List, Optional
+import threading
+import time
+from typing import List, Optional, Dict
 import hashlib
 from core.logger import logger
+from core.config import RERANK_CANDIDATES, RERANK_PRELOAD
+
+# NOTE: chromadb, sentence_transformers (torch) and pypdf are imported lazily.
+# Importing them at module level made every cold start of app.py pay several
+# seconds before the first paint, even with RAG disabled.
+
+DEFAULT_COLLECTION = "knowledge_base"
+NAMESPACE_PREFIX = "kb_"
+
+def namespace_to_collection(namespace: Optional[str]) -> str:
+    """
+    Maps a topic/course namespace to a valid Chroma collection name.
+    An empty namespace maps to the legacy global 'knowledge_base' collection.
+    """
+    if not namespace or not namespace.strip():
+        return DEFAULT_COLLECTION
+    slug = "".join([c if c.isalnum() else "_" for c in namespace.strip().lower()])[:40].strip("_")
+    if not slug:
+        return DEFAULT_COLLECTION
+    # Short hash keeps names unique once punctuation is stripped (e.g. "C++" vs "C")
+    digest = hashlib.md5(namespace.strip().lower().encode()).hexdigest()[:6]
+    return f"{NAMESPACE_PREFIX}{slug}_{digest}"
 
 class RAGManager:
     def __init__(self, persist_directory="./storage/chroma_db"):
+        import chromadb
+        from chromadb.utils import embedding_functions
+
         self.persist_directory = persist_directory
         os.makedirs(persist_directory, exist_ok=True)
         
@@ -20,20 +42,43 @@ class RAGManager:
         # Using a lightweight local model
         self.embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
         
-        # Create/Get Collection
+        # Create/Get Collection (default namespace)
         self.collection = self.client.get_or_create_collection(
-            name="knowledge_base",
+            name=DEFAULT_COLLECTION,
             embedding_function=self.embedding_fn
         )
+        self._collections = {DEFAULT_COLLECTION: self.collection}
+        self.reranker = None # Created on first rerank=True query
         logger.info("RAG Manager Initialized.")
 
-    def ingest_document(self, file_path: str, filename: str) -> bool:
+    def get_collection(self, namespace: Optional[str] = None):
+        """
+        Returns the collection backing a namespace, creating it on first use.
+        Each namespace is its own collection, so queries never scan other courses
+        and deleting a namespace is a single drop.
+        """
+        name = namespace_to_collection(namespace)
+        if name == DEFAULT_COLLECTION:
+            return self.collection
+        if not hasattr(self, "_collections"):
+            self._collections = {}
+        if name not in self._collections:
+            self._collections[name] = self.client.get_or_create_collection(
+                name=name,
+                embedding_function=self.embedding_fn,
+                metadata={"namespace": namespace.strip()}
+            )
+        return self._collections[name]
+
+    def ingest_document(self, file_path: str, filename: str, namespace: Optional[str] = None) -> bool:
         """
         Parses a PDF or Text file and adds chunks to the vector store.
+        Chunks go into the given namespace (topic/course), or the global one if omitted.
         """
         try:
             text = ""
             if filename.endswith(".pdf"):
+                import pypdf
                 reader = pypdf.PdfReader(file_path)
                 for page in reader.pages:
                     text += page.extract_text() + "\n"
@@ -52,29 +97,46 @@ class RAGManager:
             ids = [hashlib.md5(f"{filename}_{i}".encode()).hexdigest() for i in range(len(chunks))]
             metadatas = [{"source": filename, "chunk_index": i} for i in range(len(chunks))]
             
-            self.collection.upsert(
+            self.get_collection(namespace).upsert(
                 documents=chunks,
                 metadatas=metadatas,
                 ids=ids
             )
-            logger.info(f"Ingested {len(chunks)} chunks from {filename}")
+            logger.info(f"Ingested {len(chunks)} chunks from {filename} into '{namespace_to_collection(namespace)}'")
             return True
 
         except Exception as e:
             logger.error(f"Failed to ingest {filename}: {e}")
             return False
 
-    def retrieve_context(self, query: str, k: int = 3, threshold: float = 1.5) -> str:
+    def _select_top(self, query: str, candidates: List[tuple], k: int, rerank: bool) -> List[tuple]:
+        """
+        Picks the top k of (dist, formatted_chunk, raw_doc) candidates.
+        With rerank=True a cross-encoder re-orders the pool within its latency
+        budget; otherwise (or on budget overrun) distance order is kept.
+        """
+        candidates = sorted(candidates, key=lambda x: x[0])
+        if rerank and len(candidates) > 1:
+            if getattr(self, "reranker", None) is None:
+                from core.reranker import Reranker
+                self.reranker = Reranker()
+            order = self.reranker.rerank(query, [c[2] for c in candidates])
+            if order is not None:
+                candidates = [candidates[i] for i in order]
+        return candidates[:k]
+
+    def retrieve_context(self, query: str, k: int = 3, threshold: float = 1.5, namespace: Optional[str] = None, rerank: bool = False) -> str:
         """
         Retrieves top k relevant chunks with a distance threshold.
         Lower distance = more similar (for L2/Euclidean). 
         Adjust threshold based on embedding model.
+        With rerank=True a wider candidate pool is re-scored by a local cross-encoder.
         """
         try:
             # Request distances
-            results = self.collection.query(
+            results = self.get_collection(namespace).query(
                 query_texts=[query],
-                n_results=k * 2 # Fetch more to filter potential low quality ones
+                n_results=max(k * 2, RERANK_CANDIDATES) if rerank else k * 2 # Fetch more to filter potential low quality ones
             )
             
             if not results["documents"]:
@@ -90,11 +152,10 @@ class RAGManager:
                 dist = distances[i]
                 if dist <= threshold:
                     source = metadatas[i].get("source", "Unknown")
-                    filtered_results.append((dist, f"[Source: {source}]\n{doc}\n\n"))
+                    filtered_results.append((dist, f"[Source: {source}]\n{doc}\n\n", doc))
             
-            # Sort by distance (asc) and take top k
-            filtered_results.sort(key=lambda x: x[0])
-            top_results = filtered_results[:k]
+            # Sort by distance (asc) or rerank, and take top k
+            top_results = self._select_top(query, filtered_results, k, rerank)
             
             if not top_results:
                 return ""
@@ -105,6 +166,75 @@ class RAGManager:
             logger.error(f"Retrieval failed: {e}")
             return ""
 
+    def retrieve_context_batch(self, subtopics: List[str], topic: str = "", k: int = 3, threshold: float = 1.5, namespace: Optional[str] = None, rerank: bool = False) -> Dict[str, str]:
+        """
+        Retrieves top k chunks for each subtopic using a single Chroma query.
+        All queries are embedded in one forward pass. A chunk matching several
+        subtopics is only kept for the subtopic it is closest to.
+        With rerank=True each subtopic's pool is re-scored within its own budget.
+        Returns a {subtopic: context} map (empty string when nothing passed the threshold).
+        """
+        queries = [q for q in dict.fromkeys(q.strip() for q in subtopics) if q]
+        if not queries:
+            return {}
+
+        try:
+            query_texts = [f"{topic} {q}".strip() for q in queries]
+            results = self.get_collection(namespace).query(
+                query_texts=query_texts,
+                n_results=max(k * 2, RERANK_CANDIDATES) if rerank else k * 2
+            )
+
+            if not results["documents"]:
+                return {q: "" for q in queries}
+
+            # 1. Assign every chunk to its closest query (ties go to the earlier query)
+            best = {}  # chunk_id -> (dist, query_idx, formatted_chunk, raw_doc)
+            for q_idx in range(len(queries)):
+                docs = results["documents"][q_idx]
+                metadatas = results["metadatas"][q_idx]
+                ids = results["ids"][q_idx]
+                distances = results["distances"][q_idx] if results.get("distances") else [0.0] * len(docs)
+
+                for i, doc in enumerate(docs):
+                    dist = distances[i]
+                    if dist > threshold:
+                        continue
+                    chunk_id = ids[i]
+                    if chunk_id in best and best[chunk_id][0] <= dist:
+                        continue
+                    source = metadatas[i].get("source", "Unknown")
+                    best[chunk_id] = (dist, q_idx, f"[Source: {source}]\n{doc}\n\n", doc)
+
+            # 2. Group by query, sort by distance (asc) or rerank, and take top k
+            grouped = {i: [] for i in range(len(queries))}
+            for dist, q_idx, chunk, doc in best.values():
+                grouped[q_idx].append((dist, chunk, doc))
+
+            context_map = {}
+            for q_idx, query in enumerate(queries):
+                top_results = self._select_top(query_texts[q_idx], grouped[q_idx], k, rerank)
+                context_map[query] = "".join([r[1] for r in top_results]).strip()
+
+            logger.info(f"Batched retrieval: {len(queries)} queries, {len(best)} unique chunks")
+            return context_map
+
+        except Exception as e:
+            logger.error(f"Batched retrieval failed: {e}")
+            return {q: "" for q in queries}
+
+    @staticmethod
+    def format_context_map(context_map: Dict[str, str]) -> str:
+        """
+        Renders a per-subtopic context map as prompt-ready text.
+        Subtopics without any matching chunks are omitted.
+        """
+        sections = []
+        for query, context in context_map.items():
+            if context:
+                sections.append(f"### Subtopic: {query}\n{context}")
+        return "\n\n".join(sections)
+
     def _chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
         chunks = []
         start = 0
@@ -114,12 +244,156 @@ class RAGManager:
             start += (chunk_size - overlap)
         return chunks
 
-    def clear_database(self):
+    def _namespace_collections(self) -> Dict[str, object]:
+        """
+        {display name: collection} for every namespace, one lookup per collection.
+        Collections without namespace metadata show their name minus NAMESPACE_PREFIX.
+        """
+        namespaces = {}
+        for col in self.client.list_collections():
+            # chromadb >= 0.6 returns names, older versions return Collection objects
+            name = col if isinstance(col, str) else col.name
+            if name == DEFAULT_COLLECTION:
+                namespaces[""] = self.collection
+            elif name.startswith(NAMESPACE_PREFIX):
+                collection = self.client.get_collection(name) if isinstance(col, str) else col
+                meta = collection.metadata or {}
+                namespaces[meta.get("namespace") or name[len(NAMESPACE_PREFIX):]] = collection
+        return namespaces
+
+    def list_namespaces(self) -> List[str]:
+        """Returns the display names of all namespaces ('' is the global one)."""
+        return sorted(self._namespace_collections())
+
+    def namespace_stats(self) -> Dict[str, int]:
+        """Returns {namespace: chunk_count} for every namespace."""
+        stats = {}
+        for namespace, collection in sorted(self._namespace_collections().items()):
+            try:
+                stats[namespace] = collection.count()
+            except Exception as e:
+                logger.error(f"Failed to count namespace '{namespace}': {e}")
+        return stats
+
+    def delete_namespace(self, namespace: str) -> bool:
+        """Drops a single namespace without touching any other course material."""
+        name = namespace_to_collection(namespace)
+        if namespace and name != DEFAULT_COLLECTION:
+            # Collections listed under a fallback name (no metadata) don't map back through namespace_to_collection
+            listed = self._namespace_collections().get(namespace)
+            name = listed.name if listed is not None else name
+        if name == DEFAULT_COLLECTION:
+            return self.clear_database(namespace=None)
         try:
-            self.client.delete_collection("knowledge_base")
+            self.client.delete_collection(name)
+            self._collections.pop(name, None)
+            logger.info(f"Deleted namespace '{namespace}'")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to delete namespace '{namespace}': {e}")
+            return False
+
+    def clear_database(self, namespace: Optional[str] = None, all_namespaces: bool = False) -> bool:
+        """
+        Empties the global collection (or the given namespace).
+        Pass all_namespaces=True to wipe every namespace as well.
+        """
+        if namespace:
+            return self.delete_namespace(namespace)
+        try:
+            if all_namespaces:
+                for name in list(self.list_namespaces()):
+                    if name:
+                        self.delete_namespace(name)
+            self.client.delete_collection(DEFAULT_COLLECTION)
             self.collection = self.client.create_collection(
-                name="knowledge_base",
+                name=DEFAULT_COLLECTION,
                 embedding_function=self.embedding_fn
             )
+            self._collections[DEFAULT_COLLECTION] = self.collection
+            return True
         except Exception as e:
             logger.error(f"Failed to clear DB: {e}")
+            return False
+
+
+# --- BACKGROUND WARM-UP ---
+# One engine per process, shared by every Streamlit session.
+_engine: Optional[RAGManager] = None
+_engine_error: Optional[str] = None
+_warmup_thread: Optional[threading.Thread] = None
+_rerank_thread: Optional[threading.Thread] = None
+_warmup_lock = threading.Lock()
+
+def _warmup_worker(persist_directory):
+    global _engine, _engine_error
+    start = time.time()
+    try:
+        engine = RAGManager(persist_directory=persist_directory)
+        from core.reranker import Reranker  # Cheap: the model itself is only loaded by Reranker.load()
+        engine.reranker = Reranker()  # Queries arriving before load() finishes wait for it, off the budget clock
+        _engine = engine
+        logger.info("RAG engine warm-up complete", extra={"props": {"warmup_seconds": round(time.time() - start, 2)}})
+    except Exception as e:
+        _engine_error = str(e)
+        logger.error(f"RAG engine warm-up failed: {e}")
+        return
+    if RERANK_PRELOAD:
+        preload_reranker()
+
+def _reranker_worker():
+    engine = get_rag_manager(wait=True)
+    if engine is None:
+        return
+    try:
+        engine.reranker.load()
+    except Exception as e:
+        logger.warning(f"Cross-encoder preload failed; reranking will retry on first use: {e}")
+
+def preload_reranker():
+    """
+    Loads the cross-encoder on a daemon thread once the engine is ready (the
+    UI calls this when reranking is switched on). Safe to call on every rerun.
+    """
+    global _rerank_thread
+    with _warmup_lock:
+        if _rerank_thread is None:
+            _rerank_thread = threading.Thread(target=_reranker_worker, name="rerank-preload", daemon=True)
+            _rerank_thread.start()
+    return _rerank_thread
+
+def start_warmup(persist_directory="./storage/chroma_db"):
+    """
+    Starts loading the RAG engine (imports + embedding model) on a daemon thread.
+    Safe to call on every rerun; only the first call spawns the thread.
+    """
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(
+                target=_warmup_worker, args=(persist_directory,), name="rag-warmup", daemon=True
+            )
+            _warmup_thread.start()
+    return _warmup_thread
+
+def get_status() -> str:
+    """Returns one of: 'idle', 'loading', 'ready', 'error'."""
+    if _engine is not None:
+        return "ready"
+    if _engine_error is not None:
+        return "error"
+    if _warmup_thread is None:
+        return "idle"
+    return "loading"
+
+def get_error() -> Optional[str]:
+    return _engine_error
+
+def get_rag_manager(wait: bool = False, timeout: Optional[float] = None) -> Optional[RAGManager]:
+    """
+    Returns the warmed-up RAGManager, or None if it is not ready yet.
+    With wait=True, blocks (up to timeout seconds) until warm-up finishes.
+    """
+    if _engine is None and wait:
+        start_warmup().join(timeout)
+    return _engine
@@ -2,6 +2,8 @@ import asyncio
 import time
 from collections import deque
 from core.logger import logger
+from core.config import API_RPM, API_TPM
+from core import metrics
 
 class RequestQueue:
     """
@@ -41,18 +43,22 @@ import threading
 
 class RateLimiter:
     """
-    Token bucket rate limiter.
+    Sliding-window limiter for requests and (estimated) input tokens per minute.
     Thread-safe implementation for Streamlit (which runs multiple threads).
     """
     def __init__(self, rpm=50, tpm=40000):
         self.rpm = rpm
         self.tpm = tpm
         self.request_timestamps = deque()
+        self.token_log = deque()  # (timestamp, tokens) of requests in the last minute
         self._lock = threading.Lock() # Thread-safe lock for global state
 
-    async def acquire(self):
+    async def acquire(self, tokens: int = 0):
         """
-        Acquire a token. If limit reached, wait asynchronously then retry.
+        Acquire a slot for one request of about `tokens` input tokens (the
+        calibrated prediction, see core.tokens). If either limit is reached,
+        wait asynchronously then retry. A request larger than the whole TPM
+        quota is let through once the window is empty rather than blocking forever.
         """
         while True:
             wait_time = 0
@@ -62,22 +68,45 @@ class RateLimiter:
                 # 1. Cleanup old timestamps
                 while self.request_timestamps and now - self.request_timestamps[0] > 60:
                     self.request_timestamps.popleft()
+                while self.token_log and now - self.token_log[0][0] > 60:
+                    self.token_log.popleft()
                 
-                # 2. Check Limit
-                if len(self.request_timestamps) < self.rpm:
-                    # Success: Add timestamp and return
-                    self.request_timestamps.append(now)
-                    return
-                else:
-                    # Failure: Calculate wait
+                # 2. Check Limits
+                used = sum(t for _, t in self.token_log)
+                if len(self.request_timestamps) >= self.rpm:
+                    limit = f"RPM: {self.rpm}"
                     oldest = self.request_timestamps[0]
                     wait_time = 60 - (now - oldest) + 1  # +1s buffer
+                elif tokens and self.token_log and used + tokens > self.tpm:
+                    # Wait until enough of the window's tokens have aged out
+                    limit = f"TPM: {self.tpm}"
+                    freed = 0
+                    for ts, t in self.token_log:
+                        freed += t
+                        if used - freed + tokens <= self.tpm:
+                            break
+                    wait_time = 60 - (now - ts) + 1
+                else:
+                    # Success: record the request and return
+                    self.request_timestamps.append(now)
+                    if tokens:
+                        self.token_log.append((now, tokens))
+                    return
             
             # 3. Wait (Outside lock to allow others to process)
             if wait_time > 0:
-                logger.warning(f"Rate limit hit (RPM: {self.rpm}). Waiting {wait_time:.2f}s")
-                await asyncio.sleep(wait_time)
+                logger.warning(f"Rate limit hit ({limit}). Waiting {wait_time:.2f}s", extra={"props": {
+                    "event": "rate_limit_wait", "wait_s": round(wait_time, 3), "rpm": self.rpm, "tpm": self.tpm,
+                    "tokens": tokens
+                }})
+                metrics.limiter_waits.observe(wait_time)
+                metrics.limiter_waiting.inc()
+                try:
+                    await asyncio.sleep(wait_time)
+                finally:
+                    metrics.limiter_waiting.dec()
                 # Loop continues to 'retry' acquire
 
 # Global Rate Limiter Instance
-limiter = RateLimiter(rpm=50) 
+limiter = RateLimiter(rpm=API_RPM, tpm=API_TPM)
+metrics.limiter_rpm.set_function(lambda: limiter.rpm)  # Follows the worker quota split
@@ -0,0 +1,355 @@
+"""
+Record/replay for orchestrator runs.
+
+Recording wraps the HTTP transport under the Anthropic SDK and appends every
+request/response pair, with its timings and (for streams) the arrival time of
+each chunk, to a gzip JSONL file. Replaying serves those responses back with
+no network, either at recorded speed or as fast as possible, so a slow
+production run can be reproduced, profiled and regression-tested locally:
+
+    python -m core.replay record runs/dna.jsonl.gz --topic "DNA" --mode "Lecture Notes"
+    python -m core.replay replay runs/dna.jsonl.gz [--speed 1] [--profile]
+    python -m core.replay info runs/dna.jsonl.gz
+
+Responses are matched to requests by a hash of the request body, so concurrent
+calls (Auditor and Pedagogue run in parallel) replay correctly regardless of
+scheduling order. A request with no recorded match means the loop logic now
+sends something different; strict replay raises, lenient replay falls back to
+recording order and counts a mismatch.
+"""
+import os
+import sys
+import json
+import gzip
+import time
+import hashlib
+import asyncio
+import argparse
+import threading
+from collections import defaultdict, deque
+from typing import Optional
+
+import httpx
+
+FORMAT_VERSION = 1
+# Response headers worth keeping; length/encoding are recomputed on replay
+KEEP_HEADERS = ("content-type", "request-id", "retry-after", "retry-after-ms", "x-should-retry")
+
+class ReplayError(RuntimeError):
+    """A replayed run sent a request that is not in the recording."""
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    """Stable key for a request: method, path and the canonical JSON body."""
+    try:
+        canonical = json.dumps(json.loads(body or b"null"), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    except ValueError:
+        canonical = body
+    return hashlib.sha1(method.encode() + b" " + path.encode() + b"\n" + canonical).hexdigest()
+
+def _append(path, records, lock):
+    # Each append is its own gzip member; concatenated members read back as one stream
+    with lock:
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+def read_recording(path: str):
+    """Returns (meta, exchanges, result) from a recording file."""
+    meta, exchanges, result = {}, [], None
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            kind = record.pop("kind", None)
+            if kind == "meta":
+                meta = record
+            elif kind == "exchange":
+                exchanges.append(record)
+            elif kind == "result":
+                result = record
+    exchanges.sort(key=lambda e: e["seq"])
+    return meta, exchanges, result
+
+# ==========================
+# Recording
+# ==========================
+
+class _RecordingStream(httpx.AsyncByteStream):
+    """Passes response chunks through while noting when each one arrived."""
+
+    def __init__(self, inner, on_done):
+        self._inner = inner
+        self._on_done = on_done
+        self._start = time.perf_counter()
+        self.chunks = []
+
+    def _finish(self):
+        if self._on_done is not None:
+            on_done, self._on_done = self._on_done, None
+            on_done(self.chunks)
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._inner:
+                self.chunks.append((round(time.perf_counter() - self._start, 4), chunk.decode("utf-8", "replace")))
+                yield chunk
+        finally:
+            self._finish()
+
+    async def aclose(self):
+        self._finish()  # Closed unread (or part-read): record what arrived
+        await self._inner.aclose()
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Forwards to `inner` (the real network by default) and appends each exchange to `path`."""
+
+    def __init__(self, path: str, inner: Optional[httpx.AsyncBaseTransport] = None, meta: Optional[dict] = None):
+        self.path = path
+        self.inner = inner or httpx.AsyncHTTPTransport()
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._t0 = time.perf_counter()
+        self.stats = {"exchanges": 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+        _append(path, [dict({"kind": "meta", "version": FORMAT_VERSION, "recorded_at": time.time()}, **(meta or {}))],
+                 self._lock)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        # Plain bodies keep the recording readable and the replay independent of compression
+        request.headers["accept-encoding"] = "identity"
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        headers = {k: v for k, v in response.headers.items() if k.lower() in KEEP_HEADERS}
+        record = {
+            "kind": "exchange", "seq": seq, "key": request_key(request.method, request.url.path, body),
+            "method": request.method, "path": request.url.path, "request": body.decode("utf-8", "replace"),
+            "status": response.status_code, "headers": headers,
+            "start_s": round(started - self._t0, 4), "ttfb_s": round(time.perf_counter() - started, 4),
+        }
+
+        def done(chunks):
+            record["chunks"] = chunks
+            record["duration_s"] = round(time.perf_counter() - started, 4)
+            _append(self.path, [record], self._lock)
+            self.stats["exchanges"] += 1
+
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=_RecordingStream(response.stream, done), extensions=response.extensions)
+
+    def finish(self, content: str, **fields):
+        """Appends the run's final output, which replay compares against byte-for-byte."""
+        _append(self.path, [dict({"kind": "result", "sha1": hashlib.sha1(content.encode("utf-8")).hexdigest(),
+                                  "content": content}, **fields)], self._lock)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+# ==========================
+# Replay
+# ==========================
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Serves recorded responses. speed=0 replays as fast as possible; speed=1
+    reproduces the recorded time-to-first-byte and chunk pacing (2 = twice as fast).
+    """
+
+    def __init__(self, path: str, speed: float = 0.0, strict: bool = False):
+        self.meta, exchanges, self.result = read_recording(path)
+        self.speed = speed
+        self.strict = strict
+        self._by_key = defaultdict(deque)
+        for exchange in exchanges:
+            self._by_key[exchange["key"]].append(exchange)
+        self._in_order = deque(exchanges)
+        self._used = set()
+        self._lock = threading.Lock()
+        self.stats = {"served": 0, "mismatches": 0, "recorded": len(exchanges)}
+
+    def _take(self, key):
+        with self._lock:
+            queue = self._by_key.get(key)
+            while queue:
+                exchange = queue.popleft()
+                if exchange["seq"] not in self._used:
+                    self._used.add(exchange["seq"])
+                    return exchange, True
+            if self.strict:
+                return None, False
+            while self._in_order:
+                exchange = self._in_order.popleft()
+                if exchange["seq"] not in self._used:
+                    self._used.add(exchange["seq"])
+                    return exchange, False
+        return None, False
+
+    @property
+    def unused(self) -> int:
+        return self.stats["recorded"] - len(self._used)
+
+    async def _sleep(self, seconds):
+        if self.speed > 0 and seconds > 0:
+            await asyncio.sleep(seconds / self.speed)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        key = request_key(request.method, request.url.path, body)
+        exchange, matched = self._take(key)
+        if not matched:
+            self.stats["mismatches"] += 1
+        if exchange is None:
+            raise ReplayError(f"No recorded response for {request.method} {request.url.path} (key {key[:12]})")
+        self.stats["served"] += 1
+
+        await self._sleep(exchange["ttfb_s"])
+        return httpx.Response(exchange["status"], headers=exchange["headers"], stream=_ReplayStream(self, exchange))
+
+class _ReplayStream(httpx.AsyncByteStream):
+    def __init__(self, transport, exchange):
+        self._transport = transport
+        self._exchange = exchange
+
+    async def __aiter__(self):
+        previous = self._exchange["ttfb_s"]
+        for offset, text in self._exchange.get("chunks", []):
+            await self._transport._sleep(offset - previous)
+            previous = max(previous, offset)
+            yield text.encode("utf-8")
+
+def recording_http_client(path: str, inner: Optional[httpx.AsyncBaseTransport] = None, meta: Optional[dict] = None):
+    """An httpx client for anthropic.AsyncAnthropic(http_client=...) that records to `path`."""
+    return httpx.AsyncClient(transport=RecordingTransport(path, inner, meta), timeout=600)
+
+def replay_http_client(path: str, speed: float = 0.0, strict: bool = False):
+    """An httpx client that answers from the recording at `path` instead of the network."""
+    return httpx.AsyncClient(transport=ReplayTransport(path, speed, strict), base_url="https://replay.invalid")
+
+# ==========================
+# CLI
+# ==========================
+
+RUN_ARGS = ("topic", "subtopics", "transcript", "mode", "target_audience", "assignment_config")
+
+async def _run(config, http_client, run_args, api_key=None):
+    from core.orchestrator import Orchestrator
+    orch = Orchestrator(config, api_key=api_key, http_client=http_client, headless=True)
+    final = None
+    async for event in orch.run_loop(run_args["topic"], run_args["subtopics"], transcript=run_args.get("transcript"),
+                                     mode=run_args["mode"], target_audience=run_args["target_audience"],
+                                     assignment_config=run_args.get("assignment_config") or {}):
+        if event.get("type") == "FINAL_RESULT":
+            final = event
+    return final
+
+def _default_config(model):
+    from core.models import OrchestratorConfig, AgentConfig
+    return OrchestratorConfig(**{name: AgentConfig(model=model)
+                                 for name in ("creator", "auditor", "pedagogue", "editor", "sanitizer", "checker")})
+
+def cmd_record(args):
+    from core.config import DEFAULT_MODEL
+    config = _default_config(args.model or DEFAULT_MODEL)
+    transcript = None
+    if args.transcript:
+        with open(args.transcript, "r", encoding="utf-8") as f:
+            transcript = f.read()
+    run_args = {"topic": args.topic, "subtopics": args.subtopics or args.topic, "transcript": transcript,
+                "mode": args.mode, "target_audience": args.audience,
+                "assignment_config": json.loads(args.assignment_config) if args.assignment_config else {}}
+    http_client = recording_http_client(args.file, meta={"run": run_args, "config": config.model_dump()})
+    t = time.perf_counter()
+    final = asyncio.run(_run(config, http_client, run_args))
+    elapsed = time.perf_counter() - t
+    if not final:
+        print("Run produced no final result; recording kept for inspection.")
+        return 1
+    http_client._transport.finish(final["content"], wall_s=round(elapsed, 3))
+    print(f"Recorded {http_client._transport.stats['exchanges']} exchanges in {elapsed:.1f}s -> {args.file}")
+    return 0
+
+def cmd_replay(args):
+    from core.models import OrchestratorConfig
+    meta, _, result = read_recording(args.file)
+    config = OrchestratorConfig(**meta["config"])
+    http_client = replay_http_client(args.file, speed=args.speed, strict=args.strict)
+    transport = http_client._transport
+
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    t = time.perf_counter()
+    # A ReplayError surfaces inside the run as a failed API call; the mismatch count reports it
+    final = asyncio.run(_run(config, http_client, meta["run"], api_key="replay"))
+    elapsed = time.perf_counter() - t
+    if profiler:
+        import pstats
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(args.profile_top)
+
+    stats = transport.stats
+    print(f"Replayed {stats['served']}/{stats['recorded']} exchanges in {elapsed:.2f}s "
+          f"(recorded run {result['wall_s'] if result else '?'}s, speed {args.speed or 'max'})")
+    print(f"Mismatched requests: {stats['mismatches']}, unused recordings: {transport.unused}")
+    if result and final:
+        same = hashlib.sha1(final["content"].encode("utf-8")).hexdigest() == result["sha1"]
+        print("Final content: " + ("identical" if same else "DIFFERS from recording"))
+        if not same:
+            return 1
+    return 0 if stats["mismatches"] == 0 else 1
+
+def cmd_info(args):
+    meta, exchanges, result = read_recording(args.file)
+    run = meta.get("run", {})
+    print(f"{args.file}: {run.get('mode')} '{run.get('topic')}', recorded {time.ctime(meta.get('recorded_at', 0))}")
+    print(f"{'seq':>4} {'start':>8} {'ttfb':>7} {'total':>7} {'status':>6} {'chunks':>6}  model/tool")
+    for e in exchanges:
+        try:
+            request = json.loads(e["request"])
+        except ValueError:
+            request = {}
+        tool = (request.get("tools") or [{}])[0].get("name", "stream" if request.get("stream") else "text")
+        print(f"{e['seq']:>4} {e['start_s']:>8.2f} {e['ttfb_s']:>7.2f} {e.get('duration_s', 0):>7.2f} "
+              f"{e['status']:>6} {len(e.get('chunks', [])):>6}  {request.get('model', '?')}/{tool}")
+    if result:
+        print(f"Result sha1 {result['sha1'][:12]}, wall {result.get('wall_s')}s")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record and replay orchestrator runs")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record = sub.add_parser("record", help="Run the pipeline against the real API and record it")
+    record.add_argument("file")
+    record.add_argument("--topic", required=True)
+    record.add_argument("--subtopics")
+    record.add_argument("--transcript", help="Path to a transcript text file")
+    record.add_argument("--mode", default="Lecture Notes")
+    record.add_argument("--audience", default="General Student")
+    record.add_argument("--assignment-config", help='JSON, e.g. {"mcsc": 5}')
+    record.add_argument("--model", help="Model for every agent (default: DEFAULT_MODEL)")
+
+    replay = sub.add_parser("replay", help="Re-run the recorded pipeline with no network")
+    replay.add_argument("file")
+    replay.add_argument("--speed", type=float, default=0.0, help="1 = recorded timing, 0 = as fast as possible")
+    replay.add_argument("--strict", action="store_true", help="Fail on the first request not in the recording")
+    replay.add_argument("--profile", action="store_true", help="cProfile the replayed run")
+    replay.add_argument("--profile-top", type=int, default=30)
+
+    info = sub.add_parser("info", help="List the recorded exchanges")
+    info.add_argument("file")
+
+    args = parser.parse_args(argv)
+    return {"record": cmd_record, "replay": cmd_replay, "info": cmd_info}[args.command](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import time
+import threading
+from typing import Callable, List, Optional, Sequence, Tuple
+from core.config import RERANK_MODEL, RERANK_BUDGET_MS, RERANK_BATCH_SIZE
+from core.logger import logger
+
+class Reranker:
+    """
+    Local CPU cross-encoder that re-scores retrieval candidates.
+    Scoring runs in batches and stops as soon as the per-query latency budget
+    is spent; callers then keep the original (embedding distance) order.
+    Loading the model is not part of the budget (see load()).
+    """
+    def __init__(self, model_name: str = RERANK_MODEL, scorer: Optional[Callable[[List[Tuple[str, str]]], Sequence[float]]] = None):
+        self.model_name = model_name
+        self._scorer = scorer
+        self._model = None
+        self._lock = threading.Lock()
+        self.stats = {"reranked": 0, "fallbacks": 0}
+
+    def load(self) -> "Reranker":
+        """Loads the cross-encoder (pulls in torch). Called by the RAG warm-up thread, or before the first query's clock starts."""
+        if self._scorer is None and self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+                    logger.info(f"Loaded cross-encoder {self.model_name}")
+        return self
+
+    def _score(self, pairs: List[Tuple[str, str]]) -> Sequence[float]:
+        if self._scorer:
+            return self._scorer(pairs)
+        return self._model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+
+    def rerank(self, query: str, candidates: List[str], budget_ms: float = RERANK_BUDGET_MS,
+               batch_size: int = RERANK_BATCH_SIZE) -> Optional[List[int]]:
+        """
+        Returns candidate indices ordered by cross-encoder score (best first),
+        or None if the budget ran out (or scoring failed) before all were scored.
+        """
+        if not candidates:
+            return []
+        try:
+            self.load()
+        except Exception as e:
+            self.stats["fallbacks"] += 1
+            logger.warning(f"Rerank fell back to distance order: {e}")
+            return None
+
+        start = time.perf_counter()
+        scores = []
+        try:
+            for i in range(0, len(candidates), batch_size):
+                batch = candidates[i:i + batch_size]
+                scores.extend(float(s) for s in self._score([(query, c) for c in batch]))
+
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                remaining = len(candidates) - len(scores)
+                if remaining and elapsed_ms >= budget_ms:
+                    raise TimeoutError(f"{elapsed_ms:.0f}ms spent, {remaining} candidates unscored")
+        except Exception as e:
+            self.stats["fallbacks"] += 1
+            logger.warning(f"Rerank fell back to distance order: {e}")
+            return None
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms > budget_ms:
+            self.stats["fallbacks"] += 1
+            logger.warning(f"Rerank over budget ({elapsed_ms:.0f}ms > {budget_ms}ms). Using distance order.")
+            return None
+
+        self.stats["reranked"] += 1
+        return sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
@@ -0,0 +1,354 @@
+import os
+import sys
+import time
+import fnmatch
+import sqlite3
+import threading
+from contextlib import closing
+from typing import List, Optional, Tuple
+from core.config import SESSION_BACKEND, SESSION_TTL_S, SESSION_DIR, SESSION_DB, SESSION_REDIS_URL
+
+class SessionBackend:
+    """
+    Storage for per-session state. A session is a JSON state document plus an
+    optional draft, written separately so the large draft is only stored when it
+    changes. Sessions untouched for `ttl` seconds are expired by cleanup().
+    `shared` backends may be written by several processes (replicas), so a
+    writer cannot assume the stored copy is still the one it last wrote and
+    checks the stored state document (read_state) instead.
+    """
+    shared = False
+
+    def __init__(self, ttl: int = SESSION_TTL_S):
+        self.ttl = ttl
+
+    def write_state(self, session_id: str, text: str):
+        raise NotImplementedError
+
+    def write_draft(self, session_id: str, text: Optional[str]):
+        """Stores the draft; None removes it."""
+        raise NotImplementedError
+
+    def touch(self, session_id: str):
+        """Marks the session as active without rewriting it."""
+        raise NotImplementedError
+
+    def read(self, session_id: str) -> Tuple[Optional[str], Optional[str]]:
+        """Returns (state_text, draft_text); either may be None."""
+        raise NotImplementedError
+
+    def read_state(self, session_id: str) -> Optional[str]:
+        """Returns the state document alone (no draft)."""
+        return self.read(session_id)[0]
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def list_sessions(self) -> List[str]:
+        raise NotImplementedError
+
+    def cleanup(self, ttl: Optional[int] = None) -> int:
+        """Removes sessions idle for longer than ttl (default: self.ttl). Returns the number removed."""
+        raise NotImplementedError
+
+
+class FileSessionBackend(SessionBackend):
+    """{root}/{session_id}.json + {session_id}.draft.md on local disk. Single-host only."""
+    def __init__(self, root: str = SESSION_DIR, ttl: int = SESSION_TTL_S):
+        super().__init__(ttl)
+        self.root = root
+
+    def state_path(self, session_id):
+        return os.path.join(self.root, f"{session_id}.json")
+
+    def draft_path(self, session_id):
+        return os.path.join(self.root, f"{session_id}.draft.md")
+
+    def _write_atomic(self, path, text):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def write_state(self, session_id, text):
+        self._write_atomic(self.state_path(session_id), text)
+
+    def write_draft(self, session_id, text):
+        path = self.draft_path(session_id)
+        if text is None:
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            self._write_atomic(path, text)
+
+    def touch(self, session_id):
+        try:
+            os.utime(self.state_path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def read(self, session_id):
+        results = []
+        for path in (self.state_path(session_id), self.draft_path(session_id)):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    results.append(f.read())
+            except FileNotFoundError:
+                results.append(None)
+        return results[0], results[1]
+
+    def delete(self, session_id):
+        for path in (self.state_path(session_id), self.draft_path(session_id)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def list_sessions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(f[:-len(".json")] for f in os.listdir(self.root) if f.endswith(".json"))
+
+    def cleanup(self, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        cutoff = time.time() - ttl
+        removed = 0
+        for session_id in self.list_sessions():
+            try:
+                if os.path.getmtime(self.state_path(session_id)) < cutoff:
+                    self.delete(session_id)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        # Drafts whose state file is gone (crash between writes, manual deletes)
+        if os.path.isdir(self.root):
+            for f in os.listdir(self.root):
+                if f.endswith(".draft.md") and not os.path.exists(self.state_path(f[:-len(".draft.md")])):
+                    os.remove(os.path.join(self.root, f))
+        return removed
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """One WAL-mode SQLite database; safe for several app processes on the same host or shared volume."""
+    shared = True
+
+    def __init__(self, db_path: str = SESSION_DB, ttl: int = SESSION_TTL_S):
+        super().__init__(ttl)
+        self.db_path = db_path
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS sessions ("
+                        "session_id TEXT PRIMARY KEY, state TEXT, draft TEXT, updated REAL NOT NULL)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated)")
+                    conn.commit()
+                    self._initialized = True
+        return conn
+
+    def _upsert(self, session_id, column, value):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                f"INSERT INTO sessions (session_id, {column}, updated) VALUES (?, ?, ?) "
+                f"ON CONFLICT(session_id) DO UPDATE SET {column}=excluded.{column}, updated=excluded.updated",
+                (session_id, value, time.time())
+            )
+            conn.commit()
+
+    def write_state(self, session_id, text):
+        self._upsert(session_id, "state", text)
+
+    def write_draft(self, session_id, text):
+        self._upsert(session_id, "draft", text)
+
+    def touch(self, session_id):
+        with closing(self._connect()) as conn:
+            conn.execute("UPDATE sessions SET updated = ? WHERE session_id = ?", (time.time(), session_id))
+            conn.commit()
+
+    def read(self, session_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT state, draft FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def read_state(self, session_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT state FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def delete(self, session_id):
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            conn.commit()
+
+    def list_sessions(self):
+        with closing(self._connect()) as conn:
+            return [r[0] for r in conn.execute("SELECT session_id FROM sessions ORDER BY session_id")]
+
+    def cleanup(self, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with closing(self._connect()) as conn:
+            removed = conn.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - ttl,)).rowcount
+            conn.commit()
+        return removed
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Shared store for replicas behind a load balancer. Keys expire natively
+    (EX on every write/touch), so cleanup() only fixes keys left without a TTL.
+    `client` is any redis-py compatible object; by default one is created from url.
+    """
+    shared = True
+
+    def __init__(self, client=None, url: str = SESSION_REDIS_URL, ttl: int = SESSION_TTL_S, prefix: str = "session:"):
+        super().__init__(ttl)
+        self.prefix = prefix
+        if client is None:
+            import redis  # Optional dependency, only needed for this backend
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+
+    def _key(self, session_id, part="state"):
+        return f"{self.prefix}{session_id}:{part}"
+
+    def write_state(self, session_id, text):
+        self.client.set(self._key(session_id), text, ex=self.ttl)
+        self.client.expire(self._key(session_id, "draft"), self.ttl)
+
+    def write_draft(self, session_id, text):
+        if text is None:
+            self.client.delete(self._key(session_id, "draft"))
+        else:
+            self.client.set(self._key(session_id, "draft"), text, ex=self.ttl)
+
+    def touch(self, session_id):
+        self.client.expire(self._key(session_id), self.ttl)
+        self.client.expire(self._key(session_id, "draft"), self.ttl)
+
+    def read(self, session_id):
+        state, draft = self.client.mget([self._key(session_id), self._key(session_id, "draft")])
+        return state, draft
+
+    def read_state(self, session_id):
+        return self.client.get(self._key(session_id))
+
+    def delete(self, session_id):
+        self.client.delete(self._key(session_id), self._key(session_id, "draft"))
+
+    def list_sessions(self):
+        suffix = ":state"
+        return sorted(k[len(self.prefix):-len(suffix)] for k in self.client.scan_iter(match=f"{self.prefix}*{suffix}"))
+
+    def cleanup(self, ttl=None):
+        fixed = 0
+        for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            if self.client.ttl(key) == -1:  # exists but never expires
+                self.client.expire(key, self.ttl if ttl is None else ttl)
+                fixed += 1
+        return fixed
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the subset of redis-py used by RedisSessionBackend
+    (set/mget/delete/expire/ttl/scan_iter). For tests and single-process dev runs.
+    """
+    def __init__(self, clock=time.time):
+        self._data = {}
+        self._expires = {}
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= self._clock():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = value
+            if ex is not None:
+                self._expires[key] = self._clock() + ex
+            else:
+                self._expires.pop(key, None)
+        return True
+
+    def get(self, key):
+        with self._lock:
+            return self._data[key] if self._alive(key) else None
+
+    def mget(self, keys):
+        return [self.get(k) for k in keys]
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._alive(key):
+                    removed += 1
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+            return removed
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if not self._alive(key):
+                return False
+            self._expires[key] = self._clock() + seconds
+            return True
+
+    def ttl(self, key):
+        with self._lock:
+            if not self._alive(key):
+                return -2
+            if key not in self._expires:
+                return -1
+            return int(self._expires[key] - self._clock())
+
+    def scan_iter(self, match="*"):
+        with self._lock:
+            keys = [k for k in list(self._data) if self._alive(k) and fnmatch.fnmatchcase(k, match)]
+        return iter(keys)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def create_backend(name: str = SESSION_BACKEND) -> SessionBackend:
+    """'file' (default), 'sqlite', 'redis' or 'local-redis' (in-process stand-in)."""
+    if name == "sqlite":
+        return SQLiteSessionBackend()
+    if name == "redis":
+        return RedisSessionBackend()
+    if name == "local-redis":
+        return RedisSessionBackend(client=LocalRedis())
+    return FileSessionBackend()
+
+def get_backend() -> SessionBackend:
+    """Process-wide backend selected by SESSION_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+
+if __name__ == "__main__":
+    # Usage: python -m core.session_store cleanup [ttl_seconds]
+    if len(sys.argv) > 1 and sys.argv[1] == "cleanup":
+        ttl = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        backend = get_backend()
+        print(f"{type(backend).__name__}: removed {backend.cleanup(ttl)} expired sessions")
+    else:
+        print("Usage: python -m core.session_store cleanup [ttl_seconds]")
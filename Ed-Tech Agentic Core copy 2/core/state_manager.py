@@ -1,24 +1,167 @@
 import streamlit as st
 import json
 import os
+import time
 import uuid
+import atexit
+import hashlib
+import threading
+from core.config import STATE_SAVE_DEBOUNCE_S, SESSION_CLEANUP_INTERVAL_S, SESSION_DIR
+from core import session_store
+from core.logger import set_log_context
+from core.cost_ledger import ledger
+
+class SessionPersister:
+    """
+    Write-behind persistence for session state.
+    Saves requested within `delay` seconds are coalesced into one write; the
+    draft is stored separately and only rewritten when it changes. Writes go
+    to the configured session backend (see core.session_store); the file
+    backend writes via temp file + os.replace, so a crash never leaves a
+    truncated state file. On backends this process owns, unchanged content is
+    detected from the hashes it last wrote; on shared ones another replica may
+    have written since, so they are compared with the stored state document
+    (which records the draft's hash) instead. Backend I/O happens outside the
+    lock save() takes, so the UI never waits on a slow write.
+    """
+    def __init__(self, backend=None, delay=STATE_SAVE_DEBOUNCE_S):
+        self._backend = backend
+        self.delay = delay
+        self._pending = {}      # session_id -> (state_data, draft)
+        self._written = {}      # (session_id, part) -> sha1 of last content written
+        self._lock = threading.Lock()        # pending snapshots and the timer
+        self._write_lock = threading.Lock()  # serializes backend writes, in snapshot order
+        self._timer = None
+        self.stats = {"requests": 0, "writes": 0, "draft_writes": 0, "coalesced": 0,
+                      "unchanged": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0}
+
+    @property
+    def backend(self):
+        return self._backend or session_store.get_backend()
+
+    def save(self, session_id, state_data, draft, immediate=False):
+        """Queues a snapshot (taken on the caller's thread) and writes it now or after the debounce delay."""
+        with self._lock:
+            self.stats["requests"] += 1
+            if session_id in self._pending:
+                self.stats["coalesced"] += 1
+            self._pending[session_id] = (state_data, draft)
+            if not immediate and self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if immediate:
+            self.flush()
+
+    def flush(self):
+        """Writes every pending snapshot. Safe to call from any thread."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            for session_id, (state_data, draft) in pending.items():
+                self._write(session_id, state_data, draft)
+
+    def discard(self, session_id):
+        with self._write_lock, self._lock:
+            self._pending.pop(session_id, None)
+            self._written.pop((session_id, "state"), None)
+            self._written.pop((session_id, "draft"), None)
+
+    @staticmethod
+    def _stored_hashes(backend, session_id):
+        """(session_id, part) -> sha1, as far as the backend's stored state document tells."""
+        stored = backend.read_state(session_id)
+        if not stored:
+            return {}
+        hashes = {(session_id, "state"): hashlib.sha1(stored.encode("utf-8")).hexdigest()}
+        try:
+            hashes[(session_id, "draft")] = json.loads(stored).get("draft_sha")
+        except (ValueError, AttributeError):
+            pass
+        return hashes
+
+    def _write(self, session_id, state_data, draft):
+        start = time.perf_counter()
+        backend = self.backend
+        try:
+            written = self._stored_hashes(backend, session_id) if backend.shared else self._written
+            draft_sha = hashlib.sha1(draft.encode("utf-8")).hexdigest() if draft else None
+            if (session_id, "draft") not in written or written[(session_id, "draft")] != draft_sha:
+                backend.write_draft(session_id, draft or None)
+                written[(session_id, "draft")] = draft_sha
+                self.stats["draft_writes"] += 1
+
+            text = json.dumps({**state_data, "draft_sha": draft_sha}, indent=2)
+            state_sha = hashlib.sha1(text.encode("utf-8")).hexdigest()
+            if written.get((session_id, "state")) == state_sha:
+                backend.touch(session_id)  # keeps an active session from expiring
+                self.stats["unchanged"] += 1
+            else:
+                backend.write_state(session_id, text)
+                written[(session_id, "state")] = state_sha
+                self.stats["writes"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Error saving state: {e}")
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.stats["total_ms"] += elapsed_ms
+            self.stats["max_ms"] = max(self.stats["max_ms"], elapsed_ms)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        flushes = stats["writes"] + stats["unchanged"]
+        stats["avg_ms"] = stats["total_ms"] / flushes if flushes else 0.0
+        return stats
+
+
+persister = SessionPersister()
+atexit.register(persister.flush)
+_last_cleanup = 0.0
 
 class StateManager:
     @staticmethod
-    def get_state_file():
-        """Returns the path to the current session's state file."""
+    def get_session_id():
         if "session_id" not in st.session_state:
             st.session_state.session_id = str(uuid.uuid4())
+        return st.session_state.session_id
+
+    @staticmethod
+    def get_state_file():
+        """Returns the path to the current session's state file (file backend layout)."""
+        session_id = StateManager.get_session_id()
         
         # Ensure directory exists
-        os.makedirs("storage/sessions", exist_ok=True)
-        return f"storage/sessions/{st.session_state.session_id}.json"
+        os.makedirs(SESSION_DIR, exist_ok=True)
+        return f"{SESSION_DIR}/{session_id}.json"
+
+    @staticmethod
+    def cleanup_expired_sessions(force=False):
+        """Expires idle sessions in the backend, at most once per SESSION_CLEANUP_INTERVAL_S per process."""
+        global _last_cleanup
+        now = time.time()
+        if not force and now - _last_cleanup < SESSION_CLEANUP_INTERVAL_S:
+            return 0
+        _last_cleanup = now
+        try:
+            return persister.backend.cleanup()
+        except Exception as e:
+            print(f"Error cleaning up sessions: {e}")
+            return 0
 
     @staticmethod
     def initialize_state():
         # Ensure session_id exists immediately
         if "session_id" not in st.session_state:
             st.session_state.session_id = str(uuid.uuid4())
+        # API calls made from this script run are attributed to the session in the cost ledger
+        set_log_context(session_id=st.session_state.session_id)
+
+        StateManager.cleanup_expired_sessions()
 
         # Try to load formatted state from disk first
         StateManager.load_from_disk()
@@ -54,18 +197,20 @@ class StateManager:
     @staticmethod
     def navigate_to(view_name):
         st.session_state.view = view_name
-        StateManager.save_to_disk()
+        StateManager.save_to_disk(debounce=True)
         st.rerun()
 
     @staticmethod
     def set_active_file(filename):
         st.session_state.active_file = filename
-        StateManager.save_to_disk()
+        StateManager.save_to_disk(debounce=True)
 
     @staticmethod
-    def add_cost(amount: float):
-        st.session_state.total_cost += amount
-        StateManager.save_to_disk()
+    def refresh_cost():
+        """Sets total_cost to this session's spend in the cost ledger (the clients record every call)."""
+        st.session_state.total_cost = ledger.total(session_id=StateManager.get_session_id())
+        StateManager.save_to_disk(debounce=True)
+        return st.session_state.total_cost
 
     @staticmethod
     def log(message: str):
@@ -75,12 +220,15 @@ class StateManager:
     def save_checkpoint(draft, iteration):
         st.session_state.current_draft = draft
         st.session_state.iteration = iteration
-        StateManager.save_to_disk()
+        StateManager.save_to_disk(debounce=True)
 
     @staticmethod
-    def save_to_disk():
-        """Saves critical session state to a local JSON file."""
-        state_file = StateManager.get_state_file()
+    def save_to_disk(debounce=False):
+        """
+        Saves critical session state to the session backend (draft stored separately).
+        debounce=True queues the write so bursts of updates cost a single write.
+        """
+        session_id = StateManager.get_session_id()
         
         state_data = {
             "session_id": st.session_state.session_id,
@@ -91,32 +239,35 @@ class StateManager:
             "subtopics": st.session_state.get("subtopics", ""),
             "target_audience": st.session_state.get("target_audience", "General Student"),
             "mode": st.session_state.get("mode", "Lecture Notes"),
-            "current_draft": st.session_state.get("current_draft", ""),
             "iteration": st.session_state.get("iteration", 0),
             "generated_mode": st.session_state.get("generated_mode", "Lecture Notes")
         }
-        try:
-            with open(state_file, "w") as f:
-                json.dump(state_data, f, indent=2)
-        except Exception as e:
-            print(f"Error saving state: {e}")
+        persister.save(session_id, state_data, st.session_state.get("current_draft", ""), immediate=not debounce)
+
+    @staticmethod
+    def get_persistence_stats():
+        """Write counts and latency of session saves in this process."""
+        return persister.get_stats()
 
     @staticmethod
     def load_from_disk():
-        """Loads critical session state from local JSON file."""
+        """Loads critical session state from the session backend."""
         # Getting state file will initialize session_id if missing, which is good.
         # However, if we are loading, we might want to load a specific session?
         # For now, we assume implicit session continuity via cookie/streamlit session.
         # If st.session_state is fresh, we get a new session ID, so we won't load old data unless we implement a way to restore session.
         # But per requirements: "Implement session-based isolation." -> This implies isolation is key.
-        state_file = StateManager.get_state_file()
-        
-        if not os.path.exists(state_file):
-            return
+        session_id = StateManager.get_session_id()
             
         try:
-            with open(state_file, "r") as f:
-                saved_state = json.load(f)
+            state_text, draft = persister.backend.read(session_id)
+            if state_text is None:
+                return
+            saved_state = json.loads(state_text)
+
+            # Draft is stored separately; older state files still carry it inline
+            if saved_state.pop("draft_sha", None) and draft is not None:
+                saved_state["current_draft"] = draft
             
             # Restore values into session state
             for key, value in saved_state.items():
@@ -127,13 +278,13 @@ class StateManager:
 
     @staticmethod
     def clear_session():
-        """Clears the current session data from disk and memory."""
-        state_file = StateManager.get_state_file()
-        if os.path.exists(state_file):
-            try:
-                os.remove(state_file)
-            except Exception as e:
-                print(f"Error deleting state file: {e}")
+        """Clears the current session data from the backend and memory."""
+        session_id = StateManager.get_session_id()
+        persister.discard(session_id)
+        try:
+            persister.backend.delete(session_id)
+        except Exception as e:
+            print(f"Error deleting session state: {e}")
         
         # Clear Session State (keep necessary keys if needed, or just clear all)
         # We should keep session_id to generate a fresh one or just clear.
@@ -1,5 +1,5 @@
 import os
-import instructor
+import time
 import anthropic
 from dotenv import load_dotenv
 from typing import Type, TypeVar, Optional, Tuple
@@ -7,6 +7,11 @@ from pydantic import BaseModel
 from core.logger import logger
 from core.utils import retry_with_backoff
 from core.rate_limiter import limiter
+from core.tokens import calibrator
+from core.client import budget_prompt, prompt_tokens, usage_attributes
+from core.tracing import tracer
+from core import metrics
+from core.cost_ledger import ledger, calculate_cost
 
 # Load environment variables
 load_dotenv()
@@ -14,13 +19,14 @@ load_dotenv()
 T = TypeVar("T", bound=BaseModel)
 
 class StructuredClient:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, http_client=None):
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found.")
         
-        # Initialize the instructor client wrapping AsyncAnthropic
-        self.client = instructor.from_anthropic(anthropic.AsyncAnthropic(api_key=self.api_key))
+        # Initialize the instructor client wrapping AsyncAnthropic (imported here, not at module load)
+        import instructor
+        self.client = instructor.from_anthropic(anthropic.AsyncAnthropic(api_key=self.api_key, http_client=http_client))
 
     @retry_with_backoff(exceptions=(anthropic.APIConnectionError, anthropic.RateLimitError, anthropic.APIError))
     async def generate_structured(
@@ -31,90 +37,104 @@ class StructuredClient:
         model: str = "claude-3-5-sonnet-20240620",
         max_tokens: int = 4096,
         temperature: float = 0.0,
-        cache_content: Optional[str] = None
+        cache_content: Optional[str] = None,
+        agent=None
     ) -> Tuple[Optional[T], int, int, float]:
         """
         Generates a structured response based on the provided Pydantic model.
+        With `agent`, the prompt is checked (and possibly trimmed) against that agent's token budget.
         Returns: (parsed_object, input_tokens, output_tokens, cost)
         """
-        try:
-            # Construct messages to support caching
-            messages = []
-            if cache_content:
-                # We must put the Transcript FIRST to ensure the prefix matches across requests
-                messages.append({
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": cache_content,
-                            "cache_control": {"type": "ephemeral"} 
-                        },
-                        {
-                            "type": "text",
-                            "text": "\n\n" + user_content
-                        }
-                    ]
-                })
-            else:
-                messages.append({"role": "user", "content": user_content})
+        with tracer.span("llm.structured", kind="client", model=model,
+                         response_model=getattr(response_model, "__name__", str(response_model))) as span:
+            start = None
+            user_content, estimate = budget_prompt(agent, system_prompt, user_content, cache_content)
+            try:
+                # Construct messages to support caching
+                messages = []
+                if cache_content:
+                    # We must put the Transcript FIRST to ensure the prefix matches across requests
+                    messages.append({
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": cache_content,
+                                "cache_control": {"type": "ephemeral"} 
+                            },
+                            {
+                                "type": "text",
+                                "text": "\n\n" + user_content
+                            }
+                        ]
+                    })
+                else:
+                    messages.append({"role": "user", "content": user_content})
 
-            # Using the patch, we invoke chat.completions.create
-            # Acquire Rate Limit Token
-            await limiter.acquire()
+                # Using the patch, we invoke chat.completions.create
+                # Acquire Rate Limit Token
+                wait_start = time.perf_counter()
+                await limiter.acquire(calibrator.predict(model, estimate))
+                span.set(queue_wait_ms=round((time.perf_counter() - wait_start) * 1000, 1))
 
-            resp, completion = await self.client.chat.completions.create_with_completion(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                response_model=response_model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    *messages
-                ]
-            )
+                start = time.perf_counter()
+                resp, completion = await self.client.chat.completions.create_with_completion(
+                    model=model,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    response_model=response_model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        *messages
+                    ]
+                )
             
-            # Extract usage from the raw completion object if available
-            # validation for anthropic usage in instructor might vary, usually it's in usage
-            input_tokens = completion.usage.input_tokens
-            output_tokens = completion.usage.output_tokens
+                # Extract usage from the raw completion object if available
+                # validation for anthropic usage in instructor might vary, usually it's in usage
+                input_tokens = completion.usage.input_tokens
+                output_tokens = completion.usage.output_tokens
             
-            cost = self.calculate_cost(input_tokens, output_tokens, model)
+                cost = self._log_call(model, start, input_tokens, output_tokens, response_model, estimate=estimate,
+                                      prompt_tokens=prompt_tokens(completion.usage), usage=completion.usage, agent=agent)
+                span.set(cost=cost, **usage_attributes(completion.usage))
             
-            return resp, input_tokens, output_tokens, cost
+                return resp, input_tokens, output_tokens, cost
 
-        except Exception as e:
-            logger.error(f"Structured generation failed: {e}")
-            # Depending on severity, we might want to return None or re-raise.
-            # For this app, return None letting Orchestrator handle it.
-            return None, 0, 0, 0.0
+            except Exception as e:
+                span.fail(e)
+                if start is not None:  # failed after the request was sent
+                    self._log_call(model, start, 0, 0, response_model, estimate=estimate, error=e, agent=agent)
+                logger.error(f"Structured generation failed: {e}")
+                # Depending on severity, we might want to return None or re-raise.
+                # For this app, return None letting Orchestrator handle it.
+                return None, 0, 0, 0.0
 
-    def calculate_cost(self, input_tokens: int, output_tokens: int, model: str) -> float:
+    def _log_call(self, model, start, input_tokens, output_tokens, response_model, estimate=0, prompt_tokens=0,
+                  error=None, usage=None, agent=None):
         """
-        Calculates cost. Duplicated from client.py or imported. 
-         Ideally logic should be centralized.
+        One structured 'llm_call' record per API call (see core.log_analytics), also counted in
+        core.metrics and appended to the cost ledger, which prices it. Returns the call's cost.
         """
-        # Pricing table (INR Rates) - centralized logic preferred but copying for now strictly as requested in plan (new file).
-        # Actually, let's just import it if possible, but circular imports might be an issue.
-        # Let's keep it simple and consistent with client.py
-        pricing = {
-            "claude-sonnet-4-5-20250929": {"input": 300.0, "output": 1500.0},
-            "claude-haiku-4-5-20251001": {"input": 100.0, "output": 500.0},
-            "claude-opus-4-5-20251101": {"input": 500.0, "output": 2500.0},
-            "claude-3-haiku-20240307": {"input": 25.0, "output": 125.0},
-            "sonnet": {"input": 300.0, "output": 1500.0},
-            "haiku": {"input": 25.0, "output": 125.0},
-            "opus": {"input": 500.0, "output": 2500.0},
-        }
-        
-        rates = None
-        if model in pricing:
-            rates = pricing[model]
-        else:
-             if "opus" in model: rates = pricing["opus"]
-             elif "sonnet" in model: rates = pricing["sonnet"] 
-             elif "haiku" in model: rates = pricing["haiku"]
-             else: rates = pricing["sonnet"]
-        
-        cost = (input_tokens / 1_000_000 * rates["input"]) + (output_tokens / 1_000_000 * rates["output"])
-        return round(cost, 6)
+        latency = time.perf_counter() - start
+        predicted = calibrator.predict(model, estimate)  # before observe(), so it's a true prediction
+        calibrator.observe(model, estimate, prompt_tokens)
+        cost = ledger.record_usage("structured", model, usage, ok=error is None, agent=getattr(agent, "name", None))
+        metrics.record_api_call("structured", model, latency, input_tokens, output_tokens, cost, error is None, usage)
+        logger.info("LLM call", extra={"props": {
+            "event": "llm_call",
+            "call": "structured",
+            "response_model": getattr(response_model, "__name__", str(response_model)),
+            "model": model,
+            "latency_ms": round(latency * 1000, 1),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "predicted_input_tokens": predicted,
+            "prompt_tokens": prompt_tokens,
+            "cost": cost,
+            "ok": error is None,
+        }})
+        return cost
+
+    def calculate_cost(self, input_tokens: int, output_tokens: int, model: str) -> float:
+        """Calculates cost in INR (₹); same pricing as AnthropicClient (core.cost_ledger)."""
+        return calculate_cost(input_tokens, output_tokens, model)
@@ -0,0 +1,136 @@
+import os
+import json
+import atexit
+import functools
+import threading
+from core.logger import logger
+from core.config import TOKEN_CALIBRATION_PATH
+
+CHARS_PER_TOKEN = 4  # Same heuristic the orchestrator uses for streamed calls
+
+@functools.lru_cache(maxsize=1)
+def _get_encoder():
+    """Loads tiktoken's cl100k_base once. Returns None if unavailable (offline, not installed)."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, falling back to char heuristic: {e}")
+        return None
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local token estimate for Claude prompts.
+    cl100k_base is not Claude's tokenizer but tracks it closely for English prose.
+    """
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    return len(encoder.encode(text, disallowed_special=()))
+
+MESSAGE_OVERHEAD_TOKENS = 8  # Role/format tokens per message block the API adds around the text
+
+def estimate_prompt_tokens(system_prompt: str, user_content: str, cache_content: str = None) -> int:
+    """Raw (uncalibrated) estimate of the input tokens for one call."""
+    total = estimate_tokens(system_prompt) + estimate_tokens(user_content) + 2 * MESSAGE_OVERHEAD_TOKENS
+    if cache_content:
+        total += estimate_tokens(cache_content) + MESSAGE_OVERHEAD_TOKENS
+    return total
+
+def trim_to_tokens(text: str, max_tokens: int, marker: str = "\n\n[... {n} tokens omitted to fit the prompt budget ...]\n\n") -> str:
+    """
+    Cuts the middle of text so its estimate fits max_tokens, keeping the head
+    and tail (templates put instructions at both ends).
+    """
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    keep_chars = max(0, int(len(text) * max_tokens / tokens))
+    head = keep_chars * 2 // 3
+    tail = keep_chars - head
+    omitted = tokens - max_tokens
+    return text[:head] + marker.format(n=omitted) + (text[-tail:] if tail else "")
+
+class TokenCalibrator:
+    """
+    Learns, per model, the ratio between our raw estimate and the input tokens
+    the API reports (exponential moving average), so predictions converge on
+    Claude's real tokenizer. Persisted to `path` so new processes start calibrated.
+    """
+    ALPHA = 0.2
+    MIN_RATIO, MAX_RATIO = 0.5, 3.0
+
+    def __init__(self, path: str = None, save_every: int = 10):
+        self.path = path
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._models = {}   # model -> {"ratio", "calls", "abs_error"}
+        self._unsaved = 0
+        self._load()
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._models = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable token calibration {self.path}: {e}")
+
+    def save(self):
+        if not self.path or not self._unsaved:
+            return
+        with self._lock:
+            data = json.dumps(self._models, indent=2)
+            self._unsaved = 0
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Failed to save token calibration: {e}")
+
+    def ratio(self, model: str) -> float:
+        entry = self._models.get(model)
+        return entry["ratio"] if entry else 1.0
+
+    def predict(self, model: str, raw_tokens: int) -> int:
+        return int(round(raw_tokens * self.ratio(model)))
+
+    def observe(self, model: str, raw_tokens: int, actual_tokens: int):
+        """Feeds back the API-reported input tokens for a call whose raw estimate was raw_tokens."""
+        if not raw_tokens or not actual_tokens:
+            return
+        with self._lock:
+            entry = self._models.setdefault(model, {"ratio": 1.0, "calls": 0, "abs_error": 0.0})
+            predicted = raw_tokens * entry["ratio"]
+            entry["abs_error"] += abs(predicted - actual_tokens) / actual_tokens
+            sample = min(max(actual_tokens / raw_tokens, self.MIN_RATIO), self.MAX_RATIO)
+            # First sample replaces the default; later ones are smoothed
+            entry["ratio"] = sample if entry["calls"] == 0 else (1 - self.ALPHA) * entry["ratio"] + self.ALPHA * sample
+            entry["calls"] += 1
+            self._unsaved += 1
+            should_save = self._unsaved >= self.save_every
+        if should_save:
+            self.save()
+
+    def stats(self):
+        """{model: {'ratio', 'calls', 'mean_abs_error_pct'}}."""
+        with self._lock:
+            return {
+                model: {
+                    "ratio": round(e["ratio"], 3),
+                    "calls": e["calls"],
+                    "mean_abs_error_pct": round(100 * e["abs_error"] / e["calls"], 1) if e["calls"] else 0.0,
+                }
+                for model, e in self._models.items()
+            }
+
+calibrator = TokenCalibrator(TOKEN_CALIBRATION_PATH)
+atexit.register(calibrator.save)
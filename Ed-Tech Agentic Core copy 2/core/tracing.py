@@ -0,0 +1,294 @@
+"""
+Lightweight tracing: nested, timed spans for run -> node -> client call -> attempt.
+
+    with tracer.span("node.editor", kind="node") as span:
+        ...
+        span.set(replacements=len(resp.replacements))
+
+The current span lives in a context variable, so spans opened inside tasks
+started with asyncio.gather nest under the span that was current when the
+task was created. When a root span ends, its whole trace is appended to
+logs/traces/traces_{date}.jsonl (flat spans, or OTLP/JSON with
+TRACE_FORMAT=otlp) and, for runs, a flame-style summary is printed.
+
+    python -m core.tracing                     # summarize the last trace of today's file
+    python -m core.tracing logs/traces/traces_2026-10-19.jsonl --last 5
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from core.config import TRACE_ENABLED, TRACE_DIR, TRACE_FORMAT, TRACE_PRINT_SUMMARY
+from core.logger import logger
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# OTLP span kinds; anything that is not an outgoing API call is INTERNAL
+_OTLP_KIND = {"client": 3}
+_MAX_OPEN_TRACES = 256  # Traces whose root never ended (abandoned generators) are dropped beyond this
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "attributes", "start_ns", "_t0",
+                 "duration_ms", "error")
+
+    def __init__(self, name: str, kind: str = "internal", parent: Optional["Span"] = None, attributes=None):
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self._t0 = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, key: str, value: float):
+        """Accumulates a numeric attribute (e.g. rate-limit wait over several acquires)."""
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def fail(self, error):
+        """Marks the span failed when the caller handles the exception itself."""
+        self.error = f"{type(error).__name__}: {error}"[:300] if isinstance(error, BaseException) else str(error)[:300]
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+class _NoopSpan:
+    """Returned when tracing is disabled, so call sites never branch."""
+    trace_id = span_id = None
+
+    def set(self, **attributes):
+        pass
+
+    def add(self, key, value):
+        pass
+
+    def fail(self, error):
+        pass
+
+_NOOP = _NoopSpan()
+
+def current_span():
+    """The innermost open span of this task, or a no-op span."""
+    return _current_span.get() or _NOOP
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def to_otlp(spans: List[Dict]) -> Dict:
+    """One trace as an OTLP/JSON ExportTraceServiceRequest (what OTLP file exporters write per line)."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "edtech-agentic-core"}}]},
+        "scopeSpans": [{"scope": {"name": "core.tracing"}, "spans": [{
+            "traceId": s["trace_id"],
+            "spanId": s["span_id"],
+            "parentSpanId": s["parent_id"] or "",
+            "name": s["name"],
+            "kind": _OTLP_KIND.get(s["kind"], 1),
+            "startTimeUnixNano": str(s["start_ns"]),
+            "endTimeUnixNano": str(s["start_ns"] + int(s["duration_ms"] * 1e6)),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s["attributes"].items()]
+                          + [{"key": "span.kind", "value": {"stringValue": s["kind"]}}],
+            "status": {"code": 2, "message": s["error"]} if s["error"] else {"code": 1},
+        } for s in spans]}],
+    }]}
+
+def from_otlp(doc: Dict) -> List[Dict]:
+    """Inverse of to_otlp, for summarizing exported files."""
+    spans = []
+    for resource in doc.get("resourceSpans", []):
+        for scope in resource.get("scopeSpans", []):
+            for s in scope.get("spans", []):
+                attributes = {a["key"]: next(iter(a["value"].values())) for a in s.get("attributes", [])}
+                start = int(s["startTimeUnixNano"])
+                spans.append({
+                    "trace_id": s["traceId"], "span_id": s["spanId"], "parent_id": s.get("parentSpanId") or None,
+                    "name": s["name"], "kind": attributes.pop("span.kind", "internal"), "start_ns": start,
+                    "duration_ms": (int(s["endTimeUnixNano"]) - start) / 1e6,
+                    "error": s.get("status", {}).get("message"), "attributes": attributes,
+                })
+    return spans
+
+# Attributes worth showing next to a span in the summary, in this order
+_SUMMARY_ATTRS = ("model", "input_tokens", "output_tokens", "cache_read_tokens", "queue_wait_ms", "ttft_ms", "attempt",
+                  "applied", "cost")
+
+def format_summary(spans: List[Dict], width: int = 24) -> str:
+    """
+    Flame-style tree of one trace. Sibling spans with the same name are merged
+    (e.g. 20 Checker calls show as one line with x20), durations are summed and
+    the bar is relative to the root span.
+    """
+    if not spans:
+        return ""
+    children = {}
+    for s in sorted(spans, key=lambda s: s["start_ns"]):
+        children.setdefault(s["parent_id"], []).append(s)
+    ids = {s["span_id"] for s in spans}
+    roots = [s for s in spans if s["parent_id"] not in ids]
+    total = sum(s["duration_ms"] for s in roots) or 1.0
+    root = roots[0]
+    lines = [f"Trace {root['trace_id'][:8]}  {root['name']}  {total / 1000:.2f}s"
+             + (f"  cost {root['attributes']['cost']:.4f}" if "cost" in root["attributes"] else "")]
+
+    def walk(group: List[Dict], depth: int):
+        merged = OrderedDict()
+        for s in group:
+            merged.setdefault(s["name"], []).append(s)
+        for name, same in merged.items():
+            duration = sum(s["duration_ms"] for s in same)
+            errors = sum(1 for s in same if s["error"])
+            attrs = same[0]["attributes"] if len(same) == 1 else _sum_attributes(same)
+            shown = "  ".join(f"{k}={_fmt(attrs[k])}" for k in _SUMMARY_ATTRS if k in attrs)
+            bar = "#" * max(1, round(width * min(duration / total, 1.0)))
+            label = ("  " * depth + name + (f" x{len(same)}" if len(same) > 1 else ""))[:40]
+            lines.append(f"{label:<40} {duration / 1000:8.2f}s {bar:<{width}} {100 * duration / total:5.1f}%"
+                         + (f"  {shown}" if shown else "") + (f"  errors={errors}" if errors else ""))
+            walk([c for s in same for c in children.get(s["span_id"], [])], depth + 1)
+
+    walk(roots, 0)
+    return "\n".join(lines)
+
+def _sum_attributes(spans: List[Dict]) -> Dict:
+    merged = {}
+    for s in spans:
+        for k, v in s["attributes"].items():
+            if isinstance(v, (int, float)) and not isinstance(v, bool) and k != "attempt":
+                merged[k] = merged.get(k, 0) + v
+            else:
+                merged.setdefault(k, v)
+    return merged
+
+def _fmt(value):
+    return f"{value:.4g}" if isinstance(value, float) else value
+
+class Tracer:
+    """
+    Collects finished spans per trace and exports the trace when its root span ends.
+    Thread-safe: Streamlit sessions and batch workers share the singleton.
+    """
+    def __init__(self, enabled: bool = TRACE_ENABLED, directory: str = TRACE_DIR, fmt: str = TRACE_FORMAT,
+                 print_summary: bool = TRACE_PRINT_SUMMARY):
+        self.enabled = enabled
+        self.directory = directory
+        self.format = fmt
+        self.print_summary = print_summary
+        self._open = OrderedDict()  # trace_id -> finished spans of a trace whose root is still open
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes):
+        if not self.enabled:
+            yield _NOOP
+            return
+        span = Span(name, kind, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except (GeneratorExit, asyncio.CancelledError):
+            span.set(cancelled=True)  # Consumer stopped early; not an error
+            raise
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:  # Generator finalized from another context
+                pass
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        span.duration_ms = round((time.perf_counter() - span._t0) * 1000, 3)
+        with self._lock:
+            spans = self._open.setdefault(span.trace_id, [])
+            spans.append(span.to_dict())
+            if span.parent_id is not None:
+                while len(self._open) > _MAX_OPEN_TRACES:
+                    self._open.popitem(last=False)
+                return
+            del self._open[span.trace_id]
+        self.export(spans)
+        if self.print_summary and span.kind == "run":
+            print(format_summary(spans))
+
+    def export(self, spans: List[Dict]):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"traces_{time.strftime('%Y-%m-%d')}.jsonl")
+            if self.format == "otlp":
+                lines = [json.dumps(to_otlp(spans), default=str)]
+            else:
+                lines = [json.dumps(s, default=str) for s in spans]
+            with self._lock, open(path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except Exception as e:
+            logger.error(f"Failed to export trace: {e}")
+
+def load_traces(path: str) -> Dict[str, List[Dict]]:
+    """Spans grouped by trace id (in file order) from either export format."""
+    traces = OrderedDict()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            doc = json.loads(line)
+            for s in (from_otlp(doc) if "resourceSpans" in doc else [doc]):
+                traces.setdefault(s["trace_id"], []).append(s)
+    return traces
+
+# Singleton instance
+tracer = Tracer()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flame-style summaries of exported traces")
+    parser.add_argument("path", nargs="?", default=os.path.join(TRACE_DIR, f"traces_{time.strftime('%Y-%m-%d')}.jsonl"))
+    parser.add_argument("--last", type=int, default=1, help="Number of most recent traces")
+    parser.add_argument("--trace", help="Trace id (or prefix) to show")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"No trace file at {args.path}")
+        return 1
+    traces = load_traces(args.path)
+    if args.trace:
+        selected = [spans for trace_id, spans in traces.items() if trace_id.startswith(args.trace)]
+    else:
+        selected = list(traces.values())[-args.last:]
+    if not selected:
+        print("No matching traces")
+        return 1
+    print("\n\n".join(format_summary(spans) for spans in selected))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,8 @@ import json
 import re
 from datetime import datetime
 import logging
+from core.tracing import tracer
+from core import metrics
 
 logger = logging.getLogger("EdTechCore")
 
@@ -22,32 +24,42 @@ def retry_with_backoff(retries=3, base_delay=1, backoff_factor=2, exceptions=(Ex
             last_exception = None
             for i in range(retries):
                 try:
-                    return await func(*args, **kwargs)
+                    with tracer.span("attempt", kind="attempt", func=func.__name__, attempt=i + 1):
+                        return await func(*args, **kwargs)
                 except exceptions as e:
                     last_exception = e
-                    logger.warning(f"Retry {i+1}/{retries} for {func.__name__} due to: {e}")
+                    metrics.retries.inc(func=func.__name__)
+                    logger.warning(f"Retry {i+1}/{retries} for {func.__name__} due to: {e}", extra={"props": {
+                        "event": "retry", "func": func.__name__, "attempt": i + 1, "error": type(e).__name__
+                    }})
                     if i == retries - 1:
                         break
-                    await asyncio.sleep(delay + random.uniform(0, 0.1))
+                    with tracer.span("backoff", kind="attempt", attempt=i + 1):
+                        await asyncio.sleep(delay + random.uniform(0, 0.1))
                     delay *= backoff_factor
             if last_exception:
                 raise last_exception
         return wrapper
     return decorator
 
+def split_subtopics(subtopics):
+    """Splits a comma/semicolon/newline separated subtopic string into a clean list."""
+    if not subtopics:
+        return []
+    parts = re.split(r"[,;\n]", subtopics)
+    return [p.strip() for p in parts if p.strip()]
+
 def get_timestamp_filename(prefix, ext):
     """Generates a filename with current timestamp."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     return f"{prefix}_{timestamp}.{ext}"
 
-def save_markdown_file(content, filename):
-    """Saves string content to 'outputs/' directory."""
+def save_markdown_file(content, filename, topic=""):
+    """Saves string content to 'outputs/' directory (deduplicated through the artifact store)."""
+    from core.artifact_store import ArtifactStore
     output_dir = os.path.join(os.getcwd(), "outputs")
-    os.makedirs(output_dir, exist_ok=True)
     filepath = os.path.join(output_dir, filename)
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(content)
-    return filepath
+    return ArtifactStore.write_file(filepath, content, topic=topic, kind="markdown")
 
 def save_metadata(metadata, filename):
     """Saves dictionary as JSON to 'outputs/' directory."""
@@ -59,13 +71,13 @@ def save_metadata(metadata, filename):
     return filepath
 
 def save_excel(data, filename):
-    """Saves list of dicts to Excel in 'outputs/' directory."""
-    import pandas as pd
+    """Streams a list of dicts to Excel in 'outputs/' directory (columns in first-seen key order)."""
+    from core.assignment_exporter import write_xlsx_rows
     output_dir = os.path.join(os.getcwd(), "outputs")
     os.makedirs(output_dir, exist_ok=True)
     filepath = os.path.join(output_dir, filename)
-    df = pd.DataFrame(data)
-    df.to_excel(filepath, index=False)
+    columns = list(dict.fromkeys(key for row in data for key in row))
+    write_xlsx_rows(([row.get(col) for col in columns] for row in data), filepath, columns)
     return filepath
 
 def clean_meta_commentary(text: str) -> str:
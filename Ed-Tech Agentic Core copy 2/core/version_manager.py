@@ -1,25 +1,358 @@
 import os
+import sys
 import json
 import time
 import uuid
+import zlib
+import difflib
+import threading
+from collections import OrderedDict
+from core.artifact_store import ArtifactStore
+
+INDEX_FILE = "index.json"
+BLOB_DIR = "blobs"
+SNAPSHOT_INTERVAL = 10      # Every Nth version of a chain is stored in full
+RECONSTRUCT_CACHE_SIZE = 8  # Reconstructed versions kept in memory (LRU)
 
 class VersionManager:
     """
     Manages version control for generated content.
-    Stores versions as JSON files in 'storage/versions/{topic_sanitized}'.
+    Layout per topic in 'storage/versions/{topic_sanitized}':
+      - index.json: metadata only (version_id, timestamp, mode, summary, size), newest first
+      - blobs/{version_id}.z: zlib-compressed line delta against the previous version
+        ('kind' / 'base' / 'depth' in the index; compaction writes new names, kept in 'blob')
+    Full snapshots live in the shared ArtifactStore ('digest' in the index), so
+    identical content (e.g. a restored version saved again) is stored once.
+    Listing reads only the index; restoring applies at most SNAPSHOT_INTERVAL deltas.
+    Legacy one-JSON-per-version files are migrated on first access.
     """
-    
+
+    # In-process index cache: path -> (mtime_ns, entries, {version_id: entry}). Sidebar reruns hit this.
+    _index_cache = {}
+    # (version_dir, version_id) -> content for recently reconstructed versions
+    _content_cache = OrderedDict()
+    _lock = threading.RLock()
+
     @staticmethod
     def get_version_dir(topic):
         # Sanitize topic for directory name
         safe_topic = "".join([c if c.isalnum() else "_" for c in topic]).strip().lower()[:50]
         # Use a fallback if empty
-        if not safe_topic: center_topic = "untitled"
-        
+        if not safe_topic: safe_topic = "untitled"
+
         path = f"storage/versions/{safe_topic}"
         os.makedirs(path, exist_ok=True)
         return path
 
+    # ==========================
+    # Index helpers
+    # ==========================
+
+    @staticmethod
+    def _index_path(version_dir):
+        return os.path.join(version_dir, INDEX_FILE)
+
+    @staticmethod
+    def _blob_path(version_dir, version_id, ext="z"):
+        return os.path.join(version_dir, BLOB_DIR, f"{version_id}.{ext}")
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp_path = f"{path}.tmp"
+        if isinstance(data, bytes):
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _load_index(version_dir):
+        """Returns index entries (newest first), using the cache while index.json is unchanged."""
+        index_path = VersionManager._index_path(version_dir)
+        try:
+            mtime = os.stat(index_path).st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        cached = VersionManager._index_cache.get(index_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except Exception as e:
+            print(f"Error reading version index: {e}")
+            return []
+
+        VersionManager._index_cache[index_path] = (mtime, entries, {e["version_id"]: e for e in entries})
+        return entries
+
+    @staticmethod
+    def _get_entry(version_dir, version_id):
+        VersionManager._load_index(version_dir)  # refreshes the cache if index.json changed
+        cached = VersionManager._index_cache.get(VersionManager._index_path(version_dir))
+        return cached[2].get(version_id) if cached else None
+
+    @staticmethod
+    def _save_index(version_dir, entries):
+        entries.sort(key=lambda x: (x.get("timestamp", ""), x.get("created", 0)), reverse=True)
+        index_path = VersionManager._index_path(version_dir)
+        VersionManager._write_atomic(index_path, json.dumps(entries, indent=2))
+        VersionManager._index_cache[index_path] = (
+            os.stat(index_path).st_mtime_ns, entries, {e["version_id"]: e for e in entries}
+        )
+
+    # ==========================
+    # Delta storage
+    # ==========================
+
+    @staticmethod
+    def _make_delta(base, target):
+        """Line delta: [start, end] copies base lines, a string inserts new text."""
+        a = base.splitlines(keepends=True)
+        b = target.splitlines(keepends=True)
+        ops = []
+        for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+            if tag == "equal":
+                ops.append([i1, i2])
+            elif j2 > j1:
+                ops.append("".join(b[j1:j2]))
+        return ops
+
+    @staticmethod
+    def _apply_delta(base, ops):
+        a = base.splitlines(keepends=True)
+        out = []
+        for op in ops:
+            if isinstance(op, list):
+                out.extend(a[op[0]:op[1]])
+            else:
+                out.append(op)
+        return "".join(out)
+
+    @staticmethod
+    def _encode(content, parent=None, parent_content=None):
+        """
+        Returns (index_fields, delta_payload) for content stored after parent.
+        A full snapshot goes to the ArtifactStore (payload None) when the chain is
+        SNAPSHOT_INTERVAL long or the delta would not be smaller than the content itself.
+        """
+        full = zlib.compress(content.encode("utf-8"), 9)
+        if parent is not None and parent_content is not None:
+            depth = parent.get("depth", 0) + 1
+            if depth < SNAPSHOT_INTERVAL:
+                ops = VersionManager._make_delta(parent_content, content)
+                delta = zlib.compress(json.dumps(ops, separators=(",", ":")).encode("utf-8"), 9)
+                if len(delta) < len(full):
+                    return {"kind": "delta", "base": parent["version_id"], "depth": depth}, delta
+        return {"kind": "full", "base": None, "depth": 0, "digest": ArtifactStore.put(content)}, None
+
+    @staticmethod
+    def _read_payload(version_dir, entry):
+        if entry.get("digest"):
+            content = ArtifactStore.get(entry["digest"])
+            if content is None:
+                raise FileNotFoundError(f"Missing object {entry['digest']}")
+            return content
+        if entry.get("kind") in ("full", "delta"):
+            blob = entry.get("blob") or f"{entry['version_id']}.z"
+            with open(os.path.join(version_dir, BLOB_DIR, blob), "rb") as f:
+                return zlib.decompress(f.read()).decode("utf-8")
+        # Uncompressed blob written before delta storage
+        with open(VersionManager._blob_path(version_dir, entry["version_id"], ext="txt"), "r", encoding="utf-8") as f:
+            return f.read()
+
+    @staticmethod
+    def _cache_put(version_dir, version_id, content):
+        key = (version_dir, version_id)
+        VersionManager._content_cache[key] = content
+        VersionManager._content_cache.move_to_end(key)
+        while len(VersionManager._content_cache) > RECONSTRUCT_CACHE_SIZE:
+            VersionManager._content_cache.popitem(last=False)
+
+    @staticmethod
+    def _get_content(version_dir, version_id):
+        """Rebuilds a version by walking back to the nearest snapshot (or cached version)."""
+        chain, content = [], None
+        current_id = version_id
+        while current_id:
+            key = (version_dir, current_id)
+            if key in VersionManager._content_cache:
+                VersionManager._content_cache.move_to_end(key)
+                content = VersionManager._content_cache[key]
+                break
+            entry = VersionManager._get_entry(version_dir, current_id)
+            if entry is None:
+                return None
+            if entry.get("kind") != "delta":
+                content = VersionManager._read_payload(version_dir, entry)
+                break
+            chain.append(entry)
+            current_id = entry["base"]
+
+        if content is None:
+            return None
+        for entry in reversed(chain):
+            content = VersionManager._apply_delta(content, json.loads(VersionManager._read_payload(version_dir, entry)))
+        VersionManager._cache_put(version_dir, version_id, content)
+        return content
+
+    @staticmethod
+    def _append(version_dir, entry, content):
+        """Stores content as the newest version, delta-encoded against the current head."""
+        content = content or ""
+        with VersionManager._lock:
+            entries = list(VersionManager._load_index(version_dir))
+            parent = entries[0] if entries else None
+            parent_content = VersionManager._get_content(version_dir, parent["version_id"]) if parent else None
+            fields, payload = VersionManager._encode(content, parent, parent_content)
+            entry.update(fields)
+
+            # Blob first: an index entry must never point at a missing blob
+            if payload is not None:
+                os.makedirs(os.path.join(version_dir, BLOB_DIR), exist_ok=True)
+                VersionManager._write_atomic(VersionManager._blob_path(version_dir, entry["version_id"]), payload)
+            entries.append(entry)
+            VersionManager._save_index(version_dir, entries)
+            VersionManager._cache_put(version_dir, entry["version_id"], content)
+
+    # ==========================
+    # Migration & Compaction
+    # ==========================
+
+    @staticmethod
+    def migrate_legacy(version_dir):
+        """
+        Moves legacy '{epoch}_{id}.json' version files (content inline) into
+        index + blob storage, oldest first so the deltas chain in order. A file
+        that cannot be parsed is renamed to '.json.corrupt' so it is reported
+        once, not on every listing. Returns the number of versions migrated.
+        """
+        legacy_files = [f for f in os.listdir(version_dir) if f.endswith(".json") and f != INDEX_FILE]
+        if not legacy_files:
+            return 0
+
+        with VersionManager._lock:
+            known_ids = {e["version_id"] for e in VersionManager._load_index(version_dir)}
+            migrated = 0
+
+            # '{epoch}_{id}.json' sorts chronologically
+            for f in sorted(legacy_files):
+                full_path = os.path.join(version_dir, f)
+                try:
+                    with open(full_path, "r", encoding="utf-8") as file:
+                        data = json.load(file)
+                    version_id = data["version_id"]
+                except (ValueError, KeyError, TypeError) as e:
+                    os.replace(full_path, full_path + ".corrupt")
+                    print(f"Error migrating version {f}: {e} (moved aside to {f}.corrupt)")
+                    continue
+                try:
+                    if version_id not in known_ids:
+                        content = data.get("content", "")
+                        VersionManager._append(version_dir, {
+                            "version_id": version_id,
+                            "timestamp": data.get("timestamp", ""),
+                            "created": int(f.split("_")[0]) if f.split("_")[0].isdigit() else 0,
+                            "topic": data.get("topic", ""),
+                            "mode": data.get("mode", ""),
+                            "summary": data.get("summary", ""),
+                            "size": len(content or "")
+                        }, content)
+                        known_ids.add(version_id)
+                        migrated += 1
+                    os.remove(full_path)
+                except Exception as e:
+                    print(f"Error migrating version {f}: {e}")
+        return migrated
+
+    @staticmethod
+    def migrate_all(root="storage/versions"):
+        """Migrates every topic directory under root. Returns {topic_dir: migrated_count}."""
+        if not os.path.exists(root):
+            return {}
+        results = {}
+        for name in sorted(os.listdir(root)):
+            path = os.path.join(root, name)
+            if os.path.isdir(path):
+                results[name] = VersionManager.migrate_legacy(path)
+        return results
+
+    @staticmethod
+    def _dir_size(path):
+        return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+    @staticmethod
+    def compact(version_dir):
+        """
+        Rewrites every version of a topic as snapshot + delta chains in
+        chronological order (migrating legacy files and .txt blobs on the way).
+        New deltas are written under fresh blob names and the index is swapped
+        before any old blob is removed, so an interrupted compaction leaves the
+        old history intact. Returns (bytes_before, bytes_after): the topic's
+        directory plus the snapshot objects its index references, before and after.
+        """
+        digests = {e["digest"] for e in VersionManager._load_index(version_dir) if e.get("digest")}
+        bytes_before = VersionManager._dir_size(version_dir) + sum(ArtifactStore.object_size(d) for d in digests)
+
+        with VersionManager._lock:
+            VersionManager.migrate_legacy(version_dir)
+            old_entries = VersionManager._load_index(version_dir)
+            chronological = sorted(old_entries, key=lambda x: (x.get("timestamp", ""), x.get("created", 0)))
+
+            generation = uuid.uuid4().hex[:8]
+            new_entries, payloads = [], {}
+            parent, parent_content = None, None
+            for old in chronological:
+                content = VersionManager._get_content(version_dir, old["version_id"])
+                if content is None:
+                    continue
+                entry = {k: v for k, v in old.items() if k not in ("kind", "base", "depth", "digest", "blob")}
+                fields, payload = VersionManager._encode(content, parent, parent_content)
+                entry.update(fields)
+                if payload is not None:
+                    entry["blob"] = f"{entry['version_id']}.{generation}.z"
+                    payloads[entry["blob"]] = payload
+                new_entries.append(entry)
+                parent, parent_content = entry, content
+
+            blob_dir = os.path.join(version_dir, BLOB_DIR)
+            os.makedirs(blob_dir, exist_ok=True)
+            for blob, payload in payloads.items():
+                VersionManager._write_atomic(os.path.join(blob_dir, blob), payload)
+            VersionManager._save_index(version_dir, new_entries)
+
+            # Index now points only at the new delta blobs and objects; drop everything else
+            # (including blobs left behind by an earlier interrupted compaction)
+            keep = set(payloads)
+            for f in os.listdir(blob_dir):
+                if f not in keep:
+                    os.remove(os.path.join(blob_dir, f))
+            for key in [k for k in VersionManager._content_cache if k[0] == version_dir]:
+                del VersionManager._content_cache[key]
+
+        digests = {e["digest"] for e in new_entries if e.get("digest")}
+        return bytes_before, VersionManager._dir_size(version_dir) + sum(ArtifactStore.object_size(d) for d in digests)
+
+    @staticmethod
+    def compact_all(root="storage/versions"):
+        """Compacts every topic directory under root. Returns {topic_dir: (bytes_before, bytes_after)}."""
+        if not os.path.exists(root):
+            return {}
+        results = {}
+        for name in sorted(os.listdir(root)):
+            path = os.path.join(root, name)
+            if os.path.isdir(path):
+                results[name] = VersionManager.compact(path)
+        return results
+
+    # ==========================
+    # Public API
+    # ==========================
+
     @staticmethod
     def save_version(topic, content: str, mode: str, summary: str = ""):
         """
@@ -27,23 +360,21 @@ class VersionManager:
         """
         version_id = str(uuid.uuid4())[:8]
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        
-        data = {
+        version_dir = VersionManager.get_version_dir(topic)
+
+        entry = {
             "version_id": version_id,
             "timestamp": timestamp,
+            "created": int(time.time()),
             "topic": topic,
             "mode": mode,
-            "content": content,
-            "summary": summary
+            "summary": summary,
+            "size": len(content or "")
         }
-        
-        # Determine filename: v_{timestamp}_{id}.json
-        filename = f"{int(time.time())}_{version_id}.json"
-        save_path = os.path.join(VersionManager.get_version_dir(topic), filename)
-        
+
         try:
-            with open(save_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+            VersionManager.migrate_legacy(version_dir)
+            VersionManager._append(version_dir, entry, content)
             return version_id
         except Exception as e:
             print(f"Error saving version: {e}")
@@ -52,34 +383,46 @@ class VersionManager:
     @staticmethod
     def list_versions(topic):
         """
-        Returns a sorted list of versions (newest first).
+        Returns a sorted list of version metadata (newest first).
+        Content is NOT included; use restore_version to load it.
         """
-        path = VersionManager.get_version_dir(topic)
-        if not os.path.exists(path):
-            return []
-            
-        versions = []
-        for f in os.listdir(path):
-            if f.endswith(".json"):
-                full_path = os.path.join(path, f)
-                try:
-                    with open(full_path, "r", encoding="utf-8") as file:
-                        data = json.load(file)
-                        versions.append(data)
-                except:
-                    pass
-        
-        # Sort by timestamp descending
-        versions.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-        return versions
+        version_dir = VersionManager.get_version_dir(topic)
+        VersionManager.migrate_legacy(version_dir)
+        return list(VersionManager._load_index(version_dir))
 
     @staticmethod
     def restore_version(topic, version_id):
         """
-        Retrieves a specific version content.
+        Retrieves a specific version (metadata + content).
         """
-        versions = VersionManager.list_versions(topic)
-        for v in versions:
-            if v["version_id"] == version_id:
-                return v
-        return None
+        version_dir = VersionManager.get_version_dir(topic)
+        VersionManager.migrate_legacy(version_dir)
+        try:
+            content = VersionManager._get_content(version_dir, version_id)
+        except Exception as e:
+            print(f"Error restoring version {version_id}: {e}")
+            return None
+        if content is None:
+            return None
+
+        meta = VersionManager._get_entry(version_dir, version_id) or {}
+        return {**meta, "version_id": version_id, "content": content}
+
+
+if __name__ == "__main__":
+    # Usage: python -m core.version_manager [migrate|compact]
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "migrate":
+        for topic_dir, count in VersionManager.migrate_all().items():
+            print(f"{topic_dir}: migrated {count} versions")
+    elif command == "compact":
+        total_before = total_after = 0
+        for topic_dir, (before, after) in VersionManager.compact_all().items():
+            total_before += before
+            total_after += after
+            print(f"{topic_dir:<50} {before:>10,} -> {after:>10,} bytes")
+        if total_before:
+            print(f"{'TOTAL':<50} {total_before:>10,} -> {total_after:>10,} bytes "
+                  f"({100 * (1 - total_after / total_before):.1f}% saved)")
+    else:
+        print("Usage: python -m core.version_manager [migrate|compact]")
@@ -0,0 +1,244 @@
+"""
+Multi-process worker pool over the SQLite job queue (core.job_queue).
+
+    python -m core.workers enqueue semester.csv          # prints the batch id
+    python -m core.workers run --workers 4 --drain       # process until the queue is empty
+    python -m core.workers status [--batch ID]
+
+Each worker is a separate process (so CPU-side work such as edit matching,
+dedup, CSV building and RAG embedding runs on separate GILs) with its own
+asyncio loop running up to WORKER_SLOTS jobs through core.batch.BatchRunner.
+Workers register in the queue database and re-split the account-wide
+API_RPM/API_TPM quota among the live ones, so adding or losing a worker
+rebalances within WORKER_STALE_S.
+"""
+import os
+import sys
+import time
+import uuid
+import signal
+import asyncio
+import argparse
+import multiprocessing
+from typing import Dict, Optional
+from core.config import (JOB_QUEUE_DB, JOB_VISIBILITY_TIMEOUT_S, JOB_RETRY_BACKOFF_S, WORKER_SLOTS, WORKER_POLL_S,
+                         WORKER_STALE_S, API_RPM, API_TPM, DEFAULT_MODEL, BATCH_FAST_MODEL)
+from core.job_queue import JobQueue
+from core.logger import logger
+
+def quota_share(total: int, live_workers: int) -> int:
+    """This worker's slice of an account-wide per-minute quota."""
+    return max(1, total // max(1, live_workers))
+
+class Worker:
+    """One worker process: claims jobs, runs them, heartbeats leases and its quota share."""
+
+    def __init__(self, worker_id: str, db_path: str = JOB_QUEUE_DB, config: Optional[Dict] = None,
+                 slots: int = WORKER_SLOTS, rpm: int = API_RPM, tpm: int = API_TPM,
+                 visibility_timeout: float = JOB_VISIBILITY_TIMEOUT_S, retry_backoff: float = JOB_RETRY_BACKOFF_S,
+                 poll_interval: float = WORKER_POLL_S, drain: bool = False, http_client=None, api_key=None,
+                 metrics_port: Optional[int] = None):
+        self.worker_id = worker_id
+        self.queue = JobQueue(db_path)
+        self.config = config
+        self.slots = max(1, slots)
+        self.rpm, self.tpm = rpm, tpm
+        self.visibility_timeout = visibility_timeout
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self.drain = drain
+        self.http_client = http_client
+        self.api_key = api_key
+        self.metrics_port = metrics_port
+        self.running = set()
+        self.processed = 0
+        self.stopping = False
+
+    def _rebalance(self):
+        from core.rate_limiter import limiter
+        self.queue.register_worker(self.worker_id, running=len(self.running), processed=self.processed)
+        live = len(self.queue.live_workers(WORKER_STALE_S))
+        rpm, tpm = quota_share(self.rpm, live), quota_share(self.tpm, live)
+        if (limiter.rpm, limiter.tpm) != (rpm, tpm):
+            logger.info(f"Worker {self.worker_id}: quota share {rpm} rpm / {tpm} tpm ({live} live workers)")
+            limiter.rpm, limiter.tpm = rpm, tpm
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            if not await asyncio.to_thread(self.queue.heartbeat, job_id, self.worker_id, self.visibility_timeout):
+                logger.warning(f"Worker {self.worker_id} lost the lease on job {job_id}")
+                return
+
+    async def _process(self, runner, job: Dict):
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            result = await runner.run_job(job["payload"])
+        except Exception as e:  # run_job reports failures in its result; this is a worker bug
+            result = {"status": "failed", "error": str(e), "cost": 0.0}
+        finally:
+            heartbeat.cancel()
+        cost = result.get("cost", 0.0)
+        if result["status"] == "done":
+            await asyncio.to_thread(self.queue.complete, job["id"], self.worker_id, result, cost)
+        else:
+            await asyncio.to_thread(self.queue.fail, job["id"], self.worker_id, result.get("error") or result["status"],
+                                    cost, result, self.retry_backoff)
+        self.processed += 1
+
+    async def run(self):
+        from core.batch import BatchRunner, default_config
+        from core.models import OrchestratorConfig
+        config = OrchestratorConfig(**self.config) if self.config else default_config(DEFAULT_MODEL, BATCH_FAST_MODEL)
+        owns_client = self.http_client is None
+        if owns_client:
+            import anthropic
+            self.http_client = anthropic.DefaultAsyncHttpxClient()
+        runner = BatchRunner(config, concurrency=self.slots, api_key=self.api_key, http_client=self.http_client)
+        if self.metrics_port:
+            from core.metrics import start_http_server
+            start_http_server(self.metrics_port)
+        last_rebalance = 0.0
+        try:
+            while not self.stopping:
+                if time.monotonic() - last_rebalance >= min(WORKER_STALE_S / 3, 10):
+                    await asyncio.to_thread(self._rebalance)
+                    last_rebalance = time.monotonic()
+
+                while len(self.running) < self.slots:
+                    job = await asyncio.to_thread(self.queue.claim, self.worker_id, self.visibility_timeout)
+                    if job is None:
+                        break
+                    task = asyncio.create_task(self._process(runner, job))
+                    self.running.add(task)
+                    task.add_done_callback(self.running.discard)
+
+                if self.drain and not self.running:
+                    summary = await asyncio.to_thread(self.queue.summary)
+                    if summary["counts"]["queued"] == 0 and summary["counts"]["running"] == 0:
+                        break
+                await asyncio.sleep(self.poll_interval)
+            if self.running:
+                await asyncio.gather(*self.running)
+        finally:
+            self.queue.unregister_worker(self.worker_id)
+            if owns_client:
+                await self.http_client.aclose()
+
+def _worker_main(worker_id, kwargs):
+    worker = Worker(worker_id, **kwargs)
+
+    def stop(*_):
+        worker.stopping = True  # Finish running jobs, claim nothing new
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    asyncio.run(worker.run())
+
+class WorkerPool:
+    """Starts N worker processes (spawned, so each gets a fresh interpreter and GIL)."""
+
+    def __init__(self, workers: int = 2, **worker_kwargs):
+        self.n_workers = max(1, workers)
+        self.worker_kwargs = worker_kwargs
+        self.processes = []
+
+    def start(self):
+        ctx = multiprocessing.get_context("spawn")
+        for i in range(self.n_workers):
+            worker_id = f"{os.uname().nodename if hasattr(os, 'uname') else 'local'}-{os.getpid()}-{i}-{uuid.uuid4().hex[:4]}"
+            kwargs = dict(self.worker_kwargs)
+            if kwargs.get("metrics_port"):
+                kwargs["metrics_port"] += i  # Each process has its own registry, so its own port
+            process = ctx.Process(target=_worker_main, args=(worker_id, kwargs), name=f"worker-{i}")
+            process.start()
+            self.processes.append(process)
+        return self
+
+    def stop(self):
+        for p in self.processes:
+            if p.is_alive():
+                p.terminate()  # SIGTERM: workers finish running jobs first
+
+    def join(self, timeout: Optional[float] = None):
+        for p in self.processes:
+            p.join(timeout)
+        return [p.exitcode for p in self.processes]
+
+# ==========================
+# CLI
+# ==========================
+
+def format_status(queue: JobQueue, batch_id: Optional[str] = None) -> str:
+    summary = queue.summary(batch_id)
+    counts = ", ".join(f"{n} {status}" for status, n in summary["counts"].items() if n)
+    lines = [f"{'Batch ' + batch_id if batch_id else 'Queue'}: {summary['total']} jobs ({counts or 'empty'}), "
+             f"₹{summary['cost']:.4f}"]
+    for w in queue.live_workers(WORKER_STALE_S):
+        lines.append(f"  worker {w['worker_id']} pid {w['pid']}: {w['running']} running, {w['processed']} processed")
+    for job in queue.list_jobs(status="failed", batch_id=batch_id, limit=20):
+        lines.append(f"  failed {job['id'][:8]} {job['payload'].get('topic')}: {job['error']}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Durable job queue and worker pool for batch builds")
+    parser.add_argument("--db", default=JOB_QUEUE_DB)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = sub.add_parser("enqueue", help="Queue every entry of a CSV/YAML manifest")
+    enqueue.add_argument("manifest")
+    enqueue.add_argument("--priority", type=int, default=0)
+
+    run = sub.add_parser("run", help="Start worker processes")
+    run.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    run.add_argument("--slots", type=int, default=WORKER_SLOTS, help="Concurrent runs per worker")
+    run.add_argument("--rpm", type=int, default=API_RPM, help="Account-wide requests/minute, split across workers")
+    run.add_argument("--tpm", type=int, default=API_TPM, help="Account-wide tokens/minute, split across workers")
+    run.add_argument("--model", default=DEFAULT_MODEL)
+    run.add_argument("--fast-model", default=BATCH_FAST_MODEL)
+    run.add_argument("--no-cascade", action="store_true", help="Pin every agent to one model (see core.batch)")
+    run.add_argument("--drain", action="store_true", help="Exit once the queue is empty")
+    run.add_argument("--metrics-port", type=int, help="Worker i serves Prometheus metrics on this port + i")
+
+    status = sub.add_parser("status", help="Job counts, live workers and failures")
+    status.add_argument("--batch")
+
+    cancel = sub.add_parser("cancel", help="Cancel the queued jobs of a batch")
+    cancel.add_argument("batch")
+
+    args = parser.parse_args(argv)
+    queue = JobQueue(args.db)
+
+    if args.command == "enqueue":
+        from core.batch import load_manifest, ManifestError
+        try:
+            jobs = load_manifest(args.manifest)
+        except (ManifestError, ImportError, OSError) as e:
+            print(f"Manifest error: {e}")
+            return 2
+        batch_id = uuid.uuid4().hex[:8]
+        queue.enqueue_many(jobs, batch_id=batch_id, priority=args.priority)
+        print(f"Queued {len(jobs)} jobs as batch {batch_id}")
+        return 0
+    if args.command == "status":
+        print(format_status(queue, args.batch))
+        return 0
+    if args.command == "cancel":
+        print(f"Cancelled {queue.cancel(batch_id=args.batch)} queued jobs")
+        return 0
+
+    from core.batch import default_config
+    config = default_config(args.model, args.fast_model, cascade=not args.no_cascade).model_dump()
+    pool = WorkerPool(args.workers, db_path=args.db, config=config, slots=args.slots, rpm=args.rpm, tpm=args.tpm,
+                      drain=args.drain, metrics_port=args.metrics_port).start()
+    print(f"Started {args.workers} workers x {args.slots} slots ({args.rpm} rpm shared)")
+    try:
+        codes = pool.join()
+    except KeyboardInterrupt:
+        print("Stopping: workers finish their running jobs...")
+        pool.stop()
+        codes = pool.join()
+    print(format_status(queue))
+    return 0 if all(c == 0 for c in codes) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,4 @@
 import time
-from playwright.sync_api import sync_playwright
 
 # Global list to keep references and prevent Garbage Collection closing the browser
 _browser_instances = []
@@ -17,6 +16,8 @@ def publish_to_lms(email, password, content):
         dict: A dictionary containing 'success' (bool) and 'message' (str).
     """
     try:
+        from playwright.sync_api import sync_playwright  # Imported on use; optional for the rest of the app
+
         # NOTE: We do NOT use 'with sync_playwright() as p' because that closes the browser on exit.
         # We manually start it and store the reference to keep it open.
         p = sync_playwright().start()
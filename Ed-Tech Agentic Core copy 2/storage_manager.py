@@ -2,9 +2,11 @@
 import os
 import re
 import json
-import pandas as pd
 from datetime import datetime
 from pathlib import Path
+from core.artifact_store import ArtifactStore
+from core.catalog import Catalog
+from core import assignment_exporter
 
 ROOT_DIR = "generated_content"
 
@@ -45,32 +47,31 @@ def save_metadata(topic, subtopic, model, prompt_template=""):
     file_path = os.path.join(folder, "metadata.json")
     with open(file_path, "w") as f:
         json.dump(metadata, f, indent=4)
+    Catalog.record(file_path, topic=topic, kind="metadata", model=model)
 
 def save_draft(topic, iteration, content):
-    """Saves the draft notes."""
+    """Saves the draft notes. Re-saving identical content hard-links the existing file (see ArtifactStore.write_file)."""
     folder = get_topic_folder(topic)
     filename = f"notes_draft_v{iteration}_{_get_timestamp()}.md"
     path = os.path.join(folder, filename)
-    
-    with open(path, "w", encoding='utf-8') as f:
-        f.write(content)
-    return path
+    return ArtifactStore.write_file(path, content, topic=topic, kind="draft", iteration=iteration)
 
-def save_quiz(topic, quiz_df):
-    """Saves the quiz dataframe."""
+def save_quiz(topic, quiz):
+    """
+    Saves a quiz as CSV: a list of questions (models or dicts) is written in the
+    Assess template layout; a DataFrame (e.g. the edited table) is saved as-is.
+    Re-saving an identical quiz returns the existing file.
+    """
     folder = get_topic_folder(topic)
     filename = f"quiz_v{_get_timestamp()}.csv"
     path = os.path.join(folder, filename)
-    quiz_df.to_csv(path, index=False)
-    return path
+    if hasattr(quiz, "to_csv"):  # DataFrame; checked by duck type so pandas isn't imported here
+        content = quiz.to_csv(index=False)
+    else:
+        content = assignment_exporter.to_csv_text(quiz)
+    return ArtifactStore.write_file(path, content, topic=topic, kind="quiz")
 
 def list_saved_sessions():
-    """Returns a list of topic folders in the root directory."""
-    initialize_project_root()
-    folders = []
-    if os.path.exists(ROOT_DIR):
-        for name in os.listdir(ROOT_DIR):
-            path = os.path.join(ROOT_DIR, name)
-            if os.path.isdir(path):
-                folders.append(name)
-    return sorted(folders)
+    """Returns the topic folder names that have saved drafts, quizzes or metadata (from the catalog)."""
+    topics = Catalog.topics(kinds=["draft", "quiz", "metadata"])
+    return sorted({_sanitize_filename(t) for t in topics})
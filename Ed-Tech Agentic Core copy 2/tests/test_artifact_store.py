@@ -0,0 +1,77 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from core.artifact_store import ArtifactStore, OBJECTS_DIR
+from core.version_manager import VersionManager
+import storage_manager
+
+
+class TestArtifactStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.original_cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        VersionManager._index_cache.clear()
+        VersionManager._content_cache.clear()
+        self.dedup_hits = ArtifactStore.stats["dedup_hits"]
+
+    def tearDown(self):
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.test_dir)
+
+    def test_put_is_idempotent(self):
+        d1 = ArtifactStore.put("# Lecture")
+        d2 = ArtifactStore.put("# Lecture")
+        self.assertEqual(d1, d2)
+        self.assertEqual(ArtifactStore.get(d1), "# Lecture")
+        self.assertEqual(ArtifactStore.usage()["objects"], 1)
+        self.assertIsNone(ArtifactStore.get("0" * 64))
+
+    def test_identical_drafts_share_one_file(self):
+        p1 = storage_manager.save_draft("Sorting", 1, "# Bubble sort")
+        p2 = storage_manager.save_draft("Sorting", 1, "# Bubble sort")
+        p3 = storage_manager.save_draft("Sorting", 2, "# Merge sort")
+        self.assertTrue(os.path.samefile(p1, p2))
+        self.assertFalse(os.path.samefile(p1, p3))
+        self.assertEqual(ArtifactStore.stats["dedup_hits"] - self.dedup_hits, 1)
+        self.assertEqual(len(ArtifactStore.list_refs("Sorting", kind="draft")), 3)  # every save gets a ref
+        self.assertEqual(ArtifactStore.resolve("Sorting", "draft/v2"), "# Merge sort")
+        self.assertEqual(ArtifactStore.usage()["objects"], 0)  # the readable files are the only copies
+
+    def test_unchanged_iteration_still_resolves(self):
+        p1 = storage_manager.save_draft("Sorting", 1, "# Bubble sort")
+        p2 = storage_manager.save_draft("Sorting", 2, "# Bubble sort")
+        self.assertTrue(os.path.exists(p2))
+        self.assertEqual(ArtifactStore.resolve("Sorting", "draft/v2"), "# Bubble sort")
+
+    def test_edited_file_is_not_reused(self):
+        path = os.path.join("storage", "a.md")
+        ArtifactStore.write_file(path, "v1", topic="T")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("edited by hand")
+        again = ArtifactStore.write_file(os.path.join("storage", "b.md"), "v1", topic="T")
+        with open(again, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "v1")
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "edited by hand")
+        self.assertEqual(ArtifactStore.stats["dedup_hits"], self.dedup_hits)
+
+    def test_overwriting_a_linked_path_leaves_its_twin(self):
+        a, b = os.path.join("storage", "a.md"), os.path.join("storage", "b.md")
+        ArtifactStore.write_file(a, "same", topic="T")
+        ArtifactStore.write_file(b, "same", topic="T")
+        ArtifactStore.write_file(b, "different", topic="T")
+        with open(a, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "same")
+
+    def test_versions_share_snapshot_objects(self):
+        VersionManager.save_version("Topic A", "same content", "Lecture Notes")
+        VersionManager.save_version("Topic B", "same content", "Lecture Notes")
+        self.assertEqual(ArtifactStore.usage()["objects"], 1)
+        self.assertTrue(os.path.isdir(OBJECTS_DIR))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import csv
+import shutil
+import tempfile
+
+from core.models import MCSCQuestion, MCMCQuestion, SubjectiveQuestion
+from core import assignment_exporter
+from core.assignment_exporter import TEMPLATE_COLUMNS
+
+
+def sample_questions():
+    return [
+        MCSCQuestion(question_text="What is 2+2?", options=["1", "2", "3", "4"],
+                     correct_option_index=4, explanation="Math.", difficulty="Easy"),
+        MCMCQuestion(question_text="Select even numbers", options=["1", "2", "3", "4"],
+                     correct_option_indices=[2, 4], explanation="Divisible by 2.", difficulty="Medium"),
+        SubjectiveQuestion(question_text="Explain AI.", model_answer="AI is cool.",
+                           explanation="Basic def.", difficulty="Hard"),
+    ]
+
+
+class TestAssignmentExporter(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.original_cwd = os.getcwd()
+        os.chdir(self.test_dir)
+
+    def tearDown(self):
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.test_dir)
+
+    def test_rows_follow_template(self):
+        rows = [dict(zip(TEMPLATE_COLUMNS, r)) for r in assignment_exporter.iter_rows(sample_questions())]
+        self.assertEqual(rows[0]["mcscAnswer"], "4")
+        self.assertEqual(rows[0]["option.4"], "4")
+        self.assertEqual(rows[1]["mcmcAnswer"], "2, 4")
+        self.assertEqual(rows[1]["mcscAnswer"], "")
+        self.assertEqual(rows[2]["subjectiveAnswer"], "AI is cool.")
+        self.assertEqual(rows[2]["answerExplanation"], "AI is cool.")
+        self.assertEqual(rows[2]["difficultyLevel"], "Hard")
+
+    def test_dicts_and_models_match(self):
+        questions = sample_questions()
+        dumped = [q.model_dump() for q in questions]
+        self.assertEqual(list(assignment_exporter.iter_rows(questions)), list(assignment_exporter.iter_rows(dumped)))
+
+    def test_clean_strips_meta_commentary(self):
+        q = {"type": "mcsc", "question_text": "Pick one.", "options": ["a", "b", "c", "d"],
+             "correct_option_index": 1, "explanation": "Because.\nLet me adjust the options."}
+        row = assignment_exporter.question_to_row(q, clean=True)
+        self.assertNotIn("Let me adjust", row[TEMPLATE_COLUMNS.index("answerExplanation")])
+
+    def test_csv_round_trip(self):
+        count = assignment_exporter.write_csv(sample_questions(), "quiz.csv")
+        self.assertEqual(count, 3)
+        with open("quiz.csv", newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], TEMPLATE_COLUMNS)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(assignment_exporter.to_csv_text(sample_questions()), open("quiz.csv", encoding="utf-8").read())
+
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+        assignment_exporter.export(sample_questions(), "quiz.xlsx")
+        ws = load_workbook("quiz.xlsx", read_only=True).active
+        rows = list(ws.iter_rows(values_only=True))
+        self.assertEqual(list(rows[0]), TEMPLATE_COLUMNS)
+        self.assertEqual(rows[2][TEMPLATE_COLUMNS.index("mcmcAnswer")], "2, 4")
+
+    def test_parquet_needs_pyarrow(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            with self.assertRaises(ImportError):
+                assignment_exporter.write_parquet(sample_questions(), "quiz.parquet")
+            return
+        import pyarrow.parquet as pq
+        self.assertEqual(assignment_exporter.write_parquet(sample_questions(), "quiz.parquet", batch_rows=2), 3)
+        self.assertEqual(pq.read_table("quiz.parquet").column_names, TEMPLATE_COLUMNS)
+
+    def test_dataframe_for_editor(self):
+        questions = [dict(q.model_dump(), _validation_warning="check") for q in sample_questions()]
+        df = assignment_exporter.to_dataframe(questions, extra_columns=assignment_exporter.REVIEW_COLUMNS)
+        self.assertEqual(list(df.columns), TEMPLATE_COLUMNS + ["_validation_warning"])
+        self.assertEqual(list(df.index), [1, 2, 3])
+        self.assertEqual(df.loc[1, "mcscAnswer"], "4")
+        self.assertEqual(df.loc[3, "_validation_warning"], "check")
+
+
+if __name__ == "__main__":
+    unittest.main()
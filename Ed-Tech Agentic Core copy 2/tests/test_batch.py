@@ -0,0 +1,162 @@
+import unittest
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from unittest import mock
+
+from core import batch
+from core.batch import BatchRunner, ManifestError, load_manifest, default_config
+from core.cascade import default_policies
+from core.cost_ledger import calculate_cost
+
+
+class FakeOrchestrator:
+    """Stands in for Orchestrator: each run spends ₹1 over two steps and saves a file."""
+    instances = []
+    fail_topics = ()
+    step_cost = 0.5
+
+    def __init__(self, config, api_key=None, http_client=None, headless=False):
+        self.http_client = http_client
+        self.headless = headless
+        self.state = {"costs": 0.0}
+        FakeOrchestrator.instances.append(self)
+
+    async def run_loop(self, topic, subtopics, transcript=None, mode="Lecture Notes", **kwargs):
+        self.args = (topic, subtopics, transcript, mode, kwargs)
+        for _ in range(2):
+            await asyncio.sleep(0.01)
+            self.state["costs"] += self.step_cost
+            yield {"type": "step", "agent": "Creator", "status": "Working", "cost": self.step_cost}
+        if topic in self.fail_topics:
+            yield {"type": "step", "agent": "Orchestrator", "model": "Error", "status": "Process Failed: boom"}
+            return
+        path = os.path.join("storage", f"{topic}.md")
+        yield {"content": "text", "cost": self.state["costs"], "type": "FINAL_RESULT", "path": path}
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, name, text):
+        path = os.path.join(self.test_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_csv_manifest(self):
+        path = self.write("m.csv", 'topic,subtopics,mode,audience,assignment_config,transcript\n'
+                                   'DNA,"Helix, Bases",Lecture Notes,,,dna.txt\n'
+                                   ',,,,,\n'
+                                   'Cells,,Assignment,Beginners,"{""mcsc"": 4}",\n')
+        jobs = load_manifest(path)
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual(jobs[0]["subtopics"], "Helix, Bases")
+        self.assertEqual(jobs[0]["audience"], "General Student")
+        self.assertEqual(jobs[0]["transcript"], os.path.join(self.test_dir, "dna.txt"))
+        self.assertEqual(jobs[1]["assignment_config"], {"mcsc": 4})
+        self.assertEqual(jobs[1]["audience"], "Beginners")
+
+    def test_yaml_manifest_with_defaults(self):
+        path = self.write("m.yaml", "defaults:\n  mode: Pre-read Notes\n  audience: Grad\n"
+                                    "topics:\n  - DNA\n  - topic: Cells\n    mode: Assignment\n"
+                                    "    assignment_config: {mcsc: 2}\n")
+        jobs = load_manifest(path)
+        self.assertEqual([(j["topic"], j["mode"]) for j in jobs], [("DNA", "Pre-read Notes"), ("Cells", "Assignment")])
+        self.assertEqual(jobs[1]["assignment_config"], {"mcsc": 2})
+        self.assertEqual(jobs[0]["audience"], "Grad")
+
+    def test_bad_rows_name_their_line(self):
+        path = self.write("m.csv", "topic,mode\nDNA,Lecture Notes\nCells,Poster\n")
+        with self.assertRaisesRegex(ManifestError, "line 3"):
+            load_manifest(path)
+        path = self.write("m2.csv", "topic,assignment_config\nDNA,{mcsc: 2}\n")
+        with self.assertRaisesRegex(ManifestError, "not valid JSON"):
+            load_manifest(path)
+
+
+class TestBatchRunner(unittest.TestCase):
+    def setUp(self):
+        FakeOrchestrator.instances = []
+        FakeOrchestrator.fail_topics = ()
+        FakeOrchestrator.step_cost = 0.5
+        patcher = mock.patch.object(batch, "Orchestrator", FakeOrchestrator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.jobs = [batch._normalize({"topic": f"T{i}"}, "test", ".") for i in range(6)]
+
+    def run_batch(self, **kwargs):
+        runner = BatchRunner(default_config(), http_client=object(), **kwargs)
+        return asyncio.run(runner.run(self.jobs))
+
+    def test_runs_all_with_shared_client(self):
+        report = self.run_batch(concurrency=3)
+        self.assertEqual(report["counts"], {"done": 6})
+        self.assertEqual(report["total_cost"], 6.0)
+        self.assertEqual(len({id(o.http_client) for o in FakeOrchestrator.instances}), 1)
+        self.assertTrue(all(o.headless for o in FakeOrchestrator.instances))
+        self.assertEqual(report["jobs"][2]["path"], os.path.join("storage", "T2.md"))
+
+    def test_spend_cap_stops_batch(self):
+        report = self.run_batch(concurrency=2, budget=2.5)
+        # T0/T1 finish (₹2); T2/T3 start under the cap and finish; the rest never start
+        self.assertEqual(report["counts"], {"done": 4, "skipped": 2})
+        self.assertEqual(len(FakeOrchestrator.instances), 4)
+        self.assertEqual(report["total_cost"], 4.0)  # Overshoot bounded by the runs in flight
+
+    def test_spend_cap_is_in_inr(self):
+        # Steps are priced like real calls (INR, core.cost_ledger), so a cap of 4.5 steps in rupees
+        # lets the third run start (and finish) and skips the rest
+        FakeOrchestrator.step_cost = calculate_cost(100_000, 10_000, "claude-haiku-4-5-20251001")
+        report = self.run_batch(concurrency=1, budget=4.5 * FakeOrchestrator.step_cost)
+        self.assertEqual(report["counts"], {"done": 3, "skipped": 3})
+        self.assertIn("Spend cap ₹", report["jobs"][3]["error"])
+        self.assertIn("₹", batch.format_report(report))
+
+    def test_failures_are_reported(self):
+        FakeOrchestrator.fail_topics = ("T1",)
+        report = self.run_batch()
+        failed = [j for j in report["jobs"] if j["status"] == "failed"]
+        self.assertEqual([j["topic"] for j in failed], ["T1"])
+        self.assertIn("boom", failed[0]["error"])
+        self.assertIn("1 failed", batch.format_report(report))
+
+
+class TestCli(unittest.TestCase):
+    def test_dry_run(self):
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir)
+        path = os.path.join(test_dir, "m.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('topic,mode,assignment_config\nDNA,Assignment,"{""mcsc"": 3}"\nCells,,\n')
+        out = io.StringIO()
+        with redirect_stdout(out):
+            code = batch.main([path, "--dry-run"])
+        self.assertEqual(code, 0)
+        self.assertIn("2 runs", out.getvalue())
+        self.assertIn("{'mcsc': 3}", out.getvalue())
+
+
+class TestDefaultConfig(unittest.TestCase):
+    def test_cascade_starts_reviewers_on_fast_model(self):
+        config = default_config("sonnet", "haiku")
+        self.assertEqual((config.auditor.model, config.auditor.cascade.escalate_to), ("haiku", ["sonnet"]))
+        self.assertEqual(config.checker.cascade.min_confidence, default_policies()["checker"].min_confidence)
+        self.assertIsNone(config.creator.cascade)
+
+    def test_no_cascade_pins_models(self):
+        for config in (default_config("sonnet", "haiku", cascade=False), default_config("sonnet", "sonnet")):
+            self.assertEqual(config.auditor.model, "sonnet")
+            self.assertIsNone(config.sanitizer.cascade)
+            self.assertIsNone(config.checker.cascade)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import asyncio
+from types import SimpleNamespace
+
+from core import metrics
+from core.cascade import (run_cascade, check_structured, check_score, check_text, default_policies, is_stronger,
+                          ladder_policies)
+from core.models import CascadePolicy
+
+
+def attempts(results):
+    """attempt(model) returning results[model] and a cost of 1.0 per call; records the models called."""
+    calls = []
+
+    async def attempt(model):
+        calls.append(model)
+        return results[model], 1.0
+    return attempt, calls
+
+
+class TestRunCascade(unittest.TestCase):
+    def test_accepts_first_model(self):
+        attempt, calls = attempts({"haiku": "ok"})
+        policy = CascadePolicy(escalate_to=["sonnet"])
+        outcome = asyncio.run(run_cascade("TestAccept", "haiku", policy, attempt, lambda r: None))
+        self.assertEqual((outcome.result, outcome.models, outcome.reasons, outcome.cost), ("ok", ["haiku"], [], 1.0))
+        self.assertEqual(calls, ["haiku"])
+        self.assertEqual(metrics.escalation_rates()["TestAccept"], {"calls": 1, "escalated": 0, "rate": 0.0})
+
+    def test_escalates_until_check_passes(self):
+        attempt, calls = attempts({"haiku": None, "sonnet": "good", "opus": "best"})
+        policy = CascadePolicy(escalate_to=["haiku", "sonnet", "opus"])  # the start model is not retried
+        outcome = asyncio.run(run_cascade("TestEscalate", "haiku", policy, attempt,
+                                          lambda r: None if r else "invalid"))
+        self.assertEqual(calls, ["haiku", "sonnet"])
+        self.assertEqual((outcome.result, outcome.reasons, outcome.cost), ("good", ["invalid"], 2.0))
+        self.assertEqual(metrics.cascade_escalations.value(agent="TestEscalate", reason="invalid"), 1)
+        self.assertEqual(metrics.escalation_rates()["TestEscalate"]["rate"], 1.0)
+
+    def test_last_model_result_returned_unchecked(self):
+        attempt, calls = attempts({"haiku": None, "sonnet": None})
+        outcome = asyncio.run(run_cascade("TestExhaust", "haiku", CascadePolicy(escalate_to=["sonnet"]), attempt,
+                                          lambda r: "invalid"))
+        self.assertEqual((outcome.result, outcome.models, outcome.reasons), (None, ["haiku", "sonnet"], ["invalid"]))
+
+    def test_no_policy_is_single_attempt(self):
+        attempt, calls = attempts({"haiku": None})
+        outcome = asyncio.run(run_cascade("TestNoPolicy", "haiku", None, attempt, lambda r: "invalid"))
+        self.assertEqual((calls, outcome.reasons), (["haiku"], []))
+        self.assertNotIn("TestNoPolicy", metrics.escalation_rates())
+
+
+class TestChecks(unittest.TestCase):
+    def test_structured(self):
+        policy = CascadePolicy(escalate_to=["sonnet"], min_confidence=70)
+        self.assertEqual(check_structured(None, policy), "invalid")
+        self.assertEqual(check_structured(SimpleNamespace(confidence=40), policy), "low_confidence")
+        self.assertIsNone(check_structured(SimpleNamespace(confidence=90), policy))
+        self.assertIsNone(check_structured(SimpleNamespace(confidence=None), policy))  # not reported
+        self.assertIsNone(check_structured(None, CascadePolicy(escalate_to=["sonnet"], on_invalid=False)))
+
+    def test_score_borderline(self):
+        policy = default_policies("sonnet")["auditor"]
+        self.assertEqual(check_score(SimpleNamespace(quality_score=88), 90, policy), "borderline")
+        self.assertIsNone(check_score(SimpleNamespace(quality_score=60), 90, policy))
+        self.assertIsNone(check_score(None, 90, policy))  # the Auditor does not escalate on invalid output
+
+    def test_text(self):
+        policy = CascadePolicy(escalate_to=["sonnet"])
+        self.assertEqual(check_text("  ", "draft", policy), "invalid")
+        self.assertEqual(check_text("short", "x" * 100, policy), "truncated")
+        self.assertIsNone(check_text("y" * 90, "x" * 100, policy))
+
+
+class TestLadder(unittest.TestCase):
+    def test_escalates_only_to_stronger_models(self):
+        self.assertTrue(is_stronger("claude-opus-4-5-20251101", "claude-sonnet-4-5-20250929"))
+        self.assertFalse(is_stronger("claude-sonnet-4-5-20250929", "claude-opus-4-5-20251101"))
+        self.assertFalse(is_stronger("claude-haiku-4-5-20251001", "claude-haiku-4-5-20251001"))
+
+    def test_ladder_targets_the_configured_model(self):
+        starts = {"auditor": "claude-haiku-4-5-20251001", "sanitizer": "claude-3-haiku-20240307",
+                  "checker": "claude-opus-4-5-20251101"}
+        policies = ladder_policies(starts, "claude-opus-4-5-20251101")
+        self.assertEqual(policies["auditor"].escalate_to, ["claude-opus-4-5-20251101"])
+        self.assertEqual(policies["sanitizer"].escalate_to, ["claude-opus-4-5-20251101"])
+        self.assertNotIn("checker", policies)  # already on the target
+        self.assertEqual(ladder_policies(starts, "claude-3-haiku-20240307"), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
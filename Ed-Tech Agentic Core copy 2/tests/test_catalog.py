@@ -0,0 +1,56 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from core.catalog import Catalog
+from core.artifact_store import ArtifactStore
+import storage_manager
+
+
+class TestCatalog(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.original_cwd = os.getcwd()
+        os.chdir(self.test_dir)
+
+    def tearDown(self):
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.test_dir)
+
+    def test_records_at_write_time(self):
+        ArtifactStore.write_file("storage/DNA_1.md", "# DNA", topic="DNA", kind="notes",
+                                 mode="Lecture Notes", model="claude-haiku-4-5-20251001", cost=0.12)
+        ArtifactStore.write_file("storage/DNA_Assignment_2.csv", "a,b", topic="DNA", kind="assignment_csv", mode="Assignment")
+        # Duplicate content is linked at its own path and gets its own row
+        ArtifactStore.write_file("storage/DNA_3.md", "# DNA", topic="DNA", kind="notes", cost=0.05)
+
+        self.assertEqual(Catalog.count(), 3)
+        self.assertEqual(Catalog.count(topic="DNA"), 3)
+        recent = Catalog.recent(limit=1)
+        self.assertEqual(len(recent), 1)
+        self.assertIn("timestamp", recent[0])
+        self.assertAlmostEqual(Catalog.totals()["cost"], 0.17)
+
+    def test_backfills_existing_files(self):
+        os.makedirs("generated_content/Sorting")
+        with open("generated_content/Sorting/notes_draft_v1_20260116_042725.md", "w") as f:
+            f.write("# Sorting")
+        with open("generated_content/Sorting/metadata.json", "w") as f:
+            f.write("{}")
+        os.makedirs("storage")
+        with open("storage/Fast_API_Assignment_1768900236.csv", "w") as f:
+            f.write("q")
+
+        self.assertEqual(Catalog.count(), 2)  # metadata is not a project
+        self.assertEqual(storage_manager.list_saved_sessions(), ["Sorting"])
+        self.assertIn("Fast API", Catalog.topics())
+
+    def test_sessions_listed_from_catalog(self):
+        storage_manager.save_metadata("Test Topic", "Subtopic A", "claude-3-haiku")
+        storage_manager.save_draft("Other", 1, "# Draft")
+        self.assertEqual(storage_manager.list_saved_sessions(), ["Other", "Test Topic"])
+
+
+if __name__ == "__main__":
+    unittest.main()
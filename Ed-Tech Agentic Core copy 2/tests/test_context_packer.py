@@ -0,0 +1,58 @@
+import unittest
+
+from core.context_packer import pack_context, KB_HEADER, GAP_MARKER
+from core.tokens import estimate_tokens
+
+
+class TestContextPacker(unittest.TestCase):
+    def setUp(self):
+        self.transcript = "\n\n".join([
+            "Welcome everyone, today is a long session.",
+            "Helicase unwinds the DNA double helix at the replication fork.",
+            "Some unrelated chatter about the weekend and the football match. " * 20,
+            "DNA polymerase adds nucleotides to the leading strand continuously.",
+        ])
+        self.rag_map = {"Helicase": "[Source: bio.pdf]\nHelicase breaks hydrogen bonds."}
+
+    def test_fits_budget_keeps_everything(self):
+        packed, stats = pack_context(self.transcript, self.rag_map, ["Helicase"], budget_tokens=100000)
+        self.assertEqual(stats["kept"], stats["segments"])
+        self.assertIn("football", packed)
+        self.assertIn(KB_HEADER, packed)
+        self.assertIn("### Subtopic: Helicase", packed)
+
+    def test_fitting_transcript_is_not_reformatted(self):
+        transcript = "Line one\nline two\n\n\n   indented para\n \nlast"
+        packed, stats = pack_context(transcript, {}, [], budget_tokens=100000)
+        self.assertEqual(packed, transcript)
+        self.assertEqual(stats["segments"], 1)
+
+    def test_over_budget_drops_least_relevant(self):
+        packed, stats = pack_context(self.transcript, self.rag_map, ["Helicase", "Polymerase"],
+                                     topic="DNA Replication", budget_tokens=60)
+        self.assertLessEqual(estimate_tokens(packed) - estimate_tokens(KB_HEADER), 80)
+        self.assertLess(stats["kept"], stats["segments"])
+        self.assertNotIn("football", packed)
+        self.assertIn("Helicase unwinds", packed)
+        self.assertIn(GAP_MARKER, packed)
+        # Original order is preserved
+        self.assertLess(packed.index("Helicase unwinds"), packed.index("polymerase adds"))
+
+    def test_headers_and_separators_count_against_budget(self):
+        subtopics = [f"Subtopic number {i} with a fairly long descriptive title" for i in range(6)]
+        rag_map = {s: "\n".join(f"[Source: doc{j}.pdf]\nChunk {j} about {s}." for j in range(4)) for s in subtopics}
+        for budget in (40, 90, 150, 250):
+            packed, stats = pack_context("", rag_map, subtopics, budget_tokens=budget)
+            self.assertLessEqual(stats["packed_tokens"], budget)
+            self.assertLessEqual(estimate_tokens(packed), budget)
+
+    def test_deterministic(self):
+        args = (self.transcript, self.rag_map, ["Helicase"])
+        self.assertEqual(pack_context(*args, budget_tokens=60)[0], pack_context(*args, budget_tokens=60)[0])
+
+    def test_empty(self):
+        self.assertEqual(pack_context(None, {}, [])[0], "")
+
+
+if __name__ == "__main__":
+    unittest.main()
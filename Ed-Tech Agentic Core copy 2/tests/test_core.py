@@ -1,10 +1,13 @@
 import unittest
 from unittest.mock import MagicMock, patch, AsyncMock
 import asyncio
+import json
 import os
 import shutil
 import tempfile
-from core.state_manager import StateManager
+import threading
+from core.state_manager import StateManager, SessionPersister
+from core.session_store import FileSessionBackend
 from core.orchestrator import Orchestrator
 
 class TestStateManager(unittest.TestCase):
@@ -57,6 +60,65 @@ class TestStateManager(unittest.TestCase):
         self.assertNotEqual(session1, session2)
         self.assertNotEqual(file1, file2)
 
+    def test_debounced_saves_coalesce(self):
+        backend = FileSessionBackend(root="sessions")
+        persister = SessionPersister(backend=backend, delay=60)
+        for i in range(5):
+            persister.save("s1", {"total_cost": i}, "# Draft", immediate=False)
+        self.assertFalse(os.path.exists(backend.state_path("s1")))
+        persister.flush()
+
+        stats = persister.get_stats()
+        self.assertEqual(stats["writes"], 1)
+        self.assertEqual(stats["draft_writes"], 1)
+        with open(backend.state_path("s1")) as f:
+            self.assertEqual(json.load(f)["total_cost"], 4)
+
+        # Unchanged draft is not rewritten
+        persister.save("s1", {"total_cost": 5}, "# Draft", immediate=True)
+        self.assertEqual(persister.get_stats()["draft_writes"], 1)
+        self.assertFalse(os.path.exists(backend.state_path("s1") + ".tmp"))
+
+    def test_save_does_not_wait_for_backend_io(self):
+        backend = FileSessionBackend(root="sessions")
+        persister = SessionPersister(backend=backend, delay=60)
+        writing, release = threading.Event(), threading.Event()
+        original = backend.write_state
+
+        def slow_write_state(session_id, text):
+            writing.set()
+            release.wait(5)
+            original(session_id, text)
+
+        backend.write_state = slow_write_state
+        persister.save("s1", {"total_cost": 1}, "# Draft")
+        flusher = threading.Thread(target=persister.flush)
+        flusher.start()
+        self.assertTrue(writing.wait(5))
+        saver = threading.Thread(target=persister.save, args=("s1", {"total_cost": 2}, "# Draft"))
+        saver.start()
+        saver.join(1)
+        self.assertFalse(saver.is_alive())  # Returned while the first write is still in progress
+        release.set()
+        flusher.join(5)
+        persister.flush()
+        with open(backend.state_path("s1")) as f:
+            self.assertEqual(json.load(f)["total_cost"], 2)
+
+    def test_draft_round_trip(self):
+        StateManager.initialize_state()
+        self.mock_st.session_state["current_draft"] = "# Big draft"
+        StateManager.save_to_disk()
+        state_file = StateManager.get_state_file()
+        with open(state_file) as f:
+            self.assertNotIn("current_draft", json.load(f))
+
+        session_id = self.mock_st.session_state["session_id"]
+        self.mock_st.session_state.clear()
+        self.mock_st.session_state["session_id"] = session_id
+        StateManager.load_from_disk()
+        self.assertEqual(self.mock_st.session_state["current_draft"], "# Big draft")
+
 class TestOrchestrator(unittest.TestCase):
     def setUp(self):
         self.config_mock = MagicMock()
@@ -0,0 +1,114 @@
+import unittest
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from core.cost_ledger import CostLedger, calculate_cost, usage_cost
+from core.logger import set_log_context
+
+
+def usage(input_tokens, output_tokens, cache_read=0, cache_write=0):
+    return SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens,
+                           cache_read_input_tokens=cache_read, cache_creation_input_tokens=cache_write)
+
+
+class TestPricing(unittest.TestCase):
+    def test_known_and_family_rates(self):
+        self.assertEqual(calculate_cost(1_000_000, 1_000_000, "claude-haiku-4-5-20251001"), 600.0)
+        self.assertEqual(calculate_cost(1_000_000, 0, "claude-3-5-sonnet-20240620"), 300.0)  # sonnet family
+        self.assertEqual(calculate_cost(1_000_000, 0, "unknown-model"), 300.0)               # sonnet default
+
+    def test_cache_tokens_priced_off_input_rate(self):
+        # 1M cache writes at 1.25x + 1M cache reads at 0.1x of the 300/M sonnet input rate
+        self.assertEqual(usage_cost(usage(0, 0, cache_read=1_000_000, cache_write=1_000_000), "sonnet"), 405.0)
+
+
+class TestCostLedger(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.ledger = CostLedger(os.path.join(self.test_dir, "costs.db"))
+
+    def test_attribution_from_log_context(self):
+        async def run(run_id, agent, cost):
+            set_log_context(run_id=run_id, session_id="s1", agent=agent)
+            return self.ledger.record("structured", "haiku", 100, 10, cost=cost)
+
+        async def runs():
+            await asyncio.gather(run("r1", "Auditor", 0.5), run("r1", "Pedagogue", 0.25), run("r2", "Auditor", 1.0))
+
+        asyncio.run(runs())
+        self.assertEqual(self.ledger.run_total("r1"), 0.75)
+        self.assertEqual(self.ledger.total(session_id="s1"), 1.75)
+        self.assertEqual(self.ledger.total(agent="Auditor"), 1.5)
+        by_agent = {r["key"]: r for r in self.ledger.breakdown(by="agent", session_id="s1")}
+        self.assertEqual((by_agent["Auditor"]["calls"], by_agent["Auditor"]["cost"]), (2, 1.5))
+        self.assertEqual(by_agent["Pedagogue"]["input_tokens"], 100)
+
+    def test_record_usage_prices_and_counts_errors(self):
+        cost = self.ledger.record_usage("response", "claude-haiku-4-5-20251001", usage(1000, 100, cache_read=5000),
+                                        agent="Sanitizer")
+        self.assertEqual(cost, calculate_cost(1000, 100, "claude-haiku-4-5-20251001", cache_read_tokens=5000))
+        self.assertEqual(self.ledger.record_usage("response", "haiku", None, ok=False, agent="Sanitizer"), 0.0)
+        row = self.ledger.breakdown(by="agent")[0]
+        self.assertEqual((row["key"], row["calls"], row["errors"], row["cache_read_tokens"]), ("Sanitizer", 2, 1, 5000))
+
+    def test_run_total_falls_back_to_database(self):
+        self.ledger.record("stream", "sonnet", cost=0.4, run_id="r9")
+        self.assertTrue(self.ledger.flush())
+        fresh = CostLedger(self.ledger.db_path)  # Another process sharing the file
+        self.assertEqual(fresh.run_total("r9"), 0.4)
+        self.assertEqual(fresh.run_total(None), 0.0)
+
+    def test_record_does_not_touch_sqlite_on_caller_thread(self):
+        self.ledger.total()  # schema created up front
+        connecting_threads = []
+        real_connect = sqlite3.connect
+
+        def connect(*args, **kwargs):
+            connecting_threads.append(threading.current_thread().name)
+            return real_connect(*args, **kwargs)
+
+        with mock.patch("core.cost_ledger.sqlite3.connect", side_effect=connect):
+            for _ in range(5):
+                self.ledger.record("response", "haiku", 10, 1, cost=0.1, run_id="r1")
+            self.assertTrue(self.ledger.flush())
+        self.assertTrue(connecting_threads)
+        self.assertNotIn(threading.current_thread().name, connecting_threads)
+        self.assertEqual(self.ledger.total(run_id="r1"), 0.5)
+
+    def test_queries_do_not_wait_on_a_slow_writer(self):
+        self.ledger.total()  # schema created up front
+        release = threading.Event()
+        real_connect = self.ledger._connect
+
+        def slow_connect():
+            if threading.current_thread().name == "cost-ledger-writer":
+                release.wait(5)
+            return real_connect()
+
+        self.ledger._connect = slow_connect
+        try:
+            self.ledger.record("response", "haiku", cost=0.1, run_id="r1")
+            start = time.perf_counter()
+            self.assertEqual(self.ledger.total(run_id="r1"), 0.0)  # Not on disk yet
+            self.assertEqual(self.ledger.run_total("elsewhere"), 0.0)
+            self.assertLess(time.perf_counter() - start, 1.0)
+        finally:
+            release.set()
+        self.assertTrue(self.ledger.flush())
+        self.assertEqual(self.ledger.total(run_id="r1"), 0.1)
+
+    def test_rejects_unknown_grouping(self):
+        with self.assertRaises(ValueError):
+            self.ledger.breakdown(by="cost; DROP TABLE calls")
+
+
+if __name__ == "__main__":
+    unittest.main()
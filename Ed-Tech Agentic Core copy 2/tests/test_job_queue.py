@@ -0,0 +1,132 @@
+import unittest
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+from unittest import mock
+
+from core import batch, workers
+from core.job_queue import JobQueue
+from core.workers import Worker, quota_share
+from tests.test_batch import FakeOrchestrator
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.queue = JobQueue(os.path.join(self.test_dir, "jobs.db"))
+
+    def test_claim_complete(self):
+        low = self.queue.enqueue({"topic": "Low"})
+        high = self.queue.enqueue({"topic": "High"}, priority=5)
+        job = self.queue.claim("w1")
+        self.assertEqual(job["id"], high)
+        self.assertEqual((job["status"], job["attempts"]), ("running", 1))
+        self.assertTrue(self.queue.complete(high, "w1", {"path": "x.md"}, cost=0.25))
+        self.assertFalse(self.queue.complete(high, "w2", {}))  # Not ours
+        self.assertEqual(self.queue.claim("w1")["id"], low)
+        self.assertIsNone(self.queue.claim("w1"))
+        done = self.queue.get(high)
+        self.assertEqual((done["status"], done["result"], done["cost"]), ("done", {"path": "x.md"}, 0.25))
+
+    def test_failed_attempts_back_off_then_fail(self):
+        job_id = self.queue.enqueue({"topic": "DNA"}, max_attempts=2)
+        self.queue.claim("w1")
+        self.assertEqual(self.queue.fail(job_id, "w1", "boom", cost=0.1, backoff=60), "queued")
+        self.assertIsNone(self.queue.claim("w1"))  # Backing off
+        with mock.patch("core.job_queue.time.time", return_value=time.time() + 61):
+            self.assertEqual(self.queue.claim("w1")["attempts"], 2)
+            self.assertEqual(self.queue.fail(job_id, "w1", "boom again", cost=0.1), "failed")
+        job = self.queue.get(job_id)
+        self.assertEqual((job["status"], job["error"]), ("failed", "boom again"))
+        self.assertAlmostEqual(job["cost"], 0.2)
+
+    def test_lapsed_lease_is_reclaimed(self):
+        job_id = self.queue.enqueue({"topic": "DNA"}, max_attempts=2)
+        self.queue.claim("dead", visibility_timeout=10)
+        self.assertIsNone(self.queue.claim("w2"))
+        self.assertTrue(self.queue.heartbeat(job_id, "dead", visibility_timeout=10))
+        later = time.time() + 11
+        with mock.patch("core.job_queue.time.time", return_value=later):
+            job = self.queue.claim("w2")
+            self.assertEqual((job["id"], job["attempts"]), (job_id, 2))
+            self.assertFalse(self.queue.heartbeat(job_id, "dead"))
+        # Second lapse with no attempts left fails the job instead of running it a third time
+        with mock.patch("core.job_queue.time.time", return_value=later + 700):
+            self.assertIsNone(self.queue.claim("w3"))
+        self.assertEqual(self.queue.get(job_id)["error"], "Lease expired")
+
+    def test_cancel_and_summary(self):
+        self.queue.enqueue_many([{"topic": "A"}, {"topic": "B"}, {"topic": "C"}], batch_id="b1")
+        self.queue.enqueue({"topic": "D"}, batch_id="b2")
+        job = self.queue.claim("w1")
+        self.queue.complete(job["id"], "w1", {}, cost=1.5)
+        self.assertEqual(self.queue.cancel(batch_id="b1"), 2)
+        summary = self.queue.summary("b1")
+        self.assertEqual((summary["counts"]["done"], summary["counts"]["cancelled"], summary["cost"]), (1, 2, 1.5))
+        self.assertEqual(self.queue.summary()["total"], 4)
+        self.assertEqual({b["batch_id"]: b["pending"] for b in self.queue.batches()}, {"b1": 0, "b2": 1})
+
+    def test_worker_registry_and_quota_split(self):
+        self.queue.register_worker("w1")
+        self.queue.register_worker("w2")
+        self.assertEqual(len(self.queue.live_workers(stale_after=30)), 2)
+        with mock.patch("core.job_queue.time.time", return_value=time.time() + 60):
+            self.assertEqual(self.queue.live_workers(stale_after=30), [])
+        self.queue.unregister_worker("w2")
+        self.assertEqual([w["worker_id"] for w in self.queue.live_workers(30)], ["w1"])
+        self.assertEqual(quota_share(50, 3), 16)
+        self.assertEqual(quota_share(2, 4), 1)
+        self.assertEqual(quota_share(50, 0), 50)
+
+
+class TestWorker(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.db = os.path.join(self.test_dir, "jobs.db")
+        FakeOrchestrator.instances = []
+        FakeOrchestrator.fail_topics = ("T1",)
+        patcher = mock.patch.object(batch, "Orchestrator", FakeOrchestrator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        limiter = mock.patch("core.rate_limiter.limiter", mock.Mock(rpm=50, tpm=40000))
+        self.limiter = limiter.start()
+        self.addCleanup(limiter.stop)
+
+    def test_drains_queue_with_retries(self):
+        queue = JobQueue(self.db)
+        jobs = [batch._normalize({"topic": f"T{i}"}, "test", ".") for i in range(4)]
+        queue.enqueue_many(jobs, batch_id="b1", max_attempts=2)
+        queue.register_worker("peer")  # Another live worker shares the quota
+        worker = Worker("w1", db_path=self.db, config=batch.default_config().model_dump(), slots=2, rpm=50, tpm=40000,
+                        retry_backoff=0, poll_interval=0.01, drain=True, http_client=object())
+        asyncio.run(asyncio.wait_for(worker.run(), timeout=10))
+
+        summary = queue.summary("b1")
+        self.assertEqual((summary["counts"]["done"], summary["counts"]["failed"]), (3, 1))
+        self.assertEqual(summary["cost"], 5.0)  # T1 spent ₹1 on each of its two attempts
+        failed = queue.list_jobs(status="failed")[0]
+        self.assertEqual((failed["payload"]["topic"], failed["attempts"]), ("T1", 2))
+        self.assertIn("boom", failed["error"])
+        self.assertEqual((self.limiter.rpm, self.limiter.tpm), (25, 20000))
+        self.assertEqual([w["worker_id"] for w in queue.live_workers(30)], ["peer"])
+
+    def test_cli_enqueue_and_status(self):
+        manifest = os.path.join(self.test_dir, "m.csv")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write("topic\nDNA\nCells\n")
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(workers.main(["--db", self.db, "enqueue", manifest]), 0)
+            self.assertEqual(workers.main(["--db", self.db, "status"]), 0)
+        self.assertIn("Queued 2 jobs", out.getvalue())
+        self.assertIn("2 jobs (2 queued)", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from core.log_analytics import LatencyHistogram, analyze
+
+
+def _line(**fields):
+    return json.dumps({"timestamp": "2026-01-20T10:00:00Z", "level": "INFO", "message": "LLM call", **fields}) + "\n"
+
+
+class TestLogAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_histogram_percentiles(self):
+        hist = LatencyHistogram()
+        for v in range(1, 1001):
+            hist.add(v)
+        self.assertAlmostEqual(hist.percentile(50), 500, delta=25)
+        self.assertAlmostEqual(hist.percentile(95), 950, delta=50)
+
+    def test_aggregates_plain_and_gzipped_logs(self):
+        plain = os.path.join(self.test_dir, "app.jsonl")
+        with open(plain, "w") as f:
+            for ms in (100, 200, 300):
+                f.write(_line(event="llm_call", agent="Creator", model="haiku", topic="DNA", latency_ms=ms, cost=0.5))
+            # Pre-structured retry/rate-limit warnings are parsed from the message
+            f.write(_line(message="Retry 1/3 for _make_api_call due to: overloaded"))
+            f.write(_line(message="Rate limit hit (RPM: 50). Waiting 2.50s"))
+            f.write("not json but has \"event\"\n")
+            f.write(_line(message="Initializing cached RAGManager"))
+        rolled = os.path.join(self.test_dir, "app_2026-01-19.0.jsonl.gz")
+        with gzip.open(rolled, "wt") as f:
+            f.write(_line(event="llm_call", agent="Auditor", model="sonnet", topic="DNA", latency_ms=900, cost=2.0, ok=False))
+            f.write(_line(event="run_complete", run_id="abc", topic="DNA", cost=3.5, duration_s=40))
+
+        report = analyze([plain, rolled])
+        self.assertEqual(report["calls"]["calls"], 4)
+        self.assertEqual(report["calls"]["errors"], 1)
+        self.assertEqual(report["by"]["agent"]["Creator"]["calls"], 3)
+        self.assertAlmostEqual(report["by"]["topic"]["DNA"]["cost"], 3.5)
+        self.assertEqual(report["retries"], {"_make_api_call": 1})
+        self.assertEqual(report["rate_limit"], {"waits": 1, "total_wait_s": 2.5})
+        self.assertEqual(report["runs"]["top"][0]["run_id"], "abc")
+        self.assertEqual(report["bad_lines"], 1)
+
+    def test_time_window(self):
+        path = os.path.join(self.test_dir, "app.jsonl")
+        with open(path, "w") as f:
+            f.write(_line(event="llm_call", latency_ms=10))
+        self.assertEqual(analyze([path], since="2026-02-01")["calls"]["calls"], 0)
+
+    def test_cascade_escalation_stats(self):
+        path = os.path.join(self.test_dir, "app.jsonl")
+        with open(path, "w") as f:
+            for _ in range(3):
+                f.write(_line(event="cascade", agent="Checker", reasons=[],
+                              steps=[{"model": "haiku", "cost": 0.1, "latency_ms": 100, "verdict": "Valid"}]))
+            f.write(_line(event="cascade", agent="Checker", reasons=["low_confidence"],
+                          steps=[{"model": "haiku", "cost": 0.1, "latency_ms": 100, "verdict": "Valid"},
+                                 {"model": "sonnet", "cost": 1.0, "latency_ms": 1000, "verdict": "Invalid"}]))
+        cs = analyze([path])["cascade"]["Checker"]
+        self.assertEqual((cs["calls"], cs["escalated"], cs["rate"]), (4, 1, 0.25))
+        self.assertEqual(cs["reasons"], {"low_confidence": 1})
+        self.assertEqual(cs["verdict_changed_pct"], 100.0)
+        self.assertAlmostEqual(cs["est_saved_cost"], 4 * 1.0 - 0.4 - 1.0)  # vs. every call on sonnet
+        self.assertAlmostEqual(cs["est_saved_s"], 2.6)
+
+
+if __name__ == "__main__":
+    unittest.main()
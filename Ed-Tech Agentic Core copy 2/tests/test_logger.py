@@ -0,0 +1,90 @@
+import unittest
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import tempfile
+
+from core.logger import JSONFormatter, DebugSampler, NonBlockingQueueHandler, RotatingJSONLHandler, set_log_context
+
+
+class TestRotatingJSONLHandler(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _logger(self, handler):
+        handler.setFormatter(JSONFormatter())
+        log = logging.getLogger(f"test-rotation-{id(handler)}")
+        log.propagate = False
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        return log
+
+    def test_size_rollover_gzips_and_prunes(self):
+        handler = RotatingJSONLHandler(directory=self.test_dir, max_bytes=500, backup_count=2, compress=True)
+        log = self._logger(handler)
+        for i in range(60):
+            log.info("event %d", i, extra={"props": {"pad": "x" * 20}})
+        handler.close()
+
+        rolled = handler.rolled_files()
+        self.assertEqual(len(rolled), 2)
+        self.assertTrue(all(f.endswith(".jsonl.gz") for f in rolled))
+        with gzip.open(rolled[-1], "rt", encoding="utf-8") as f:
+            self.assertEqual(json.loads(f.readline())["pad"], "x" * 20)
+
+    def test_day_change_rolls(self):
+        handler = RotatingJSONLHandler(directory=self.test_dir, compress=False)
+        log = self._logger(handler)
+        log.info("yesterday")
+        handler._day = "2000-01-01"
+        log.info("today")
+        handler.close()
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, "app_2000-01-01.0.jsonl")))
+
+
+class TestQueuePipeline(unittest.TestCase):
+    def test_debug_sampling(self):
+        sampler = DebugSampler(rate=0.25)
+        record = logging.LogRecord("t", logging.DEBUG, "f.py", 1, "tick", None, None)
+        kept = sum(sampler.filter(record) for _ in range(100))
+        self.assertEqual(kept, 25)
+        self.assertTrue(sampler.filter(logging.LogRecord("t", logging.INFO, "f.py", 1, "info", None, None)))
+
+    def test_queue_handler_keeps_exception(self):
+        q = queue.SimpleQueue()
+        handler = NonBlockingQueueHandler(q)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord("t", logging.ERROR, "f.py", 1, "failed %s", ("x",), sys.exc_info())
+        handler.emit(record)
+        out = json.loads(JSONFormatter().format(q.get_nowait()))
+        self.assertEqual(out["message"], "failed x")
+        self.assertIn("ValueError: boom", out["exception"])
+
+    def test_context_fields_are_merged(self):
+        import contextvars
+        q = queue.SimpleQueue()
+        handler = NonBlockingQueueHandler(q)
+
+        def emit():
+            set_log_context(run_id="r1", agent="Creator")
+            record = logging.LogRecord("t", logging.INFO, "f.py", 1, "LLM call", None, None)
+            record.props = {"agent": "Auditor"}
+            handler.emit(record)
+
+        contextvars.copy_context().run(emit)
+        out = json.loads(JSONFormatter().format(q.get_nowait()))
+        self.assertEqual(out["run_id"], "r1")
+        self.assertEqual(out["agent"], "Auditor")  # explicit props win
+
+
+if __name__ == "__main__":
+    unittest.main()
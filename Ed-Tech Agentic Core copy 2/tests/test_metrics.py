@@ -0,0 +1,149 @@
+import unittest
+import asyncio
+import socket
+import urllib.request
+from types import SimpleNamespace
+from unittest import mock
+
+from core import metrics
+from core.metrics import Registry
+from core.rate_limiter import RateLimiter
+from core.utils import retry_with_backoff
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_prometheus_text_format(self):
+        calls = self.registry.counter("calls_total", "Calls", ("model", "status"))
+        calls.inc(model="haiku", status="ok")
+        calls.inc(2, model='say "hi"', status="ok")
+        depth = self.registry.gauge("depth", "Depth")
+        depth.set_function(lambda: 7)
+        latency = self.registry.histogram("latency_seconds", "Latency", ("call",), buckets=(1, 5))
+        latency.observe(0.5, call="stream")
+        latency.observe(3, call="stream")
+        latency.observe(9, call="stream")
+
+        text = self.registry.render()
+        self.assertIn("# TYPE calls_total counter\n", text)
+        self.assertIn('calls_total{model="haiku",status="ok"} 1\n', text)
+        self.assertIn('calls_total{model="say \\"hi\\"",status="ok"} 2\n', text)
+        self.assertIn("depth 7\n", text)
+        self.assertIn('latency_seconds_bucket{call="stream",le="1"} 1\n', text)
+        self.assertIn('latency_seconds_bucket{call="stream",le="5"} 2\n', text)
+        self.assertIn('latency_seconds_bucket{call="stream",le="+Inf"} 3\n', text)
+        self.assertIn('latency_seconds_sum{call="stream"} 12.5\n', text)
+        self.assertIn('latency_seconds_count{call="stream"} 3\n', text)
+
+    def test_reregistering_returns_same_metric(self):
+        a = self.registry.counter("runs_total", "Runs")
+        self.assertIs(self.registry.counter("runs_total", "Runs"), a)
+
+    def test_partial_label_values_and_label_checks(self):
+        tokens = self.registry.counter("tokens_total", "Tokens", ("model", "kind"))
+        tokens.inc(100, model="a", kind="input")
+        tokens.inc(50, model="b", kind="input")
+        tokens.inc(10, model="a", kind="output")
+        self.assertEqual(tokens.value(kind="input"), 150)
+        self.assertEqual(tokens.value(), 160)
+        with self.assertRaises(ValueError):
+            tokens.inc(model="a")
+        with self.assertRaises(ValueError):
+            tokens.value(agent="Editor")
+
+    def test_histogram_quantiles(self):
+        h = self.registry.histogram("h", "H", buckets=(1, 2, 4, 8))
+        self.assertEqual(h.quantile(0.5), 0.0)
+        for v in (0.5,) * 50 + (3,) * 45 + (6,) * 5:
+            h.observe(v)
+        self.assertAlmostEqual(h.quantile(0.5), 1.0)
+        self.assertAlmostEqual(h.quantile(0.95), 4.0)
+        self.assertEqual(h.count(), 100)
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_api_call_and_summary(self):
+        before = metrics.summary()
+        usage = SimpleNamespace(cache_read_input_tokens=800, cache_creation_input_tokens=0)
+        metrics.record_api_call("structured", "claude-x", 1.5, 1000, 200, 0.5, True, usage)
+        metrics.record_api_call("stream", "claude-x", 0.1, 0, 0, 0.0, False)
+        after = metrics.summary()
+        self.assertEqual(after["api_calls"] - before["api_calls"], 2)
+        self.assertEqual(after["api_errors"] - before["api_errors"], 1)
+        self.assertEqual(after["input_tokens"] - before["input_tokens"], 1000)
+        self.assertEqual(after["cache_read_tokens"] - before["cache_read_tokens"], 800)
+        self.assertAlmostEqual(after["cost_inr"] - before["cost_inr"], 0.5)
+
+    def test_retries_counted(self):
+        attempts = []
+
+        @retry_with_backoff(retries=2, base_delay=0, exceptions=(ConnectionError,))
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError("reset")
+
+        before = metrics.retries.value(func="flaky")
+        asyncio.run(flaky())
+        self.assertEqual(metrics.retries.value(func="flaky") - before, 1)
+
+    def test_limiter_waits_counted(self):
+        limiter = RateLimiter(rpm=1)
+        waiting_during_sleep = []
+
+        async def fake_sleep(seconds):
+            waiting_during_sleep.append(metrics.limiter_waiting.value())
+            limiter.request_timestamps.clear()  # The window has passed
+
+        before = metrics.limiter_waits.count()
+        with mock.patch("core.rate_limiter.asyncio.sleep", fake_sleep):
+            asyncio.run(limiter.acquire())
+            asyncio.run(limiter.acquire())
+        self.assertEqual(metrics.limiter_waits.count() - before, 1)
+        self.assertEqual(waiting_during_sleep, [1])
+        self.assertEqual(metrics.limiter_waiting.value(), 0)
+
+    def test_limiter_enforces_tpm(self):
+        limiter = RateLimiter(rpm=100, tpm=1000)
+        waits = []
+
+        async def fake_sleep(seconds):
+            waits.append(seconds)
+            limiter.token_log.popleft()  # The oldest call has aged out of the window
+
+        with mock.patch("core.rate_limiter.asyncio.sleep", fake_sleep):
+            asyncio.run(limiter.acquire(600))
+            asyncio.run(limiter.acquire(300))
+            self.assertEqual(waits, [])
+            asyncio.run(limiter.acquire(400))  # 1300 > 1000: waits for the 600-token call to expire
+            self.assertEqual(len(waits), 1)
+            limiter.token_log.clear()
+            asyncio.run(limiter.acquire(5000))  # Larger than the quota, but the window is empty
+        self.assertEqual(len(waits), 1)
+
+    def test_http_endpoint(self):
+        server = metrics.start_http_server(port=0)
+        self.assertIsNotNone(server)
+        self.assertIs(metrics.start_http_server(port=0), server)  # Idempotent
+        with urllib.request.urlopen(metrics.endpoint_url()) as resp:
+            self.assertIn("text/plain; version=0.0.4", resp.headers["Content-Type"])
+            body = resp.read().decode()
+        self.assertIn("# TYPE edtech_api_calls_total counter", body)
+        self.assertIn("edtech_active_runs ", body)
+
+    def test_taken_port_is_reported_once(self):
+        with socket.socket() as taken:
+            taken.bind(("127.0.0.1", 0))
+            taken.listen()
+            port = taken.getsockname()[1]
+            with mock.patch.object(metrics, "_server", None), mock.patch.object(metrics, "_failed_binds", set()), \
+                    mock.patch.object(metrics.logger, "error") as error:
+                for _ in range(3):  # Streamlit reruns
+                    self.assertIsNone(metrics.start_http_server(port=port, host="127.0.0.1"))
+        self.assertEqual(error.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
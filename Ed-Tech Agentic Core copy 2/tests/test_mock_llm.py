@@ -0,0 +1,163 @@
+import unittest
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+import anthropic
+
+from core import models
+from core.mock_llm import MockLLMConfig, mock_http_client, fake_from_schema
+from core.models import OrchestratorConfig, AgentConfig
+from core.orchestrator import Orchestrator
+from core.rate_limiter import RateLimiter
+from core.tokens import TokenCalibrator
+
+MODEL = "claude-3-haiku-20240307"
+
+
+def tool_for(model_cls):
+    return {"name": model_cls.__name__, "description": "", "input_schema": model_cls.model_json_schema()}
+
+
+class TestMockTransport(unittest.TestCase):
+    def client(self, config=None, **kwargs):
+        return anthropic.AsyncAnthropic(api_key="mock", http_client=mock_http_client(config), **kwargs)
+
+    def test_tool_use_validates_against_model(self):
+        async def call():
+            client = self.client()
+            response = await client.messages.create(
+                model=MODEL, max_tokens=100, tools=[tool_for(models.MCSCBatch)],
+                messages=[{"role": "user", "content": "Topic: DNA\nNumber of Questions: 7"}])
+            return response
+
+        response = asyncio.run(call())
+        block = response.content[0]
+        self.assertEqual(block.type, "tool_use")
+        batch = models.MCSCBatch.model_validate(block.input)
+        self.assertEqual(len(batch.questions), 7)
+        self.assertGreater(response.usage.input_tokens, 0)
+
+    def test_schema_fallback_covers_every_model(self):
+        for model_cls in (models.AuditResult, models.PedagogueAnalysis, models.EditorResponse,
+                          models.CheckerResponse, models.MCMCBatch, models.SubjectiveBatch, models.AssignmentBatch):
+            schema = model_cls.model_json_schema()
+            model_cls.model_validate(fake_from_schema(schema))
+
+    def test_rate_limits_are_retried(self):
+        config = MockLLMConfig(rate_limit_rate=0.5, retry_after_s=0.001, output_tokens=42, seed=3)
+        http_client = mock_http_client(config)
+        transport = http_client._transport
+
+        async def calls():
+            client = anthropic.AsyncAnthropic(api_key="mock", max_retries=10, http_client=http_client)
+            return [await client.messages.create(model=MODEL, max_tokens=10,
+                                                 messages=[{"role": "user", "content": "hi"}]) for _ in range(5)]
+
+        responses = asyncio.run(calls())
+        self.assertEqual([r.usage.output_tokens for r in responses], [42] * 5)
+        self.assertGreater(transport.stats["rate_limited"], 0)
+        self.assertEqual(transport.stats["requests"], 5 + transport.stats["rate_limited"])
+
+    def test_persistent_rate_limit_surfaces(self):
+        async def call():
+            client = self.client(MockLLMConfig(rate_limit_rate=1.0, retry_after_s=0.001), max_retries=1)
+            await client.messages.create(model=MODEL, max_tokens=10, messages=[{"role": "user", "content": "hi"}])
+
+        with self.assertRaises(anthropic.RateLimitError):
+            asyncio.run(call())
+
+    def test_stream_is_paced(self):
+        config = MockLLMConfig(stream_chunk_chars=100, stream_chunk_delay_s=0.01, draft_sections=3)
+
+        async def stream():
+            client = self.client(config)
+            chunks = []
+            t = time.perf_counter()
+            async with client.messages.stream(model=MODEL, max_tokens=100,
+                                              messages=[{"role": "user", "content": "Draft notes"}]) as s:
+                async for text in s.text_stream:
+                    chunks.append(text)
+                final = await s.get_final_message()
+            return chunks, time.perf_counter() - t, final
+
+        chunks, elapsed, final = asyncio.run(stream())
+        self.assertGreater(len(chunks), 3)
+        self.assertGreaterEqual(elapsed, 0.01 * len(chunks))
+        self.assertIn("[mock-para-1]", "".join(chunks))
+        self.assertEqual(final.usage.output_tokens, len("".join(chunks)) // 4)
+
+    def test_override_response(self):
+        audit = {"critiques": [], "summary": "Perfect.", "quality_score": 99}
+
+        async def call():
+            client = self.client(MockLLMConfig(responses={"AuditResult": audit}))
+            return await client.messages.create(model=MODEL, max_tokens=10, tools=[tool_for(models.AuditResult)],
+                                                messages=[{"role": "user", "content": "audit"}])
+
+        self.assertEqual(asyncio.run(call()).content[0].input, audit)
+
+
+class TestOfflinePipeline(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.original_cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        # Mock usage must not leak into the persisted calibration
+        calibrator = TokenCalibrator(None)
+        for target in ("core.client.calibrator", "core.structured_client.calibrator", "agents.base_agent.calibrator"):
+            patcher = mock.patch(target, calibrator)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Offline runs must not wait on (or use up) the process-wide API quota
+        limiter = RateLimiter(rpm=100_000, tpm=10**9)
+        for target in ("core.client.limiter", "core.structured_client.limiter"):
+            patcher = mock.patch(target, limiter)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.config = OrchestratorConfig(**{name: AgentConfig(model=MODEL) for name in
+                                            ("creator", "auditor", "pedagogue", "editor", "sanitizer", "checker")})
+
+    def tearDown(self):
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.test_dir)
+
+    def run_pipeline(self, mode, mock_config=None, **kwargs):
+        http_client = mock_http_client(mock_config or MockLLMConfig(rate_limit_rate=0.2, retry_after_s=0.001))
+        orch = Orchestrator(self.config, api_key="mock", http_client=http_client, headless=True)
+
+        async def run():
+            return [e async for e in orch.run_loop("Mock Topic", "Basics", mode=mode, **kwargs)]
+
+        events = asyncio.run(run())
+        final = events[-1]
+        self.assertEqual(final.get("type"), "FINAL_RESULT")
+        return final, http_client._transport.stats
+
+    def test_lecture_notes_full_loop(self):
+        final, stats = self.run_pipeline("Lecture Notes")
+        self.assertTrue(os.path.exists(final["path"]))
+        self.assertIn("## 1. Section 1", final["content"])
+        # Creator stream, 3 audits, 1 pedagogue pass, 2 edits, sanitizer
+        self.assertEqual(stats["tool:AuditResult"], 3)
+        self.assertEqual(stats["tool:EditorResponse"], 2)
+        self.assertEqual(stats["streams"], 1)
+
+    def test_clean_audit_stops_early(self):
+        final, stats = self.run_pipeline("Lecture Notes", MockLLMConfig(quality_score=95))
+        self.assertEqual(stats["tool:AuditResult"], 1)
+        self.assertEqual(stats["tool:EditorResponse"], 0)
+
+    def test_assignment_batch_and_checks(self):
+        final, stats = self.run_pipeline("Assignment", assignment_config={"mcsc": 3, "mcmc": 2, "subjective": 1})
+        self.assertEqual(len(json.loads(final["content"])), 6)
+        self.assertEqual(stats["tool:CheckerResponse"], 6)
+        self.assertTrue(final["path"].endswith(".csv"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from core import tokens
+from core.tokens import TokenCalibrator, estimate_prompt_tokens, trim_to_tokens
+from core.log_analytics import LogAnalyzer
+from agents.definitions import EditorAgent, CheckerAgent
+
+
+class TestTokenCalibrator(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "calibration.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_converges_and_persists(self):
+        cal = TokenCalibrator(self.path, save_every=5)
+        for _ in range(20):
+            cal.observe("haiku", 1000, 1300)
+        self.assertAlmostEqual(cal.ratio("haiku"), 1.3, places=2)
+        self.assertEqual(cal.predict("haiku", 2000), 2600)
+        self.assertEqual(cal.ratio("sonnet"), 1.0)
+
+        reloaded = TokenCalibrator(self.path)
+        self.assertAlmostEqual(reloaded.ratio("haiku"), 1.3, places=2)
+        self.assertEqual(reloaded.stats()["haiku"]["calls"], 20)
+
+    def test_ignores_missing_usage(self):
+        cal = TokenCalibrator(None)
+        cal.observe("haiku", 1000, 0)
+        self.assertEqual(cal.stats(), {})
+
+    def test_trim_keeps_head_and_tail(self):
+        text = "HEAD " + "filler text " * 5000 + " TAIL"
+        trimmed = trim_to_tokens(text, 500)
+        self.assertTrue(trimmed.startswith("HEAD"))
+        self.assertTrue(trimmed.endswith("TAIL"))
+        self.assertIn("omitted", trimmed)
+        self.assertLess(tokens.estimate_tokens(trimmed), 600)
+
+
+class TestAgentBudget(unittest.TestCase):
+    def setUp(self):
+        # Isolated, uncalibrated estimates
+        self.cal = TokenCalibrator(None)
+        patcher = mock.patch("agents.base_agent.calibrator", self.cal)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_under_budget_is_untouched(self):
+        agent = EditorAgent()
+        user = agent.format_instruction_prompt("short draft", "fix typos")
+        fitted, raw = agent.fit_prompt(agent.get_system_prompt(), user)
+        self.assertEqual(fitted, user)
+        self.assertEqual(raw, estimate_prompt_tokens(agent.get_system_prompt(), user))
+
+    def test_warn_policy_keeps_prompt(self):
+        agent = CheckerAgent()
+        user = agent.format_user_prompt("x " * 40000)
+        with self.assertLogs("EdTechCore", level="WARNING"):
+            fitted, _ = agent.fit_prompt(agent.get_system_prompt(), user)
+        self.assertEqual(fitted, user)
+
+    def test_trim_policy_fits_budget(self):
+        agent = CheckerAgent()
+        agent.budget_policy = "trim"
+        self.cal.observe(agent.model, 1000, 1500)  # API counts 1.5x our estimate
+        system = agent.get_system_prompt()
+        user = agent.format_user_prompt("lorem ipsum " * 20000)
+        with self.assertLogs("EdTechCore", level="WARNING"):
+            fitted, raw = agent.fit_prompt(system, user)
+        self.assertLess(len(fitted), len(user))
+        self.assertLessEqual(agent.predict_tokens(system, fitted), agent.token_budget)
+        self.assertEqual(raw, estimate_prompt_tokens(system, fitted))
+
+    def test_tokens_available_for_batching(self):
+        agent = CheckerAgent()
+        system = agent.get_system_prompt()
+        available = agent.tokens_available(system)
+        self.assertGreater(available, 0)
+        self.assertLess(available, agent.token_budget)
+
+
+class TestPredictionReport(unittest.TestCase):
+    def test_prediction_error_aggregated(self):
+        analyzer = LogAnalyzer()
+        analyzer.feed({"event": "llm_call", "model": "haiku", "predicted_input_tokens": 900, "prompt_tokens": 1000})
+        analyzer.feed({"event": "llm_call", "model": "haiku", "predicted_input_tokens": 1100, "prompt_tokens": 1000})
+        analyzer.feed({"event": "llm_call", "model": "haiku"})  # older record without prediction
+        self.assertEqual(analyzer.report()["calls"]["prediction_error_pct"], 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from agents.prompt_registry import PromptRegistry, PromptError
+from agents.definitions import prompts, AuditorAgent, CreatorAgent, CheckerAgent, SanitizerAgent
+
+
+class TestPromptRegistry(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write(self, name, text, mtime=None):
+        path = os.path.join(self.test_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def test_render_matches_replace(self):
+        text = 'Draft: {draft}\nJSON: { "type": "mcsc" }\n## What Is {Topic}?\nAgain: {draft} for {mode}'
+        self.write("user.md", text)
+        registry = PromptRegistry(self.test_dir, fields={"user.md": ("draft", "mode")})
+        rendered = registry.render("user.md", draft="D {mode}", mode="Assignment")
+        # Values are never re-scanned, unlike chained str.replace
+        self.assertEqual(rendered, text.replace("{mode}", "Assignment").replace("{draft}", "D {mode}"))
+
+    def test_missing_file_fails_at_load(self):
+        with self.assertRaises(PromptError):
+            PromptRegistry(self.test_dir, fields={"absent.md": ("draft",)})
+
+    def test_missing_placeholder_fails_at_load(self):
+        self.write("user.md", "Draft: {drafft}")
+        with self.assertRaises(PromptError):
+            PromptRegistry(self.test_dir, fields={"user.md": ("draft",)})
+
+    def test_missing_value_raises(self):
+        self.write("user.md", "{draft} / {mode}")
+        registry = PromptRegistry(self.test_dir, fields={"user.md": ("draft", "mode")})
+        with self.assertRaises(PromptError):
+            registry.render("user.md", draft="x")
+
+    def test_hot_reload_on_mtime_change(self):
+        self.write("user.md", "v1 {draft}", mtime=1_000_000)
+        registry = PromptRegistry(self.test_dir, fields={"user.md": ("draft",)}, hot_reload=True, check_interval=0)
+        self.assertEqual(registry.render("user.md", draft="x"), "v1 x")
+
+        self.write("user.md", "v2 {draft}", mtime=1_000_100)
+        self.assertEqual(registry.render("user.md", draft="x"), "v2 x")
+        self.assertEqual(registry.stats["reloads"], 1)
+
+        # A broken edit keeps the last good version
+        self.write("user.md", "v3 without placeholder", mtime=1_000_200)
+        self.assertEqual(registry.render("user.md", draft="x"), "v2 x")
+
+    def test_no_reload_when_disabled(self):
+        self.write("user.md", "v1", mtime=1_000_000)
+        registry = PromptRegistry(self.test_dir, hot_reload=False)
+        self.write("user.md", "v2", mtime=1_000_100)
+        self.assertEqual(registry.text("user.md"), "v1")
+
+
+class TestAgentPrompts(unittest.TestCase):
+    def test_repo_prompts_fill_every_placeholder(self):
+        audit = AuditorAgent().format_user_prompt("DRAFT", "TRANSCRIPT", mode="Assignment", target_audience="Beginners")
+        self.assertIn("Content Type: Assignment", audit)
+        self.assertIn("Target Audience: Beginners", audit)
+        self.assertNotIn("{mode}", audit)
+
+        sanitized = SanitizerAgent().format_user_prompt("Uses {mode} literally", mode="Pre-read Notes")
+        self.assertIn("Uses {mode} literally", sanitized)
+        self.assertIn("Content Type: Pre-read Notes", sanitized)
+
+        creator = CreatorAgent().format_user_prompt("DNA", "Helix", mode="Assignment", count=7)
+        self.assertIn("Number of Questions: 7", creator)
+
+        fix = CheckerAgent().format_fix_prompt('{"q": 1}', ["bad index"], "Fix it")
+        self.assertIn("Issues: ['bad index']", fix)
+
+    def test_system_prompts_are_cached(self):
+        loads = prompts.stats["loads"]
+        for _ in range(5):
+            CheckerAgent().get_system_prompt()
+        self.assertEqual(prompts.stats["loads"], loads)
+
+
+if __name__ == "__main__":
+    unittest.main()
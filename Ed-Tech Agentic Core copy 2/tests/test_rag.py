@@ -0,0 +1,164 @@
+import unittest
+import os
+import shutil
+import tempfile
+import sys
+import time
+import types
+from unittest.mock import MagicMock, patch
+
+import chromadb
+from chromadb.api.types import EmbeddingFunction
+
+from core.rag import RAGManager, namespace_to_collection, DEFAULT_COLLECTION
+from core.reranker import Reranker
+from core.utils import split_subtopics
+
+
+class HashEmbedding(EmbeddingFunction):
+    """Tiny deterministic embedding so tests don't download a model."""
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        return [[float(len(t) % 7), float(sum(map(ord, t)) % 11), 1.0] for t in input]
+
+    @staticmethod
+    def name():
+        return "test-hash"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashEmbedding()
+
+
+class TestBatchedRetrieval(unittest.TestCase):
+    def setUp(self):
+        # Bypass __init__ so no embedding model / persistent client is loaded
+        self.rag = RAGManager.__new__(RAGManager)
+        self.rag.collection = MagicMock()
+        self.rag.collection.query.return_value = {
+            "ids": [["a", "b", "c"], ["b", "d", "e"]],
+            "documents": [["doc a", "doc b", "doc c"], ["doc b", "doc d", "doc e"]],
+            "metadatas": [[{"source": "s1"}] * 3, [{"source": "s2"}] * 3],
+            "distances": [[0.2, 0.9, 1.2], [0.4, 0.5, 2.0]],
+        }
+
+    def test_single_query_call(self):
+        self.rag.retrieve_context_batch(["Helicase", "Polymerase"], topic="DNA Replication")
+        self.rag.collection.query.assert_called_once()
+        kwargs = self.rag.collection.query.call_args.kwargs
+        self.assertEqual(kwargs["query_texts"], ["DNA Replication Helicase", "DNA Replication Polymerase"])
+
+    def test_dedup_and_threshold(self):
+        result = self.rag.retrieve_context_batch(["Helicase", "Polymerase"], k=3)
+        # "b" is closer to the second query (0.4 < 0.9), so it only appears there
+        self.assertIn("doc a", result["Helicase"])
+        self.assertNotIn("doc b", result["Helicase"])
+        self.assertIn("doc b", result["Polymerase"])
+        # "e" is above the distance threshold
+        self.assertNotIn("doc e", result["Polymerase"])
+
+    def test_format_context_map_skips_empty(self):
+        text = RAGManager.format_context_map({"A": "ctx", "B": ""})
+        self.assertIn("### Subtopic: A", text)
+        self.assertNotIn("Subtopic: B", text)
+
+    def test_split_subtopics(self):
+        self.assertEqual(split_subtopics("Causes, Bastille;\nReign of Terror,"), ["Causes", "Bastille", "Reign of Terror"])
+        self.assertEqual(split_subtopics(None), [])
+
+
+class TestNamespaces(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.rag = RAGManager.__new__(RAGManager)
+        self.rag.client = chromadb.PersistentClient(path=self.test_dir)
+        self.rag.embedding_fn = HashEmbedding()
+        self.rag.collection = self.rag.client.get_or_create_collection(DEFAULT_COLLECTION, embedding_function=self.rag.embedding_fn)
+        self.rag._collections = {DEFAULT_COLLECTION: self.rag.collection}
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _ingest(self, name, text, namespace):
+        path = os.path.join(self.test_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return self.rag.ingest_document(path, name, namespace=namespace)
+
+    def test_collection_names(self):
+        self.assertEqual(namespace_to_collection(""), DEFAULT_COLLECTION)
+        self.assertEqual(namespace_to_collection(None), DEFAULT_COLLECTION)
+        self.assertNotEqual(namespace_to_collection("C++"), namespace_to_collection("C"))
+        self.assertTrue(namespace_to_collection("DNA Replication").startswith("kb_dna_replication"))
+
+    def test_scoped_query_stats_and_delete(self):
+        self.assertTrue(self._ingest("dna.txt", "helicase unwinds DNA " * 10, "DNA Replication"))
+        self.assertTrue(self._ingest("css.txt", "flexbox layout " * 10, "CSS"))
+
+        self.assertEqual(self.rag.namespace_stats(), {"": 0, "CSS": 1, "DNA Replication": 1})
+
+        context = self.rag.retrieve_context("helicase", threshold=1e9, namespace="DNA Replication")
+        self.assertIn("dna.txt", context)
+        self.assertNotIn("css.txt", context)
+
+        self.assertTrue(self.rag.delete_namespace("CSS"))
+        self.assertEqual(self.rag.namespace_stats(), {"": 0, "DNA Replication": 1})
+
+    def test_namespace_without_metadata(self):
+        self.rag.client.create_collection("kb_legacy_course", embedding_function=self.rag.embedding_fn)
+        self.assertIn("legacy_course", self.rag.list_namespaces())
+        self.assertEqual(self.rag.namespace_stats()["legacy_course"], 0)
+        self.assertTrue(self.rag.delete_namespace("legacy_course"))
+        self.assertNotIn("legacy_course", self.rag.list_namespaces())
+
+
+class TestReranker(unittest.TestCase):
+    def test_orders_by_score(self):
+        # Score = candidate length, so the longest candidate wins
+        reranker = Reranker(scorer=lambda pairs: [len(c) for _, c in pairs])
+        order = reranker.rerank("q", ["aa", "a", "aaaa"], budget_ms=1000, batch_size=2)
+        self.assertEqual(order, [2, 0, 1])
+
+    def test_budget_exceeded_falls_back(self):
+        def slow_scorer(pairs):
+            time.sleep(0.02)
+            return [0.0] * len(pairs)
+        reranker = Reranker(scorer=slow_scorer)
+        self.assertIsNone(reranker.rerank("q", ["a", "b", "c", "d"], budget_ms=5, batch_size=1))
+        self.assertEqual(reranker.stats["fallbacks"], 1)
+
+    def test_model_load_is_outside_budget(self):
+        class SlowLoadingCrossEncoder:
+            def __init__(self, name, device=None):
+                time.sleep(0.05)
+
+            def predict(self, pairs, **kwargs):
+                return [len(c) for _, c in pairs]
+
+        fake = types.SimpleNamespace(CrossEncoder=SlowLoadingCrossEncoder)
+        with patch.dict(sys.modules, {"sentence_transformers": fake}):
+            order = Reranker().rerank("q", ["a", "aaa"], budget_ms=20)
+        self.assertEqual(order, [1, 0])
+
+    def test_retrieve_context_uses_rerank_order(self):
+        rag = RAGManager.__new__(RAGManager)
+        rag.collection = MagicMock()
+        rag.collection.query.return_value = {
+            "ids": [["a", "b"]],
+            "documents": [["short", "much longer chunk"]],
+            "metadatas": [[{"source": "s"}, {"source": "s"}]],
+            "distances": [[0.1, 0.2]],
+        }
+        rag.reranker = Reranker(scorer=lambda pairs: [len(c) for _, c in pairs])
+        context = rag.retrieve_context("q", k=1, rerank=True)
+        self.assertIn("much longer chunk", context)
+        self.assertEqual(rag.retrieve_context("q", k=1), "[Source: s]\nshort")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+from unittest import mock
+
+import anthropic
+
+from core import replay
+from core.mock_llm import MockLLMConfig, MockAnthropicTransport
+from core.models import OrchestratorConfig, AgentConfig
+from core.orchestrator import Orchestrator
+from core.replay import recording_http_client, replay_http_client, read_recording
+from core.rate_limiter import RateLimiter
+from core.tokens import TokenCalibrator
+
+MODEL = "claude-3-haiku-20240307"
+
+
+async def session(http_client, prompts=("one", "two"), max_retries=5):
+    """A create per prompt plus one stream, as the pipeline's clients would issue them."""
+    client = anthropic.AsyncAnthropic(api_key="test", http_client=http_client, max_retries=max_retries)
+    texts = []
+    for prompt in prompts:
+        response = await client.messages.create(model=MODEL, max_tokens=10,
+                                                messages=[{"role": "user", "content": prompt}])
+        texts.append(response.content[0].text)
+    async with client.messages.stream(model=MODEL, max_tokens=10,
+                                      messages=[{"role": "user", "content": "stream"}]) as s:
+        texts.append("".join([t async for t in s.text_stream]))
+    return texts
+
+
+class TestRecordReplay(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, "run.jsonl.gz")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def record(self, **mock_kwargs):
+        config = MockLLMConfig(retry_after_s=0.001, **mock_kwargs)
+        http_client = recording_http_client(self.path, inner=MockAnthropicTransport(config), meta={"note": "test"})
+        texts = asyncio.run(session(http_client))
+        return texts, http_client._transport
+
+    def test_replay_returns_recorded_responses(self):
+        texts, recorder = self.record(rate_limit_rate=0.3, seed=1)
+        meta, exchanges, _ = read_recording(self.path)
+        self.assertEqual(meta["note"], "test")
+        self.assertEqual(len(exchanges), recorder.stats["exchanges"])
+        self.assertIn(429, [e["status"] for e in exchanges])  # Retries are part of the recording
+
+        http_client = replay_http_client(self.path)
+        self.assertEqual(asyncio.run(session(http_client)), texts)
+        self.assertEqual(http_client._transport.stats["mismatches"], 0)
+        self.assertEqual(http_client._transport.unused, 0)
+
+    def test_speed_reproduces_pacing(self):
+        self.record(latency_s=0.05, stream_chunk_chars=200, stream_chunk_delay_s=0.01)
+        t = time.perf_counter()
+        asyncio.run(session(replay_http_client(self.path, speed=1.0)))
+        paced = time.perf_counter() - t
+        t = time.perf_counter()
+        asyncio.run(session(replay_http_client(self.path)))
+        fast = time.perf_counter() - t
+        self.assertGreater(paced, 0.15)
+        self.assertLess(fast, paced)
+
+    def test_changed_request_is_a_mismatch(self):
+        self.record()
+        lenient = replay_http_client(self.path)
+        asyncio.run(session(lenient, prompts=("one", "changed")))
+        self.assertEqual(lenient._transport.stats["mismatches"], 1)
+
+        strict = replay_http_client(self.path, strict=True)
+        with self.assertRaises(anthropic.APIConnectionError):
+            asyncio.run(session(strict, prompts=("changed",), max_retries=0))
+
+    def test_info_lists_exchanges(self):
+        self.record()
+        out = io.StringIO()
+        with redirect_stdout(out):
+            replay.main(["info", self.path])
+        self.assertIn(f"{MODEL}/stream", out.getvalue())
+
+
+class TestPipelineReplay(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.original_cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        calibrator = TokenCalibrator(None)
+        for target in ("core.client.calibrator", "core.structured_client.calibrator", "agents.base_agent.calibrator"):
+            patcher = mock.patch(target, calibrator)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Offline runs must not wait on (or use up) the process-wide API quota
+        limiter = RateLimiter(rpm=100_000, tpm=10**9)
+        for target in ("core.client.limiter", "core.structured_client.limiter"):
+            patcher = mock.patch(target, limiter)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.config = OrchestratorConfig(**{name: AgentConfig(model=MODEL) for name in
+                                            ("creator", "auditor", "pedagogue", "editor", "sanitizer", "checker")})
+
+    def tearDown(self):
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.test_dir)
+
+    def run_loop(self, http_client):
+        orch = Orchestrator(self.config, api_key="test", http_client=http_client, headless=True)
+
+        async def run():
+            return [e async for e in orch.run_loop("Replay Topic", "Basics", mode="Lecture Notes")][-1]
+
+        return asyncio.run(run())
+
+    def test_replayed_run_is_identical(self):
+        recorder = recording_http_client("run.jsonl.gz", inner=MockAnthropicTransport(MockLLMConfig()))
+        recorded = self.run_loop(recorder)
+        recorder._transport.finish(recorded["content"])
+
+        player = replay_http_client("run.jsonl.gz")
+        replayed = self.run_loop(player)
+        self.assertEqual(replayed["content"], recorded["content"])
+        self.assertEqual(player._transport.stats["mismatches"], 0)
+        self.assertEqual(player._transport.unused, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+
+from core.session_store import FileSessionBackend, SQLiteSessionBackend, RedisSessionBackend, LocalRedis
+from core.state_manager import SessionPersister
+
+
+class BackendContract:
+    """Behaviour every session backend must provide."""
+
+    def make_backend(self, ttl):
+        raise NotImplementedError
+
+    def expire(self, backend, session_id):
+        """Makes session_id look idle for longer than the TTL."""
+        raise NotImplementedError
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.backend = self.make_backend(ttl=3600)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_round_trip_and_delete(self):
+        self.backend.write_state("a", '{"view": "editor"}')
+        self.backend.write_draft("a", "# Draft")
+        self.assertEqual(self.backend.read("a"), ('{"view": "editor"}', "# Draft"))
+        self.backend.write_draft("a", None)
+        self.assertEqual(self.backend.read("a"), ('{"view": "editor"}', None))
+        self.assertEqual(self.backend.list_sessions(), ["a"])
+        self.backend.delete("a")
+        self.assertEqual(self.backend.read("a"), (None, None))
+
+    def test_cleanup_expires_idle_sessions(self):
+        self.backend.write_state("old", "{}")
+        self.backend.write_draft("old", "# stale")
+        self.backend.write_state("fresh", "{}")
+        self.expire(self.backend, "old")
+        self.backend.cleanup()
+        self.assertEqual(self.backend.read("old"), (None, None))
+        self.assertEqual(self.backend.list_sessions(), ["fresh"])
+
+    def test_persister_writes_through_backend(self):
+        persister = SessionPersister(backend=self.backend, delay=60)
+        persister.save("s", {"total_cost": 1.5}, "# Notes", immediate=True)
+        state, draft = self.backend.read("s")
+        self.assertIn('"total_cost": 1.5', state)
+        self.assertEqual(draft, "# Notes")
+
+    def test_replica_rewrites_state_another_replica_replaced(self):
+        if not self.backend.shared:
+            self.skipTest("single-writer backend")
+        replica_a = SessionPersister(backend=self.backend, delay=60)
+        replica_b = SessionPersister(backend=self.backend, delay=60)
+        replica_a.save("s", {"view": "editor"}, "# A", immediate=True)
+        replica_b.save("s", {"view": "library"}, "# B", immediate=True)
+        replica_a.save("s", {"view": "editor"}, "# A", immediate=True)  # Same as A's last write, but not what is stored
+        state, draft = self.backend.read("s")
+        self.assertIn('"view": "editor"', state)
+        self.assertEqual(draft, "# A")
+
+    def test_unchanged_draft_not_rewritten(self):
+        persister = SessionPersister(backend=self.backend, delay=60)
+        for cost in (1, 2, 3):
+            persister.save("s", {"total_cost": cost}, "# Notes", immediate=True)
+        stats = persister.get_stats()
+        self.assertEqual((stats["writes"], stats["draft_writes"]), (3, 1))
+        self.assertEqual(self.backend.read("s")[1], "# Notes")
+
+
+class TestFileBackend(BackendContract, unittest.TestCase):
+    def make_backend(self, ttl):
+        return FileSessionBackend(root=os.path.join(self.test_dir, "sessions"), ttl=ttl)
+
+    def expire(self, backend, session_id):
+        past = time.time() - 7200
+        os.utime(backend.state_path(session_id), (past, past))
+
+
+class TestSQLiteBackend(BackendContract, unittest.TestCase):
+    def make_backend(self, ttl):
+        return SQLiteSessionBackend(db_path=os.path.join(self.test_dir, "sessions.db"), ttl=ttl)
+
+    def expire(self, backend, session_id):
+        with backend._connect() as conn:
+            conn.execute("UPDATE sessions SET updated = ? WHERE session_id = ?", (time.time() - 7200, session_id))
+
+
+class TestRedisBackend(BackendContract, unittest.TestCase):
+    def make_backend(self, ttl):
+        self.now = [1000.0]
+        return RedisSessionBackend(client=LocalRedis(clock=lambda: self.now[0]), ttl=ttl)
+
+    def expire(self, backend, session_id):
+        # Keys expire natively; move every key of this session past its TTL
+        for key in list(backend.client._expires):
+            if key.startswith(backend._key(session_id, "")):
+                backend.client._expires[key] = self.now[0] - 1
+
+    def test_cleanup_sets_missing_ttls(self):
+        self.backend.client.set(self.backend._key("legacy"), "{}")
+        self.assertEqual(self.backend.cleanup(), 1)
+        self.assertEqual(self.backend.client.ttl(self.backend._key("legacy")), 3600)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import asyncio
+import io
+import json
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from unittest import mock
+
+from core import tracing
+from core.tracing import Tracer, current_span, format_summary, load_traces
+from core.utils import retry_with_backoff
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.tracer = Tracer(enabled=True, directory=self.test_dir, fmt="jsonl", print_summary=False)
+
+    def trace_file(self):
+        files = os.listdir(self.test_dir)
+        self.assertEqual(len(files), 1)
+        return os.path.join(self.test_dir, files[0])
+
+    def run_pipeline(self):
+        tracer = self.tracer
+
+        async def call(name):
+            with tracer.span("llm.structured", kind="client", model=name) as span:
+                await asyncio.sleep(0.01)
+                span.set(input_tokens=100, output_tokens=10)
+
+        async def pipeline():
+            with tracer.span("run", kind="run", topic="DNA") as run:
+                with tracer.span("node.critique", kind="node"):
+                    await asyncio.gather(call("auditor"), call("pedagogue"))
+                with tracer.span("node.editor", kind="node"):
+                    try:
+                        with tracer.span("edits.apply"):
+                            raise ValueError("no match")
+                    except ValueError:
+                        pass
+                run.set(cost=1.5)
+        asyncio.run(pipeline())
+
+    def test_spans_nest_across_gather_and_export_on_root_end(self):
+        self.run_pipeline()
+        spans = next(iter(load_traces(self.trace_file()).values()))
+        by_name = {}
+        for s in spans:
+            by_name.setdefault(s["name"], []).append(s)
+        run, critique = by_name["run"][0], by_name["node.critique"][0]
+        self.assertIsNone(run["parent_id"])
+        self.assertEqual(critique["parent_id"], run["span_id"])
+        self.assertEqual({s["parent_id"] for s in by_name["llm.structured"]}, {critique["span_id"]})
+        self.assertEqual(len({s["trace_id"] for s in spans}), 1)
+        self.assertEqual(by_name["edits.apply"][0]["error"], "ValueError: no match")
+        self.assertGreaterEqual(critique["duration_ms"], 10)
+        self.assertEqual(run["attributes"], {"topic": "DNA", "cost": 1.5})
+
+    def test_summary_merges_siblings(self):
+        self.run_pipeline()
+        spans = next(iter(load_traces(self.trace_file()).values()))
+        summary = format_summary(spans)
+        self.assertIn("cost 1.5000", summary.splitlines()[0])
+        line = next(l for l in summary.splitlines() if "llm.structured" in l)
+        self.assertIn("x2", line)
+        self.assertIn("input_tokens=200", line)
+        self.assertIn("errors=1", next(l for l in summary.splitlines() if "edits.apply" in l))
+
+    def test_otlp_export_round_trips(self):
+        self.tracer.format = "otlp"
+        self.run_pipeline()
+        with open(self.trace_file(), encoding="utf-8") as f:
+            doc = json.loads(f.readline())
+        otlp_spans = doc["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        self.assertEqual(len(otlp_spans), 6)
+        client = next(s for s in otlp_spans if s["name"] == "llm.structured")
+        self.assertEqual(client["kind"], 3)
+        self.assertIn({"key": "input_tokens", "value": {"intValue": "100"}}, client["attributes"])
+        spans = next(iter(load_traces(self.trace_file()).values()))
+        self.assertEqual({s["name"] for s in spans}, {"run", "node.critique", "llm.structured", "node.editor", "edits.apply"})
+        self.assertEqual(next(s for s in spans if s["name"] == "edits.apply")["error"], "ValueError: no match")
+
+    def test_retry_attempts_are_spans(self):
+        calls = []
+
+        @retry_with_backoff(retries=3, base_delay=0, exceptions=(ConnectionError,))
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 2:
+                raise ConnectionError("reset")
+            return "ok"
+
+        async def run():
+            with self.tracer.span("llm.response", kind="client"):
+                return await flaky()
+
+        with mock.patch("core.utils.tracer", self.tracer):
+            self.assertEqual(asyncio.run(run()), "ok")
+        spans = next(iter(load_traces(self.trace_file()).values()))
+        attempts = [s for s in spans if s["name"] == "attempt"]
+        self.assertEqual([(s["attributes"]["attempt"], bool(s["error"])) for s in attempts], [(1, True), (2, False)])
+        self.assertEqual(len([s for s in spans if s["name"] == "backoff"]), 1)
+
+    def test_disabled_tracer_is_noop(self):
+        tracer = Tracer(enabled=False, directory=self.test_dir)
+        with tracer.span("run", kind="run") as span:
+            span.set(cost=1.0)
+            self.assertIs(current_span(), span)  # Both are the shared no-op
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+    def test_run_summary_printed_and_cli(self):
+        self.tracer.print_summary = True
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.run_pipeline()
+        self.assertIn("node.critique", out.getvalue())
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(tracing.main([self.trace_file(), "--last", "1"]), 0)
+        self.assertIn("llm.structured x2", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from core import version_manager
+from core.version_manager import VersionManager
+
+
+class TestVersionManager(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.original_cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        VersionManager._index_cache.clear()
+        VersionManager._content_cache.clear()
+
+    def tearDown(self):
+        os.chdir(self.original_cwd)
+        shutil.rmtree(self.test_dir)
+
+    def test_save_list_restore(self):
+        v1 = VersionManager.save_version("DNA Replication", "# Draft 1", "Lecture Notes", summary="first")
+        v2 = VersionManager.save_version("DNA Replication", "# Draft 2", "Lecture Notes", summary="second")
+
+        versions = VersionManager.list_versions("DNA Replication")
+        self.assertEqual({v["version_id"] for v in versions}, {v1, v2})
+        # Listing is metadata only
+        self.assertTrue(all("content" not in v for v in versions))
+        self.assertEqual(versions[0]["size"], len("# Draft 2"))
+
+        restored = VersionManager.restore_version("DNA Replication", v1)
+        self.assertEqual(restored["content"], "# Draft 1")
+        self.assertEqual(restored["summary"], "first")
+        self.assertIsNone(VersionManager.restore_version("DNA Replication", "missing"))
+
+    def test_migrates_legacy_files(self):
+        version_dir = VersionManager.get_version_dir("Legacy Topic")
+        legacy = {
+            "version_id": "abcd1234", "timestamp": "2026-01-19 19:25:59", "topic": "Legacy Topic",
+            "mode": "Assignment", "content": "[]", "summary": "Finalized Generation"
+        }
+        with open(os.path.join(version_dir, "1768830959_abcd1234.json"), "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+
+        versions = VersionManager.list_versions("Legacy Topic")
+        self.assertEqual(len(versions), 1)
+        self.assertEqual(versions[0]["mode"], "Assignment")
+        self.assertEqual(VersionManager.restore_version("Legacy Topic", "abcd1234")["content"], "[]")
+        self.assertFalse(os.path.exists(os.path.join(version_dir, "1768830959_abcd1234.json")))
+
+    def test_corrupt_legacy_file_is_moved_aside(self):
+        version_dir = VersionManager.get_version_dir("Legacy Topic")
+        with open(os.path.join(version_dir, "1768830959_bad.json"), "w", encoding="utf-8") as f:
+            f.write("{not json")
+        with mock.patch("builtins.print") as printed:
+            self.assertEqual(VersionManager.list_versions("Legacy Topic"), [])
+            VersionManager.list_versions("Legacy Topic")
+        self.assertEqual(printed.call_count, 1)
+        self.assertTrue(os.path.exists(os.path.join(version_dir, "1768830959_bad.json.corrupt")))
+
+    def test_delta_chain_and_snapshots(self):
+        base = "".join(f"Line {i} of the lecture notes.\n" for i in range(200))
+        drafts = [base + f"Refinement {n}\n" for n in range(version_manager.SNAPSHOT_INTERVAL + 2)]
+        ids = [VersionManager.save_version("Chain", d, "Lecture Notes") for d in drafts]
+
+        entries = {e["version_id"]: e for e in VersionManager.list_versions("Chain")}
+        kinds = [entries[v]["kind"] for v in ids]
+        self.assertEqual(kinds[0], "full")
+        self.assertIn("delta", kinds)
+        self.assertTrue(all(e["depth"] < version_manager.SNAPSHOT_INTERVAL for e in entries.values()))
+
+        # Cold restore rebuilds every version from blobs alone
+        VersionManager._content_cache.clear()
+        for version_id, draft in zip(ids, drafts):
+            self.assertEqual(VersionManager.restore_version("Chain", version_id)["content"], draft)
+        self.assertLessEqual(len(VersionManager._content_cache), version_manager.RECONSTRUCT_CACHE_SIZE)
+
+    def test_delta_roundtrip(self):
+        base = "a\nb\nc\nd"
+        target = "a\nB\nc\nd\ne"
+        ops = VersionManager._make_delta(base, target)
+        self.assertEqual(VersionManager._apply_delta(base, ops), target)
+
+    def test_compact_shrinks_legacy_history(self):
+        version_dir = VersionManager.get_version_dir("Compact Me")
+        base = "".join(f"Question {i}: what does helicase do?\n" for i in range(300))
+        for n in range(5):
+            legacy = {
+                "version_id": f"v{n}", "timestamp": f"2026-01-19 19:25:0{n}", "topic": "Compact Me",
+                "mode": "Assignment", "content": base + f"Edit {n}\n", "summary": ""
+            }
+            with open(os.path.join(version_dir, f"176883095{n}_v{n}.json"), "w", encoding="utf-8") as f:
+                json.dump(legacy, f, indent=4)
+
+        before, after = VersionManager.compact(version_dir)
+        self.assertLess(after, before)
+        VersionManager._content_cache.clear()
+        self.assertEqual(VersionManager.restore_version("Compact Me", "v3")["content"], base + "Edit 3\n")
+        self.assertTrue(all(f.endswith(".z") for f in os.listdir(os.path.join(version_dir, "blobs"))))
+
+    def test_compact_counts_snapshot_objects_on_both_sides(self):
+        base = "".join(f"Line {i} of the lecture notes.\n" for i in range(200))
+        for n in range(3):
+            VersionManager.save_version("Stable", base + f"Refinement {n}\n", "Lecture Notes")
+        version_dir = VersionManager.get_version_dir("Stable")
+        VersionManager.compact(version_dir)
+        before, after = VersionManager.compact(version_dir)  # Nothing left to compact
+        self.assertEqual(before, after)
+
+    def test_interrupted_compact_keeps_history(self):
+        base = "".join(f"Line {i} of the lecture notes.\n" for i in range(200))
+        drafts = [base + f"Refinement {n}\n" for n in range(4)]
+        ids = [VersionManager.save_version("Crash", d, "Lecture Notes") for d in drafts]
+        version_dir = VersionManager.get_version_dir("Crash")
+
+        # Reverse the chronology so compaction re-encodes every delta against a different parent
+        index_path = os.path.join(version_dir, version_manager.INDEX_FILE)
+        with open(index_path, encoding="utf-8") as f:
+            entries = json.load(f)
+        for n, entry in enumerate(entries):
+            entry["timestamp"] = f"2026-01-0{n + 1} 00:00:00"
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        VersionManager._index_cache.clear()
+
+        with mock.patch.object(VersionManager, "_save_index", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                VersionManager.compact(version_dir)
+        VersionManager._index_cache.clear()
+        VersionManager._content_cache.clear()
+        for version_id, draft in zip(ids, drafts):
+            self.assertEqual(VersionManager.restore_version("Crash", version_id)["content"], draft)
+
+        VersionManager.compact(version_dir)  # A later run succeeds and clears the orphaned blobs
+        VersionManager._content_cache.clear()
+        for version_id, draft in zip(ids, drafts):
+            self.assertEqual(VersionManager.restore_version("Crash", version_id)["content"], draft)
+        blobs = os.listdir(os.path.join(version_dir, "blobs"))
+        self.assertEqual(len(blobs), sum(1 for e in VersionManager.list_versions("Crash") if e["kind"] == "delta"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -386,9 +386,7 @@ async def render_generation_status(orchestrator, topic, subtopics, transcript_te
     final_result = None
     audit_log = [] 
     
-    if "total_cost" not in st.session_state:
-        st.session_state["total_cost"] = 0.0
-    
+    # Run-local ticker only; the session total comes from the cost ledger (StateManager.refresh_cost)
     current_run_cost = 0.0
 
     # Track streaming updates to reduce rendering freq
@@ -405,9 +403,7 @@ async def render_generation_status(orchestrator, topic, subtopics, transcript_te
             audit_log.append(event)
             
             if "cost" in event and event["cost"] > 0:
-                cost = event["cost"]
-                st.session_state["total_cost"] += cost
-                current_run_cost += cost
+                current_run_cost += event["cost"]
                 update_ticker(current_agent, current_status, current_cost=current_run_cost)
                 
             if event.get("type") == "FINAL_RESULT":
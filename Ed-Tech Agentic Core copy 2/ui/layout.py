@@ -7,6 +7,13 @@ from core.config import ALLOWED_MODELS
 
 from ui.components import render_shortcuts
 
+NAMESPACE_STATS_TTL_S = 30  # Sidebar chunk counts; cleared on delete/ingest, so this only bounds other sessions' staleness
+
+@st.cache_data(ttl=NAMESPACE_STATS_TTL_S, show_spinner=False)
+def cached_namespace_stats(_rag_manager):
+    """namespace_stats() costs a Chroma round trip per namespace; don't repeat it on every rerun."""
+    return _rag_manager.namespace_stats()
+
 def render_sidebar():
     """
     Renders the persistent Sidebar for Navigation and Global Context.
@@ -51,6 +58,46 @@ def render_sidebar():
         
         rag_enabled = st.checkbox("RAG Enabled", value=False)
         
+        # Namespace: uploads and retrieval are scoped to one topic/course
+        st.text_input(
+            "Namespace",
+            key="rag_namespace",
+            placeholder="Course or topic (blank = global)",
+            help="Uploads are stored in, and retrieval searches only, this namespace."
+        )
+        st.checkbox(
+            "Rerank results",
+            key="rag_rerank",
+            help="Re-score a wider candidate pool with a local cross-encoder (falls back to distance order if too slow)."
+        )
+        if st.session_state.get("rag_rerank"):
+            from core import rag
+            rag.preload_reranker()  # Model loads in the background, not on the first query
+        
+        # Engine readiness (loaded on a background thread at startup)
+        rag_status = st.session_state.get("rag_status", "idle")
+        if rag_status == "ready":
+            st.caption("🟢 Engine ready")
+        elif rag_status == "error":
+            st.caption("🔴 Engine failed to load")
+        else:
+            st.caption("🟡 Engine warming up...")
+            if rag_enabled:
+                st.info("Knowledge Base is still loading. Retrieval and uploads will apply once it is ready.")
+        
+        if rag_status == "ready" and st.session_state.get("rag_manager"):
+            with st.expander("Namespaces"):
+                stats = cached_namespace_stats(st.session_state.rag_manager)
+                if not stats:
+                    st.caption("Knowledge Base is empty.")
+                for ns, count in stats.items():
+                    c_ns, c_del = st.columns([3, 1])
+                    c_ns.caption(f"{ns or 'global'} · {count} chunks")
+                    if c_del.button("🗑️", key=f"del_ns_{ns or '__global__'}", help=f"Delete '{ns or 'global'}'"):
+                        st.session_state.rag_manager.delete_namespace(ns)
+                        cached_namespace_stats.clear()
+                        st.rerun()
+        
         if uploaded_files:
             st.session_state["uploaded_files"] = uploaded_files
             
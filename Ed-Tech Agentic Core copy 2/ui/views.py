@@ -1,15 +1,16 @@
 import streamlit as st
 import os
 import json
-import pandas as pd
 import html
 import time
 from werkzeug.utils import secure_filename
 from core.state_manager import StateManager
 from core.models import OrchestratorConfig, AgentConfig
 from core.orchestrator import Orchestrator
-from core.config import ALLOWED_MODELS
-from core.utils import load_recent_files
+from core.config import ALLOWED_MODELS, CONTEXT_TOKEN_BUDGET, JOB_QUEUE_DB
+from core.cascade import is_stronger, ladder_policies
+from core.context_packer import pack_context
+from core.utils import split_subtopics
 from ui.components import (
     render_metric_card, render_input_area, 
     render_generation_status, render_skeleton_loader
@@ -17,8 +18,11 @@ from ui.components import (
 from ui.diff_viewer import render_diff_view
 from core.logger import logger
 from core.version_manager import VersionManager
-from lms_automation import publish_to_lms
-from assess_automation import publish_quiz_loop
+from core.catalog import Catalog
+from core.job_queue import JobQueue
+from core import metrics
+from core.cost_ledger import ledger
+from core import assignment_exporter
 
 def render_dashboard():
     """
@@ -84,14 +88,23 @@ def render_dashboard():
         st.divider()
         st.caption("SYSTEM METRICS")
         cost = st.session_state.get("total_cost", 0.0)
-        files_count = len(load_recent_files(limit=100))
+        files_count = Catalog.count()
         c1, c2 = st.columns(2)
         c1.metric("Total Cost", f"₹{cost:.4f}")
         c2.metric("Files", f"{files_count}")
 
+        if os.path.exists(JOB_QUEUE_DB):
+            st.caption("BATCH JOBS")
+            jobs = JobQueue().summary()
+            counts = jobs["counts"]
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Pending", f"{counts['queued'] + counts['running']}")
+            c2.metric("Done", f"{counts['done']}")
+            c3.metric("Failed", f"{counts['failed']}")
+
     # 3. Recent Projects (Full Width)
     st.caption("RECENT PROJECTS")
-    recent_files = load_recent_files(limit=4)
+    recent_files = Catalog.recent(limit=4)
     
     if not recent_files:
         st.info("No recent projects yet. Start creating!")
@@ -199,12 +212,22 @@ def render_editor():
             
         # Initialize Orchestrator
         models = st.session_state.get("model_config", {})
+        auditor_model = models.get("auditor", "claude-3-5-sonnet-20241022")
+        sanitizer_model = models.get("sanitizer", "claude-3-haiku-20240307")
+        checker_model = models.get("checker", "claude-haiku-4-5-20251001")
+        # Cascade: the Auditor starts on the Checker's fast model; all three escalate to the Auditor model
+        # (as core.batch.default_config does), skipping agents already on a model at least as strong
+        cascade = models.get("cascade", False)
+        auditor_start = checker_model if cascade and is_stronger(auditor_model, checker_model) else auditor_model
+        policies = ladder_policies({"auditor": auditor_start, "sanitizer": sanitizer_model, "checker": checker_model},
+                                   auditor_model) if cascade else {}
         config = OrchestratorConfig(
             creator=AgentConfig(model=models.get("creator", "claude-3-5-sonnet-20241022")),
-            auditor=AgentConfig(model=models.get("auditor", "claude-3-5-sonnet-20241022")),
-            pedagogue=AgentConfig(model=models.get("auditor", "claude-3-5-sonnet-20241022")), 
+            auditor=AgentConfig(model=auditor_start, cascade=policies.get("auditor")),
+            pedagogue=AgentConfig(model=auditor_model), 
             editor=AgentConfig(model=models.get("editor", "claude-3-5-sonnet-20241022")),
-            sanitizer=AgentConfig(model=models.get("sanitizer", "claude-3-haiku-20240307")),
+            sanitizer=AgentConfig(model=sanitizer_model, cascade=policies.get("sanitizer")),
+            checker=AgentConfig(model=checker_model, cascade=policies.get("checker")),
             max_iterations=models.get("max_iterations", 3),
             human_in_the_loop=False 
         )
@@ -212,16 +235,28 @@ def render_editor():
         orchestrator = Orchestrator(config=config)
         
         # RAG Logic
-        rag_context = ""
+        context_map = {}
+        subtopic_list = split_subtopics(subtopics)
         if st.session_state.get("rag_enabled", False) and st.session_state.get("rag_manager"):
              with st.spinner("Searching Knowledge Base..."):
-                query = f"{topic} {subtopics}"
-                rag_context = st.session_state.rag_manager.retrieve_context(query)
-                if rag_context: st.toast(f"Found {len(rag_context)} chars of context")
-
-        combined_context = transcript_text or ""
-        if rag_context:
-            combined_context += f"\n\n[KNOWLEDGE BASE CONTEXT]:\n{rag_context}"
+                rag_manager = st.session_state.rag_manager
+                namespace = st.session_state.get("rag_namespace", "")
+                rerank = st.session_state.get("rag_rerank", False)
+                if subtopic_list:
+                    # One batched query -> per-subtopic grounding
+                    context_map = rag_manager.retrieve_context_batch(subtopic_list, topic=topic, namespace=namespace, rerank=rerank)
+                else:
+                    context_map = {topic: rag_manager.retrieve_context(topic, namespace=namespace, rerank=rerank)}
+                rag_chars = sum(len(c) for c in context_map.values())
+                if rag_chars: st.toast(f"Found {rag_chars} chars of context")
+
+        # Fit transcript + KB context into the token budget (stable order keeps the cache prefix identical)
+        combined_context, pack_stats = pack_context(
+            transcript_text, context_map, subtopics=subtopic_list, topic=topic,
+            budget_tokens=st.session_state.get("model_config", {}).get("context_budget", CONTEXT_TOKEN_BUDGET)
+        )
+        if pack_stats["kept"] < pack_stats["segments"]:
+            st.toast(f"Context trimmed to {pack_stats['packed_tokens']} tokens ({pack_stats['kept']}/{pack_stats['segments']} segments)")
 
         # Placeholders
         status_area = st.empty()
@@ -237,9 +272,9 @@ def render_editor():
             assignment_config=st.session_state.get("assignment_config", {})
         ))
         
+        StateManager.refresh_cost()  # Spend is in the ledger even when the run failed
         if final_result:
              st.balloons()
-             StateManager.add_cost(final_result.get('cost', 0))
              st.session_state["generated_content"] = final_result
              st.session_state["generated_mode"] = mode
              
@@ -319,93 +354,14 @@ def render_editor():
                      st.warning("Could not auto-parse assignment JSON. Switching to Markdown view.")
                      assignment_df = None 
                 if content_data:
-                    # Transform to Template Format
+                    # Transform to Template Format (one columnar build, already in template order)
                     if isinstance(content_data, list):
-                        rows = []
-                        for q in content_data:
-                            # Extract basic fields - strict type from model
-                            q_type = q.get("type", "mcsc").lower().strip()
-                            
-                            # Robust Question Text
-                            q_text = q.get("question_text") or q.get("question") or q.get("content") or ""
-                            
-                            # Initialize row with common fields
-                            row = {
-                                "questionType": q_type,
-                                "contentType": "markdown",
-                                "contentBody": q_text,
-                                "intAnswer": "",
-                                "prepTime(in_seconds)": "",
-                                "floatAnswer.max": "",
-                                "floatAnswer.min": "",
-                                "fitbAnswer": "",
-                                "mcscAnswer": "",
-                                "subjectiveAnswer": "",
-                                "option.1": "",
-                                "option.2": "",
-                                "option.3": "",
-                                "option.4": "",
-                                "mcmcAnswer": "",
-                                "tagRelationships": "",
-                                "difficultyLevel": q.get("difficulty", "Medium"),
-                                "answerExplanation": q.get("explanation", ""),
-                                "_validation_warning": q.get("_validation_warning", ""), # NEW
-                                "_original_issues": str(q.get("_original_issues", "")) # NEW
-                            }
-                            
-                            # Populate specifics based on type
-                            if q_type == "mcsc":
-                                opts = q.get("options", [])
-                                for i, opt in enumerate(opts):
-                                    if i < 4:
-                                        row[f"option.{i+1}"] = opt
-                                
-                                # Convert 0-based index to 1-based (Model already returns 1-based, just ensure str)
-                                ans_idx = q.get("correct_option_index", "")
-                                row["mcscAnswer"] = str(ans_idx)
-                                
-                            elif q_type == "mcmc":
-                                opts = q.get("options", [])
-                                for i, opt in enumerate(opts):
-                                    if i < 4:
-                                        row[f"option.{i+1}"] = opt
-                                indices = q.get("correct_option_indices", [])
-                                if isinstance(indices, list):
-                                    # Model returns 1-based indices
-                                    row["mcmcAnswer"] = ", ".join([str(i) for i in indices])
-                                else:
-                                    row["mcmcAnswer"] = str(indices)
-                                    
-                            elif q_type == "subjective":
-                                # User Request: answerExplanation will contain the Solution of the question
-                                # We check multiple keys for the solution/answer
-                                solution = q.get("model_answer") or q.get("answer") or q.get("correct_answer") or q.get("explanation") or ""
-                                row["answerExplanation"] = solution
-                                row["subjectiveAnswer"] = solution # Populate this too just in case
-                                
-                            rows.append(row)
-                        
-                        assignment_df = pd.DataFrame(rows)
-                        # Set Index to start from 1
-                        assignment_df.index = assignment_df.index + 1
-                        
-                        # Enforce Column Order EXACTLY as per template
-                        cols = ["questionType", "contentType", "contentBody", "intAnswer", "prepTime(in_seconds)", 
-                                "floatAnswer.max", "floatAnswer.min", "fitbAnswer", "mcscAnswer", "subjectiveAnswer", 
-                                "option.1", "option.2", "option.3", "option.4", "mcmcAnswer", "tagRelationships", 
-                                "difficultyLevel", "answerExplanation", "_validation_warning"] # Included warning in cols
-                        
-                        # Add missing columns if any
-                        for c in cols:
-                            if c not in assignment_df.columns:
-                                assignment_df[c] = ""
-                        
-                        assignment_df = assignment_df[cols]
-                        
-                        # Ensure all columns are string to prevent PyArrow conversion errors
-                        assignment_df = assignment_df.astype(str)
+                        assignment_df = assignment_exporter.to_dataframe(
+                            content_data, extra_columns=assignment_exporter.REVIEW_COLUMNS
+                        )
                     else:
                         # Fallback for unexpected structure
+                        import pandas as pd
                         assignment_df = pd.DataFrame([content_data] if isinstance(content_data, dict) else [])
 
                 # --- DEBUG UI ---
@@ -513,7 +469,7 @@ def render_editor():
                          new_text, cost = asyncio.run(orch.refine_content(current_text, refine_input))
                          
                          st.session_state.chat_history.append({"role": "assistant", "content": "Updated content based on your request."})
-                         StateManager.add_cost(cost)
+                         StateManager.refresh_cost()
                          
                          st.session_state["manual_editor"] = new_text
                          st.session_state["manual_editor_widget"] = new_text
@@ -543,10 +499,14 @@ def render_editor():
                                  st.caption(summary)
                              with c_v2:
                                  if st.button("Load", key=f"load_v_{v_id}"):
-                                     st.session_state.manual_editor = v.get("content")
-                                     st.session_state.manual_editor_widget = v.get("content")
-                                     st.toast(f"Restored version from {ts}")
-                                     st.rerun()
+                                     restored = VersionManager.restore_version(topic, v_id)
+                                     if restored:
+                                         st.session_state.manual_editor = restored["content"]
+                                         st.session_state.manual_editor_widget = restored["content"]
+                                         st.toast(f"Restored version from {ts}")
+                                         st.rerun()
+                                     else:
+                                         st.error("Version content not found.")
 
         # --- RIGHT COLUMN (Content) ---
         with col_right:
@@ -576,7 +536,7 @@ def render_editor():
              if mode_saved == "Assignment" and assignment_df is not None:
                   # Display Validation Warnings
                   if "_validation_warning" in assignment_df.columns:
-                       warning_count = assignment_df["_validation_warning"].replace("", pd.NA).dropna().shape[0]
+                       warning_count = int((assignment_df["_validation_warning"] != "").sum())
                        if warning_count > 0:
                            st.warning(f"⚠️ {warning_count} questions have validation warnings. Please review the '_validation_warning' column.")
 
@@ -644,7 +604,7 @@ def render_editor():
                              
                           with st.spinner("🕵️ checking for ambiguity and errors..."):
                               report, cost = asyncio.run(checker.check_batch(questions_to_check))
-                              StateManager.add_cost(cost)
+                              StateManager.refresh_cost()
                               
                           # Display Report
                           st.session_state["checker_report"] = report
@@ -903,6 +863,7 @@ def render_editor():
                                   prog_bar.progress(min(max(p, 0.0), 1.0))
                               
                               try:
+                                  from assess_automation import publish_quiz_loop  # Playwright, only on push
                                   with st.spinner("Automating Assessment Creation..."):
                                       res = publish_quiz_loop(email, password, assignment_df, status_callback=update_status)
                                       
@@ -928,6 +889,7 @@ def render_editor():
                               st.error("⚠️ Please set LMS_EMAIL and LMS_PASSWORD in .streamlit/secrets.toml or env vars.")
                           else:
                               try:
+                                  from lms_automation import publish_to_lms  # Playwright, only on push
                                   with st.spinner("Pushing content to Canvas LMS..."):
                                       res = publish_to_lms(email, password, st.session_state.manual_editor)
                                       
@@ -939,6 +901,46 @@ def render_editor():
                               except Exception as e:
                                   st.error(f"Unexpected Error: {e}")
 
+def render_metrics_panel():
+    """
+    Live numbers from core.metrics (the registry served at /metrics) for this server process.
+    """
+    st.markdown("### 📈 Live Metrics")
+    m = metrics.summary()
+    url = metrics.endpoint_url()
+    st.caption(f"Prometheus endpoint: {url}" if url else "Prometheus endpoint not running (METRICS_ENABLED=0 or port in use).")
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("API Calls", f"{m['api_calls']}", help=f"{m['api_errors']} failed")
+    c2.metric("Latency p50 / p95", f"{m['latency_p50_s']:.1f}s / {m['latency_p95_s']:.1f}s")
+    c3.metric("Tokens In / Out", f"{m['input_tokens']:,} / {m['output_tokens']:,}",
+              help=f"{m['cache_read_tokens']:,} input tokens read from the prompt cache")
+    c4.metric("Spend", f"₹{m['cost_inr']:.4f}")
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Active Runs", f"{m['active_runs']}", help=f"{m['runs']} finished")
+    c2.metric("Queue Depth", f"{m['limiter_waiting'] + m['job_queue_depth']}",
+              help=f"{m['limiter_waiting']} requests waiting for the rate limiter · {m['job_queue_depth']} batch jobs pending")
+    c3.metric("Retries", f"{m['retries']}")
+    c4.metric("Limiter Waits", f"{m['limiter_waits']}", help=f"{m['limiter_wait_s']:.1f}s spent waiting")
+
+    st.markdown("#### 💰 Session Spend by Agent")
+    rows = ledger.breakdown(by="agent", session_id=StateManager.get_session_id())
+    if rows:
+        st.table([{"Agent": r["key"] or "—", "Calls": r["calls"], "Tokens In": r["input_tokens"],
+                   "Cache Read": r["cache_read_tokens"], "Tokens Out": r["output_tokens"],
+                   "Cost (₹)": f"{r['cost']:.4f}"} for r in rows])
+    else:
+        st.caption("No API calls recorded for this session yet.")
+
+    rates = metrics.escalation_rates()
+    if rates:
+        st.markdown("#### 🪜 Model Cascade")
+        st.table([{"Agent": agent, "Calls": r["calls"], "Escalated": r["escalated"], "Rate": f"{r['rate']:.0%}"}
+                  for agent, r in sorted(rates.items())])
+
+    st.button("🔄 Refresh Metrics")
+
 def render_settings():
     """
     Settings View: Model Config & System Prompts.
@@ -967,6 +969,16 @@ def render_settings():
         checker_model = st.selectbox("Checker Model", ALLOWED_MODELS, index=get_index(current_config.get("checker", "claude-haiku-4-5-20251001")))
         
     iterations = st.slider("Max Refinement Loops", 1, 5, current_config.get("max_iterations", 2))
+    context_budget = st.number_input(
+        "Context Token Budget", min_value=2000, max_value=180000, step=2000,
+        value=current_config.get("context_budget", CONTEXT_TOKEN_BUDGET),
+        help="Max tokens of transcript + knowledge base context sent to the agents."
+    )
+    cascade = st.checkbox(
+        "Model Cascade", value=current_config.get("cascade", False),
+        help="The Auditor starts on the Checker model. Auditor, Sanitizer and Checker retry on the Auditor model "
+             "only when their output fails validation, reports low confidence or scores near the stop threshold."
+    )
     
     # Save back to session state to be picked up by other views
     new_config = {
@@ -975,17 +987,28 @@ def render_settings():
         "editor": editor_model,
         "sanitizer": sanitizer_model,
         "checker": checker_model,
-        "max_iterations": iterations
+        "max_iterations": iterations,
+        "context_budget": context_budget,
+        "cascade": cascade
     }
     
     st.session_state.model_config = new_config
     
-    StateManager.save_to_disk()
+    StateManager.save_to_disk(debounce=True)
     
     if st.button("💾 Save Configuration"):
         StateManager.save_to_disk()
         st.success("Configuration saved to disk.")
     
+    stats = StateManager.get_persistence_stats()
+    st.caption(
+        f"Session saves: {stats['requests']} requested · {stats['writes']} state writes · "
+        f"{stats['draft_writes']} draft writes · avg {stats['avg_ms']:.1f} ms · max {stats['max_ms']:.1f} ms"
+    )
+
+    st.divider()
+    render_metrics_panel()
+
     st.divider()
     
     st.markdown("### 🛑 Danger Zone")